@@ -0,0 +1,55 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+"""
+benchmarks of the performance critical parts of xrayutilities, i.e. the
+reciprocal space conversion and the gridders.
+
+The layout follows the conventions of airspeed velocity (asv): every class
+defines params/param_names, a setup method and time_* and track_* methods.
+The track_* methods return the throughput in items (pixels, data points) per
+second. The benchmarks can be run either with 'asv run' or without any further
+dependency using 'python -m benchmarks [filter]' in the repository root.
+"""
+
+import time
+
+
+def throughput(func, nitems, repeat=3):
+    """
+    determine the throughput of a function as the best of several runs
+
+    Parameters
+    ----------
+    func :      callable
+        function without arguments which performs the benchmarked operation
+    nitems :    int
+        number of items (pixels, data points) treated in one call of func
+    repeat :    int, optional
+        number of repetitions (default: 3)
+
+    Returns
+    -------
+    float
+        number of treated items per second
+    """
+    best = float('inf')
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return nitems / best
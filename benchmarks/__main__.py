@@ -0,0 +1,102 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+"""
+simple runner for the benchmarks which does not need airspeed velocity.
+
+usage: python -m benchmarks [-r REPEAT] [filter]
+
+The optional filter is a regular expression which is matched against the
+benchmark names, e.g. 'QConversionArea' or 'track_.*throughput'.
+"""
+
+import argparse
+import importlib
+import inspect
+import itertools
+import re
+import time
+
+MODULES = ('qconversion', 'gridder')
+
+
+def find_benchmarks(pattern):
+    """
+    yield all benchmark classes and the names of their benchmark methods
+    which match the given regular expression
+    """
+    regex = re.compile(pattern)
+    for modname in MODULES:
+        module = importlib.import_module('.' + modname, __package__)
+        for cname, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            methods = [m for m in sorted(dir(cls))
+                       if m.startswith(('time_', 'track_')) and
+                       regex.search('%s.%s.%s' % (modname, cname, m))]
+            if methods:
+                yield '%s.%s' % (modname, cname), cls, methods
+
+
+def run_benchmark(name, cls, methods, repeat):
+    """
+    run the benchmark methods of one class for all parameter combinations
+    """
+    params = getattr(cls, 'params', ())
+    if params and not isinstance(params[0], (list, tuple)):
+        params = (params, )
+    for p in itertools.product(*params):
+        bench = cls()
+        try:
+            bench.setup(*p)
+        except NotImplementedError:
+            continue
+        try:
+            for m in methods:
+                func = getattr(bench, m)
+                label = '%s.%s(%s)' % (name, m, ', '.join(map(str, p)))
+                if m.startswith('time_'):
+                    best = float('inf')
+                    for i in range(repeat):
+                        t0 = time.perf_counter()
+                        func(*p)
+                        best = min(best, time.perf_counter() - t0)
+                    print('%-78s %10.2f ms' % (label, best * 1e3))
+                else:
+                    value = func(*p)
+                    print('%-78s %10.4g %s' % (label, value,
+                                               getattr(func, 'unit', '')))
+        finally:
+            if hasattr(bench, 'teardown'):
+                bench.teardown(*p)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='run the xrayutilities benchmarks')
+    parser.add_argument('filter', nargs='?', default='',
+                        help='regular expression to select benchmarks')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='number of repetitions of the time_ benchmarks')
+    args = parser.parse_args()
+
+    for name, cls, methods in find_benchmarks(args.filter):
+        run_benchmark(name, cls, methods, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+"""
+benchmarks of the 2D and 3D gridders including the fuzzy gridders and the
+fused area detector conversion and gridding
+"""
+
+import numpy
+import xrayutilities as xu
+
+from . import throughput
+
+NTHREADS = (1, 0)
+
+
+class GridderBase(object):
+    timeout = 300
+    npoints = 2 * 10**6
+
+    def setup(self, *params):
+        self.nthreads = xu.config.NTHREADS
+        rng = numpy.random.RandomState(0)
+        self.x = rng.normal(size=self.npoints)
+        self.y = rng.normal(size=self.npoints)
+        self.z = rng.normal(size=self.npoints)
+        self.data = rng.rand(self.npoints)
+        self.nitems = self.npoints
+
+    def teardown(self, *params):
+        xu.config.NTHREADS = self.nthreads
+
+
+class Gridder2D(GridderBase):
+    params = (('Gridder2D', 'FuzzyGridder2D'), (100, 1000), NTHREADS)
+    param_names = ('gridder', 'nbins', 'nthreads')
+
+    def setup(self, gridder, nbins, nthreads):
+        GridderBase.setup(self)
+        xu.config.NTHREADS = nthreads
+        self.gridder = getattr(xu, gridder)(nbins, nbins)
+
+    def run(self):
+        self.gridder(self.x, self.y, self.data)
+
+    def time_gridder2d(self, gridder, nbins, nthreads):
+        self.run()
+
+    def track_gridder2d_throughput(self, gridder, nbins, nthreads):
+        return throughput(self.run, self.nitems)
+    track_gridder2d_throughput.unit = 'points/s'
+
+
+class Gridder3D(GridderBase):
+    params = (('Gridder3D', 'FuzzyGridder3D'), (50, 200), NTHREADS)
+    param_names = ('gridder', 'nbins', 'nthreads')
+
+    def setup(self, gridder, nbins, nthreads):
+        GridderBase.setup(self)
+        xu.config.NTHREADS = nthreads
+        self.gridder = getattr(xu, gridder)(nbins, nbins, nbins)
+
+    def run(self):
+        self.gridder(self.x, self.y, self.z, self.data)
+
+    def time_gridder3d(self, gridder, nbins, nthreads):
+        self.run()
+
+    def track_gridder3d_throughput(self, gridder, nbins, nthreads):
+        return throughput(self.run, self.nitems)
+    track_gridder3d_throughput.unit = 'points/s'
+
+
+class Gridder3DArea(GridderBase):
+    params = ((256, 1024), NTHREADS)
+    param_names = ('npixel', 'nthreads')
+    totalpixels = 2**22
+
+    def setup(self, npixel, nthreads):
+        self.nthreads = xu.config.NTHREADS
+        xu.config.NTHREADS = nthreads
+        self.qconv = xu.QConversion(['x+', 'y+', 'z-'], ['x+'], [0, 1, 0])
+        self.qconv.init_area('z-', 'y+', npixel / 2, npixel / 2, npixel,
+                             npixel, 1.0, 75e-6, 75e-6)
+        npoints = max(1, self.totalpixels // npixel**2)
+        om = numpy.linspace(10, 40, npoints)
+        self.angles = (om, 0, 0, 2 * om)
+        self.data = numpy.random.RandomState(0).rand(npoints, npixel,
+                                                     npixel)
+        self.gridder = xu.Gridder3D(100, 100, 100)
+        qx, qy, qz = self.qconv.area(*self.angles)
+        self.gridder.dataRange(qx.min(), qx.max(), qy.min(), qy.max(),
+                               qz.min(), qz.max())
+        self.nitems = self.data.size
+
+    def run(self):
+        self.gridder.grid_area(self.qconv, *self.angles, self.data)
+
+    def time_grid_area(self, npixel, nthreads):
+        self.run()
+
+    def track_grid_area_throughput(self, npixel, nthreads):
+        return throughput(self.run, self.nitems)
+    track_grid_area_throughput.unit = 'pixels/s'
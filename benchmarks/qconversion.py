@@ -0,0 +1,152 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+"""
+benchmarks of the reciprocal space conversion of point, linear and area
+detector data for the different variants of the C-code (sample displacement
+'sd', detector translations 'trans' and both 'sdtrans')
+"""
+
+import numpy
+import xrayutilities as xu
+
+from . import throughput
+
+VARIANTS = ('plain', 'sd', 'trans', 'sdtrans')
+NTHREADS = (1, 0)
+
+
+def make_qconv(variant):
+    """
+    create a four-circle goniometer with optional detector translation and the
+    keyword arguments needed for the given conversion variant
+    """
+    daxis = ['x+', 'ty'] if variant.endswith('trans') else ['x+']
+    qconv = xu.QConversion(['x+', 'y+', 'z-'], daxis, [0, 1, 0])
+    kwargs = {}
+    if variant.startswith('sd'):
+        kwargs['sampledis'] = (1e-3, -2e-3, 5e-4)
+    return qconv, kwargs
+
+
+def make_angles(qconv, npoints):
+    """
+    angular positions of a continuous scan through reciprocal space
+    """
+    om = numpy.linspace(10, 40, npoints)
+    angles = [om, numpy.linspace(-2, 2, npoints), numpy.zeros(npoints),
+              2 * om]
+    if len(qconv.detectorAxis) > 1:
+        angles.append(numpy.linspace(0, 1e-3, npoints))
+    return angles
+
+
+class ConversionBase(object):
+    timeout = 300
+
+    def setup(self, *params):
+        self.nthreads = xu.config.NTHREADS
+
+    def teardown(self, *params):
+        xu.config.NTHREADS = self.nthreads
+
+
+class QConversionPoint(ConversionBase):
+    params = (VARIANTS, (10**4, 10**6), NTHREADS)
+    param_names = ('variant', 'npoints', 'nthreads')
+
+    def setup(self, variant, npoints, nthreads):
+        ConversionBase.setup(self)
+        xu.config.NTHREADS = nthreads
+        self.qconv, self.kwargs = make_qconv(variant)
+        self.angles = make_angles(self.qconv, npoints)
+        self.nitems = npoints
+
+    def run(self):
+        self.qconv.point(*self.angles, **self.kwargs)
+
+    def time_point(self, variant, npoints, nthreads):
+        self.run()
+
+    def track_point_throughput(self, variant, npoints, nthreads):
+        return throughput(self.run, self.nitems)
+    track_point_throughput.unit = 'points/s'
+
+
+class QConversionLinear(ConversionBase):
+    params = (VARIANTS, (1280, 5120), ('full', 'Nav', 'roi'), NTHREADS)
+    param_names = ('variant', 'nchannel', 'reduction', 'nthreads')
+    npoints = 500
+
+    def setup(self, variant, nchannel, reduction, nthreads):
+        ConversionBase.setup(self)
+        xu.config.NTHREADS = nthreads
+        self.qconv, self.kwargs = make_qconv(variant)
+        self.qconv.init_linear('z+', nchannel / 2, nchannel, 1.0, 50e-6)
+        self.angles = make_angles(self.qconv, self.npoints)
+        nch = nchannel
+        if reduction == 'Nav':
+            self.kwargs['Nav'] = 4
+            nch = nchannel // 4
+        elif reduction == 'roi':
+            self.kwargs['roi'] = (nchannel // 4, 3 * nchannel // 4)
+            nch = nchannel // 2
+        self.nitems = self.npoints * nch
+
+    def run(self):
+        self.qconv.linear(*self.angles, **self.kwargs)
+
+    def time_linear(self, variant, nchannel, reduction, nthreads):
+        self.run()
+
+    def track_linear_throughput(self, variant, nchannel, reduction, nthreads):
+        return throughput(self.run, self.nitems)
+    track_linear_throughput.unit = 'pixels/s'
+
+
+class QConversionArea(ConversionBase):
+    params = (VARIANTS, (256, 1024), ('full', 'Nav', 'roi'), NTHREADS)
+    param_names = ('variant', 'npixel', 'reduction', 'nthreads')
+    # total number of converted pixels per call
+    totalpixels = 2**22
+
+    def setup(self, variant, npixel, reduction, nthreads):
+        ConversionBase.setup(self)
+        xu.config.NTHREADS = nthreads
+        self.qconv, self.kwargs = make_qconv(variant)
+        self.qconv.init_area('z-', 'y+', npixel / 2, npixel / 2, npixel,
+                             npixel, 1.0, 75e-6, 75e-6)
+        npix = npixel**2
+        if reduction == 'Nav':
+            self.kwargs['Nav'] = (2, 2)
+            npix //= 4
+        elif reduction == 'roi':
+            self.kwargs['roi'] = (0, npixel // 2, 0, npixel // 2)
+            npix //= 4
+        npoints = max(1, self.totalpixels // npix)
+        self.angles = make_angles(self.qconv, npoints)
+        self.nitems = npoints * npix
+
+    def run(self):
+        self.qconv.area(*self.angles, **self.kwargs)
+
+    def time_area(self, variant, npixel, reduction, nthreads):
+        self.run()
+
+    def track_area_throughput(self, variant, npixel, reduction, nthreads):
+        return throughput(self.run, self.nitems)
+    track_area_throughput.unit = 'pixels/s'
@@ -83,3 +83,13 @@ for i in range(100):
 
 tend = time.time()
 print("Total time needed: %.2fsec" % (tend - tbegin))
+
+# the same path can be calculated in one call, which uses the previous
+# solution as start value of the next fit (nproc > 1 splits the path into
+# chunks treated in parallel worker processes)
+tbegin = time.time()
+qvecs = numpy.zeros((100, 3))
+qvecs[:, 2] = numpy.arange(100) * 0.01
+ang, qerror, errcode = xu.Q2AngFitBatch(qvecs, hxrd, bounds)
+tend = time.time()
+print("Total time needed for batch conversion: %.2fsec" % (tend - tbegin))
@@ -32,12 +32,15 @@ import os
 from . import __path__, analysis, config, io, materials, math, simpack
 from .experiment import (GID, GISAXS, HXRD, Experiment, FourC, NonCOP,
                          PowderExperiment, QConversion)
-from .gridder import FuzzyGridder1D, Gridder1D, npyGridder1D
-from .gridder2d import FuzzyGridder2D, Gridder2D, Gridder2DList
-from .gridder3d import FuzzyGridder3D, Gridder3D
+from .gridder import (FuzzyGridder1D, Gridder1D, grid_parallel,
+                      load_pyramid, npyGridder1D)
+from .gridder2d import (FuzzyGridder2D, Gridder2D, Gridder2DList,
+                        PixelSplitGridder2D, SlabGridder2D)
+from .gridder3d import (FuzzyGridder3D, Gridder3D, OutOfCoreGridder3D,
+                        PixelSplitGridder3D, SparseGridder3D)
 from .normalize import (IntensityNormalizer, blockAverage1D, blockAverage2D,
                         blockAverageCCD, blockAveragePSD)
-from .q2ang_fit import Q2AngFit
+from .q2ang_fit import Q2AngFit, Q2AngFitBatch
 from .utilities import (clear_bit, en2lam, energy, frac2str, lam2en,
                         makeNaturalName, maplog, set_bit, wavelength)
 
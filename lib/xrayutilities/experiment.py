@@ -73,7 +73,8 @@ class QConversion(object):
                           'en': 'x-ray energy',
                           'UB': 'orientation/orthonormalization matrix',
                           'deg': 'True if angles are in degrees',
-                          'sampledis': 'sample displacement vector'}
+                          'sampledis': 'sample displacement vector',
+                          'dtype': 'data type of the momentum transfer'}
     _valid_linear_kwargs = {'Nav': 'number of channels for block-average',
                             'roi': 'region of interest'}
 
@@ -141,6 +142,7 @@ class QConversion(object):
         self._linear_init = False
         self._area_init = False
         self._area_detrotaxis_set = False
+        self._detector_cache = {}
 
     def _set_energy(self, energy):
         self._en = utilities.energy(energy)
@@ -486,6 +488,11 @@ class QConversion(object):
         sampledis : tuple or list or array-like
             sample displacement vector in relative units of the detector
             distance (default: (0, 0, 0))
+        dtype :     numpy.float64 or numpy.float32, optional
+            data type of the returned momentum transfer (default:
+            numpy.float64). The calculation is always performed in double
+            precision, while the storage in single precision halves the memory
+            footprint of the result.
         """
         flags = 0
         if self._has_translations:
@@ -516,6 +523,13 @@ class QConversion(object):
         if 'sampledis' in kwargs:
             flags = utilities.set_bit(flags, 2)
 
+        dtype = numpy.dtype(kwargs.get('dtype', numpy.double))
+        if dtype == numpy.float32:
+            flags = utilities.set_bit(flags, 3)
+        elif dtype != numpy.double:
+            raise InputError("QConversion: dtype must be either numpy.float64 "
+                             "or numpy.float32")
+
         return Ns, Nd, Ncirc, wl, deg, delta, UB, sd, flags
 
     def __call__(self, *args, **kwargs):
@@ -524,6 +538,74 @@ class QConversion(object):
         """
         return self.point(*args, **kwargs)
 
+    def _prepare_point(self, args, kwargs):
+        """
+        helper function to prepare the input of the point detector conversion
+        and its derivatives (see point for a description of the arguments)
+
+        Returns
+        -------
+        sAngles, dAngles :  ndarray
+            sample and detector angles with shape (Npoints, Ns/Nd)
+        sAxis, dAxis :      str
+            sample and detector axis strings
+        UB :                ndarray
+            orientation matrix
+        sd :                ndarray
+            sample displacement
+        wl :                ndarray
+            wavelength for every point
+        Npoints :           int
+            number of points
+        retshape :          tuple
+            shape of the return values
+        flags :             int
+            flags for the C-functions
+        """
+        Ns, Nd, Ncirc, wl, deg, delta, UB, sd, flags = \
+            self._parse_common_kwargs(**kwargs)
+
+        # prepare angular arrays from *args
+        # need one sample angle and one detector angle array
+        if len(args) != Ncirc:
+            raise InputError("QConversion: wrong amount (%d) of arguments "
+                             "given, number of arguments should be %d"
+                             % (len(args), Ncirc))
+
+        # determine the number of points
+        a = args + (wl,)
+        Npoints = self._checkInput(*a)
+
+        # reshape/recast input arguments for sample and detector angles
+        sAngles, retshape = self._reshapeInput(Npoints, delta[:Ns],
+                                               self.sampleAxis, *args[:Ns],
+                                               deg=deg)
+        dAngles = self._reshapeInput(Npoints, delta[Ns:],
+                                     self.detectorAxis, *args[Ns:],
+                                     deg=deg)[0]
+        wl = numpy.ravel(self._reshapeInput(Npoints, (0, ), 'a',
+                                            wl, deg=False)[0])
+
+        sAngles = sAngles.transpose()
+        dAngles = dAngles.transpose()
+
+        sAxis = self._sampleAxis_str
+        dAxis = self._detectorAxis_str
+
+        if self._area_detrotaxis_set:
+            # do not consider detector rotation for point detector
+            dAxis = self._detectorAxis_str[:-2]
+        else:
+            dAxis = self._detectorAxis_str
+
+        if config.VERBOSITY >= config.DEBUG:
+            print("XU.QConversion: Ns, Nd: %d %d" % (Ns, Nd))
+            print("XU.QConversion: sAngles / dAngles %s / %s"
+                  % (str(sAngles), str(dAngles)))
+
+        return (sAngles, dAngles, sAxis, dAxis, UB, sd, wl, Npoints, retshape,
+                flags)
+
     def point(self, *args, **kwargs):
         """
         angular to momentum space conversion for a point detector
@@ -566,6 +648,11 @@ class QConversion(object):
         sampledis : tuple or list or array-like
             sample displacement vector in relative units of the detector
             distance (default: (0, 0, 0))
+        dtype :     numpy.float64 or numpy.float32, optional
+            data type of the returned momentum transfer (default:
+            numpy.float64). The calculation is always performed in double
+            precision, while the storage in single precision halves the memory
+            footprint of the result.
 
         Returns
         -------
@@ -576,46 +663,8 @@ class QConversion(object):
 
         utilities.check_kwargs(kwargs, self._valid_call_kwargs, 'Ang2Q/point')
 
-        Ns, Nd, Ncirc, wl, deg, delta, UB, sd, flags = \
-            self._parse_common_kwargs(**kwargs)
-
-        # prepare angular arrays from *args
-        # need one sample angle and one detector angle array
-        if len(args) != Ncirc:
-            raise InputError("QConversion: wrong amount (%d) of arguments "
-                             "given, number of arguments should be %d"
-                             % (len(args), Ncirc))
-
-        # determine the number of points
-        a = args + (wl,)
-        Npoints = self._checkInput(*a)
-
-        # reshape/recast input arguments for sample and detector angles
-        sAngles, retshape = self._reshapeInput(Npoints, delta[:Ns],
-                                               self.sampleAxis, *args[:Ns],
-                                               deg=deg)
-        dAngles = self._reshapeInput(Npoints, delta[Ns:],
-                                     self.detectorAxis, *args[Ns:],
-                                     deg=deg)[0]
-        wl = numpy.ravel(self._reshapeInput(Npoints, (0, ), 'a',
-                                            wl, deg=False)[0])
-
-        sAngles = sAngles.transpose()
-        dAngles = dAngles.transpose()
-
-        sAxis = self._sampleAxis_str
-        dAxis = self._detectorAxis_str
-
-        if self._area_detrotaxis_set:
-            # do not consider detector rotation for point detector
-            dAxis = self._detectorAxis_str[:-2]
-        else:
-            dAxis = self._detectorAxis_str
-
-        if config.VERBOSITY >= config.DEBUG:
-            print("XU.QConversion: Ns, Nd: %d %d" % (Ns, Nd))
-            print("XU.QConversion: sAngles / dAngles %s / %s"
-                  % (str(sAngles), str(dAngles)))
+        sAngles, dAngles, sAxis, dAxis, UB, sd, wl, Npoints, retshape, \
+            flags = self._prepare_point(args, kwargs)
 
         qpos = cxrayutilities.ang2q_conversion(
             sAngles, dAngles, self.r_i, sAxis, dAxis,
@@ -628,6 +677,56 @@ class QConversion(object):
                 numpy.reshape(qpos[:, 1], retshape), \
                 numpy.reshape(qpos[:, 2], retshape)
 
+    def point_jacobian(self, *args, **kwargs):
+        """
+        derivatives of the momentum transfer for a point detector with respect
+        to the goniometer angles. The derivatives are calculated analytically
+        from the rotation matrices of the goniometer circles.
+
+        Parameters
+        ----------
+        args :      ndarray, list or Scalars
+            sample and detector angles; see point for details
+        kwargs :    dict, optional
+            optional keyword arguments; same as for point. The dtype argument
+            is ignored.
+
+        Returns
+        -------
+        ndarray
+            derivatives of the momentum transfer with shape ``(N, Ncirc, 3)``
+            or ``(Ncirc, 3)`` for a single point, where `Ncirc` is the number
+            of goniometer circles. The derivatives are given per degree (or
+            per radian if deg=False) for rotations and per unit length for
+            translations.
+        """
+
+        utilities.check_kwargs(kwargs, self._valid_call_kwargs,
+                               'Ang2Q/point_jacobian')
+
+        sAngles, dAngles, sAxis, dAxis, UB, sd, wl, Npoints, retshape, \
+            flags = self._prepare_point(args, kwargs)
+        Nd = len(dAxis) // 2
+
+        jac = cxrayutilities.ang2q_conversion_jacobian(
+            sAngles, numpy.ascontiguousarray(dAngles[:, :Nd]), self.r_i,
+            sAxis, dAxis, self._kappa_dir, UB, sd, wl, config.NTHREADS, flags)
+
+        if kwargs.get('deg', True):
+            rot = [circleSyntaxSample.search(c) is not None
+                   for c in self.sampleAxis + self.detectorAxis[:Nd]]
+            jac[:, rot, :] *= numpy.pi / 180.
+
+        if dAngles.shape[1] > Nd:
+            # the detector rotation of area detectors has no influence
+            jac = numpy.concatenate(
+                (jac, numpy.zeros((Npoints, dAngles.shape[1] - Nd, 3))),
+                axis=1)
+
+        if Npoints == 1:
+            return jac[0]
+        return jac
+
     def init_linear(self, detectorDir, cch, Nchannel, distance=None,
                     pixelwidth=None, chpdeg=None, tilt=0, **kwargs):
         """
@@ -704,6 +803,7 @@ class QConversion(object):
         self.r_i = math.VecUnit(self.r_i) * self._linear_distance
 
         self._linear_init = True
+        self._detector_cache.clear()
 
     def _get_detparam_linear(self, oroi, nav):
         """
@@ -770,6 +870,11 @@ class QConversion(object):
         sampledis : tuple or list or array-like
             sample displacement vector in relative units of the detector
             distance (default: (0, 0, 0))
+        dtype :     numpy.float64 or numpy.float32, optional
+            data type of the returned momentum transfer (default:
+            numpy.float64). The calculation is always performed in double
+            precision, while the storage in single precision halves the memory
+            footprint of the result.
 
         Returns
         -------
@@ -777,13 +882,63 @@ class QConversion(object):
         shape ( (*)*(self._linear_roi[1]-self._linear_roi[0]+1) , 3 )
         """
 
+        sAngles, dAngles, wl, Npoints, rpix, UB, sd, flags = \
+            self._prepare_linear(args, kwargs, 'Ang2Q/linear')
+        nch = rpix.shape[0]
+        sAxis = self._sampleAxis_str
+        dAxis = self._detectorAxis_str
+
+        qpos = cxrayutilities.ang2q_conversion_linear(
+            sAngles, dAngles, self.r_i, sAxis, dAxis, self._kappa_dir,
+            rpix, UB, sd, wl, config.NTHREADS, flags)
+
+        # reshape output
+        if Npoints == 1:
+            qpos.shape = (Npoints * nch, 3)
+            return qpos[:, 0], qpos[:, 1], qpos[:, 2]
+        else:
+            qpos.shape = (Npoints, nch, 3)
+            return qpos[:, :, 0], qpos[:, :, 1], qpos[:, :, 2]
+
+    def _prepare_linear(self, args, kwargs, identifier):
+        """
+        common input checks and preparation of the arguments for the linear
+        detector conversion routines.
+
+        Parameters
+        ----------
+        args :          tuple
+            sample and detector angles as given to linear()
+        kwargs :        dict
+            keyword arguments as given to linear()
+        identifier :    str
+            name of the calling function used in error messages
+
+        Returns
+        -------
+        sAngles, dAngles :  ndarray
+            sample and detector angles with shape (Npoints, Ns/Nd)
+        wl :                ndarray
+            wavelength for every goniometer position
+        Npoints :           int
+            number of goniometer positions
+        rpix :              ndarray
+            position of the detector channels considering Nav and roi with
+            shape (Nch, 3), see _get_detector_pixels
+        UB :                ndarray
+            orientation matrix
+        sd :                ndarray
+            sample displacement vector
+        flags :             int
+            flags for the C-routines
+        """
         if not self._linear_init:
             raise Exception("QConversion: linear detector not initialized -> "
                             "call Ang2Q.init_linear(...)")
 
         valid_kwargs = copy.copy(self._valid_call_kwargs)
         valid_kwargs.update(self._valid_linear_kwargs)
-        utilities.check_kwargs(kwargs, valid_kwargs, 'Ang2Q/linear')
+        utilities.check_kwargs(kwargs, valid_kwargs, identifier)
 
         Ns, Nd, Ncirc, wl, deg, delta, UB, sd, flags = \
             self._parse_common_kwargs(**kwargs)
@@ -816,22 +971,42 @@ class QConversion(object):
         sAngles = sAngles.transpose()
         dAngles = dAngles.transpose()
 
-        cch, pwidth, roi = self._get_detparam_linear(oroi, nav)
-        sAxis = self._sampleAxis_str
-        dAxis = self._detectorAxis_str
+        rpix = self._get_detector_pixels(1, oroi, nav)
 
-        qpos = cxrayutilities.ang2q_conversion_linear(
-            sAngles, dAngles, self.r_i, sAxis, dAxis, self._kappa_dir,
-            cch, pwidth, roi, self._linear_detdir, self._linear_tilt,
-            UB, sd, wl, config.NTHREADS, flags)
+        return sAngles, dAngles, wl, Npoints, rpix, UB, sd, flags
 
-        # reshape output
-        if Npoints == 1:
-            qpos.shape = (Npoints * (roi[1] - roi[0]), 3)
-            return qpos[:, 0], qpos[:, 1], qpos[:, 2]
-        else:
-            qpos.shape = (Npoints, (roi[1] - roi[0]), 3)
-            return qpos[:, :, 0], qpos[:, :, 1], qpos[:, :, 2]
+    def linear_bounds(self, *args, **kwargs):
+        """
+        determine the minimum and maximum momentum transfer of all channels
+        of a linear detector for the given goniometer positions. The result is
+        identical to the extrema of the output of linear(), however, only the
+        two outer channels and the channels around the interior extrema of
+        every momentum transfer component are converted for every goniometer
+        position. This allows to fix the data range of a gridder before the
+        data are converted.
+
+        Parameters
+        ----------
+        args :      ndarray, list or Scalars
+            sample and detector angles as for the linear() method.
+        kwargs :    dict, optional
+            all optional keyword arguments of linear() are supported. If UB
+            is given the bounds of the (hkl) coordinates are determined.
+
+        Returns
+        -------
+        bounds :    ndarray
+            array of shape (3, 2) with the minimum and maximum of the three
+            momentum transfer components, e.g. to be used as
+            ``gridder.dataRange(*bounds.flat)``
+        """
+        sAngles, dAngles, wl, Npoints, rpix, UB, sd, flags = \
+            self._prepare_linear(args, kwargs, 'Ang2Q/linear_bounds')
+
+        return cxrayutilities.ang2q_conversion_area_bounds(
+            sAngles, dAngles, self.r_i, self._sampleAxis_str,
+            self._detectorAxis_str, self._kappa_dir, rpix[:, numpy.newaxis],
+            UB, sd, wl, config.NTHREADS, flags)
 
     def init_area(self, detectorDir1, detectorDir2, cch1, cch2, Nch1, Nch2,
                   distance=None, pwidth1=None, pwidth2=None, chpdeg1=None,
@@ -951,6 +1126,7 @@ class QConversion(object):
         self.r_i = math.VecUnit(self.r_i) * self._area_distance
 
         self._area_init = True
+        self._detector_cache.clear()
 
     def _get_detparam_area(self, oroi, nav):
         """
@@ -969,6 +1145,63 @@ class QConversion(object):
         roi = roi.astype(numpy.int32)
         return cch1, cch2, pwidth1, pwidth2, roi
 
+    def _get_detector_pixels(self, dim, oroi, nav, corners=False):
+        """
+        position of the detector pixels relative to the center of rotation at
+        zero detector angles as used by the C subroutines. Since the positions
+        only depend on the detector parameters they are cached until
+        init_linear/init_area is called again.
+
+        Parameters
+        ----------
+        dim :       int
+            dimension of the detector (1: linear, 2: area detector)
+        oroi :      tuple or list
+            region of interest for the detector pixels
+        nav :       int or tuple or list
+            number of channels to average
+        corners :   bool, optional
+            if True the positions of the pixel corners instead of the pixel
+            centers are returned (only for area detectors)
+
+        Returns
+        -------
+        ndarray
+            read-only array with the pixel positions of shape (Nch, 3) for a
+            linear or (Npix1, Npix2, 3) for an area detector. The corners are
+            returned with shape (Npix1 + 1, Npix2 + 1, 3).
+        """
+        key = (dim, tuple(numpy.ravel(oroi)), tuple(numpy.ravel(nav)),
+               tuple(self.r_i), corners)
+        if key in self._detector_cache:
+            return self._detector_cache[key]
+
+        if dim == 1:
+            rpix = cxrayutilities.ang2q_detector_linear(
+                self.r_i, *self._get_detparam_linear(oroi, nav),
+                self._linear_detdir, self._linear_tilt)
+        else:
+            cch1, cch2, pwidth1, pwidth2, roi = \
+                self._get_detparam_area(oroi, nav)
+            if corners:
+                # the corners are located half a pixel before the pixel
+                # centers and one more corner than pixels exists
+                cch1 += 0.5
+                cch2 += 0.5
+                roi[1] += 1
+                roi[3] += 1
+            rpix = cxrayutilities.ang2q_detector_area(
+                self.r_i, cch1, cch2, pwidth1, pwidth2, roi,
+                self._area_detdir1, self._area_detdir2,
+                self._area_tiltazimuth, self._area_tilt)
+        rpix.flags.writeable = False
+
+        # only few different roi/Nav settings are expected
+        if len(self._detector_cache) >= 16:
+            self._detector_cache.clear()
+        self._detector_cache[key] = rpix
+        return rpix
+
     def area(self, *args, **kwargs):
         """
         angular to momentum space conversion for a area detector
@@ -1020,6 +1253,15 @@ class QConversion(object):
         sampledis : tuple or list or array-like
             sample displacement vector in relative units of the detector
             distance (default: (0, 0, 0))
+        dtype :     numpy.float64 or numpy.float32, optional
+            data type of the returned momentum transfer (default:
+            numpy.float64). The calculation is always performed in double
+            precision, while the storage in single precision halves the memory
+            footprint of the result.
+        corners :   bool, optional
+            if True the momentum transfer of the pixel corners instead of the
+            pixel centers is returned. In this case one point more than pixels
+            is returned along both detector directions (default: False).
 
 
         Returns
@@ -1030,13 +1272,174 @@ class QConversion(object):
         the fastest varing
         """
 
+        sAngles, dAngles, wl, Npoints, rpix, UB, sd, flags = \
+            self._prepare_area(args, kwargs, 'Ang2Q/area')
+
+        qpos = cxrayutilities.ang2q_conversion_area(
+            sAngles, dAngles, self.r_i, self._sampleAxis_str,
+            self._detectorAxis_str, self._kappa_dir, rpix, UB, sd, wl,
+            config.NTHREADS, flags)
+
+        # reshape output
+        if Npoints == 1:
+            qpos.shape = rpix.shape
+            return qpos[:, :, 0], qpos[:, :, 1], qpos[:, :, 2]
+        else:
+            qpos.shape = (Npoints, ) + rpix.shape
+            return qpos[:, :, :, 0], qpos[:, :, :, 1], qpos[:, :, :, 2]
+
+    def area_iter(self, *args, **kwargs):
+        """
+        angular to momentum space conversion for a area detector which yields
+        the result chunk by chunk. In contrast to area() the momentum transfer
+        of all frames is never held in memory at the same time, which allows
+        the treatment of scans which would not fit into memory at once.
+
+        the detector geometry must be initialized by the init_area(...) routine
+
+        Parameters
+        ----------
+        args :      ndarray, list or Scalars
+            sample and detector angles as for the area() method.
+        kwargs :    dict, optional
+            all optional keyword arguments of area() are supported and
+            additionally the following ones
+        chunk :     int, optional
+            number of goniometer positions (frames) converted in every step
+            (default: 1)
+        out :       ndarray, optional
+            C-contiguous array with shape (chunk, Npix1, Npix2, 3) and the
+            data type selected by the dtype argument (default float64)
+            used as output buffer for every chunk. If given no memory is
+            allocated during the iteration and the yielded arrays are views
+            into this buffer, which are overwritten in the next step!
+
+        Yields
+        ------
+        qx, qy, qz :    ndarray
+            reciprocal space position of all detector pixels of the current
+            chunk with shape (n, Npix1, Npix2), where n is the chunk size or
+            less for the last chunk. The frames are yielded in the order of
+            the input.
+        """
+        valid_kwargs = {'chunk': 'number of frames per chunk',
+                        'out': 'output buffer'}
+        kwargs = copy.copy(kwargs)
+        chunk = int(kwargs.pop('chunk', 1))
+        out = kwargs.pop('out', None)
+        if chunk < 1:
+            raise InputError("QConversion: chunk must be a positive integer")
+
+        sAngles, dAngles, wl, Npoints, rpix, UB, sd, flags = \
+            self._prepare_area(args, kwargs, 'Ang2Q/area_iter', valid_kwargs)
+        shape = rpix.shape[:2]
+
+        if out is not None:
+            dtype = numpy.dtype(kwargs.get('dtype', numpy.double))
+            if (not isinstance(out, numpy.ndarray) or
+                    out.dtype != dtype or
+                    not out.flags.c_contiguous or
+                    out.shape != (chunk, ) + shape + (3, )):
+                raise InputError("QConversion: out must be a C-contiguous "
+                                 "%s array of shape %s"
+                                 % (dtype.name,
+                                    str((chunk, ) + shape + (3, ))))
+
+        def iterate():
+            for start in range(0, Npoints, chunk):
+                stop = min(start + chunk, Npoints)
+                cargs = (sAngles[start:stop], dAngles[start:stop], self.r_i,
+                         self._sampleAxis_str, self._detectorAxis_str,
+                         self._kappa_dir, rpix, UB, sd, wl[start:stop],
+                         config.NTHREADS, flags)
+                if out is not None:
+                    cargs += (out[:stop - start].reshape((-1, 3)), )
+                qpos = cxrayutilities.ang2q_conversion_area(*cargs)
+                qpos.shape = (stop - start, ) + shape + (3, )
+                yield qpos[..., 0], qpos[..., 1], qpos[..., 2]
+
+        # input checks are performed above upon the call, while the
+        # conversion is only performed when the chunks are requested
+        return iterate()
+
+    def area_bounds(self, *args, **kwargs):
+        """
+        determine the minimum and maximum momentum transfer of all pixels of
+        an area detector for the given goniometer positions. The result is
+        identical to the extrema of the output of area(), however, only the
+        pixels on the detector boundary and the pixels next to the single
+        stationary point of every momentum transfer component along each
+        detector row are converted for every goniometer position. This allows
+        to fix the data range of a gridder before the data are converted in a
+        single (streamed) pass.
+
+        Parameters
+        ----------
+        args :      ndarray, list or Scalars
+            sample and detector angles as for the area() method.
+        kwargs :    dict, optional
+            all optional keyword arguments of area() are supported. If UB is
+            given the bounds of the (hkl) coordinates are determined.
+
+        Returns
+        -------
+        bounds :    ndarray
+            array of shape (3, 2) with the minimum and maximum of the three
+            momentum transfer components, e.g. to be used as
+            ``gridder.dataRange(*bounds.flat)``
+        """
+        sAngles, dAngles, wl, Npoints, rpix, UB, sd, flags = \
+            self._prepare_area(args, kwargs, 'Ang2Q/area_bounds')
+
+        return cxrayutilities.ang2q_conversion_area_bounds(
+            sAngles, dAngles, self.r_i, self._sampleAxis_str,
+            self._detectorAxis_str, self._kappa_dir, rpix, UB, sd, wl,
+            config.NTHREADS, flags)
+
+    def _prepare_area(self, args, kwargs, identifier, extra_kwargs=None):
+        """
+        common input checks and preparation of the arguments for the area
+        detector conversion routines.
+
+        Parameters
+        ----------
+        args :          tuple
+            sample and detector angles as given to area()
+        kwargs :        dict
+            keyword arguments as given to area()
+        identifier :    str
+            name of the calling function used in error messages
+        extra_kwargs :  dict, optional
+            additional valid keyword arguments which are ignored here
+
+        Returns
+        -------
+        sAngles, dAngles :  ndarray
+            sample and detector angles with shape (Npoints, Ns/Nd)
+        wl :                ndarray
+            wavelength for every goniometer position
+        Npoints :           int
+            number of goniometer positions
+        rpix :              ndarray
+            position of the detector pixels (or their corners) considering Nav
+            and roi with shape (Npix1, Npix2, 3), see _get_detector_pixels
+        UB :                ndarray
+            orientation matrix
+        sd :                ndarray
+            sample displacement vector
+        flags :             int
+            flags for the C-routines
+        """
         if not self._area_init:
             raise Exception("QConversion: area detector not initialized -> "
                             "call Ang2Q.init_area(...)")
 
         valid_kwargs = copy.copy(self._valid_call_kwargs)
         valid_kwargs.update(self._valid_linear_kwargs)
-        utilities.check_kwargs(kwargs, valid_kwargs, 'Ang2Q/area')
+        valid_kwargs['corners'] = 'convert the pixel corners'
+        if extra_kwargs:
+            valid_kwargs.update(extra_kwargs)
+        utilities.check_kwargs(kwargs, valid_kwargs, identifier)
 
         Ns, Nd, Ncirc, wl, deg, delta, UB, sd, flags = \
             self._parse_common_kwargs(**kwargs)
@@ -1077,32 +1480,23 @@ class QConversion(object):
                                          self.detectorAxis, *args[Ns:],
                                          deg=deg)[0]
 
-        sAngles = sAngles.transpose()
-        dAngles = dAngles.transpose()
+        # transpose and copy to obtain C-contiguous arrays whose rows can be
+        # passed to the C-code in chunks
+        sAngles = numpy.ascontiguousarray(sAngles.transpose())
+        dAngles = numpy.ascontiguousarray(dAngles.transpose())
 
-        cch1, cch2, pwidth1, pwidth2, roi = self._get_detparam_area(oroi, nav)
+        rpix = self._get_detector_pixels(2, oroi, nav,
+                                         kwargs.get('corners', False))
 
         if config.VERBOSITY >= config.DEBUG:
+            detparam = self._get_detparam_area(oroi, nav)
+            roi = detparam[-1]
             print("QConversion.area: roi, number of points per frame: %s, %d"
                   % (str(roi), (roi[1] - roi[0]) * (roi[3] - roi[2])))
-            print("QConversion.area: cch1, cch2: %5.2f %5.2f" % (cch1, cch2))
-
-        sAxis = self._sampleAxis_str
-        dAxis = self._detectorAxis_str
-
-        qpos = cxrayutilities.ang2q_conversion_area(
-            sAngles, dAngles, self.r_i, sAxis, dAxis, self._kappa_dir,
-            cch1, cch2, pwidth1, pwidth2, roi, self._area_detdir1,
-            self._area_detdir2, self._area_tiltazimuth, self._area_tilt,
-            UB, sd, wl, config.NTHREADS, flags)
+            print("QConversion.area: cch1, cch2: %5.2f %5.2f"
+                  % (detparam[0], detparam[1]))
 
-        # reshape output
-        if Npoints == 1:
-            qpos.shape = ((roi[1] - roi[0]), (roi[3] - roi[2]), 3)
-            return qpos[:, :, 0], qpos[:, :, 1], qpos[:, :, 2]
-        else:
-            qpos.shape = (Npoints, (roi[1] - roi[0]), (roi[3] - roi[2]), 3)
-            return qpos[:, :, :, 0], qpos[:, :, :, 1], qpos[:, :, :, 2]
+        return sAngles, dAngles, wl, Npoints, rpix, UB, sd, flags
 
     def transformSample2Lab(self, vector, *args):
         """
@@ -1571,6 +1965,8 @@ class Experiment(object):
         sampledis : tuple, list or array-like, optional
             sample displacement vector in relative units of the detector
             distance (default: (0, 0, 0))
+        dtype :     numpy.float64 or numpy.float32, optional
+            data type of the returned coordinates (default: numpy.float64)
 
         Returns
         -------
@@ -1838,6 +2234,11 @@ class HXRD(Experiment):
                        due to refraction
              - pdi_d : offset ot the diffracted beam from the scattering plane
                        due to refraction
+
+            In case N > 1 q-space positions are given the arrays have the
+            shape (4, N) or (6, N), respectively. If refraction is considered
+            positions for which the primary or diffracted beam does not pass
+            the given facets are returned as NaN.
         """
 
         valid_kwargs = {'trans': 'flag, perform coordinate transformation',
@@ -1886,7 +2287,7 @@ class HXRD(Experiment):
         else:
             k = self.k0
 
-        # start calculation for each given Q-point
+        # all Q-points are treated at once in array operations
         if foutp:
             angle = numpy.zeros((6, q.shape[0]))
         else:
@@ -1900,12 +2301,15 @@ class HXRD(Experiment):
 
         qa = math.VecNorm(q)
         tth = 2. * numpy.arcsin(qa / 2. / k)
+        qx = math.VecDot(q, x)
+        qy = math.VecDot(q, y)
+        qz = math.VecDot(q, z)
 
         # calculation of the sample azimuth phi (scattering plane
         # spanned by qvec[1] and qvec[2] directions)
 
-        chi = -numpy.arctan2(math.VecDot(q, x), math.VecDot(q, z))
-        if numpy.any(numpy.isclose(numpy.abs(math.VecDot(q, z)), 0)):
+        chi = -numpy.arctan2(qx, qz)
+        if numpy.any(numpy.isclose(numpy.abs(qz), 0)):
             if config.VERBOSITY >= config.INFO_LOW:
                 print("XU.HXRD: some position is perpendicular to ndir-"
                       "reference direction (might be inplane or "
@@ -1914,26 +2318,20 @@ class HXRD(Experiment):
         if geom == 'hi_lo':
             # +: high incidence geometry
             om = tth / 2. + math.VecAngle(q, z)
-            phi = -numpy.arctan2(math.VecDot(q, x), math.VecDot(q, y))
+            phi = -numpy.arctan2(qx, qy)
         elif geom == 'lo_hi':
             # -: low incidence geometry
             om = tth / 2. - math.VecAngle(q, z)
-            phi = -numpy.arctan2(-1 * math.VecDot(q, x),
-                                 -1 * math.VecDot(q, y))
+            phi = -numpy.arctan2(-1 * qx, -1 * qy)
         elif geom == 'real':
-            phi = -numpy.arctan2(math.VecDot(q, x), math.VecDot(q, y))
-            sign = numpy.ones(q.shape[0])
+            phi = -numpy.arctan2(qx, qy)
             m = numpy.abs(phi) > numpy.pi / 2.
-            phi = -numpy.arctan2(math.VecDot(q, x), math.VecDot(q, y))
-            sign[m] = -1
-            phi[m] = -numpy.arctan2(-1 * math.VecDot(q[m], x),
-                                    -1 * math.VecDot(q[m], y))
+            sign = numpy.where(m, -1., 1.)
+            phi[m] = -numpy.arctan2(-1 * qx[m], -1 * qy[m])
             om = tth / 2 + sign * math.VecAngle(q, z)
         elif geom == 'realTilt':
             phi = 0.
-            om = tth / 2 + numpy.arctan2(
-                math.VecDot(q, y),
-                numpy.sqrt(math.VecDot(q, z) ** 2 + math.VecDot(q, x) ** 2))
+            om = tth / 2 + numpy.arctan2(qy, numpy.sqrt(qz ** 2 + qx ** 2))
 
         # refraction correction at incidence and exit facet
         psi_i = numpy.zeros_like(tth)
@@ -1945,49 +2343,50 @@ class HXRD(Experiment):
                       numpy.sin(om)[:, numpy.newaxis] * z[numpy.newaxis, :])
             kd = k * (numpy.cos(beta)[:, numpy.newaxis] * y[numpy.newaxis, :] +
                       numpy.sin(beta)[:, numpy.newaxis] * z[numpy.newaxis, :])
+            kifi = math.VecDot(ki, fi)
+            kdfd = math.VecDot(kd, fd)
 
-            # refraction at incidence facet
-            m = math.VecDot(ki, fi) > 0
+            # positions for which the beams do not pass the facets have no
+            # solution and are returned as NaN
+            m = kifi > 0
             if numpy.any(m):
                 print("XU.HXRD: Warning, incidence facet not hit by "
                       "primary beam for all positions! check your input!")
-                om[m] = numpy.nan
-                tth[m] = numpy.nan
-            mnot = numpy.logical_not(m)
-            cosbi = numpy.abs(math.VecDot(ki, fi) / math.VecNorm(ki))
+            md = kdfd < 0
+            if numpy.any(md):
+                print("XU.HXRD: Warning, exit facet not hit by "
+                      "diffracted beam! check your input!")
+            mnot = numpy.logical_not(numpy.logical_or(m, md))
+
+            # refraction at incidence facet
+            cosbi = numpy.abs(kifi / math.VecNorm(ki))
             cosb0 = numpy.sqrt(1 - n ** 2 * (1 - cosbi ** 2))
 
             ki0 = self.k0 * (n * math.VecUnit(ki) -
-                             (numpy.sign(math.VecDot(ki, fi)) *
+                             (numpy.sign(kifi) *
                              (n * cosbi - cosb0))[:, numpy.newaxis] *
                              fi[numpy.newaxis, :])
-            om[mnot] = math.VecAngle(ki0, y)
-            psi_i[mnot] = numpy.arcsin(math.VecDot(ki0, x) / self.k0)
             if config.VERBOSITY >= config.DEBUG:
                 print("XU.HXRD.Q2Ang: ki, ki0 = %s %s"
                       % (repr(ki), repr(ki0)))
 
             # refraction at exit facet
-            m = math.VecDot(kd, fd) < 0
-            if numpy.any(m):
-                print("XU.HXRD: Warning, exit facet not hit by "
-                      "diffracted beam! check your input!")
-                om[m] = numpy.nan
-                tth[m] = numpy.nan
-
-            cosbd = numpy.abs(math.VecDot(kd, fd) / math.VecNorm(kd))
+            cosbd = numpy.abs(kdfd / math.VecNorm(kd))
             cosb0 = numpy.sqrt(1 - n ** 2 * (1 - cosbd ** 2))
 
             kd0 = self.k0 * (n * math.VecUnit(kd) -
-                             (numpy.sign(math.VecDot(kd, fd)) *
+                             (numpy.sign(kdfd) *
                              (n * cosbd - cosb0))[:, numpy.newaxis] *
                              fd[numpy.newaxis, :])
-            tth[mnot] = math.VecAngle(ki0, kd0)
-            psi_d[mnot] = numpy.arcsin(numpy.dot(kd0, x) / self.k0)
             if config.VERBOSITY >= config.DEBUG:
                 print("XU.HXRD.Q2Ang: kd, kd0 = %s %s"
                       % (repr(kd), repr(kd0)))
 
+            om = numpy.where(mnot, math.VecAngle(ki0, y), numpy.nan)
+            tth = numpy.where(mnot, math.VecAngle(ki0, kd0), numpy.nan)
+            psi_i[mnot] = numpy.arcsin(math.VecDot(ki0[mnot], x) / self.k0)
+            psi_d[mnot] = numpy.arcsin(math.VecDot(kd0[mnot], x) / self.k0)
+
         if geom == 'realTilt':
             angle[0, :] = om
             angle[1, :] = chi
@@ -2268,9 +2667,10 @@ class GID(Experiment):
 
         Returns
         -------
-        ndarray
-            a numpy array of shape (4) with four GID scattering
-            angles which are [alpha_i, azimuth, twotheta, beta];
+        list or ndarray
+            a list with four GID scattering angles which are [alpha_i,
+            azimuth, twotheta, beta] or a numpy array of shape (4, N) in case
+            N > 1 q-space positions are given;
 
              - alpha_i :    incidence angle to surface (at the moment always 0)
              - azimuth :    sample rotation with respect to the inplane
@@ -2284,12 +2684,7 @@ class GID(Experiment):
                         'deg': 'degree-flag'}
         utilities.check_kwargs(kwargs, valid_kwargs, 'Q2Ang')
 
-        if isinstance(Q, list):
-            q = numpy.array(Q, dtype=numpy.double)
-        elif isinstance(Q, numpy.ndarray):
-            q = Q
-        else:
-            raise TypeError("Q vector must be a list or numpy array")
+        q = self._prepare_qvec((Q, ))
 
         if trans:
             q = self.Transform(q)
@@ -2303,9 +2698,10 @@ class GID(Experiment):
         x = self.Transform(self.scatplane)  # x
 
         # check if reflection is inplane
-        if numpy.abs(math.VecDot(q, z)) >= 0.001:
+        m = numpy.abs(math.VecDot(q, z)) >= 0.001
+        if numpy.any(m):
             raise InputError("Reflection not reachable in GID geometry (Q: %s)"
-                             % str(q))
+                             % str(q[m]))
 
         # calculate angle to inplane reference direction
         aref = numpy.arctan2(math.VecDot(q, x), math.VecDot(q, y))
@@ -2316,13 +2712,19 @@ class GID(Experiment):
         azimuth = numpy.pi / 2 + aref + tth / 2.
 
         if deg:
-            ang = [0, numpy.degrees(azimuth), numpy.degrees(tth), 0]
+            azimuth = numpy.degrees(azimuth)
+            tth = numpy.degrees(tth)
+
+        if q.shape[0] == 1:
+            ang = [0, azimuth[0], tth[0], 0]
         else:
-            ang = [0, azimuth, tth, 0]
+            ang = numpy.zeros((4, q.shape[0]))
+            ang[1, :] = azimuth
+            ang[2, :] = tth
 
         if config.VERBOSITY >= config.INFO_ALL:
             print("XU.GID.Q2Ang: [ai, azimuth, tth, beta] = %s \n difference "
-                  "to inplane reference which is %5.2f" % (str(ang), aref))
+                  "to inplane reference which is %s" % (str(ang), str(aref)))
 
         return ang
 
@@ -19,7 +19,12 @@
 # Copyright (C) 2009-2017 Dominik Kriegner <dominik.kriegner@gmail.com>
 
 import abc
+import concurrent.futures
+import contextlib
+import copy
+import multiprocessing
 
+import h5py
 import numpy
 
 from . import config, cxrayutilities, utilities
@@ -73,6 +78,62 @@ def ones(*args):
     return numpy.ones(args, dtype=numpy.double)
 
 
+def _downsample(a):
+    """
+    sum neighboring bins of an array pairwise along all axes with more than
+    one bin. Axes of odd length are padded with zeros.
+    """
+    pad = [(0, n % 2) if n > 1 else (0, 0) for n in a.shape]
+    if any(p[1] for p in pad):
+        a = numpy.pad(a, pad, mode='constant')
+    shape = []
+    for n in a.shape:
+        shape += [n // 2, 2] if n > 1 else [1, 1]
+    return a.reshape(shape).sum(axis=tuple(range(1, 2 * a.ndim, 2)))
+
+
+def load_pyramid(filename, level=0):
+    """
+    read one level of a multi-resolution pyramid of gridded data written by
+    Gridder.save_pyramid(). Only the datasets of the requested level are
+    read from the file.
+
+    Parameters
+    ----------
+    filename :  str or h5py.Group
+        name of the HDF5 file or group of an open HDF5 file containing the
+        pyramid
+    level :     int, optional
+        level of the pyramid; level n is downsampled by a factor of 2**n
+        along every axis (default: 0, full resolution)
+
+    Returns
+    -------
+    axes :      tuple
+        positions of the bin centers along all axes
+    data :      ndarray
+        gridded data (normalized if the gridder normalized its data)
+    norm :      ndarray
+        sum of the normalization of the combined bins
+    """
+    if isinstance(filename, h5py.Group):
+        h5 = filename
+    else:
+        h5 = h5py.File(filename, 'r')
+    try:
+        name = 'level%d' % level
+        if name not in h5:
+            raise InputError("XU.load_pyramid: level %d not found, the "
+                             "pyramid has %d levels"
+                             % (level, h5.attrs.get('levels', 0) + 1))
+        grp = h5[name]
+        axes = tuple(grp[n + 'axis'][()] for n in 'xyz'[:grp['data'].ndim])
+        return axes, grp['data'][()], grp['norm'][()]
+    finally:
+        if h5 is not filename:
+            h5.close()
+
+
 class Gridder(utilities.ABC):
     """
     Basis class for gridders in xrayutilities. A gridder is a function mapping
@@ -92,11 +153,50 @@ class Gridder(utilities.ABC):
     A different definition is used by numpy histogram functions where the bins
     extend only to the end of the data range. (see numpy histogram,
     histrogram2d, ...)
+
+    Input coordinates and data given as single precision (float32) arrays are
+    binned by Gridder1D, Gridder2D and Gridder3D without conversion. The same
+    holds for data (e.g. detector counts) given as uint16, int32 or uint32
+    arrays. All other input types are converted to double precision. The
+    accumulation is always performed in double precision.
+
+    The binning is parallelized with OpenMP using config.NTHREADS threads.
+    Every thread accumulates into a private copy of the grid as long as the
+    memory needed for these copies is moderate, otherwise the shared grid is
+    updated atomically. Since the order of the summation differs from the
+    serial execution the results can differ on the level of the floating point
+    precision.
+
+    Gridder1D, Gridder2D, Gridder3D and their fuzzy variants can store the
+    grid in a buffer provided by the caller, e.g. a
+    multiprocessing.shared_memory.SharedMemory block. Several processes can
+    then grid into the same grid without copying the data. The buffer holds
+    the data followed by the normalization of all bins as double precision
+    values, i.e. it needs a size of at least 16 bytes times the number of
+    bins. The data range of gridders using a buffer needs to be fixed by
+    dataRange() before the first call. Gridders using a buffer update the grid
+    atomically, which requires the OpenMP support of xrayutilities.
+    Alternatively, or for updates of the grid from Python, a lock can be
+    given, which is held during all updates of the grid.
     """
 
-    def __init__(self):
+    def __init__(self, buffer=None, lock=None):
         """
         Constructor defining default properties of any Gridder class
+
+        Parameters
+        ----------
+        buffer :    SharedMemory or buffer, optional
+            writable object supporting the buffer protocol (or
+            multiprocessing.shared_memory.SharedMemory) used to store the
+            grid. Its content is not initialized and keep_data is switched
+            on, so that several gridders can accumulate into the same buffer.
+            The data range needs to be fixed by dataRange() before gridding.
+            Gridders using a SharedMemory block can be pickled without
+            copying the grid, e.g. to send them to worker processes.
+        lock :      Lock, optional
+            lock (e.g. multiprocessing.Lock or a Manager().Lock()) which is
+            held during any update of the grid.
         """
 
         self.flags = 0
@@ -117,6 +217,58 @@ class Gridder(utilities.ABC):
         if config.VERBOSITY >= config.INFO_ALL:
             self.flags = utilities.set_bit(self.flags, 3)
 
+        self._buffer = buffer
+        self._lock = lock
+        if buffer is not None:
+            # grid is shared with others: atomic updates and no clearing
+            self.flags = utilities.set_bit(self.flags, 5)
+            self.keep_data = True
+
+    def _allocate_grid(self, shape):
+        """
+        allocate the data and normalization arrays of the grid, either as new
+        arrays or in the buffer given to the constructor
+        """
+        if self._buffer is None:
+            self._gdata = numpy.zeros(shape, dtype=numpy.double)
+            self._gnorm = numpy.zeros(shape, dtype=numpy.double)
+            return
+        ntot = int(numpy.prod(shape))
+        buf = getattr(self._buffer, 'buf', self._buffer)
+        try:
+            grid = numpy.frombuffer(buf, dtype=numpy.double, count=2 * ntot)
+        except (TypeError, ValueError):
+            raise InputError("XU.%s: buffer can not hold a grid with %d bins "
+                             "(%d bytes needed)"
+                             % (self.__class__.__name__, ntot, 16 * ntot))
+        if not grid.flags.writeable:
+            raise InputError("XU.%s: buffer is not writable"
+                             % self.__class__.__name__)
+        grid = grid.reshape((2, ) + tuple(shape))
+        self._gdata = grid[0]
+        self._gnorm = grid[1]
+
+    def _locked(self):
+        """
+        context manager holding the lock of the gridder (if any) during an
+        update of the grid
+        """
+        if getattr(self, '_lock', None) is None:
+            # no-op context manager (contextlib.nullcontext needs Python 3.7)
+            return contextlib.suppress()
+        return self._lock
+
+    def _check_range_shared(self):
+        """
+        check that the data range of a gridder using a buffer is fixed.
+        Otherwise every gridder sharing the buffer would deduce its own range
+        from its data and accumulate into the same bins.
+        """
+        if getattr(self, '_buffer', None) is not None:
+            raise InputError("XU.%s: the data range of a gridder using a "
+                             "buffer needs to be fixed (see dataRange)"
+                             % self.__class__.__name__)
+
     @abc.abstractmethod
     def __call__(self):
         """
@@ -176,19 +328,379 @@ class Gridder(utilities.ABC):
         self._gdata[...] = 0
         self._gnorm[...] = 0
 
+    def _check_mergeable(self, other):
+        """
+        check if the gridded data of an other gridder can be added to the
+        data of this gridder, which requires identical grids.
+        """
+        names = ('nx', 'ny', 'nz', 'xmin', 'xmax', 'ymin', 'ymax', 'zmin',
+                 'zmax')
+        if (not isinstance(other, Gridder) or
+                any(getattr(self, n, None) != getattr(other, n, None)
+                    for n in names) or
+                numpy.shape(self._gdata) != numpy.shape(other._gdata)):
+            raise InputError("XU.%s: %s can not be merged since its grid "
+                             "differs" % (self.__class__.__name__,
+                                          other.__class__.__name__))
+
+    def merge(self, *others):
+        """
+        add the gridded data of other gridders to the data of this gridder.
+        This allows to split the gridding of large datasets between several
+        gridders, e.g. in different processes, and combine the results. The
+        gridders need to use the same grid, i.e. the same number of bins and
+        the same data range (use dataRange() before the gridding). Merging is
+        also available by the += operator.
+
+        Parameters
+        ----------
+        others :    Gridder
+            gridders with the same grid as this gridder
+
+        Returns
+        -------
+        Gridder
+            this gridder
+        """
+        for other in others:
+            self._check_mergeable(other)
+        with self._locked():
+            for other in others:
+                self._gdata += other._gdata
+                self._gnorm += other._gnorm
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def _accumulated(self):
+        """
+        return the accumulated (not normalized) data and the normalization of
+        all bins as dense arrays
+        """
+        if self._gdata is None:
+            raise InputError("XU.%s: gridded data are not numeric"
+                             % self.__class__.__name__)
+        return self._gdata, self._gnorm
+
+    def pyramid(self, levels=3):
+        """
+        downsample the gridded data to a multi-resolution pyramid. For every
+        level two neighboring bins along every axis are combined by summing
+        the accumulated data and normalization, so that the data of the
+        coarse levels are correctly averaged over the contributing data
+        points.
+
+        Parameters
+        ----------
+        levels :    int, optional
+            number of downsampled levels, i.e. the coarsest level is
+            downsampled by a factor of 2**levels (default: 3)
+
+        Returns
+        -------
+        list
+            list of levels+1 tuples (axes, data, norm) starting with the full
+            resolution. axes are the positions of the bin centers along all
+            axes, data the (normalized if switched on) gridded data and norm
+            the sum of the normalization of the combined bins.
+        """
+        gdata, gnorm = self._accumulated()
+        result = []
+        for level, ranges in enumerate(self._pyramid_ranges(gdata.shape,
+                                                            levels)):
+            if level > 0:
+                gdata = _downsample(gdata)
+                gnorm = _downsample(gnorm)
+            data = gdata.copy()
+            if self.normalize:
+                mask = gnorm != 0
+                data[mask] /= gnorm[mask]
+            result.append((tuple(axis(*r) for r in ranges), data,
+                           numpy.array(gnorm, dtype=numpy.double)))
+        return result
+
+    def _pyramid_ranges(self, shape, levels):
+        """
+        return the ranges (min, max, number of bins) of all axes for every
+        level of a pyramid of a grid with the given shape
+        """
+        ranges = [(getattr(self, n + 'min'), getattr(self, n + 'max'), num)
+                  for n, num in zip('xyz', shape)]
+        result = [list(ranges)]
+        for level in range(levels):
+            # the new bin centers are in between the combined bins
+            for i, (amin, amax, num) in enumerate(ranges):
+                if num > 1:
+                    d = delta(amin, amax, num)
+                    num = (num + 1) // 2
+                    amin += d / 2.
+                    ranges[i] = (amin, amin + 2 * d * (num - 1), num)
+            result.append(list(ranges))
+        return result
+
+    def save_pyramid(self, filename, levels=3, chunks=32, compression=None):
+        """
+        write the gridded data and a downsampled multi-resolution pyramid
+        (see pyramid()) to a HDF5 file. Every level is stored in a group
+        'level<n>' with the chunked datasets 'data' and 'norm' and the bin
+        positions along all axes (e.g. 'xaxis'). Viewers or further
+        processing can therefore read only the level they need, see
+        load_pyramid().
+
+        Parameters
+        ----------
+        filename :      str or h5py.Group
+            name of the HDF5 file or group of an open HDF5 file. Levels
+            stored before in the same file/group are replaced.
+        levels :        int, optional
+            number of downsampled levels (default: 3, i.e. factors 2, 4, 8)
+        chunks :        int, optional
+            edge length of the chunks of the datasets (default: 32)
+        compression :   str, optional
+            compression filter of the datasets, e.g. 'gzip' (default: None)
+        """
+        if isinstance(filename, h5py.Group):
+            h5 = filename
+        else:
+            h5 = h5py.File(filename, 'a')
+        try:
+            for name in [k for k in h5 if k.startswith('level')]:
+                del h5[name]
+            self._write_pyramid(h5, levels, chunks, compression)
+            h5.attrs['levels'] = levels
+            h5.attrs['normalized'] = self.normalize
+        finally:
+            if h5 is not filename:
+                h5.close()
+
+    def _write_pyramid(self, h5, levels, chunks, compression):
+        """
+        write the levels of the pyramid to the groups 'level<n>' of h5
+        """
+        for level, (axes, data, norm) in enumerate(self.pyramid(levels)):
+            grp = h5.create_group('level%d' % level)
+            grp.attrs['factor'] = 2**level
+            cshape = tuple(min(chunks, n) for n in data.shape)
+            for name, d in (('data', data), ('norm', norm)):
+                grp.create_dataset(name, data=d, chunks=cshape,
+                                   compression=compression)
+            for n, a in zip('xyz', axes):
+                grp.create_dataset(n + 'axis', data=numpy.atleast_1d(a))
+
+    def _empty_copy(self):
+        """
+        return a gridder with the same grid and settings, but without data
+        """
+        g = copy.copy(self)
+        if getattr(self, '_buffer', None) is not None:
+            g._buffer = None
+            g._lock = None
+            g.flags = utilities.clear_bit(g.flags, 5)
+        g._allocate_memory()
+        return g
+
+    def __getstate__(self):
+        """
+        compact state of the gridder used for pickling. In case less than a
+        third of the bins contains data only these bins are stored.
+        """
+        state = self.__dict__.copy()
+        if getattr(self, '_buffer', None) is not None:
+            if hasattr(self._buffer, 'name'):
+                # shared memory is attached again by its name. The arrays
+                # viewing the buffer are not pickled but created again in
+                # __setstate__.
+                state['_gdata'] = state['_gnorm'] = None
+                return state
+            state['_buffer'] = None
+            state['flags'] = utilities.clear_bit(self.flags, 5)
+        gdata = self._gdata
+        gnorm = self._gnorm
+        if (isinstance(gdata, numpy.ndarray) and gdata.dtype.kind == 'f' and
+                numpy.shape(gnorm) == gdata.shape):
+            idx = numpy.flatnonzero((gnorm != 0) | (gdata != 0))
+            if idx.size < gdata.size // 3:
+                if gdata.size < 2**31:
+                    idx = idx.astype(numpy.int32)
+                del state['_gdata'], state['_gnorm']
+                state['_compact'] = (gdata.shape, gnorm.dtype, idx,
+                                     gdata.flat[idx], gnorm.flat[idx])
+        return state
+
+    def __setstate__(self, state):
+        compact = state.pop('_compact', None)
+        self.__dict__.update(state)
+        if (state.get('_buffer') is not None and
+                state.get('_gdata', 0) is None):
+            self._allocate_memory()
+        if compact is not None:
+            shape, ndtype, idx, gdata, gnorm = compact
+            self._gdata = numpy.zeros(shape, dtype=gdata.dtype)
+            self._gnorm = numpy.zeros(shape, dtype=ndtype)
+            self._gdata.flat[idx] = gdata
+            self._gnorm.flat[idx] = gnorm
+
+
+class PixelSplitGridder(object):
+    """
+    Mixin for gridders of area detector data which consider the finite size
+    of the detector pixels. Instead of the pixel centers the positions of the
+    pixel corners are given to the gridder. The footprint of every pixel,
+    which is split into two triangles, is clipped at the borders of the grid
+    cells and the intensity is distributed among the cells proportional to the
+    area of overlap.
+    """
+
+    def _checkcornerinput(self, x, y, z, data):
+        """
+        common checks and reshape commands for the corner positions and the
+        data. The corners are returned with shape (Nframes, Npix1 + 1,
+        Npix2 + 1) and the data with shape (Nframes, Npix1, Npix2).
+        """
+        data = numpy.asarray(data)
+        if data.ndim == 2:
+            data = data[numpy.newaxis]
+        if data.ndim != 3:
+            raise InputError("XU.%s: data must be of shape (Npix1, Npix2) "
+                             "or (Nframes, Npix1, Npix2)"
+                             % self.__class__.__name__)
+        cshape = (data.shape[0], data.shape[1] + 1, data.shape[2] + 1)
+
+        corners = []
+        for c in (x, y, z):
+            if c is None:
+                corners.append(c)
+                continue
+            c = numpy.asarray(c, dtype=numpy.double)
+            if c.size != numpy.prod(cshape):
+                raise InputError(
+                    "XU.%s: shape of the corners does not fit to the data, "
+                    "expected %s" % (self.__class__.__name__, str(cshape)))
+            corners.append(c.reshape(cshape))
+
+        if not self.keep_data:
+            self.Clear()
+
+        if not self.fixed_range:
+            self._check_range_shared()
+            self.dataRange(*[v for c in corners if c is not None
+                             for v in (c.min(), c.max())],
+                           fixed=self.keep_data)
+
+        return corners + [data, ]
+
+    def _grid(self, x, y, z, data, flags):
+        """
+        call the C-routine for the prepared input
+        """
+        gdata = self._gdata.reshape((self.nx, self.ny, -1))
+        gnorm = self._gnorm.reshape((self.nx, self.ny, -1))
+        with self._locked():
+            cxrayutilities.pixelsplit_gridder3d(
+                x, y, z, data, self.nx, self.ny, gdata.shape[-1],
+                self.xmin, self.xmax, self.ymin, self.ymax,
+                getattr(self, 'zmin', 0), getattr(self, 'zmax', 0),
+                gdata, gnorm, flags, config.NTHREADS)
+
+
+def _grid_items(gridder, func, items):
+    """
+    worker function of grid_parallel: grid the data of all items in a
+    gridder and return it
+    """
+    gridder.KeepData(True)
+    for item in items:
+        gridder(*func(item))
+    return gridder
+
+
+def grid_parallel(gridder, func, items, nproc=0, nchunks=None):
+    """
+    grid the data of a list of items (e.g. detector frames, files, or scans)
+    using several worker processes. The items are split into chunks, which are
+    gridded in separate worker processes, and the partial results are merged
+    into the given gridder.
+
+    Parameters
+    ----------
+    gridder :   Gridder
+        gridder with a fixed data range (see dataRange) receiving the result.
+        If its keep_data flag is set the new data are added to the already
+        gridded data.
+    func :      callable
+        function called with a single item in the worker processes. It needs
+        to return a tuple of the arguments for the call of the gridder, e.g.
+        (qx, qy, qz, intensity) for a Gridder3D. func needs to be picklable,
+        i.e. defined at the top level of a module.
+    items :     sequence
+        items to be gridded, e.g. frame numbers or filenames.
+    nproc :     int, optional
+        number of worker processes (default: 0 which uses one process per
+        CPU)
+    nchunks :   int, optional
+        number of chunks into which the items are split (default: nproc).
+        Every chunk is gridded in a separate gridder which is sent back to
+        the main process.
+
+    Returns
+    -------
+    Gridder
+        the gridder containing the merged data
+
+    Examples
+    --------
+    >>> def read_frame(i):
+    ...     return qx[i], qy[i], qz[i], read_image(i)
+    >>> g = xu.Gridder3D(100, 100, 100)
+    >>> g.dataRange(qx.min(), qx.max(), qy.min(), qy.max(),
+    ...             qz.min(), qz.max())
+    >>> g = xu.grid_parallel(g, read_frame, range(nframes))
+    """
+    if not gridder.fixed_range:
+        raise InputError("XU.grid_parallel: the data range of the gridder "
+                         "needs to be fixed (see dataRange)")
+    if not gridder.keep_data:
+        gridder.Clear()
+
+    items = list(items)
+    if nproc == 0:
+        nproc = multiprocessing.cpu_count()
+    nproc = max(1, min(nproc, len(items)))
+    if nchunks is None:
+        nchunks = nproc
+    nchunks = max(1, min(nchunks, len(items)))
+    template = gridder._empty_copy()
+    chunks = [[items[i] for i in idx]
+              for idx in numpy.array_split(numpy.arange(len(items)), nchunks)]
+
+    with concurrent.futures.ProcessPoolExecutor(nproc) as executor:
+        futures = [executor.submit(_grid_items, template, func, chunk)
+                   for chunk in chunks]
+        # merge the partial results as soon as they are available
+        for future in concurrent.futures.as_completed(futures):
+            gridder.merge(future.result())
+    return gridder
+
 
 class Gridder1D(Gridder):
 
-    def __init__(self, nx):
-        Gridder.__init__(self)
+    def __init__(self, nx, buffer=None, lock=None):
+        Gridder.__init__(self, buffer, lock)
         if nx <= 0:
             raise InputError('nx must be a positiv integer!')
 
         self.nx = nx
         self.xmin = 0
         self.xmax = 0
-        self._gdata = numpy.zeros(nx, dtype=numpy.double)
-        self._gnorm = numpy.zeros(nx, dtype=numpy.double)
+        self._allocate_memory()
+
+    def _allocate_memory(self):
+        """
+        Class method to allocate memory for the gridder based on the nx class
+        attribute.
+        """
+        self._allocate_grid((self.nx, ))
 
     def savetxt(self, filename, header=''):
         """
@@ -252,6 +764,7 @@ class Gridder1D(Gridder):
                              " is not equal!" % self.__class__.__name__)
 
         if not self.fixed_range:
+            self._check_range_shared()
             # assume that with setting keep_data the user wants to call the
             # gridder more often and obtain a reasonable result
             self.dataRange(x.min(), x.max(), self.keep_data)
@@ -274,8 +787,10 @@ class Gridder1D(Gridder):
         # remove normalize flag for C-code, normalization is always performed
         # in python
         flags = utilities.set_bit(self.flags, 2)
-        cxrayutilities.gridder1d(x, data, self.nx, self.xmin, self.xmax,
-                                 self._gdata, self._gnorm, flags)
+        with self._locked():
+            cxrayutilities.gridder1d(x, data, self.nx, self.xmin, self.xmax,
+                                     self._gdata, self._gnorm, flags,
+                                     config.NTHREADS)
 
 
 class FuzzyGridder1D(Gridder1D):
@@ -310,8 +825,10 @@ class FuzzyGridder1D(Gridder1D):
         # remove normalize flag for C-code, normalization is always performed
         # in python
         flags = utilities.set_bit(self.flags, 2)
-        cxrayutilities.fuzzygridder1d(x, data, self.nx, self.xmin, self.xmax,
-                                      self._gdata, self._gnorm, width, flags)
+        with self._locked():
+            cxrayutilities.fuzzygridder1d(x, data, self.nx, self.xmin,
+                                          self.xmax, self._gdata, self._gnorm,
+                                          width, flags, config.NTHREADS)
 
 
 class npyGridder1D(Gridder1D):
@@ -350,6 +867,7 @@ class npyGridder1D(Gridder1D):
         lx = x[mask]
 
         if not self.fixed_range:
+            self._check_range_shared()
             # assume that with setting keep_data the user wants to call the
             # gridder more often and obtain a reasonable result
             self.dataRange(lx.min(), lx.max(), self.keep_data)
@@ -359,9 +877,7 @@ class npyGridder1D(Gridder1D):
                                          range=(self.xmin, self.xmax))
         tmpgnorm, bins = numpy.histogram(lx, bins=self.nx,
                                          range=(self.xmin, self.xmax))
-        if self.keep_data:
+        # the grid was cleared before unless keep_data is set
+        with self._locked():
             self._gnorm += tmpgnorm
             self._gdata += tmpgdata
-        else:
-            self._gnorm = tmpgnorm
-            self._gdata = tmpgdata
@@ -20,14 +20,14 @@
 
 import numpy
 
-from . import cxrayutilities, exception, utilities
-from .gridder import Gridder, axis, delta, ones
+from . import config, cxrayutilities, exception, utilities
+from .gridder import Gridder, PixelSplitGridder, axis, delta, ones
 
 
 class Gridder2D(Gridder):
 
-    def __init__(self, nx, ny):
-        Gridder.__init__(self)
+    def __init__(self, nx, ny, buffer=None, lock=None):
+        Gridder.__init__(self, buffer, lock)
 
         # check input
         if nx <= 0 or ny <= 0:
@@ -49,9 +49,7 @@ class Gridder2D(Gridder):
         Class method to allocate memory for the gridder based on the nx, ny
         class attributes.
         """
-
-        self._gdata = numpy.zeros((self.nx, self.ny), dtype=numpy.double)
-        self._gnorm = numpy.zeros((self.nx, self.ny), dtype=numpy.double)
+        self._allocate_grid((self.nx, self.ny))
 
     def savetxt(self, filename, header=''):
         """
@@ -146,6 +144,7 @@ class Gridder2D(Gridder):
                                        % self.__class__.__name__)
 
         if not self.fixed_range:
+            self._check_range_shared()
             # assume that with setting keep_data the user wants to call the
             # gridder more often and obtain a reasonable result
             self.dataRange(x.min(), x.max(), y.min(), y.max(), self.keep_data)
@@ -169,10 +168,12 @@ class Gridder2D(Gridder):
         x, y, data = self._checktransinput(x, y, data)
         # remove normalize flag for C-code
         flags = utilities.set_bit(self.flags, 2)
-        cxrayutilities.gridder2d(x, y, data, self.nx, self.ny,
-                                 self.xmin, self.xmax,
-                                 self.ymin, self.ymax,
-                                 self._gdata, self._gnorm, flags)
+        with self._locked():
+            cxrayutilities.gridder2d(x, y, data, self.nx, self.ny,
+                                     self.xmin, self.xmax,
+                                     self.ymin, self.ymax,
+                                     self._gdata, self._gnorm, flags,
+                                     config.NTHREADS)
 
 
 class FuzzyGridder2D(Gridder2D):
@@ -227,10 +228,204 @@ class FuzzyGridder2D(Gridder2D):
             wy = delta(self.ymin, self.ymax, self.ny) / 2.
         # remove normalize flag for C-code
         flags = utilities.set_bit(self.flags, 2)
-        cxrayutilities.fuzzygridder2d(x, y, data, self.nx, self.ny,
-                                      self.xmin, self.xmax,
-                                      self.ymin, self.ymax,
-                                      self._gdata, self._gnorm, wx, wy, flags)
+        with self._locked():
+            cxrayutilities.fuzzygridder2d(x, y, data, self.nx, self.ny,
+                                          self.xmin, self.xmax,
+                                          self.ymin, self.ymax,
+                                          self._gdata, self._gnorm, wx, wy,
+                                          flags, config.NTHREADS)
+
+
+class PixelSplitGridder2D(PixelSplitGridder, Gridder2D):
+    """
+    A 2D binning class for area detector data which considers the finite size
+    of the detector pixels. The intensity of every pixel is distributed among
+    the grid cells proportional to the area of overlap of its footprint, which
+    is determined from the positions of the pixel corners.
+    """
+
+    def __call__(self, x, y, data):
+        """
+        Perform gridding on a set of area detector frames. After running the
+        gridder the 'data' object in the class is holding the gridded data.
+
+        Parameters
+        ----------
+        x :     ndarray
+            x positions of the pixel corners with shape (Npix1 + 1, Npix2 +
+            1) or (Nframes, Npix1 + 1, Npix2 + 1)
+        y :	ndarray
+            y positions of the pixel corners
+        data :	ndarray
+            detector intensities with shape (Npix1, Npix2) or (Nframes,
+            Npix1, Npix2)
+        """
+        x, y, z, data = self._checkcornerinput(x, y, None, data)
+
+        # remove normalize flag for C-code
+        flags = utilities.set_bit(self.flags, 2)
+        self._grid(x, y, z, data, flags)
+
+
+class SlabGridder2D(Gridder2D):
+    """
+    Gridder for a two dimensional cut through three dimensional data, e.g. a
+    qx-qz slice through the reciprocal space map of an area detector scan.
+    Only data points inside a slab of finite thickness around a plane are
+    considered and binned using their coordinates in this plane. Points
+    outside of the slab are discarded in the C-code, so neither a full three
+    dimensional grid nor a masked copy of the data is needed.
+    """
+
+    def __init__(self, nx, ny, normal, offset, thickness, xdir=None,
+                 buffer=None, lock=None):
+        """
+        Parameters
+        ----------
+        nx, ny :    int
+            number of bins along the in-plane x- and y-direction
+        normal :    list, tuple or array-like
+            normal vector of the plane
+        offset :    float
+            distance of the center of the slab from the origin along the
+            normal vector
+        thickness : float
+            thickness of the slab. Points with a distance from the plane of
+            more than half the thickness are discarded.
+        xdir :      list, tuple or array-like, optional
+            in-plane x-direction of the grid. The component along the normal
+            is removed. If not given the projection of the laboratory axis
+            with the smallest component along the normal is used. The
+            in-plane y-direction is perpendicular to both and its largest
+            component is positive, e.g. for a normal along y the grid axes
+            are x and z.
+        buffer :    buffer or array-like, optional
+            see Gridder
+        lock :      lock, optional
+            see Gridder
+        """
+        normal = numpy.asarray(normal, dtype=numpy.double)
+        if normal.shape != (3, ) or not numpy.linalg.norm(normal) > 0:
+            raise exception.InputError("XU.%s: normal must be a non-zero "
+                                       "vector of length 3"
+                                       % self.__class__.__name__)
+        if not thickness > 0:
+            raise exception.InputError("XU.%s: thickness must be positive"
+                                       % self.__class__.__name__)
+        normal = normal / numpy.linalg.norm(normal)
+
+        if xdir is None:
+            xdir = numpy.identity(3)[numpy.argmin(numpy.abs(normal))]
+        xdir = numpy.asarray(xdir, dtype=numpy.double)
+        xdir = xdir - numpy.dot(xdir, normal) * normal
+        if xdir.shape != (3, ) or not numpy.linalg.norm(xdir) > 1e-10:
+            raise exception.InputError("XU.%s: xdir must be a vector of "
+                                       "length 3 not parallel to the normal"
+                                       % self.__class__.__name__)
+        xdir = xdir / numpy.linalg.norm(xdir)
+        ydir = numpy.cross(normal, xdir)
+        if ydir[numpy.argmax(numpy.abs(ydir))] < 0:
+            ydir = -ydir
+
+        self.normal = normal
+        self.xdir = xdir
+        self.ydir = ydir
+        self.offset = float(offset)
+        self.thickness = float(thickness)
+        self._axes = numpy.array((xdir, ydir, normal))
+
+        Gridder2D.__init__(self, nx, ny, buffer, lock)
+
+    def _check_mergeable(self, other):
+        """
+        check if the gridded data of an other gridder can be added to the
+        data of this gridder, which requires identical grids and slabs.
+        """
+        Gridder2D._check_mergeable(self, other)
+        if (not isinstance(other, SlabGridder2D) or
+                not numpy.array_equal(self._axes, other._axes) or
+                self.offset != other.offset or
+                self.thickness != other.thickness):
+            raise exception.InputError("XU.%s: %s can not be merged since "
+                                       "its slab differs"
+                                       % (self.__class__.__name__,
+                                          other.__class__.__name__))
+
+    def plane_coordinates(self, x, y, z):
+        """
+        coordinates of data points in the plane of the slab and their
+        distance from the center of the slab.
+
+        Parameters
+        ----------
+        x, y, z :   ndarray
+            numpy arrays of arbitrary shape with the x, y, z positions
+
+        Returns
+        -------
+        u, v, d :   ndarray
+            in-plane x- and y-coordinates and distance from the center of the
+            slab along the plane normal
+        """
+        x, y, z = (numpy.asarray(a) for a in (x, y, z))
+        u, v, d = (x * a[0] + y * a[1] + z * a[2] for a in self._axes)
+        return u, v, d - self.offset
+
+    def __call__(self, x, y, z, data):
+        """
+        Perform gridding on the data points inside the slab. After running the
+        gridder the 'data' object in the class is holding the gridded data.
+
+        Parameters
+        ----------
+        x :     ndarray
+            numpy array of arbitrary shape with x positions
+        y :	ndarray
+            numpy array of arbitrary shape with y positions
+        z :	ndarray
+            numpy array of arbitrary shape with z positions
+        data :	ndarray
+            numpy array of arbitrary shape with data values
+
+        Notes
+        -----
+        If the data range is not fixed (see dataRange) it is determined from
+        the in-plane coordinates of the points inside the slab, which are
+        calculated in Python for this purpose.
+        """
+        if not self.keep_data:
+            self.Clear()
+
+        x = self._prepare_array(x)
+        y = self._prepare_array(y)
+        z = self._prepare_array(z)
+        data = self._prepare_array(data)
+
+        if x.size != y.size or y.size != z.size or z.size != data.size:
+            raise exception.InputError("XU.%s: size of given datasets "
+                                       "(x, y, z, data) is not equal!"
+                                       % self.__class__.__name__)
+
+        if not self.fixed_range:
+            self._check_range_shared()
+            u, v, d = self.plane_coordinates(x, y, z)
+            mask = numpy.abs(d) <= self.thickness / 2.
+            if not numpy.any(mask):
+                raise exception.InputError("XU.%s: no data points inside "
+                                           "the slab"
+                                           % self.__class__.__name__)
+            self.dataRange(u[mask].min(), u[mask].max(),
+                           v[mask].min(), v[mask].max(), self.keep_data)
+
+        # remove normalize flag for C-code
+        flags = utilities.set_bit(self.flags, 2)
+        with self._locked():
+            cxrayutilities.slab_gridder2d(x, y, z, data, self.nx, self.ny,
+                                          self.xmin, self.xmax,
+                                          self.ymin, self.ymax, self._axes,
+                                          self.offset, self.thickness,
+                                          self._gdata, self._gnorm, flags,
+                                          config.NTHREADS)
 
 
 class Gridder2DList(Gridder2D):
@@ -239,6 +434,10 @@ class Gridder2DList(Gridder2D):
     special version of a 2D gridder which performs no actual averaging of the
     data in one grid/bin but just collects the data-objects belonging to one
     bin for further treatment by the user
+
+    Internally the data-objects are stored sorted by their bin in a single
+    array (compressed sparse row layout) together with the offsets of the
+    bins in this array. Data points outside of the data range are ignored.
     """
 
     def _allocate_memory(self):
@@ -246,25 +445,109 @@ class Gridder2DList(Gridder2D):
         Class method to allocate memory for the gridder based on the nx, ny
         class attributes.
         """
-
-        self._gdata = numpy.empty((self.nx, self.ny), dtype=list)
-        for i in range(self.nx):
-            for j in range(self.ny):
-                self._gdata[i, j] = []
-        self._gnorm = numpy.zeros((self.nx, self.ny), dtype=numpy.int)
+        if self._buffer is not None:
+            raise exception.InputError("XU.%s: gridding into a buffer is not "
+                                       "supported" % self.__class__.__name__)
+        self._gdata = None
+        # bin indices and data-objects of the gridded points, which are
+        # sorted by the bin index and joined by _sort()
+        self._bins = []
+        self._values = []
+        self._offsets = None
+        self._gnorm = numpy.zeros((self.nx, self.ny), dtype=numpy.int64)
 
     def Clear(self):
         self._allocate_memory()
 
+    def _sort(self):
+        """
+        sort the gridded data-objects by their bin index and determine the
+        offsets of the bins. The sorting is stable, i.e. the data-objects of
+        one bin are kept in the order in which they were gridded.
+
+        Returns
+        -------
+        values :    ndarray
+            flat array with the data-objects sorted by their bin index
+        offsets :   ndarray
+            array of length nx*ny+1; the data-objects of the bin with flat
+            index k are values[offsets[k]:offsets[k+1]]
+        """
+        if self._offsets is None:
+            if self._values:
+                bins = numpy.concatenate(self._bins)
+                order = numpy.argsort(bins, kind='mergesort')
+                self._bins = [bins[order]]
+                self._values = [numpy.concatenate(self._values)[order]]
+            else:
+                self._bins = [numpy.empty(0, dtype=numpy.intp)]
+                self._values = [numpy.empty(0, dtype=object)]
+            self._offsets = numpy.zeros(self.nx * self.ny + 1,
+                                        dtype=numpy.intp)
+            numpy.cumsum(self._gnorm, out=self._offsets[1:])
+        return self._values[0], self._offsets
+
+    def bin_data(self, ix, iy):
+        """
+        return the data-objects gridded into one bin
+
+        Parameters
+        ----------
+        ix, iy :    int
+            index of the bin in x and y direction
+
+        Returns
+        -------
+        ndarray
+            view of the data-objects of the bin in the order in which they
+            were gridded
+        """
+        values, offsets = self._sort()
+        k = numpy.ravel_multi_index((int(ix), int(iy)), (self.nx, self.ny))
+        return values[offsets[k]:offsets[k + 1]]
+
     def __get_data(self):
         """
         return gridded data, in this special version no normalization is
         defined!
         """
-        return self._gdata.copy()
+        values, offsets = self._sort()
+        gdata = numpy.empty(self.nx * self.ny, dtype=list)
+        for k, (start, stop) in enumerate(zip(offsets[:-1], offsets[1:])):
+            gdata[k] = list(values[start:stop])
+        return gdata.reshape((self.nx, self.ny))
 
     data = property(__get_data)
 
+    def merge(self, *others):
+        """
+        add the data-objects of other Gridder2DList instances to this
+        gridder. The gridders need to use the same grid. The data-objects of
+        the other gridders are appended to the ones of this gridder.
+
+        Parameters
+        ----------
+        others :    Gridder2DList
+            gridders with the same grid as this gridder
+
+        Returns
+        -------
+        Gridder2DList
+            this gridder
+        """
+        for other in others:
+            self._check_mergeable(other)
+            if not isinstance(other, Gridder2DList):
+                raise exception.InputError(
+                    "XU.%s: %s can not be merged" %
+                    (self.__class__.__name__, other.__class__.__name__))
+        for other in others:
+            self._bins.extend(other._bins)
+            self._values.extend(other._values)
+            self._gnorm += other._gnorm
+            self._offsets = None
+        return self
+
     def __call__(self, x, y, data):
         """
         Perform gridding on a set of data. After running the gridder the 'data'
@@ -283,15 +566,17 @@ class Gridder2DList(Gridder2D):
 
         x, y, data = self._checktransinput(x, y, data)
 
-        # perform gridding this should be moved to native code if possible
-        def gindex(x, min, delt):
-            return numpy.round((x - min) / delt).astype(numpy.int)
-
+        mask = numpy.logical_and.reduce((x >= self.xmin, x <= self.xmax,
+                                         y >= self.ymin, y <= self.ymax))
         xdelta = delta(self.xmin, self.xmax, self.nx)
         ydelta = delta(self.ymin, self.ymax, self.ny)
-
-        for i in range(len(x)):
-            xidx = gindex(x[i], self.xmin, xdelta)
-            yidx = gindex(y[i], self.ymin, ydelta)
-            self._gdata[xidx, yidx].append(data[i])
-            self._gnorm[xidx, yidx] += 1
+        bins = numpy.ravel_multi_index(
+            (numpy.rint((x[mask] - self.xmin) / xdelta).astype(numpy.intp),
+             numpy.rint((y[mask] - self.ymin) / ydelta).astype(numpy.intp)),
+            (self.nx, self.ny))
+
+        self._bins.append(bins)
+        self._values.append(data[mask])
+        self._gnorm += numpy.bincount(
+            bins, minlength=self.nx * self.ny).reshape(self._gnorm.shape)
+        self._offsets = None
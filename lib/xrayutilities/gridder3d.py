@@ -18,16 +18,22 @@
 # Copyright (C) 2009 Mario Keplinger <mario.keplinger@jku.at>
 # Copyright (C) 2009-2016 Dominik Kriegner <dominik.kriegner@gmail.com>
 
+import collections
+import itertools
+
+import h5py
 import numpy
+import scipy.sparse
 
-from . import cxrayutilities, exception, utilities
-from .gridder import Gridder, axis, delta, ones
+from . import config, cxrayutilities, exception, utilities
+from .gridder import (Gridder, PixelSplitGridder, _downsample, axis, delta,
+                      ones)
 
 
 class Gridder3D(Gridder):
 
-    def __init__(self, nx, ny, nz):
-        Gridder.__init__(self)
+    def __init__(self, nx, ny, nz, buffer=None, lock=None):
+        Gridder.__init__(self, buffer, lock)
 
         # check input
         if nx <= 0 or ny <= 0 or nz <= 0:
@@ -52,10 +58,7 @@ class Gridder3D(Gridder):
         Class method to allocate memory for the gridder based on the nx, ny
         class attributes.
         """
-        self._gdata = numpy.zeros((self.nx, self.ny, self.nz),
-                                  dtype=numpy.double)
-        self._gnorm = numpy.zeros((self.nx, self.ny, self.nz),
-                                  dtype=numpy.double)
+        self._allocate_grid((self.nx, self.ny, self.nz))
 
     def SetResolution(self, nx, ny, nz):
         self.nx = nx
@@ -136,6 +139,7 @@ class Gridder3D(Gridder):
                                        % self.__class__.__name__)
 
         if not self.fixed_range:
+            self._check_range_shared()
             # assume that with setting keep_data the user wants to call the
             # gridder more often and obtain a reasonable result
             self.dataRange(x.min(), x.max(),
@@ -166,11 +170,89 @@ class Gridder3D(Gridder):
 
         # remove normalize flag for C-code
         flags = utilities.set_bit(self.flags, 2)
-        cxrayutilities.gridder3d(x, y, z, data, self.nx, self.ny, self.nz,
-                                 self.xmin, self.xmax,
-                                 self.ymin, self.ymax,
-                                 self.zmin, self.zmax,
-                                 self._gdata, self._gnorm, flags)
+        with self._locked():
+            cxrayutilities.gridder3d(x, y, z, data, self.nx, self.ny, self.nz,
+                                     self.xmin, self.xmax,
+                                     self.ymin, self.ymax,
+                                     self.zmin, self.zmax,
+                                     self._gdata, self._gnorm, flags,
+                                     config.NTHREADS)
+
+    def _prepare_area_input(self, qconv, args, kwargs):
+        """
+        common checks of the input of grid_area. The data are separated from
+        the angular arguments and the arguments of the fused conversion and
+        gridding are prepared.
+        """
+        if len(args) < 1:
+            raise exception.InputError("XU.%s.grid_area: data argument "
+                                       "missing" % self.__class__.__name__)
+        data = self._prepare_array(args[-1])
+        args = args[:-1]
+        prepared = qconv._prepare_area(
+            args, kwargs, '%s.grid_area' % self.__class__.__name__)
+        Npoints, rpix = prepared[3:5]
+        npixel = rpix.shape[0] * rpix.shape[1]
+        if data.size != Npoints * npixel:
+            raise exception.InputError("XU.%s.grid_area: size of data (%d) "
+                                       "does not fit to the number of pixels "
+                                       "(%d)" % (self.__class__.__name__,
+                                                 data.size, Npoints * npixel))
+        return data, args, prepared
+
+    def _area_data_range(self, qconv, args, kwargs):
+        """
+        determine the data range of area detector data from the momentum
+        transfer of the detector boundary, see QConversion.area_bounds
+        """
+        bounds = qconv.area_bounds(*args, **kwargs)
+        self.dataRange(*bounds.flat, fixed=self.keep_data)
+
+    def grid_area(self, qconv, *args, **kwargs):
+        """
+        Convert area detector data to reciprocal space and perform the
+        gridding in one step. In contrast to the conversion with
+        QConversion.area() followed by a call of the gridder the momentum
+        transfer of the individual pixels is never stored, which avoids the
+        allocation of three arrays of the size of the full dataset.
+
+        Parameters
+        ----------
+        qconv :     QConversion
+            QConversion instance with initialized area detector (see
+            QConversion.init_area)
+        args :      list
+            sample and detector angles as accepted by QConversion.area(),
+            followed by the detector intensities as last argument. The
+            intensities must be of shape (Npoints, Npix1, Npix2) where the
+            number of pixels is determined by the roi and Nav settings.
+        kwargs :    dict, optional
+            optional keyword arguments of QConversion.area(), e.g. UB, Nav,
+            roi, wl, deg, sampledis, delta
+
+        Notes
+        -----
+        If the data range of the gridder is not fixed the range is determined
+        from the detector boundary using QConversion.area_bounds() before
+        the data are gridded.
+        """
+        data, args, (sAngles, dAngles, wl, Npoints, rpix, UB, sd, flags) = \
+            self._prepare_area_input(qconv, args, kwargs)
+
+        if not self.keep_data:
+            self.Clear()
+
+        if not self.fixed_range:
+            self._check_range_shared()
+            self._area_data_range(qconv, args, kwargs)
+
+        with self._locked():
+            cxrayutilities.ang2q_conversion_area_grid(
+                sAngles, dAngles, qconv.r_i, qconv._sampleAxis_str,
+                qconv._detectorAxis_str, qconv._kappa_dir, rpix, UB, sd, wl,
+                data, self.nx, self.ny, self.nz, self.xmin, self.xmax,
+                self.ymin, self.ymax, self.zmin, self.zmax,
+                self._gdata, self._gnorm, config.NTHREADS, flags)
 
 
 class FuzzyGridder3D(Gridder3D):
@@ -229,9 +311,944 @@ class FuzzyGridder3D(Gridder3D):
 
         # remove normalize flag for C-code
         flags = utilities.set_bit(self.flags, 2)
-        cxrayutilities.fuzzygridder3d(x, y, z, data, self.nx, self.ny, self.nz,
-                                      self.xmin, self.xmax,
-                                      self.ymin, self.ymax,
-                                      self.zmin, self.zmax,
-                                      self._gdata, self._gnorm,
-                                      wx, wy, wz, flags)
+        with self._locked():
+            cxrayutilities.fuzzygridder3d(x, y, z, data,
+                                          self.nx, self.ny, self.nz,
+                                          self.xmin, self.xmax,
+                                          self.ymin, self.ymax,
+                                          self.zmin, self.zmax,
+                                          self._gdata, self._gnorm,
+                                          wx, wy, wz, flags, config.NTHREADS)
+
+    def grid_area(self, qconv, *args, **kwargs):
+        """
+        Convert area detector data to reciprocal space and perform the fuzzy
+        gridding. The conversion is performed chunk-wise using
+        QConversion.area_iter() so that the momentum transfer of all frames is
+        never held in memory at the same time.
+
+        Parameters
+        ----------
+        qconv :     QConversion
+            QConversion instance with initialized area detector (see
+            QConversion.init_area)
+        args :      list
+            sample and detector angles as accepted by QConversion.area(),
+            followed by the detector intensities as last argument. The
+            intensities must be of shape (Npoints, Npix1, Npix2) where the
+            number of pixels is determined by the roi and Nav settings.
+        kwargs :    dict, optional
+            optional keyword arguments of QConversion.area(), e.g. UB, Nav,
+            roi, wl, deg, sampledis, delta, and the width of the data points
+            (see __call__)
+
+        Notes
+        -----
+        If the data range of the gridder is not fixed the range is determined
+        from the detector boundary using QConversion.area_bounds() before
+        the data are gridded.
+        """
+        gkwargs = {}
+        if 'width' in kwargs:
+            gkwargs['width'] = kwargs.pop('width')
+        data, args, prepared = self._prepare_area_input(qconv, args, kwargs)
+        data = data.reshape(prepared[3], -1)
+
+        if not self.keep_data:
+            self.Clear()
+
+        if not self.fixed_range:
+            self._check_range_shared()
+            self._area_data_range(qconv, args, kwargs)
+
+        # the chunks are accumulated on the grid determined above
+        keep_data, fixed_range = self.keep_data, self.fixed_range
+        self.keep_data = self.fixed_range = True
+        try:
+            start = 0
+            for q in qconv.area_iter(*args,
+                                     chunk=max(1, 2**20 // data.shape[1]),
+                                     **kwargs):
+                n = q[0].shape[0]
+                self(*q, data[start:start+n], **gkwargs)
+                start += n
+        finally:
+            self.keep_data, self.fixed_range = keep_data, fixed_range
+
+
+class PixelSplitGridder3D(PixelSplitGridder, Gridder3D):
+    """
+    A 3D binning class for area detector data which considers the finite size
+    of the detector pixels. Instead of the momentum transfer of the pixel
+    centers the momentum transfer of the pixel corners is used. The footprint
+    of every pixel, which is split into two triangles, is clipped at the
+    borders of the grid cells and the intensity is distributed among the cells
+    proportional to the area of overlap. This avoids empty cells and moiré
+    artifacts when the grid is finer than the pixel footprint.
+    """
+
+    def __call__(self, x, y, z, data):
+        """
+        Perform gridding on a set of area detector frames. After running the
+        gridder the 'data' object in the class is holding the gridded data.
+
+        Parameters
+        ----------
+        x :     ndarray
+            x positions of the pixel corners with shape (Npix1 + 1, Npix2 +
+            1) or (Nframes, Npix1 + 1, Npix2 + 1), e.g. as obtained by
+            QConversion.area(..., corners=True)
+        y :	ndarray
+            y positions of the pixel corners
+        z :	ndarray
+            z positions of the pixel corners
+        data :	ndarray
+            detector intensities with shape (Npix1, Npix2) or (Nframes,
+            Npix1, Npix2)
+        """
+        x, y, z, data = self._checkcornerinput(x, y, z, data)
+
+        # remove normalize flag for C-code
+        flags = utilities.set_bit(self.flags, 2)
+        self._grid(x, y, z, data, flags)
+
+    def grid_area(self, qconv, *args, **kwargs):
+        """
+        Convert area detector data to reciprocal space and perform the
+        gridding with pixel splitting. The momentum transfer of the pixel
+        corners is calculated chunk by chunk using QConversion.area_iter()
+        and therefore never held in memory for the full dataset.
+
+        Parameters
+        ----------
+        qconv :     QConversion
+            QConversion instance with initialized area detector (see
+            QConversion.init_area)
+        args :      list
+            sample and detector angles as accepted by QConversion.area(),
+            followed by the detector intensities as last argument. The
+            intensities must be of shape (Npoints, Npix1, Npix2) where the
+            number of pixels is determined by the roi and Nav settings.
+        kwargs :    dict, optional
+            optional keyword arguments of QConversion.area(), e.g. UB, Nav,
+            roi, wl, deg, sampledis, delta. Additionally the number of frames
+            converted in one step can be given by the 'chunk' argument
+            (default: 16).
+        """
+        if len(args) < 1:
+            raise exception.InputError("XU.%s.grid_area: data argument "
+                                       "missing" % self.__class__.__name__)
+        kwargs = dict(kwargs, corners=True)
+        chunk = kwargs.pop('chunk', 16)
+        data = numpy.asarray(args[-1])
+        args = args[:-1]
+
+        Npoints, rpix = qconv._prepare_area(
+            args, kwargs, '%s.grid_area' % self.__class__.__name__)[3:5]
+        shape = (Npoints, rpix.shape[0] - 1, rpix.shape[1] - 1)
+        if data.size != numpy.prod(shape):
+            raise exception.InputError("XU.%s.grid_area: size of data (%d) "
+                                       "does not fit to the number of pixels "
+                                       "(%d)" % (self.__class__.__name__,
+                                                 data.size,
+                                                 numpy.prod(shape)))
+        data = data.reshape(shape)
+
+        if not self.keep_data:
+            self.Clear()
+
+        if not self.fixed_range:
+            self._check_range_shared()
+            self._area_data_range(qconv, args, kwargs)
+
+        # remove normalize flag for C-code
+        flags = utilities.set_bit(self.flags, 2)
+        start = 0
+        for q in qconv.area_iter(*args, chunk=chunk, **kwargs):
+            stop = start + q[0].shape[0]
+            self._grid(*q, data[start:stop], flags)
+            start = stop
+
+
+class SparseGridder3D(Gridder3D):
+    """
+    3D binning class which only stores the parts of the grid touched by the
+    data. The grid is divided into cubic blocks of blocksize^3 bins and memory
+    is allocated only for blocks which contain at least one data point. This
+    allows to grid high resolution reciprocal space maps of which only a small
+    fraction of the volume is covered by the data (e.g. the thin shell covered
+    by the Ewald sphere during a rocking curve).
+
+    The gridder is used like Gridder3D. The data property and todense() return
+    the gridded data as dense array, while tocoo() and slice() extract the
+    gridded data without materializing the full grid.
+    """
+
+    def __init__(self, nx, ny, nz, blocksize=16):
+        """
+        Parameters
+        ----------
+        nx, ny, nz :    int
+            number of bins in x, y, and z direction
+        blocksize :     int, optional
+            edge length of the blocks in which the grid is stored (default:
+            16). Larger blocks cause less overhead per block but waste memory
+            on the boundary of the covered volume.
+        """
+        if blocksize <= 0:
+            raise exception.InputError('blocksize must be a positive '
+                                       'integer!')
+        self.blocksize = int(blocksize)
+        Gridder3D.__init__(self, nx, ny, nz)
+
+    def _allocate_memory(self):
+        """
+        Class method to allocate the block table of the gridder based on the
+        nx, ny, nz and blocksize class attributes. Blocks are allocated during
+        the gridding.
+        """
+        bs = self.blocksize
+        self._btable = numpy.full(((self.nx + bs - 1) // bs,
+                                   (self.ny + bs - 1) // bs,
+                                   (self.nz + bs - 1) // bs), -1,
+                                  dtype=numpy.int64)
+        self._nblocks = 0
+        self._bdata = numpy.zeros((0, bs**3), dtype=numpy.double)
+        self._bnorm = numpy.zeros((0, bs**3), dtype=numpy.double)
+
+    def _reserve(self, nblocks):
+        """
+        enlarge the block pool to hold at least nblocks blocks. The pool grows
+        at least by a factor of two to amortize the copying of the data.
+        """
+        nalloc = self._bdata.shape[0]
+        if nblocks <= nalloc:
+            return
+        nnew = min(max(nblocks, 2 * nalloc), self._btable.size)
+        for name in ('_bdata', '_bnorm'):
+            old = getattr(self, name)
+            new = numpy.zeros((nnew, old.shape[1]), dtype=numpy.double)
+            new[:nalloc] = old
+            setattr(self, name, new)
+
+    def _grid(self, x, y, z, data):
+        """
+        register the blocks touched by the data and perform the gridding
+        """
+        args = (x, y, z, data, self.nx, self.ny, self.nz,
+                self.xmin, self.xmax, self.ymin, self.ymax,
+                self.zmin, self.zmax, self.blocksize, self._btable)
+        nblocks = cxrayutilities.sparse_gridder3d_blocks(*args,
+                                                         self._nblocks)
+        self._reserve(nblocks)
+        self._nblocks = nblocks
+        cxrayutilities.sparse_gridder3d(*args, self._bdata, self._bnorm,
+                                        config.NTHREADS)
+
+    def __call__(self, x, y, z, data):
+        """
+        Perform gridding on a set of data. After running the gridder
+        the 'data' object in the class is holding the gridded data.
+
+        Parameters
+        ----------
+        x :     ndarray
+            numpy array of arbitrary shape with x positions
+        y :     ndarray
+            numpy array of arbitrary shape with y positions
+        z :     ndarray
+            numpy array fo arbitrary shape with z positions
+        data :  ndarray
+            numpy array of arbitrary shape with data values
+        """
+        x, y, z, data = self._checktransinput(x, y, z, data)
+        self._grid(x, y, z, data)
+
+    def grid_area(self, qconv, *args, **kwargs):
+        """
+        Convert area detector data to reciprocal space and perform the
+        gridding. The conversion is performed chunk-wise using
+        QConversion.area_iter() so that the momentum transfer of all frames is
+        never held in memory at the same time.
+
+        Parameters
+        ----------
+        qconv :     QConversion
+            QConversion instance with initialized area detector (see
+            QConversion.init_area)
+        args :      list
+            sample and detector angles as accepted by QConversion.area(),
+            followed by the detector intensities as last argument. The
+            intensities must be of shape (Npoints, Npix1, Npix2) where the
+            number of pixels is determined by the roi and Nav settings.
+        kwargs :    dict, optional
+            optional keyword arguments of QConversion.area(), e.g. UB, Nav,
+            roi, wl, deg, sampledis, delta
+        """
+        data, args, prepared = self._prepare_area_input(qconv, args, kwargs)
+        data = data.reshape(prepared[3], -1)
+
+        if not self.keep_data:
+            self.Clear()
+
+        if not self.fixed_range:
+            self._check_range_shared()
+            self._area_data_range(qconv, args, kwargs)
+
+        start = 0
+        for q in qconv.area_iter(*args, chunk=max(1, 2**20 // data.shape[1]),
+                                 **kwargs):
+            n = q[0].shape[0]
+            self._grid(*[self._prepare_array(qi) for qi in q],
+                       data[start:start+n].reshape(-1))
+            start += n
+
+    def _block_positions(self):
+        """
+        return the block indices of all allocated blocks in the order of the
+        block pool
+        """
+        mask = self._btable >= 0
+        pos = numpy.empty((self._nblocks, 3), dtype=numpy.intp)
+        pos[self._btable[mask]] = numpy.argwhere(mask)
+        return pos
+
+    def _values(self, gdata, gnorm):
+        """
+        return the (normalized) values of bins containing data
+        """
+        if self.normalize:
+            return gdata / gnorm
+        return gdata
+
+    def _accumulated(self):
+        """
+        return the accumulated (not normalized) data and the normalization of
+        all bins as dense arrays of shape (nx, ny, nz)
+        """
+        bs = self.blocksize
+        nbx, nby, nbz = self._btable.shape
+        gdata = numpy.zeros((nbx * bs, nby * bs, nbz * bs),
+                            dtype=numpy.double)
+        gnorm = numpy.zeros_like(gdata)
+        pos = self._block_positions()
+        for dense, pool in ((gdata, self._bdata), (gnorm, self._bnorm)):
+            blocks = dense.reshape(nbx, bs, nby, bs, nbz, bs)
+            blocks = blocks.transpose(0, 2, 4, 1, 3, 5)
+            blocks[pos[:, 0], pos[:, 1], pos[:, 2]] = \
+                pool[:self._nblocks].reshape(-1, bs, bs, bs)
+        return (numpy.ascontiguousarray(gdata[:self.nx, :self.ny, :self.nz]),
+                numpy.ascontiguousarray(gnorm[:self.nx, :self.ny, :self.nz]))
+
+    def todense(self):
+        """
+        return the gridded data as dense array of shape (nx, ny, nz)
+        (performs normalization if switched on)
+        """
+        gdata, gnorm = self._accumulated()
+        if self.normalize:
+            mask = gnorm != 0
+            gdata[mask] /= gnorm[mask]
+        return gdata
+
+    data = property(todense)
+
+    def tocoo(self):
+        """
+        return the gridded data of all bins which contain data (performs
+        normalization if switched on)
+
+        Returns
+        -------
+        idx :       tuple
+            tuple of three integer arrays with the x, y, and z indices of the
+            bins, usable to index the dense data array
+        values :    ndarray
+            gridded data of the bins
+        """
+        bs = self.blocksize
+        gnorm = self._bnorm[:self._nblocks]
+        blk, off = numpy.nonzero(gnorm)
+        pos = self._block_positions()[blk] * bs
+        idx = (pos[:, 0] + off // bs**2,
+               pos[:, 1] + off // bs % bs,
+               pos[:, 2] + off % bs)
+        return idx, self._values(self._bdata[blk, off], gnorm[blk, off])
+
+    def slice(self, axis, index, sparse=False):
+        """
+        extract a two dimensional slice of the gridded data perpendicular to
+        one of the grid axes (performs normalization if switched on). Only the
+        blocks intersecting with the slice are considered.
+
+        Parameters
+        ----------
+        axis :      int
+            axis perpendicular to the slice (0, 1, 2 for x, y, z)
+        index :     int
+            index of the slice along axis
+        sparse :    bool, optional
+            if True a scipy.sparse.coo_matrix is returned instead of a dense
+            array (default: False)
+
+        Returns
+        -------
+        ndarray or scipy.sparse.coo_matrix
+            slice of the gridded data, e.g. of shape (ny, nz) for axis=0
+        """
+        shape = [self.nx, self.ny, self.nz]
+        if axis not in (0, 1, 2):
+            raise exception.InputError("XU.%s.slice: axis must be 0, 1, or 2"
+                                       % self.__class__.__name__)
+        if not 0 <= index < shape[axis]:
+            raise exception.InputError("XU.%s.slice: index %d out of range "
+                                       "for axis of length %d"
+                                       % (self.__class__.__name__, index,
+                                          shape[axis]))
+        shape.pop(axis)
+        bs = self.blocksize
+        btable = numpy.take(self._btable, index // bs, axis=axis)
+        mask = btable >= 0
+        ids = btable[mask]
+        pos = numpy.argwhere(mask) * bs
+
+        def take(pool):
+            blocks = pool[ids].reshape(-1, bs, bs, bs)
+            return numpy.take(blocks, index % bs, axis=axis+1)
+
+        gnorm = take(self._bnorm)
+        k, u, v = numpy.nonzero(gnorm)
+        rows = pos[k, 0] + u
+        cols = pos[k, 1] + v
+        values = self._values(take(self._bdata)[k, u, v], gnorm[k, u, v])
+        if sparse:
+            return scipy.sparse.coo_matrix((values, (rows, cols)),
+                                           shape=shape)
+        out = numpy.zeros(shape, dtype=numpy.double)
+        out[rows, cols] = values
+        return out
+
+    def _check_mergeable(self, other):
+        Gridder3D._check_mergeable(self, other)
+        if (not isinstance(other, SparseGridder3D) or
+                other.blocksize != self.blocksize):
+            raise exception.InputError("XU.%s: only sparse gridders with the "
+                                       "same blocksize can be merged"
+                                       % self.__class__.__name__)
+
+    def _iter_blocks(self, nmax=1024):
+        """
+        iterate over the blocks containing data. Yields the linear block
+        indices and the data and normalization of up to nmax blocks.
+        """
+        blocks = numpy.flatnonzero(self._btable >= 0)
+        for start in range(0, blocks.size, nmax):
+            ids = self._btable.flat[blocks[start:start+nmax]]
+            yield blocks[start:start+nmax], self._bdata[ids], self._bnorm[ids]
+
+    def _add_blocks(self, blocks, gdata, gnorm):
+        """
+        add the data and normalization of blocks to the grid
+        """
+        new = blocks[self._btable.flat[blocks] < 0]
+        self._reserve(self._nblocks + new.size)
+        self._btable.flat[new] = numpy.arange(self._nblocks,
+                                              self._nblocks + new.size)
+        self._nblocks += new.size
+        ids = self._btable.flat[blocks]
+        self._bdata[ids] += gdata
+        self._bnorm[ids] += gnorm
+
+    def merge(self, *others):
+        """
+        add the gridded data of other sparse gridders to the data of this
+        gridder. The gridders need to use the same grid, i.e. the same number
+        of bins, data range and blocksize. Merging is also available by the +=
+        operator.
+
+        Parameters
+        ----------
+        others :    SparseGridder3D
+            gridders with the same grid as this gridder
+
+        Returns
+        -------
+        SparseGridder3D
+            this gridder
+        """
+        for other in others:
+            self._check_mergeable(other)
+        for other in others:
+            for blocks, gdata, gnorm in other._iter_blocks():
+                self._add_blocks(blocks, gdata, gnorm)
+        return self
+
+    def __getstate__(self):
+        """
+        state of the gridder used for pickling containing only the used part
+        of the block pool
+        """
+        state = Gridder3D.__getstate__(self)
+        state['_bdata'] = self._bdata[:self._nblocks]
+        state['_bnorm'] = self._bnorm[:self._nblocks]
+        return state
+
+    def __get_nbytes(self):
+        """
+        memory used by the gridder to store the gridded data
+        """
+        return self._btable.nbytes + self._bdata.nbytes + self._bnorm.nbytes
+
+    nbytes = property(__get_nbytes)
+
+    def Clear(self):
+        """
+        Clear so far gridded data to reuse this instance of the Gridder
+        """
+        self._bdata[:self._nblocks] = 0
+        self._bnorm[:self._nblocks] = 0
+        self._btable[...] = -1
+        self._nblocks = 0
+
+
+class OutOfCoreGridder3D(SparseGridder3D):
+    """
+    3D binning class storing the grid in a chunked HDF5 dataset. Only a
+    limited number of chunks is held in memory, the least recently used chunk
+    is written to the file when another chunk needs to be loaded. This allows
+    sequential gridding (see KeepData) of grids which do not fit into memory.
+
+    The grid size, data range and all gridded data are stored in the file.
+    Modified chunks are written to the file when evicted from the cache or
+    by flush() and close(). When a file containing a grid is opened the
+    gridding is continued with the stored data (keep_data is switched on), so
+    that the accumulation survives a restart of the process as long as the
+    gridder was flushed before.
+
+    The gridded data are read from the file by the data property, slice() and
+    tocoo(). Note that the data property and pyramid() read the full grid into
+    memory, while save_pyramid() processes the grid tile by tile.
+    """
+
+    def __init__(self, filename, nx=None, ny=None, nz=None, blocksize=16,
+                 cachesize=1024):
+        """
+        Parameters
+        ----------
+        filename :      str or h5py.Group
+            name of the HDF5 file or group of an open HDF5 file in which the
+            grid is stored. If it already holds a grid the gridding is
+            continued.
+        nx, ny, nz :    int, optional
+            number of bins in x, y, and z direction. Needed only for a new
+            grid, for an existing grid they are read from the file.
+        blocksize :     int, optional
+            edge length of the chunks in which the grid is stored (default:
+            16). Ignored for an existing grid.
+        cachesize :     int, optional
+            number of chunks held in memory (default: 1024). Every chunk uses
+            2 * 8 * blocksize^3 bytes of memory.
+        """
+        if cachesize <= 0:
+            raise exception.InputError('cachesize must be a positive '
+                                       'integer!')
+        self.cachesize = int(cachesize)
+        if isinstance(filename, h5py.Group):
+            self._h5 = filename
+            self._closefile = False
+        else:
+            self._h5 = h5py.File(filename, 'a')
+            self._closefile = True
+
+        self._resume = 'data' in self._h5
+        if self._resume:
+            shape = self._h5['data'].shape
+            for n, s in zip((nx, ny, nz), shape):
+                if n is not None and n != s:
+                    if self._closefile:
+                        self._h5.close()
+                    raise exception.InputError(
+                        "XU.%s: grid size (%d, %d, %d) in file does not fit "
+                        "to the given size" % ((self.__class__.__name__, )
+                                               + shape))
+            nx, ny, nz = shape
+            blocksize = self._h5.attrs['blocksize']
+        elif None in (nx, ny, nz):
+            raise exception.InputError("XU.%s: nx, ny, nz are needed for a "
+                                       "new grid" % self.__class__.__name__)
+        SparseGridder3D.__init__(self, nx, ny, nz, blocksize)
+
+        if self._resume:
+            attrs = self._h5.attrs
+            self.dataRange(*[attrs[k] for k in ('xmin', 'xmax', 'ymin',
+                                                'ymax', 'zmin', 'zmax')],
+                           fixed=bool(attrs['fixed_range']))
+            self.keep_data = True
+            self._resume = False
+
+    def _allocate_memory(self):
+        """
+        Class method to allocate the chunk cache of the gridder and to create
+        the datasets in the HDF5 file (unless the gridding of an existing grid
+        is continued).
+        """
+        SparseGridder3D._allocate_memory(self)
+        bs3 = self.blocksize**3
+        self._bdata = numpy.zeros((self.cachesize, bs3), dtype=numpy.double)
+        self._bnorm = numpy.zeros((self.cachesize, bs3), dtype=numpy.double)
+        # resident chunks in the order of their last use
+        self._lru = collections.OrderedDict()
+        self._dirty = numpy.zeros(self.cachesize, dtype=bool)
+        if self._resume:
+            self._chunks = self._h5['chunks'][()]
+        else:
+            self._create_datasets()
+
+    def _create_datasets(self):
+        """
+        create empty datasets for the grid in the HDF5 file
+        """
+        bs = self.blocksize
+        shape = (self.nx, self.ny, self.nz)
+        chunks = tuple(min(bs, n) for n in shape)
+        for name in ('data', 'norm', 'chunks'):
+            if name in self._h5:
+                del self._h5[name]
+        for name in ('data', 'norm'):
+            self._h5.create_dataset(name, shape=shape, dtype=numpy.double,
+                                    chunks=chunks, fillvalue=0)
+        # flags of the chunks containing data
+        self._chunks = numpy.zeros(self._btable.shape, dtype=numpy.int8)
+        self._h5.create_dataset('chunks', data=self._chunks)
+        self._write_attrs()
+
+    def _write_attrs(self):
+        """
+        write the parameters of the grid to the HDF5 file
+        """
+        for k in ('xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax'):
+            self._h5.attrs[k] = getattr(self, k)
+        self._h5.attrs['fixed_range'] = self.fixed_range
+        self._h5.attrs['blocksize'] = self.blocksize
+
+    def _chunk_slices(self, block):
+        """
+        return the slices of the grid covered by a chunk
+        """
+        bs = self.blocksize
+        pos = numpy.unravel_index(block, self._btable.shape)
+        return tuple(slice(p * bs, min((p + 1) * bs, n))
+                     for p, n in zip(pos, (self.nx, self.ny, self.nz)))
+
+    def _read_chunk(self, block):
+        """
+        read the data and normalization of a chunk from the file
+        """
+        idx = self._chunk_slices(block)
+        return self._h5['data'][idx], self._h5['norm'][idx]
+
+    def _pool_view(self, pool, slot, idx):
+        """
+        view of the part of a slot of the cache covered by the grid
+        """
+        bs = self.blocksize
+        return pool[slot].reshape(bs, bs, bs)[tuple(slice(0, s.stop - s.start)
+                                                    for s in idx)]
+
+    def _evict(self):
+        """
+        remove the least recently used chunk from the cache and return its
+        slot
+        """
+        block, slot = self._lru.popitem(last=False)
+        self._btable.flat[block] = -1
+        if self._dirty[slot]:
+            idx = self._chunk_slices(block)
+            self._h5['data'][idx] = self._pool_view(self._bdata, slot, idx)
+            self._h5['norm'][idx] = self._pool_view(self._bnorm, slot, idx)
+            self._dirty[slot] = False
+        return slot
+
+    def _load(self, blocks):
+        """
+        make the given chunks resident in the cache and return their slots.
+        The number of chunks must not exceed the size of the cache.
+        """
+        for block in blocks:
+            if block in self._lru:
+                self._lru.move_to_end(block)
+        slots = numpy.empty(len(blocks), dtype=numpy.int64)
+        for i, block in enumerate(blocks):
+            if block not in self._lru:
+                if len(self._lru) < self.cachesize:
+                    slot = len(self._lru)
+                else:
+                    slot = self._evict()
+                idx = self._chunk_slices(block)
+                self._bdata[slot] = 0
+                self._bnorm[slot] = 0
+                if self._chunks.flat[block]:
+                    gdata, gnorm = self._read_chunk(block)
+                    self._pool_view(self._bdata, slot, idx)[...] = gdata
+                    self._pool_view(self._bnorm, slot, idx)[...] = gnorm
+                self._lru[block] = slot
+                self._btable.flat[block] = slot
+            slots[i] = self._lru[block]
+        return slots
+
+    def _grid(self, x, y, z, data):
+        """
+        load the chunks touched by the data and perform the gridding. In case
+        more chunks are touched than fit into the cache the gridding is
+        performed in several passes.
+        """
+        table = numpy.full(self._btable.shape, -1, dtype=numpy.int64)
+        args = (x, y, z, data, self.nx, self.ny, self.nz,
+                self.xmin, self.xmax, self.ymin, self.ymax,
+                self.zmin, self.zmax, self.blocksize, table)
+        cxrayutilities.sparse_gridder3d_blocks(*args, 0)
+        blocks = numpy.flatnonzero(table >= 0)
+        for start in range(0, blocks.size, self.cachesize):
+            rblocks = blocks[start:start+self.cachesize]
+            slots = self._load(rblocks)
+            self._dirty[slots] = True
+            self._chunks.flat[rblocks] = 1
+            table[...] = -1
+            table.flat[rblocks] = slots
+            cxrayutilities.sparse_gridder3d(*args, self._bdata, self._bnorm,
+                                            config.NTHREADS)
+
+    def flush(self):
+        """
+        write all modified chunks and the grid parameters to the file
+        """
+        for block, slot in self._lru.items():
+            if self._dirty[slot]:
+                idx = self._chunk_slices(block)
+                self._h5['data'][idx] = self._pool_view(self._bdata, slot,
+                                                        idx)
+                self._h5['norm'][idx] = self._pool_view(self._bnorm, slot,
+                                                        idx)
+        self._dirty[...] = False
+        self._h5['chunks'][...] = self._chunks
+        self._write_attrs()
+        self._h5.file.flush()
+
+    def _write_pyramid(self, h5, levels, chunks, compression):
+        """
+        write the levels of the pyramid to the groups 'level<n>' of h5. The
+        grid is read and downsampled in tiles aligned to the bins combined in
+        the coarsest level, so that only one tile is held in memory. Tiles
+        without data are skipped.
+        """
+        self.flush()
+        shape = (self.nx, self.ny, self.nz)
+        groups = []
+        for level, ranges in enumerate(self._pyramid_ranges(shape, levels)):
+            grp = h5.create_group('level%d' % level)
+            grp.attrs['factor'] = 2**level
+            lshape = tuple(r[2] for r in ranges)
+            cshape = tuple(min(chunks, n) for n in lshape)
+            for name in ('data', 'norm'):
+                grp.create_dataset(name, shape=lshape, dtype=numpy.double,
+                                   chunks=cshape, compression=compression,
+                                   fillvalue=0)
+            for n, r in zip('xyz', ranges):
+                grp.create_dataset(n + 'axis',
+                                   data=numpy.atleast_1d(axis(*r)))
+            groups.append(grp)
+
+        bs = self.blocksize
+        tile = 2**levels * -(-bs // 2**levels)
+        for start in itertools.product(*[range(0, n, tile) for n in shape]):
+            idx = tuple(slice(s, min(s + tile, n))
+                        for s, n in zip(start, shape))
+            if not self._chunks[tuple(slice(s.start // bs, -(-s.stop // bs))
+                                      for s in idx)].any():
+                continue
+            gdata = self._h5['data'][idx]
+            gnorm = self._h5['norm'][idx]
+            for level, grp in enumerate(groups):
+                if level > 0:
+                    gdata = _downsample(gdata)
+                    gnorm = _downsample(gnorm)
+                lidx = tuple(slice(s // 2**level, s // 2**level + n)
+                             for s, n in zip(start, gdata.shape))
+                grp['data'][lidx] = self._normalized(gdata.copy(), gnorm)
+                grp['norm'][lidx] = gnorm
+
+    def close(self):
+        """
+        flush the gridder and close the HDF5 file if it was opened by the
+        gridder
+        """
+        self.flush()
+        if self._closefile:
+            self._h5.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def _normalized(self, gdata, gnorm):
+        """
+        normalize gridded data if switched on
+        """
+        if self.normalize:
+            mask = gnorm != 0
+            gdata[mask] /= gnorm[mask]
+        return gdata
+
+    def _accumulated(self):
+        """
+        return the accumulated (not normalized) data and the normalization of
+        all bins read from the file
+        """
+        self.flush()
+        return self._h5['data'][()], self._h5['norm'][()]
+
+    def todense(self):
+        """
+        return the gridded data as dense array of shape (nx, ny, nz)
+        (performs normalization if switched on)
+        """
+        return self._normalized(*self._accumulated())
+
+    data = property(todense)
+
+    def tocoo(self):
+        """
+        return the gridded data of all bins which contain data (performs
+        normalization if switched on). The data are read chunk by chunk from
+        the file.
+
+        Returns
+        -------
+        idx :       tuple
+            tuple of three integer arrays with the x, y, and z indices of the
+            bins, usable to index the dense data array
+        values :    ndarray
+            gridded data of the bins
+        """
+        self.flush()
+        idx = ([], [], [])
+        values = []
+        for block in numpy.flatnonzero(self._chunks):
+            gdata, gnorm = self._read_chunk(block)
+            cidx = numpy.nonzero(gnorm)
+            for i, s in enumerate(self._chunk_slices(block)):
+                idx[i].append(cidx[i] + s.start)
+            values.append(self._values(gdata[cidx], gnorm[cidx]))
+        if not values:
+            return (tuple(numpy.zeros(0, dtype=numpy.intp) for i in range(3)),
+                    numpy.zeros(0))
+        return tuple(numpy.concatenate(i) for i in idx), \
+            numpy.concatenate(values)
+
+    def slice(self, axis, index, sparse=False):
+        """
+        extract a two dimensional slice of the gridded data perpendicular to
+        one of the grid axes (performs normalization if switched on). Only
+        the slice is read from the file.
+
+        Parameters
+        ----------
+        axis :      int
+            axis perpendicular to the slice (0, 1, 2 for x, y, z)
+        index :     int
+            index of the slice along axis
+        sparse :    bool, optional
+            if True a scipy.sparse.coo_matrix is returned instead of a dense
+            array (default: False)
+
+        Returns
+        -------
+        ndarray or scipy.sparse.coo_matrix
+            slice of the gridded data, e.g. of shape (ny, nz) for axis=0
+        """
+        shape = (self.nx, self.ny, self.nz)
+        if axis not in (0, 1, 2):
+            raise exception.InputError("XU.%s.slice: axis must be 0, 1, or 2"
+                                       % self.__class__.__name__)
+        if not 0 <= index < shape[axis]:
+            raise exception.InputError("XU.%s.slice: index %d out of range "
+                                       "for axis of length %d"
+                                       % (self.__class__.__name__, index,
+                                          shape[axis]))
+        self.flush()
+        idx = [slice(None)] * 3
+        idx[axis] = index
+        idx = tuple(idx)
+        out = self._normalized(self._h5['data'][idx], self._h5['norm'][idx])
+        if sparse:
+            return scipy.sparse.coo_matrix(out)
+        return out
+
+    def _iter_blocks(self, nmax=1024):
+        """
+        iterate over the chunks containing data. Yields the linear block
+        indices and the data and normalization of up to nmax chunks.
+        """
+        self.flush()
+        bs = self.blocksize
+        blocks = numpy.flatnonzero(self._chunks)
+        for start in range(0, blocks.size, nmax):
+            bblocks = blocks[start:start+nmax]
+            gdata = numpy.zeros((bblocks.size, bs**3), dtype=numpy.double)
+            gnorm = numpy.zeros_like(gdata)
+            for i, block in enumerate(bblocks):
+                idx = self._chunk_slices(block)
+                d, n = self._read_chunk(block)
+                self._pool_view(gdata, i, idx)[...] = d
+                self._pool_view(gnorm, i, idx)[...] = n
+            yield bblocks, gdata, gnorm
+
+    def _add_blocks(self, blocks, gdata, gnorm):
+        """
+        add the data and normalization of blocks to the grid
+        """
+        for start in range(0, blocks.size, self.cachesize):
+            s = slice(start, start + self.cachesize)
+            slots = self._load(blocks[s])
+            self._bdata[slots] += gdata[s]
+            self._bnorm[slots] += gnorm[s]
+            self._dirty[slots] = True
+            self._chunks.flat[blocks[s]] = 1
+
+    def _empty_copy(self):
+        """
+        return a SparseGridder3D with the same grid and settings, but without
+        data, e.g. to perform partial griddings which are merged into this
+        gridder.
+        """
+        g = SparseGridder3D(self.nx, self.ny, self.nz, self.blocksize)
+        for k in ('xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax', 'flags',
+                  'keep_data', 'normalize', 'fixed_range'):
+            setattr(g, k, getattr(self, k))
+        return g
+
+    def __getstate__(self):
+        raise TypeError("XU.%s can not be pickled, use a SparseGridder3D for "
+                        "partial griddings and merge it"
+                        % self.__class__.__name__)
+
+    def __get_nbytes(self):
+        """
+        memory used by the gridder for the chunk cache and tables
+        """
+        return (self._btable.nbytes + self._chunks.nbytes +
+                self._bdata.nbytes + self._bnorm.nbytes)
+
+    nbytes = property(__get_nbytes)
+
+    def Clear(self):
+        """
+        Clear so far gridded data to reuse this instance of the Gridder. The
+        data stored in the file are removed.
+        """
+        self._lru.clear()
+        self._dirty[...] = False
+        self._btable[...] = -1
+        self._create_datasets()
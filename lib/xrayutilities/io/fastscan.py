@@ -613,7 +613,6 @@ class FastScanCCD(FastScan):
         """
 
         g2l = self._gridCCDnumbers(nx, ny, ccdnr, gridrange=gridrange)
-        gdata = g2l.data
 
         ccdtemplate, nextNr = self.getccdFileTemplate(
             self.specscan, datadir, keepdir=keepdir, replacedir=replacedir)
@@ -627,14 +626,15 @@ class FastScanCCD(FastScan):
                   % ccddata.nbytes)
 
         # go through the gridded data and average the ccd-frames
-        for i in range(gdata.shape[0]):
-            for j in range(gdata.shape[1]):
-                if not gdata[i, j]:
+        for i in range(g2l.nx):
+            for j in range(g2l.ny):
+                ccdnrs = g2l.bin_data(i, j)
+                if ccdnrs.size == 0:
                     continue
                 else:
                     framecount = 0
                     # read ccd-frames and average them
-                    for imgnum in gdata[i, j]:
+                    for imgnum in ccdnrs:
                         imgindex, filenumber = self._get_image_number(
                             imgnum, nextNr, nextNr, ccdtemplate)
                         filename = ccdtemplate % filenumber
@@ -862,17 +862,16 @@ class FastScanSeries(object):
         if self.motor_pos is None:
             self.read_motors()
 
-        # determine q-coordinates
+        # determine the q-range from the detector boundary
         kwargs = {'Nav': nav}
         if roi:
             kwargs['roi'] = roi
-        qx, qy, qz = qconv.area(*self.motor_pos.T, **kwargs)
+        bounds = qconv.area_bounds(*self.motor_pos.T, **kwargs)
 
         # define gridder with fixed optimized q-range
         g3d = Gridder3D(qnx, qny, qnz)
         g3d.keep_data = True
-        g3d.dataRange(qx.min(), qx.max(), qy.min(),
-                      qy.max(), qz.min(), qz.max(), fixed=True)
+        g3d.dataRange(*bounds.flat, fixed=True)
 
         # start parsing the images and grid the data frame by frame
         for fsidx, fsccd in enumerate(self.fastscans):
@@ -881,7 +880,8 @@ class FastScanSeries(object):
                 replacedir=replacedir)
 
             ccdnumbers = fsccd._getCCDnumbers(self.ccdnr)
-            ccdav = numpy.zeros_like(qx[fsidx, ...])
+            qx, qy, qz = qconv.area(*self.motor_pos[fsidx], **kwargs)
+            ccdav = numpy.zeros_like(qx)
 
             # go through the ccdframes
             for i, imgnum in enumerate(ccdnumbers):
@@ -892,7 +892,7 @@ class FastScanSeries(object):
                 ccd = fsccd._read_image(filename, imgindex, nav, roi,
                                         filterfunc)
                 ccdav += ccd
-            g3d(qx[fsidx, ...], qy[fsidx, ...], qz[fsidx, ...], ccdav)
+            g3d(qx, qy, qz, ccdav)
 
         return g3d
 
@@ -1041,7 +1041,8 @@ class FastScanSeries(object):
                 g2l = fs._gridCCDnumbers(
                     self.nx, self.ny, self.ccdnr,
                     gridrange=((self.xmin, self.xmax), (self.ymin, self.ymax)))
-                self.glist.append(g2l)  # contains the ccdnumbers in g2l.data
+                # contains the ccdnumbers of every bin
+                self.glist.append(g2l)
 
             self.gridded = True
 
@@ -1049,7 +1050,7 @@ class FastScanSeries(object):
         ret = []
         for i in range(len(self.glist)):
             motorpos = self.motor_pos[i]
-            ccdnrs = self.glist[i].data[xidx, yidx]
+            ccdnrs = list(self.glist[i].bin_data(xidx, yidx))
             ret.append([motorpos, ccdnrs])
 
         return ret
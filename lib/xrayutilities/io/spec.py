@@ -27,12 +27,18 @@ This module is a proof of concept code to write a file observer starting
 a reread of the file starting from a stored offset (last known scan position)
 """
 
+import contextlib
+import json
+import mmap
+import os
 import os.path
 import re
+import tempfile
+import zlib
 
 import numpy
 
-from .. import config, utilities
+from .. import config, cxrayutilities, utilities
 from ..exception import InputError
 # relative imports from xrayutilities
 from .helper import xu_h5open, xu_open
@@ -62,8 +68,97 @@ SPEC_scanresumed = re.compile(r"#C[a-zA-Z0-9: .]*Scan resumed")
 SPEC_commentline = re.compile(r"#C")
 SPEC_newheader = re.compile(r"^#E")
 SPEC_errorbm20 = re.compile(r"^MI:")
+# size of the chunks read when searching the end of a data block; the
+# chunk size is doubled for every chunk up to its maximum
+SPEC_chunksize_min = 1 << 16
+SPEC_chunksize = 1 << 22
 scan_status_flags = ["OK", "NODATA", "ABORTED", "CORRUPTED"]
 
+# version of the sidecar scan index written by SPECFile
+SPEC_index_version = 1
+# number of bytes before the last parsed offset used to validate an index
+SPEC_index_crclength = 4096
+
+
+def _mapped_lines(mm, start, end=None):
+    """
+    iterate over the lines of a memory mapped file between two offsets
+    without using the file position of the mapping.
+
+    Parameters
+    ----------
+    mm :        mmap.mmap
+        memory mapping of the file
+    start :     int
+        offset of the first line
+    end :       int, optional
+        offset at which the iteration stops (default: end of the mapping)
+
+    Yields
+    ------
+    bytes
+        lines including the line break
+    """
+    if end is None:
+        end = len(mm)
+    pos = start
+    while pos < end:
+        lend = mm.find(b'\n', pos, end) + 1
+        if lend == 0:
+            lend = end
+        yield mm[pos:lend]
+        pos = lend
+
+
+@contextlib.contextmanager
+def _mapped(mm):
+    """
+    context manager providing an already opened memory mapping, which stays
+    open when the context is left
+    """
+    yield mm
+
+
+def _special_lines(block, start, end):
+    """
+    locate the comment, header and error lines in a chunk of a data block.
+
+    Parameters
+    ----------
+    block :     bytes or mmap.mmap
+        buffer holding the chunk of the file
+    start, end : int
+        offsets of the chunk in block. start needs to be the start of a line
+        and end the end of a line.
+
+    Yields
+    ------
+    tuple
+        (start, end) offsets of the lines starting with '#' or 'MI:' (apart
+        from leading blanks) in the chunk in ascending order
+    """
+    nexthash = block.find(b'#', start, end)
+    nextmi = block.find(b'MI:', start, end)
+    while nexthash >= 0 or nextmi >= 0:
+        if nextmi < 0 or 0 <= nexthash < nextmi:
+            pos = nexthash
+            nexthash = block.find(b'#', pos + 1, end)
+        else:
+            pos = nextmi
+            nextmi = block.find(b'MI:', pos + 1, end)
+        lstart = max(block.rfind(b'\n', start, pos) + 1, start)
+        if block[lstart:pos].strip():
+            continue
+        lend = block.find(b'\n', pos, end)
+        if lend < 0:
+            lend = end
+        yield lstart, lend
+        # skip further markers in the same line
+        if 0 <= nexthash < lend:
+            nexthash = block.find(b'#', lend, end)
+        if 0 <= nextmi < lend:
+            nextmi = block.find(b'MI:', lend, end)
+
 
 class SPECScan(object):
     """
@@ -110,6 +205,7 @@ class SPECScan(object):
         self.command = command  # command used to record the data
         self.date = date  # date the command has been sent
         self.time = time  # time the command has been sent
+        self.itime = itime  # integration time
         self.colnames = colnames  # list with column names
         self.hoffset = hoffset  # file offset where the header data starts
         self.doffset = doffset  # file offset where the data section starts
@@ -118,6 +214,8 @@ class SPECScan(object):
         self.ischanged = True
         self.header = []
         self.fid = None
+        # memory mapping of the file shared by all scans of a SPECFile
+        self._mmap = None
 
         if scan_status in scan_status_flags:
             self.scan_status = scan_status
@@ -256,6 +354,29 @@ class SPECScan(object):
                 print("XU.io.SPECScan.ReadData: scan %d contains no MCA data"
                       % self.nr)
 
+        # create dictionary to hold the data
+        if self.has_mca:
+            type_desc = {"names": self.colnames + ["MCA"],
+                         "formats": len(self.colnames) * [numpy.float32] +
+                         [(numpy.uint32, self.mca_channels)]}
+        else:
+            type_desc = {"names": self.colnames,
+                         "formats": len(self.colnames) * [numpy.float32]}
+
+        if config.VERBOSITY >= config.DEBUG:
+            print("xu.io.SPECScan.ReadData: type descriptor: %s"
+                  % (repr(type_desc)))
+
+        if self._mmap is not None:
+            # the mapping is shared by all scans of the file and is therefore
+            # read by offsets only, which allows reading scans concurrently
+            self.header = [
+                line.decode('ascii', 'ignore').strip()
+                for line in _mapped_lines(self._mmap, self.hoffset,
+                                          self.doffset)]
+            self._parse_data(self._read_datablock(), type_desc)
+            return
+
         with xu_open(self.fname) as self.fid:
             # read header lines
             self.fid.seek(self.hoffset, 0)
@@ -265,113 +386,235 @@ class SPECScan(object):
                 self.header.append(line.strip())
 
             self.fid.seek(self.doffset, 0)
+            self._parse_data(self._read_datablock(), type_desc)
 
-            # create dictionary to hold the data
-            if self.has_mca:
-                type_desc = {"names": self.colnames + ["MCA"],
-                             "formats": len(self.colnames) * [numpy.float32] +
-                             [(numpy.uint32, self.mca_channels)]}
-            else:
-                type_desc = {"names": self.colnames,
-                             "formats": len(self.colnames) * [numpy.float32]}
-
-            if config.VERBOSITY >= config.DEBUG:
-                print("xu.io.SPECScan.ReadData: type descriptor: %s"
-                      % (repr(type_desc)))
-
-            record_list = []  # from this list the record array while be built
+    def _parse_data(self, block, type_desc):
+        """
+        set the data attribute from the data block of the scan
 
-            mca_counter = 0
-            scan_aborted_flag = False
+        Parameters
+        ----------
+        block :     bytes or memoryview
+            data lines of the scan
+        type_desc : dict
+            type descriptor of the record array
+        """
+        try:
+            self.data = self._parse_datablock(block, type_desc)
+            if self.data is None:
+                # fall back to the line by line parser which is able to
+                # handle irregular data blocks
+                self._parse_datalines(bytes(block), type_desc)
+        finally:
+            if isinstance(block, memoryview):
+                block.release()
+
+    def _read_datablock(self):
+        """
+        read the data block of the scan starting at the data offset. For
+        files which are not memory mapped the file handle needs to be
+        positioned at the data offset. Comment and header lines are located by
+        searching for their markers in large chunks of the file, which
+        determines the end of the data block and the aborted/resumed state of
+        the scan.
 
-            for line in self.fid:
-                line = line.decode('ascii', 'ignore')
-                line = line.strip()
-                if not line:
-                    continue
+        Returns
+        -------
+        bytes or memoryview
+            data lines of the scan. For memory mapped files a memoryview of
+            the mapping is returned if the data lines are contiguous.
+        """
+        segments = []  # list of (buffer, start, end)
+        mm = self._mmap
+        pos = self.doffset
+        rest = b''
+        chunksize = min(SPEC_chunksize_min, SPEC_chunksize)
+        aborted = False
+        done = False
+        while not done:
+            if mm is None:
+                chunk = self.fid.read(chunksize)
+                eof = not chunk
+                block = rest + chunk
+                if eof:
+                    rest = b''
+                else:
+                    cut = block.rfind(b'\n') + 1
+                    block, rest = block[:cut], block[cut:]
+                start, wend = 0, len(block)
+            else:
+                # work on a window of the mapping without copying
+                block = mm
+                start, wend = pos, min(pos + chunksize, len(mm))
+                if wend < len(mm):
+                    cut = mm.rfind(b'\n', pos, wend) + 1
+                    if cut == 0:
+                        cut = mm.find(b'\n', wend) + 1
+                    wend = cut if cut > 0 else len(mm)
+                eof = wend == len(mm)
+                pos = wend
+            for lstart, lend in _special_lines(block, start, wend):
+                if aborted and block[start:lstart].strip():
+                    # data after an aborted scan which was not resumed
+                    done = True
+                    break
+                segments.append((block, start, lstart))
+                start = lend
+                line = block[lstart:lend].strip().decode('ascii', 'ignore')
 
                 # check if scan is broken
-                if (SPEC_scanbroken.findall(line) != [] or
-                        scan_aborted_flag):
+                if SPEC_scanbroken.findall(line) != [] or aborted:
                     # need to check next line(s) to know if scan is resumed
-                    # read until end of comment block or end of file
-                    if not scan_aborted_flag:
-                        scan_aborted_flag = True
+                    if not aborted:
+                        aborted = True
                         self.scan_status = "ABORTED"
                         if config.VERBOSITY >= config.INFO_ALL:
                             print("XU.io.SPECScan.ReadData: %s aborted"
                                   % self.name)
-                        continue
                     elif SPEC_scanresumed.match(line):
                         self.scan_status = "OK"
-                        scan_aborted_flag = False
+                        aborted = False
                         if config.VERBOSITY >= config.INFO_ALL:
                             print("XU.io.SPECScan.ReadData: %s resumed"
                                   % self.name)
-                        continue
-                    elif SPEC_commentline.match(line):
-                        continue
                     elif SPEC_errorbm20.match(line):
                         print(line)
-                        continue
-                    else:
+                    elif not SPEC_commentline.match(line):
+                        done = True
                         break
+                elif SPEC_errorbm20.match(line):
+                    # not within an aborted scan: treat as data line
+                    segments.append((block, lstart, lend))
+                elif not SPEC_commentline.match(line):
+                    # header of the next scan
+                    done = True
+                    break
+            else:
+                if aborted and block[start:wend].strip():
+                    done = True
+                else:
+                    segments.append((block, start, wend))
+            if eof:
+                done = True
+            chunksize = min(2 * chunksize, SPEC_chunksize)
+
+        if mm is not None:
+            # merge adjacent segments of the mapping
+            merged = []
+            for seg in segments:
+                if merged and merged[-1][2] == seg[1]:
+                    merged[-1] = (mm, merged[-1][1], seg[2])
+                else:
+                    merged.append(seg)
+            if len(merged) == 1:
+                return memoryview(mm)[merged[0][1]:merged[0][2]]
+            segments = merged
+        return b'\n'.join(block[start:end] for block, start, end in segments)
 
-                if SPEC_headerline.match(line) or \
-                   SPEC_commentline.match(line):
-                    if SPEC_scanresumed.match(line):
-                        continue
-                    elif SPEC_commentline.match(line):
-                        continue
-                    else:
-                        break
+    def _parse_datablock(self, block, type_desc):
+        """
+        convert the data block to a record array by parsing all scalar data
+        and MCA spectra in one go in the C extension.
 
-                if mca_counter == 0:
-                    # the line is a scalar data line
-                    line_list = SPEC_num_value.findall(line)
-                    if config.VERBOSITY >= config.DEBUG:
-                        print("XU.io.SPECScan.ReadData: %s" % line)
-                        print("XU.io.SPECScan.ReadData: read scalar values %s"
-                              % repr(line_list))
-                    # convert strings to numbers
-                    line_list = map(float, line_list)
-
-                    # increment the MCA counter if MCA data is stored
-                    if self.has_mca:
-                        mca_counter = mca_counter + 1
-                        # create a temporary list for the mca data
-                        mca_tmp_list = []
-                    else:
-                        record_list.append(tuple(line_list))
-                else:
-                    # reading MCA spectrum
-                    mca_tmp_list += map(int, SPEC_int_value.findall(line))
+        Parameters
+        ----------
+        block :     bytes
+            data lines of the scan
+        type_desc : dict
+            type descriptor of the record array
 
-                    # increment MCA counter
+        Returns
+        -------
+        numpy.recarray or None
+            the scan data or None if the data block is irregular and
+            needs to be parsed line by line
+        """
+        try:
+            scalars, mca = cxrayutilities.specread(
+                block, len(self.colnames), self.mca_channels,
+                self.mca_nof_lines if self.has_mca else 0)
+        except ValueError:
+            return None
+
+        npts = scalars.shape[0]
+        if config.VERBOSITY >= config.INFO_LOW:
+            print("XU.io.SPECScan.ReadData: %s: %d %d %d"
+                  % (self.name, npts, scalars.shape[1] + int(self.has_mca),
+                     len(type_desc["names"])))
+        data = numpy.recarray(npts, dtype=numpy.dtype(type_desc))
+        for i, name in enumerate(self.colnames):
+            data[name] = scalars[:, i]
+        if self.has_mca:
+            data["MCA"] = mca
+        return data
+
+    def _parse_datalines(self, block, type_desc):
+        """
+        set the data attribute by parsing the data lines one by one.
+
+        Parameters
+        ----------
+        block :     bytes
+            data lines of the scan
+        type_desc : dict
+            type descriptor of the record array
+        """
+        record_list = []  # from this list the record array while be built
+
+        mca_counter = 0
+
+        for line in block.split(b'\n'):
+            line = line.decode('ascii', 'ignore')
+            line = line.strip()
+            if not line:
+                continue
+
+            if mca_counter == 0:
+                # the line is a scalar data line
+                line_list = SPEC_num_value.findall(line)
+                if config.VERBOSITY >= config.DEBUG:
+                    print("XU.io.SPECScan.ReadData: %s" % line)
+                    print("XU.io.SPECScan.ReadData: read scalar values %s"
+                          % repr(line_list))
+                # convert strings to numbers
+                line_list = map(float, line_list)
+
+                # increment the MCA counter if MCA data is stored
+                if self.has_mca:
                     mca_counter = mca_counter + 1
-                    # if mca_counter exceeds the number of lines used to store
-                    # MCA data: append everything to the record list
-                    if mca_counter > self.mca_nof_lines:
-                        record_list.append(tuple(list(line_list) +
-                                                 [mca_tmp_list]))
-                        mca_counter = 0
-
-            # convert the data to numpy arrays
-            ncol = len(record_list[0])
-            if config.VERBOSITY >= config.INFO_LOW:
-                print("XU.io.SPECScan.ReadData: %s: %d %d %d"
-                      % (self.name, len(record_list), ncol,
-                         len(type_desc["names"])))
-            if ncol == len(type_desc["names"]):
-                try:
-                    self.data = numpy.rec.fromrecords(record_list,
-                                                      dtype=type_desc)
-                except ValueError:
-                    self.scan_status = 'NODATA'
-                    print("XU.io.SPECScan.ReadData: %s exception while "
-                          "parsing data" % self.name)
+                    # create a temporary list for the mca data
+                    mca_tmp_list = []
+                else:
+                    record_list.append(tuple(line_list))
             else:
+                # reading MCA spectrum
+                mca_tmp_list += map(int, SPEC_int_value.findall(line))
+
+                # increment MCA counter
+                mca_counter = mca_counter + 1
+                # if mca_counter exceeds the number of lines used to store
+                # MCA data: append everything to the record list
+                if mca_counter > self.mca_nof_lines:
+                    record_list.append(tuple(list(line_list) +
+                                             [mca_tmp_list]))
+                    mca_counter = 0
+
+        # convert the data to numpy arrays
+        ncol = len(record_list[0])
+        if config.VERBOSITY >= config.INFO_LOW:
+            print("XU.io.SPECScan.ReadData: %s: %d %d %d"
+                  % (self.name, len(record_list), ncol,
+                     len(type_desc["names"])))
+        if ncol == len(type_desc["names"]):
+            try:
+                self.data = numpy.rec.fromrecords(record_list,
+                                                  dtype=type_desc)
+            except ValueError:
                 self.scan_status = 'NODATA'
+                print("XU.io.SPECScan.ReadData: %s exception while "
+                      "parsing data" % self.name)
+        else:
+            self.scan_status = 'NODATA'
 
     def plot(self, *args, **keyargs):
         """
@@ -524,6 +767,43 @@ class SPECScan(object):
 
             h5.flush()
 
+    def _index_entry(self):
+        """
+        return the scan metadata determined by SPECFile.Parse as dictionary
+        which can be stored in the scan index of the SPECFile.
+        """
+        if self.has_mca:
+            mca = [self.mca_column_format, self.mca_channels,
+                   self.mca_start_channel, self.mca_stop_channel]
+        else:
+            mca = None
+        return {'name': self.name, 'nr': self.nr, 'command': self.command,
+                'date': self.date, 'time': self.time, 'itime': self.itime,
+                'colnames': self.colnames, 'hoffset': self.hoffset,
+                'doffset': self.doffset, 'scan_status': self.scan_status,
+                'init_motor_pos': self.init_motor_pos, 'mca': mca}
+
+    @classmethod
+    def _from_index(cls, entry, fname):
+        """
+        create a SPECScan from an entry of the scan index of a SPECFile
+
+        Parameters
+        ----------
+        entry :     dict
+            scan metadata as returned by _index_entry()
+        fname :     str
+            file name of the SPEC file the scan belongs to
+        """
+        s = cls(entry['name'], entry['nr'], entry['command'], entry['date'],
+                entry['time'], entry['itime'], entry['colnames'],
+                entry['hoffset'], entry['doffset'], fname, [], [],
+                entry['scan_status'])
+        s.init_motor_pos = entry['init_motor_pos']
+        if entry['mca'] is not None:
+            s.SetMCAParams(*entry['mca'])
+        return s
+
     def getheader_element(self, key, firstonly=True):
         """
         return the value-string of the first appearance of this SPECScan's
@@ -568,7 +848,7 @@ class SPECFile(object):
     interesting for interactive use.
     """
 
-    def __init__(self, filename, path=""):
+    def __init__(self, filename, path="", index=False, use_mmap=False):
         """
         SPECFile init routine
 
@@ -578,14 +858,40 @@ class SPECFile(object):
             filename of the spec file
         path :      str, optional
             path to the specfile
+        index :     bool or str, optional
+            use a sidecar scan index to avoid reparsing the file when it is
+            opened again. If True the index is stored next to the SPEC file
+            with the additional extension '.xuidx', alternatively the file
+            name of the index can be given. The index is validated by the
+            size and modification time of the SPEC file. If the file has
+            grown since the index was written only the new part is parsed.
+            By default no index is used.
+        use_mmap :  bool, optional
+            memory map the file. All scans of the file share the read-only
+            mapping and read their header and data from it without reopening
+            the file. Only available for uncompressed files, for compressed
+            files the option is ignored.
         """
         self.full_filename = os.path.join(path, filename)
         self.filename = os.path.basename(self.full_filename)
+        if index is True:
+            self.index_filename = self.full_filename + '.xuidx'
+        elif index:
+            self.index_filename = index
+        else:
+            self.index_filename = None
 
         # list holding scan objects
         self.scan_list = []
         self.fid = None
         self.last_offset = 0
+        self._mmap = None
+        self.use_mmap = use_mmap
+        if use_mmap and self.full_filename.endswith(('.gz', '.bz2', '.xz')):
+            if config.VERBOSITY >= config.INFO_LOW:
+                print("XU.io.SPECFile: compressed files can not be memory "
+                      "mapped")
+            self.use_mmap = False
 
         # initially parse the file
         self.init_motor_names_fh = []  # this list will hold the names of the
@@ -596,7 +902,11 @@ class SPECFile(object):
         # motors saved in initial motor positions from either the file or
         # scan header
 
-        self.Parse()
+        if self.index_filename is None:
+            self.Parse()
+        elif not self._load_index():
+            self.Parse()
+            self._save_index()
 
     def __getitem__(self, index):
         """
@@ -700,15 +1010,125 @@ class SPECFile(object):
             lastscan = self.scan_list[idx - 1]
             lastscan.ischanged = True
         self.Parse()
+        if self.index_filename is not None:
+            self._save_index()
+
+    def _map_file(self):
+        """
+        memory map the file and share the mapping with all scans. An existing
+        mapping is replaced if the file size changed.
+        """
+        size = os.path.getsize(self.full_filename)
+        if self._mmap is None or len(self._mmap) != size:
+            with open(self.full_filename, 'rb') as fid:
+                self._mmap = mmap.mmap(fid.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+        for s in self.scan_list:
+            s._mmap = self._mmap
+
+    def _open(self):
+        """
+        return a context manager providing the file handle used for parsing
+        """
+        if self.use_mmap:
+            self._map_file()
+            return _mapped(self._mmap)
+        return xu_open(self.full_filename)
+
+    def _index_checksum(self, offset):
+        """
+        checksum of the file content preceding offset, which is used to
+        validate that the already indexed part of a grown file is unchanged.
+        """
+        start = max(0, offset - SPEC_index_crclength)
+        with xu_open(self.full_filename) as fid:
+            fid.seek(start, 0)
+            return zlib.crc32(fid.read(offset - start))
+
+    def _save_index(self):
+        """
+        write the scan index of the file to index_filename. The file is
+        replaced atomically so that concurrent readers never see a partial
+        index. Failing to write the index is not an error.
+        """
+        stat = os.stat(self.full_filename)
+        index = {'version': SPEC_index_version,
+                 'filename': self.filename,
+                 'size': stat.st_size,
+                 'mtime': stat.st_mtime_ns,
+                 'last_offset': self.last_offset,
+                 'checksum': self._index_checksum(self.last_offset),
+                 'init_motor_names_fh': self.init_motor_names_fh,
+                 'init_motor_names_sh': self.init_motor_names_sh,
+                 'init_motor_names': self.init_motor_names,
+                 'scans': [s._index_entry() for s in self.scan_list]}
+        dirname = os.path.dirname(os.path.abspath(self.index_filename))
+        tmpname = None
+        try:
+            fd, tmpname = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+            with os.fdopen(fd, 'w') as fid:
+                json.dump(index, fid)
+            os.replace(tmpname, self.index_filename)
+        except OSError as e:
+            if tmpname is not None and os.path.exists(tmpname):
+                os.remove(tmpname)
+            if config.VERBOSITY >= config.INFO_LOW:
+                print("XU.io.SPECFile: could not write scan index %s (%s)"
+                      % (self.index_filename, e))
+
+    def _load_index(self):
+        """
+        load the scan index from index_filename. If the SPEC file has grown
+        since the index was written the new part of the file is parsed.
+
+        Returns
+        -------
+        bool
+            True if the scan list was loaded from the index, False if the
+            index is missing or outdated and the file needs to be parsed.
+        """
+        try:
+            with open(self.index_filename, 'r') as fid:
+                index = json.load(fid)
+        except (OSError, ValueError):
+            return False
+        if (index.get('version') != SPEC_index_version or
+                index.get('filename') != self.filename):
+            return False
+
+        stat = os.stat(self.full_filename)
+        if stat.st_size == index['size']:
+            if stat.st_mtime_ns != index['mtime']:
+                return False
+            grown = False
+        elif (stat.st_size > index['size'] and
+                self._index_checksum(index['last_offset']) ==
+                index['checksum']):
+            grown = True
+        else:
+            return False
+
+        self.scan_list = [SPECScan._from_index(e, self.full_filename)
+                          for e in index['scans']]
+        if self.use_mmap:
+            self._map_file()
+        self.last_offset = index['last_offset']
+        self.init_motor_names_fh = index['init_motor_names_fh']
+        self.init_motor_names_sh = index['init_motor_names_sh']
+        self.init_motor_names = index['init_motor_names']
+        if config.VERBOSITY >= config.INFO_ALL:
+            print("XU.io.SPECFile: loaded %d scans from index %s"
+                  % (len(self.scan_list), self.index_filename))
+        if grown:
+            self.Update()
+        return True
 
     def Parse(self):
         """
         Parses the file from the starting at last_offset and adding found scans
         to the scan list.
         """
-        with xu_open(self.full_filename) as self.fid:
-            # move to the last read position in the file
-            self.fid.seek(self.last_offset, 0)
+        with self._open() as self.fid:
             scan_started = False
             scan_has_mca = False
             # list with the motors from whome the initial
@@ -718,7 +1138,14 @@ class SPECFile(object):
             if config.VERBOSITY >= config.DEBUG:
                 print('XU.io.SPECFile: start parsing')
 
-            for line in self.fid:
+            if self._mmap is not None:
+                # the mapping is shared with the scans: read by offsets
+                lines = _mapped_lines(self._mmap, self.last_offset)
+            else:
+                # move to the last read position in the file
+                self.fid.seek(self.last_offset, 0)
+                lines = self.fid
+            for line in lines:
                 linelength = len(line)
                 line = line.decode('ascii', 'ignore')
                 if config.VERBOSITY >= config.DEBUG:
@@ -924,6 +1351,8 @@ class SPECFile(object):
             # if reading of the file is finished store the data offset of the
             # last scan as the last offset for the next parsing run of the file
             self.last_offset = self.scan_list[-1].doffset
+            for s in self.scan_list:
+                s._mmap = self._mmap
 
 
 class SPECCmdLine(object):
@@ -66,6 +66,21 @@ def blockAverage1D(data, Nav):
     return block_av
 
 
+def _block_average_input(data, roi, mask):
+    """
+    common preparation of the input of the block average functions. The
+    region of interest of the data and mask is selected without conversion
+    of the data type. The C-code uses float32 and unsigned/signed integer
+    detector data directly.
+    """
+    sl = tuple(slice(roi[2 * i], roi[2 * i + 1])
+               for i in range(len(roi) // 2))
+    data = data[(slice(None), ) * (data.ndim - len(sl)) + sl]
+    if mask is not None:
+        mask = numpy.asarray(mask, dtype=bool)[sl]
+    return data, mask
+
+
 def blockAverage2D(data2d, Nav1, Nav2, **kwargs):
     """
     perform a block average for 2D array of Scalar values
@@ -74,7 +89,8 @@ def blockAverage2D(data2d, Nav1, Nav2, **kwargs):
     Parameters
     ----------
     data2d :        ndarray
-        array of 2D data shape (N, M)
+        array of 2D data shape (N, M). Data of type float32, uint16, int32
+        and uint32 are used without conversion.
     Nav1, Nav2 :    int
         a field of (Nav1 x Nav2) values is contracted
 
@@ -83,6 +99,13 @@ def blockAverage2D(data2d, Nav1, Nav2, **kwargs):
     roi :           tuple or list, optional
         region of interest for the 2D array. e.g. [20, 980, 40, 960],
         reduces M, and M!
+    mask :          ndarray, optional
+        boolean array of shape (N, M) which is True for pixels (e.g. dead or
+        hot pixels) which are excluded from the average. Blocks without valid
+        pixels are set to NaN.
+    out :           ndarray, optional
+        C-contiguous float64 or float32 array of the shape of the result in
+        which the result is stored
 
     Returns
     -------
@@ -90,13 +113,16 @@ def blockAverage2D(data2d, Nav1, Nav2, **kwargs):
         block averaged numpy array with type numpy.double with shape
         (ceil(N/Nav1), ceil(M/Nav2))
     """
+    valid_kwargs = {'roi': 'region of interest',
+                    'mask': 'mask of excluded pixels',
+                    'out': 'output array'}
+    utilities.check_kwargs(kwargs, valid_kwargs, 'blockAverage2D')
 
     if not isinstance(data2d, (numpy.ndarray)):
         raise TypeError("first argument data2d must be of type numpy.ndarray")
 
     roi = kwargs.get('roi', [0, data2d.shape[0], 0, data2d.shape[1]])
-    data = numpy.array(data2d[roi[0]:roi[1], roi[2]:roi[3]],
-                       dtype=numpy.double)
+    data, mask = _block_average_input(data2d, roi, kwargs.get('mask'))
 
     if config.VERBOSITY >= config.DEBUG:
         N, M = (roi[1] - roi[0], roi[3] - roi[2])
@@ -106,7 +132,8 @@ def blockAverage2D(data2d, Nav1, Nav2, **kwargs):
               % (numpy.ceil(N / float(Nav1)), numpy.ceil(M / float(Nav2))))
 
     block_av = cxrayutilities.block_average2d(data, Nav1, Nav2,
-                                              config.NTHREADS)
+                                              config.NTHREADS, mask,
+                                              kwargs.get('out'))
 
     return block_av
 
@@ -120,7 +147,8 @@ def blockAveragePSD(psddata, Nav, **kwargs):
     Parameters
     ----------
     psddata :   ndarray
-        array of 2D data shape (Nspectra, Nchannels)
+        array of 2D data shape (Nspectra, Nchannels). Data of type float32,
+        uint16, int32 and uint32 are used without conversion.
     Nav :       int
         number of channels which should be averaged
 
@@ -128,6 +156,13 @@ def blockAveragePSD(psddata, Nav, **kwargs):
         optional keyword argument
     roi :       tuple or list
         region of interest for the 2D array. e.g. [20, 980] Nchannels = 980-20
+    mask :      ndarray, optional
+        boolean array of length Nchannels which is True for channels which
+        are excluded from the average. Blocks without valid channels are set
+        to NaN.
+    out :       ndarray, optional
+        C-contiguous float64 or float32 array of the shape of the result in
+        which the result is stored
 
     Returns
     -------
@@ -135,14 +170,19 @@ def blockAveragePSD(psddata, Nav, **kwargs):
         block averaged psd spectra as numpy array with type numpy.double of
         shape (Nspectra , ceil(Nchannels/Nav))
     """
+    valid_kwargs = {'roi': 'region of interest',
+                    'mask': 'mask of excluded channels',
+                    'out': 'output array'}
+    utilities.check_kwargs(kwargs, valid_kwargs, 'blockAveragePSD')
 
     if not isinstance(psddata, (numpy.ndarray)):
         raise TypeError("first argument psddata must be of type numpy.ndarray")
 
     roi = kwargs.get('roi', [0, psddata.shape[1]])
-    data = numpy.array(psddata[:, roi[0]:roi[1]], dtype=numpy.double)
+    data, mask = _block_average_input(psddata, roi, kwargs.get('mask'))
 
-    block_av = cxrayutilities.block_average_PSD(data, Nav, config.NTHREADS)
+    block_av = cxrayutilities.block_average_PSD(data, Nav, config.NTHREADS,
+                                                mask, kwargs.get('out'))
 
     return block_av
 
@@ -155,7 +195,8 @@ def blockAverageCCD(data3d, Nav1, Nav2, **kwargs):
     Parameters
     ----------
     data3d :        ndarray
-        array of 3D data shape (Nframes, N, M)
+        array of 3D data shape (Nframes, N, M). Data of type float32, uint16,
+        int32 and uint32 are used without conversion.
     Nav1, Nav2 :    int
         a field of (Nav1 x Nav2) values is contracted
 
@@ -164,6 +205,13 @@ def blockAverageCCD(data3d, Nav1, Nav2, **kwargs):
     roi :           tuple or list, optional
         region of interest for the 2D array. e.g. [20, 980, 40, 960],
         reduces M, and M!
+    mask :          ndarray, optional
+        boolean array of shape (N, M) which is True for pixels (e.g. dead or
+        hot pixels) which are excluded from the average in all frames. Blocks
+        without valid pixels are set to NaN.
+    out :           ndarray, optional
+        C-contiguous float64 or float32 array of the shape of the result in
+        which the result is stored
 
     Returns
     -------
@@ -171,13 +219,16 @@ def blockAverageCCD(data3d, Nav1, Nav2, **kwargs):
         block averaged numpy array with type numpy.double with shape
         (Nframes, ceil(N/Nav1), ceil(M/Nav2))
     """
+    valid_kwargs = {'roi': 'region of interest',
+                    'mask': 'mask of excluded pixels',
+                    'out': 'output array'}
+    utilities.check_kwargs(kwargs, valid_kwargs, 'blockAverageCCD')
 
     if not isinstance(data3d, (numpy.ndarray)):
         raise TypeError("first argument data3d must be of type numpy.ndarray")
 
     roi = kwargs.get('roi', [0, data3d.shape[1], 0, data3d.shape[2]])
-    data = numpy.array(data3d[:, roi[0]:roi[1], roi[2]:roi[3]],
-                       dtype=numpy.double)
+    data, mask = _block_average_input(data3d, roi, kwargs.get('mask'))
 
     if config.VERBOSITY >= config.DEBUG:
         N, M = (roi[1] - roi[0], roi[3] - roi[2])
@@ -186,8 +237,10 @@ def blockAverageCCD(data3d, Nav1, Nav2, **kwargs):
         print("xu.normalize.blockAverageCCD: number of points: (%d,%d)"
               % (numpy.ceil(N / float(Nav1)), numpy.ceil(M / float(Nav2))))
 
+    # the frames are averaged in parallel using config.NTHREADS threads
     block_av = cxrayutilities.block_average_CCD(data, Nav1, Nav2,
-                                                config.NTHREADS)
+                                                config.NTHREADS, mask,
+                                                kwargs.get('out'))
 
     return block_av
 
@@ -227,11 +280,11 @@ class IntensityNormalizer(object):
             absorber correction function to be used as in
             ``absorber_corrected_intensity = data[det]*absfun(data)``
         flatfield : ndarray
-            flatfield of the detector; shape must be the same as data[det], and
-            is only applied for MCA detectors
+            flatfield of the detector; shape must be the same as data[det] (or
+            a single CCD frame), and is only applied for MCA and CCD detectors
         darkfield : ndarray
-            darkfield of the detector; shape must be the same as data[det], and
-            is only applied for MCA detectors
+            darkfield of the detector; shape must be the same as data[det] (or
+            a single CCD frame), and is only applied for MCA and CCD detectors
 
         Examples
         --------
@@ -428,31 +481,23 @@ class IntensityNormalizer(object):
     flatfield = property(_getflatfield, _setflatfield)
     darkfield = property(_getdarkfield, _setdarkfield)
 
-    def __call__(self, data, ccd=None):
+    def _correction_factor(self, data):
         """
-        apply the correction method which was initialized to the measured data
+        determine the correction factor for monitor, count time and
+        absorbers.
 
         Parameters
         ----------
         data :  numpy.recarray
             data object from xrayutilities.io classes
-        ccd :   ndarray, optional
-            optionally CCD data can be given as separate ndarray of shape
-            (len(data), n1, n2), where n1, n2 is the shape of the CCD image.
 
         Returns
         -------
-        corrint :   ndarray
-            corrected intensity as numpy.ndarray of the same shape as data[det]
-            (or ccd.shape)
+        c :     float or ndarray
+            correction factor (scalar or one value per data point)
+        time :  float or ndarray
+            count time
         """
-        if numpy.any(ccd):
-            rawdata = ccd
-        else:
-            rawdata = data[self._det]
-
-        corrint = numpy.zeros(rawdata.shape, dtype=numpy.float)
-
         # set needed variables
         # monitor intensity
         if self._mon:
@@ -490,6 +535,158 @@ class IntensityNormalizer(object):
         else:
             if numpy.isnan(c) or numpy.isinf(c) or c == 0:
                 c = 1.0
+        return c, time
+
+    def _frame_corrections(self, shape, dtype):
+        """
+        prepare the darkfield and flatfield correction of CCD frames of the
+        given shape. Fields of a different shape, e.g. set for a linear
+        detector, are ignored.
+
+        Returns
+        -------
+        dark :  ndarray or None
+            darkfield of the detector in the requested data type
+        flat :  ndarray or None
+            flatfield correction factor in the requested data type
+        """
+        shape = tuple(shape)
+        dark = None
+        if self._darkfield is not None and self._darkfield.shape == shape:
+            dark = self._darkfield.astype(dtype)
+        flat = None
+        if self._flatfield is not None and self._flatfield.shape == shape:
+            flat = (self._flatfieldav / self._flatfield).astype(dtype)
+        return dark, flat
+
+    @staticmethod
+    def _correct_frame(frame, c, time, dark, flat, out, tmp):
+        """
+        apply darkfield, monitor, count time, absorber and flatfield
+        correction to a single CCD frame. The result is stored in out, which
+        may be the frame itself. tmp is a buffer of the frame shape needed
+        for the darkfield correction.
+        """
+        if dark is not None:
+            numpy.multiply(dark, time, out=tmp)
+            numpy.subtract(frame, tmp, out=out)
+            numpy.maximum(out, 0, out=out)
+            numpy.multiply(out, c, out=out)
+        else:
+            numpy.multiply(frame, c, out=out)
+        if flat is not None:
+            numpy.multiply(out, flat, out=out)
+        return out
+
+    def iter_frames(self, data, ccd, dtype=numpy.float32, out=None):
+        """
+        apply the correction to CCD frames one by one. In contrast to the
+        call of the normalizer only buffers of the size of a single frame are
+        allocated, so that stacks which do not fit into memory can be
+        corrected while reading the frames, e.g. from a list of files.
+
+        Parameters
+        ----------
+        data :  numpy.recarray
+            data object from xrayutilities.io classes with one entry per
+            frame
+        ccd :   ndarray or iterable
+            CCD frames of shape (n1, n2), e.g. a 3D array or a generator
+            yielding the frames
+        dtype : numpy.float32 or numpy.float64, optional
+            data type of the corrected frames (default: numpy.float32)
+        out :   ndarray, optional
+            array of shape (len(data), n1, n2) in which the corrected frames
+            are stored. If not given the yielded frames are views of a
+            buffer which is overwritten in the next step!
+
+        Yields
+        ------
+        ndarray
+            corrected frame. darkfield and flatfield corrections are applied
+            if they were given to the normalizer with the shape of the
+            frames.
+        """
+        c, time = (numpy.asarray(v) for v in self._correction_factor(data))
+        nframes = max(c.size, time.size) if c.ndim or time.ndim else None
+        if out is not None:
+            self._check_out(out, (len(data), ))
+            dtype = out.dtype
+
+        def iterate():
+            buf = tmp = dark = flat = None
+            for i, frame in enumerate(ccd):
+                if nframes is not None and i >= nframes:
+                    raise InputError("XU.IntensityNormalizer: more CCD "
+                                     "frames than data points given")
+                frame = numpy.asarray(frame)
+                if tmp is None:
+                    dark, flat = self._frame_corrections(frame.shape, dtype)
+                    tmp = numpy.empty(frame.shape, dtype=dtype)
+                    if out is None:
+                        buf = numpy.empty(frame.shape, dtype=dtype)
+                yield self._correct_frame(
+                    frame, c[i] if c.ndim else c,
+                    time[i] if time.ndim else time, dark, flat,
+                    buf if out is None else out[i], tmp)
+
+        # input checks are performed above upon the call, while the
+        # correction is only performed when the frames are requested
+        return iterate()
+
+    @staticmethod
+    def _check_out(out, shape):
+        """
+        check an output array given to the normalizer
+        """
+        if (not isinstance(out, numpy.ndarray) or
+                out.dtype not in (numpy.float32, numpy.float64) or
+                out.shape[:len(shape)] != shape):
+            raise InputError("XU.IntensityNormalizer: out must be a float32 "
+                             "or float64 array with leading dimensions %s"
+                             % str(shape))
+
+    def __call__(self, data, ccd=None, out=None):
+        """
+        apply the correction method which was initialized to the measured data
+
+        Parameters
+        ----------
+        data :  numpy.recarray
+            data object from xrayutilities.io classes
+        ccd :   ndarray, optional
+            optionally CCD data can be given as separate ndarray of shape
+            (len(data), n1, n2), where n1, n2 is the shape of the CCD image.
+        out :   ndarray, optional
+            float32 or float64 array of the shape of the corrected intensity
+            in which the result is stored. For CCD data the frames are
+            corrected one by one, so no temporary array of the size of the
+            data is allocated. out may be the ccd array itself to perform the
+            correction in place.
+
+        Returns
+        -------
+        corrint :   ndarray
+            corrected intensity as numpy.ndarray of the same shape as data[det]
+            (or ccd.shape)
+        """
+        if ccd is not None:
+            rawdata = ccd
+        else:
+            rawdata = data[self._det]
+
+        if out is not None:
+            self._check_out(out, rawdata.shape)
+
+        if len(rawdata.shape) == 3:
+            # CCD frames are corrected one by one
+            if out is None:
+                out = numpy.empty(rawdata.shape, dtype=numpy.double)
+            for corrint in self.iter_frames(data, rawdata, out=out):
+                pass
+            return out
+
+        c, time = self._correction_factor(data)
 
         if len(rawdata.shape) == 1:
             corrint = rawdata * c
@@ -532,12 +729,11 @@ class IntensityNormalizer(object):
             # single 2D detector frame
             corrint = rawdata * c
 
-        elif len(rawdata.shape) == 3:
-            # darkfield and flatfield correction is still missing!
-            corrint = rawdata * c[:, numpy.newaxis, numpy.newaxis]
-
         else:
             raise InputError("data[det] must be an array of dimension one "
                              "or two or three")
 
+        if out is not None:
+            out[...] = corrint
+            return out
         return corrint
@@ -31,6 +31,7 @@ analytic expressions from literature can be used as they are implemented in the
 predefined experimental classes HXRD, NonCOP, and GID.
 """
 
+import multiprocessing
 import numbers
 
 import numpy
@@ -79,18 +80,20 @@ def _makebounds(boundsin):
             lb.append(b-1000*config.EPSILON)
             ub.append(b+1000*config.EPSILON)
         elif b is None:
-            lb.append(-np.inf)
-            ub.append(np.inf)
+            lb.append(-numpy.inf)
+            ub.append(numpy.inf)
         else:
             raise InputError('bound value is of invalid type (%s)' % type(b))
 
     return scipy.optimize.Bounds(lb, ub)
 
 
-def _errornorm_q2ang(angles, qvec, hxrd, U=numpy.identity(3)):
+def _errornorm_q2ang_grad(angles, qvec, hxrd, U=numpy.identity(3)):
     """
-    function to determine the offset in the qposition calculated from
-    a set of experimental angles and the given vector
+    function to determine the offset in the qposition calculated from a set of
+    experimental angles and the given vector together with its gradient with
+    respect to the angles. The gradient is determined from the analytic
+    derivatives of the momentum transfer.
 
     Parameters
     ----------
@@ -108,11 +111,17 @@ def _errornorm_q2ang(angles, qvec, hxrd, U=numpy.identity(3)):
     error : float
         q-space error between the current fit-guess and the user-specified
         position
+    grad :  ndarray
+        derivative of the error with respect to the angles
     """
 
-    qcalc = hxrd.Ang2Q.point(*angles, UB=U)
-    dq = numpy.linalg.norm(qcalc - qvec)
-    return dq
+    qcalc = numpy.asarray(hxrd.Ang2Q.point(*angles, UB=U))
+    jac = hxrd.Ang2Q.point_jacobian(*angles, UB=U)
+    diff = qcalc - qvec
+    dq = numpy.linalg.norm(diff)
+    if dq == 0:
+        return dq, numpy.zeros(len(angles))
+    return dq, numpy.dot(jac, diff) / dq
 
 
 def incidenceAngleConst(angles, alphai, xrd):
@@ -245,8 +254,8 @@ def Q2AngFit(qvec, expclass, bounds=None, ormat=numpy.identity(3),
 
     sbounds = _makebounds(bounds)
     # perform optimization
-    res = scipy.optimize.minimize(_errornorm_q2ang, start,
-                                  args=(lqvec, expclass, ormat),
+    res = scipy.optimize.minimize(_errornorm_q2ang_grad, start,
+                                  args=(lqvec, expclass, ormat), jac=True,
                                   method='SLSQP', bounds=sbounds,
                                   constraints=constraints,
                                   options={'maxiter': 1000,
@@ -258,8 +267,8 @@ def Q2AngFit(qvec, expclass, bounds=None, ormat=numpy.identity(3),
         if config.VERBOSITY >= config.DEBUG:
             print("XU.Q2AngFit: info: need second run")
         # make a second run
-        res = scipy.optimize.minimize(_errornorm_q2ang, res.x,
-                                      args=(lqvec, expclass, ormat),
+        res = scipy.optimize.minimize(_errornorm_q2ang_grad, res.x,
+                                      args=(lqvec, expclass, ormat), jac=True,
                                       method='SLSQP',
                                       bounds=sbounds,
                                       constraints=constraints,
@@ -275,3 +284,105 @@ def Q2AngFit(qvec, expclass, bounds=None, ormat=numpy.identity(3),
               % (qerror, errcode, res.message))
 
     return x, qerror, errcode
+
+
+def _q2angfit_path(qvecs, expclass, bounds, ormat, startvalues, constraints,
+                   warmstart):
+    """
+    sequentially fit the goniometer angles for a list of q-vectors. See
+    Q2AngFitBatch for a description of the arguments.
+
+    Returns
+    -------
+    fittedangles, qerror, errcode : ndarray
+        arrays with the results of Q2AngFit for every q-vector
+    """
+    qconv = expclass._A2QConversion
+    nangles = len(qconv.sampleAxis) + len(qconv.detectorAxis)
+    npoints = len(qvecs)
+
+    angles = numpy.empty((npoints, nangles))
+    qerror = numpy.empty(npoints)
+    errcode = numpy.empty(npoints, dtype=numpy.int32)
+
+    start = startvalues
+    for i in range(npoints):
+        angles[i], qerror[i], errcode[i] = Q2AngFit(
+            qvecs[i], expclass, bounds=bounds, ormat=ormat, startvalues=start,
+            constraints=constraints)
+        if warmstart:
+            # use the previous solution only if it was successful
+            start = angles[i] if errcode[i] <= 2 else startvalues
+    return angles, qerror, errcode
+
+
+def Q2AngFitBatch(qvecs, expclass, bounds=None, ormat=numpy.identity(3),
+                  startvalues=None, constraints=(), warmstart=True, nproc=1):
+    """
+    Convert a series of q-vectors from reciprocal space to angular space using
+    Q2AngFit. Along a continuous path in reciprocal space the solution of the
+    previous point is used as start value for the next fit (warm start), which
+    significantly reduces the number of iterations and yields consistent
+    solution branches. Optionally the series is split into independent
+    contiguous chunks which are solved in separate worker processes.
+
+    Parameters
+    ----------
+    qvecs :     array-like
+        q-vectors for which the angular positions should be calculated. shape
+        (N, 3)
+    expclass :  Experiment
+        experimental class used to define the goniometer for which the angles
+        should be calculated.
+
+    bounds :    tuple or list
+        bounds of the goniometer angles (see Q2AngFit)
+    ormat :     array-like
+        orientation matrix of the sample to be used in the conversion
+    startvalues :   array-like
+        start values for the fit of the first q-vector (of every chunk). The
+        number of values must correspond to the number of angles in the
+        goniometer of the expclass
+    constraints :   tuple
+        sequence of constraint dictionaries (see Q2AngFit). When worker
+        processes are used the constraint functions must be picklable, i.e.
+        no lambda functions can be used.
+    warmstart :     bool, optional
+        if True (default) the result of the previous q-vector is used as start
+        value for the next one. Otherwise every fit starts from startvalues.
+    nproc :     int, optional
+        number of worker processes. The q-vectors are split into nproc
+        contiguous chunks of which every one is fitted with warm starts. 0
+        uses all available CPUs. (default: 1, no worker processes)
+
+    Returns
+    -------
+    fittedangles :  ndarray
+        fitted goniometer angles, shape (N, nangles)
+    qerror :        ndarray
+        error in reciprocal space, shape (N, )
+    errcode :       ndarray
+        error-codes of the scipy minimize function, shape (N, ). for a
+        successful fit the error code should be <=2
+    """
+    lqvecs = numpy.asarray(qvecs, dtype=numpy.double)
+    if lqvecs.ndim != 2 or lqvecs.shape[1] != 3:
+        raise InputError("XU.Q2AngFitBatch: q-vectors must be given as array "
+                         "of shape (N, 3)")
+    npoints = lqvecs.shape[0]
+
+    if nproc == 0:
+        nproc = multiprocessing.cpu_count()
+    nproc = max(1, min(nproc, npoints))
+
+    args = [(lqvecs[idx], expclass, bounds, ormat, startvalues, constraints,
+             warmstart)
+            for idx in numpy.array_split(numpy.arange(npoints), nproc)]
+
+    if nproc == 1:
+        results = [_q2angfit_path(*args[0])]
+    else:
+        with multiprocessing.Pool(nproc) as pool:
+            results = pool.starmap(_q2angfit_path, args)
+
+    return tuple(numpy.concatenate(r) for r in zip(*results))
@@ -18,6 +18,7 @@
 */
 
 #include "xrayutilities.h"
+#include "gridder_utils.h"
 
 PyObject* block_average1d(PyObject *self, PyObject *args) {
     /*    block average for one-dimensional double array
@@ -54,6 +55,7 @@ PyObject* block_average1d(PyObject *self, PyObject *args) {
     outarr = (PyArrayObject *) PyArray_SimpleNew(1, &nout, NPY_DOUBLE);
     cout = (double *) PyArray_DATA(outarr);
 
+    Py_BEGIN_ALLOW_THREADS
     /* c-code following is performing the block averaging */
     for (i = 0; i < N; i = i + Nav) {
         buf = 0;
@@ -65,6 +67,7 @@ PyObject* block_average1d(PyObject *self, PyObject *args) {
         /* save average to output array */
         cout[i / Nav] = buf / (float) (j - i);
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(input);
@@ -73,6 +76,148 @@ PyObject* block_average1d(PyObject *self, PyObject *args) {
     return PyArray_Return(outarr);
 }
 
+/* block averaging of a series of frames. The loop is defined as macro to
+ * expand it for all supported types of the input and output arrays. Every
+ * iteration of the parallel loop treats one row of blocks of one frame.
+ * Masked pixels are excluded from the average and blocks without valid
+ * pixels are set to NaN. */
+#define BLOCK_AVERAGE_LOOP(OTYPE, ITYPE) \
+    { \
+        ITYPE *ci = (ITYPE *) cin; \
+        OTYPE *co = (OTYPE *) cout; \
+        OMP_PRAGMA(omp parallel for default(shared) schedule(static)) \
+        for (b = 0; b < nrows; ++b) { \
+            long n = b / nout2;  /* frame index */ \
+            int i = (int) (b % nout2) * Nav2;  /* first row of the block */ \
+            int j, k, l, cnt; \
+            double buf; \
+            ITYPE *frame = ci + n * Nch1 * Nch2; \
+            for (j = 0; j < Nch1; j = j + Nav1) { \
+                buf = 0.; \
+                cnt = 0; \
+                for (k = i; k < i + Nav2 && k < Nch2; ++k) { \
+                    for (l = j; l < j + Nav1 && l < Nch1; ++l) { \
+                        if (mask != NULL && mask[k * Nch1 + l]) { \
+                            continue; \
+                        } \
+                        buf += frame[k * Nch1 + l]; \
+                        cnt++; \
+                    } \
+                } \
+                co[b * nout1 + j / Nav1] = cnt > 0 ? buf / cnt : NAN; \
+            } \
+        } \
+    }
+
+static PyObject* block_average_frames(PyArrayObject *input, int dtype,
+                                      PyObject *py_mask, PyObject *py_out,
+                                      int ndim, long Nframes, int Nch2,
+                                      int Nch1, int Nav2, int Nav1,
+                                      unsigned int nthreads)
+    /* block average of a series of frames of size (Nch2, Nch1) with
+     * optional mask and output array. The frames are averaged in blocks of
+     * Nav2 x Nav1 pixels. The output has the shape of the input with the
+     * frame dimensions replaced by (ceil(Nch2/Nav2), ceil(Nch1/Nav1)) and
+     * ndim dimensions in total.
+     *
+     * the reference to input is released by this function */
+{
+    PyArrayObject *mask_arr = NULL, *outarr = NULL;
+    npy_bool *mask = NULL;
+    void *cin, *cout;
+    npy_intp nout[3];
+    long nout1, nout2, nrows, b;
+    int otype;
+
+    if (Nav1 < 1 || Nav2 < 1) {
+        Py_DECREF(input);
+        PyErr_SetString(PyExc_ValueError,
+                        "number of channels to average must be positive!");
+        return NULL;
+    }
+    nout1 = (Nch1 + Nav1 - 1) / Nav1;
+    nout2 = (Nch2 + Nav2 - 1) / Nav2;
+    nrows = Nframes * nout2;
+    /* the output dimensions for 2D (frame, PSD) and 3D data */
+    if (ndim == 3) {
+        nout[0] = Nframes;
+        nout[1] = nout2;
+        nout[2] = nout1;
+    }
+    else {
+        nout[0] = Nframes * nout2;
+        nout[1] = nout1;
+    }
+
+    /* mask of the pixels which are excluded from the average */
+    if (py_mask != NULL && py_mask != Py_None) {
+        mask_arr = (PyArrayObject *) PyArray_FROM_OTF(
+            py_mask, NPY_BOOL, NPY_ARRAY_C_CONTIGUOUS | NPY_ARRAY_ALIGNED);
+        if (mask_arr == NULL) {
+            Py_DECREF(input);
+            return NULL;
+        }
+        if (PyArray_SIZE(mask_arr) != (npy_intp) Nch1 * Nch2) {
+            Py_DECREF(input);
+            Py_DECREF(mask_arr);
+            PyErr_SetString(PyExc_ValueError,
+                            "mask must have the shape of one frame!");
+            return NULL;
+        }
+        mask = (npy_bool *) PyArray_DATA(mask_arr);
+    }
+
+    /* output array: either newly allocated or provided by the caller */
+    if (py_out != NULL && py_out != Py_None) {
+        outarr = (PyArrayObject *) py_out;
+        if (!PyArray_Check(py_out) ||
+            !PyArray_ISCARRAY(outarr) ||
+            (PyArray_TYPE(outarr) != NPY_DOUBLE &&
+             PyArray_TYPE(outarr) != NPY_FLOAT32) ||
+            PyArray_NDIM(outarr) != ndim ||
+            !PyArray_CompareLists(PyArray_DIMS(outarr), nout, ndim)) {
+            Py_DECREF(input);
+            Py_XDECREF(mask_arr);
+            PyErr_SetString(PyExc_ValueError,
+                            "out must be a writable C-contiguous float64 or "
+                            "float32 array of the shape of the result!");
+            return NULL;
+        }
+        Py_INCREF(outarr);
+    }
+    else {
+        outarr = (PyArrayObject *) PyArray_SimpleNew(ndim, nout, NPY_DOUBLE);
+        if (outarr == NULL) {
+            Py_DECREF(input);
+            Py_XDECREF(mask_arr);
+            return NULL;
+        }
+    }
+    otype = PyArray_TYPE(outarr);
+    cin = PyArray_DATA(input);
+    cout = PyArray_DATA(outarr);
+
+    Py_BEGIN_ALLOW_THREADS
+    #ifdef __OPENMP__
+    /* set openmp thread numbers dynamically */
+    OMPSETNUMTHREADS(nthreads);
+    #endif
+
+    if (otype == NPY_FLOAT32) {
+        GRIDDER_DATA_DISPATCH(BLOCK_AVERAGE_LOOP, float, dtype)
+    }
+    else {
+        GRIDDER_DATA_DISPATCH(BLOCK_AVERAGE_LOOP, double, dtype)
+    }
+    Py_END_ALLOW_THREADS
+
+    /* clean up */
+    Py_DECREF(input);
+    Py_XDECREF(mask_arr);
+
+    return PyArray_Return(outarr);
+}
+
 PyObject* block_average2d(PyObject *self, PyObject *args) {
     /*    2D block average for one CCD frame
      *
@@ -84,6 +229,8 @@ PyObject* block_average2d(PyObject *self, PyObject *args) {
      *    Nav1, 2:      number of channels to average in each dimension
      *                  in total a block of Nav1 x Nav2 is averaged
      *    nthreads:     number of threads to use in parallel section
+     *    mask:         optional mask of pixels to exclude (size of ccd)
+     *    out:          optional output array
      *
      *    Returns
      *    -------
@@ -92,55 +239,25 @@ PyObject* block_average2d(PyObject *self, PyObject *args) {
      *
      */
 
-    int i = 0, j = 0, k = 0, l = 0;  /* loop indices */
-    int Nch1, Nch2;  /* number of values in input array */
     int Nav1, Nav2;  /* number of items to average */
     unsigned int nthreads;  /* number of threads to use */
-    PyArrayObject *input = NULL, *outarr = NULL;
-    double *cin, *cout;
-    double buf;
-    npy_intp nout[2];
+    PyArrayObject *input = NULL;
+    PyObject *mask = NULL, *out = NULL;
+    int dtype;
 
     /* Python argument conversion code */
-    if (!PyArg_ParseTuple(args, "O!iiI", &PyArray_Type, &input, &Nav2,
-                          &Nav1, &nthreads)) {
+    if (!PyArg_ParseTuple(args, "O!iiI|OO", &PyArray_Type, &input, &Nav2,
+                          &Nav1, &nthreads, &mask, &out)) {
         return NULL;
     }
 
-    PYARRAY_CHECK(input, 2, NPY_DOUBLE, "input must be a 2D double array!");
-    Nch2 = (int) PyArray_DIMS(input)[0];
-    Nch1 = (int) PyArray_DIMS(input)[1];
-    cin = (double *) PyArray_DATA(input);
-
-    /* create output ndarray */
-    nout[0] = ((int) ceil(Nch2 / (float) Nav2));
-    nout[1] = ((int) ceil(Nch1 / (float) Nav1));
-    outarr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_DOUBLE);
-    cout = (double *) PyArray_DATA(outarr);
-
-    #ifdef __OPENMP__
-    /* set openmp thread numbers dynamically */
-    OMPSETNUMTHREADS(nthreads);
-    #endif
-
-    #pragma omp parallel for default(shared) \
-     private(i, j, k, l, buf) schedule(static)
-    for (i = 0; i < Nch2; i = i + Nav2) {
-        for (j = 0; j < Nch1; j = j + Nav1) {
-            buf = 0.;
-            for (k = 0; k < Nav2 && (i + k) < Nch2; ++k) {
-                for (l = 0; l < Nav1 && (j + l) < Nch1; ++l) {
-                    buf += cin[(i + k) * Nch1 + (j + l)];
-                }
-            }
-            cout[(i / Nav2) * nout[1] + j / Nav1] = buf / (float)(k * l);
-        }
-    }
-
-    /* clean up */
-    Py_DECREF(input);
+    dtype = GRIDDER_DATA_TYPE(input);
+    PYARRAY_CHECK(input, 2, dtype, "input must be a 2D array!");
 
-    return PyArray_Return(outarr);
+    return block_average_frames(input, dtype, mask, out, 2, 1,
+                                (int) PyArray_DIMS(input)[0],
+                                (int) PyArray_DIMS(input)[1], Nav2, Nav1,
+                                nthreads);
 }
 
 PyObject* block_average_PSD(PyObject *self, PyObject *args) {
@@ -152,63 +269,33 @@ PyObject* block_average_PSD(PyObject *self, PyObject *args) {
      *                  size = (Nspec, Nch) (in)
      *    Nav:          number of channels to average
      *    nthreads:     number of threads to use in parallel section
+     *    mask:         optional mask of channels to exclude (size Nch)
+     *    out:          optional output array
      *
      *    Returns
      *    -------
      *    block_av:     block averaged output array
      *                  size = (Nspec , ceil(Nch/Nav)) (out)
      */
-    int i, j, k;  /* loop indices */
-    int Nspec, Nch;  /* number of items in input */
     int Nav;  /* number of items to average */
     unsigned int nthreads;  /* number of threads to use */
-    PyArrayObject *input = NULL, *outarr = NULL;
-    double *cin, *cout;
-    double buf;
-    npy_intp nout[2];
+    PyArrayObject *input = NULL;
+    PyObject *mask = NULL, *out = NULL;
+    int dtype;
 
     /* Python argument conversion code */
-    if (!PyArg_ParseTuple(args, "O!iI", &PyArray_Type,
-                          &input, &Nav, &nthreads)) {
+    if (!PyArg_ParseTuple(args, "O!iI|OO", &PyArray_Type,
+                          &input, &Nav, &nthreads, &mask, &out)) {
         return NULL;
     }
-    PYARRAY_CHECK(input, 2, NPY_DOUBLE, "input must be a 2D double array!");
-    Nspec = (int) PyArray_DIMS(input)[0];
-    Nch = (int) PyArray_DIMS(input)[1];
-    cin = (double *) PyArray_DATA(input);
-
-    /* create output ndarray */
-    nout[0] = Nspec;
-    nout[1] = ((int) ceil(Nch / (float) Nav));
-    outarr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_DOUBLE);
-    cout = (double *) PyArray_DATA(outarr);
-
-    #ifdef __OPENMP__
-    /* set openmp thread numbers dynamically */
-    OMPSETNUMTHREADS(nthreads);
-    #endif
-
-    /* c-code following is performing the block averaging */
-    #pragma omp parallel for default(shared) private(i, j, k, buf) \
-     schedule(static)
-    for (i = 0; i < Nspec; ++i) {
-        for (j = 0; j < Nch; j = j + Nav) {
-            buf = 0;
-            /* perform one block average
-               (j-i serves as counter -> last bin is therefore correct) */
-            for (k = j; k < j + Nav && k < Nch; ++k) {
-                buf += cin[i * Nch + k];
-            }
-            /* save average to output array */
-            cout[j / Nav + i * nout[1]] = buf / (float) (k - j);
-        }
-    }
-
-    /* clean up */
-    Py_DECREF(input);
-
-    /* return output array */
-    return PyArray_Return(outarr);
+    dtype = GRIDDER_DATA_TYPE(input);
+    PYARRAY_CHECK(input, 2, dtype, "input must be a 2D array!");
+
+    /* every spectrum is treated as frame with a single row */
+    return block_average_frames(input, dtype, mask, out, 2,
+                                (long) PyArray_DIMS(input)[0], 1,
+                                (int) PyArray_DIMS(input)[1], 1, Nav,
+                                nthreads);
 }
 
 PyObject* block_average_CCD(PyObject *self, PyObject *args) {
@@ -222,6 +309,8 @@ PyObject* block_average_CCD(PyObject *self, PyObject *args) {
      *    Nav1, 2:      number of channels to average in each dimension
      *                  in total a block of Nav1 x Nav2 is averaged
      *    nthreads:     number of threads to use in parallel section
+     *    mask:         optional mask of pixels to exclude (size of a frame)
+     *    out:          optional output array
      *
      *    Returns
      *    -------
@@ -230,57 +319,24 @@ PyObject* block_average_CCD(PyObject *self, PyObject *args) {
      *
      */
 
-    int i = 0, j = 0, k = 0, l = 0, n = 0;  /* loop indices */
-    int Nframes, Nch1, Nch2;  /* number of values in input array */
     int Nav1, Nav2;  /* number of items to average */
     unsigned int nthreads;  /* number of threads to use */
-    PyArrayObject *input = NULL, *outarr = NULL;
-    double *cin, *cout;
-    double buf;
-    npy_intp nout[3];
+    PyArrayObject *input = NULL;
+    PyObject *mask = NULL, *out = NULL;
+    int dtype;
 
     /* Python argument conversion code */
-    if (!PyArg_ParseTuple(args, "O!iiI", &PyArray_Type, &input, &Nav2,
-                          &Nav1, &nthreads)) {
+    if (!PyArg_ParseTuple(args, "O!iiI|OO", &PyArray_Type, &input, &Nav2,
+                          &Nav1, &nthreads, &mask, &out)) {
         return NULL;
     }
 
-    PYARRAY_CHECK(input, 3, NPY_DOUBLE, "input must be a 3D double array!");
-    Nframes = (int) PyArray_DIMS(input)[0];
-    Nch2 = (int) PyArray_DIMS(input)[1];
-    Nch1 = (int) PyArray_DIMS(input)[2];
-    cin = (double *) PyArray_DATA(input);
-
-    /* create output ndarray */
-    nout[0] = Nframes;
-    nout[1] = ((int) ceil(Nch2 / (float) Nav2));
-    nout[2] = ((int) ceil(Nch1 / (float) Nav1));
-    outarr = (PyArrayObject *) PyArray_SimpleNew(3, nout, NPY_DOUBLE);
-    cout = (double *) PyArray_DATA(outarr);
+    dtype = GRIDDER_DATA_TYPE(input);
+    PYARRAY_CHECK(input, 3, dtype, "input must be a 3D array!");
 
-    #ifdef __OPENMP__
-    /* set openmp thread numbers dynamically */
-    OMPSETNUMTHREADS(nthreads);
-    #endif
-
-    #pragma omp parallel for default(shared) \
-     private(i, j, k, l, n, buf) schedule(static)
-    for (n = 0; n < Nframes; n++) {
-        for (i = 0; i < Nch2; i = i + Nav2) {
-            for (j = 0; j < Nch1; j = j + Nav1) {
-                buf = 0.;
-                for (k = 0; k < Nav2 && (i + k) < Nch2; ++k) {
-                    for (l = 0; l < Nav1 && (j + l) < Nch1; ++l) {
-                        buf += cin[n* Nch1 * Nch2 + (i + k) * Nch1 + (j + l)];
-                    }
-                }
-                cout[n * nout[1] * nout[2] + (i / Nav2) * nout[1] + j / Nav1] = buf / (float)(k * l);
-            }
-        }
-    }
-
-    /* clean up */
-    Py_DECREF(input);
-
-    return PyArray_Return(outarr);
+    return block_average_frames(input, dtype, mask, out, 3,
+                                (long) PyArray_DIMS(input)[0],
+                                (int) PyArray_DIMS(input)[1],
+                                (int) PyArray_DIMS(input)[2], Nav2, Nav1,
+                                nthreads);
 }
@@ -38,15 +38,27 @@ extern PyObject* pyfuzzygridder1d(PyObject *self, PyObject *args);
 /* functions from gridder2d.c */
 extern PyObject* pygridder2d(PyObject *self, PyObject *args);
 extern PyObject* pyfuzzygridder2d(PyObject *self, PyObject *args);
+extern PyObject* pyslab_gridder2d(PyObject *self, PyObject *args);
 
 /* function from gridder3d.c */
 extern PyObject* pygridder3d(PyObject *self, PyObject *args);
 extern PyObject* pyfuzzygridder3d(PyObject *self, PyObject *args);
+extern PyObject* pysparse_gridder3d_blocks(PyObject *self, PyObject *args);
+extern PyObject* pysparse_gridder3d(PyObject *self, PyObject *args);
+extern PyObject* pypixelsplit_gridder3d(PyObject *self, PyObject *args);
 
 /* functions from qconversion.c */
+extern PyObject* py_ang2q_detector_linear(PyObject *self, PyObject *args);
+extern PyObject* py_ang2q_detector_area(PyObject *self, PyObject *args);
 extern PyObject* py_ang2q_conversion(PyObject *self, PyObject *args);
+extern PyObject* py_ang2q_conversion_jacobian(PyObject *self,
+                                             PyObject *args);
 extern PyObject* py_ang2q_conversion_linear(PyObject *self, PyObject *args);
 extern PyObject* py_ang2q_conversion_area(PyObject *self, PyObject *args);
+extern PyObject* py_ang2q_conversion_area_grid(PyObject *self,
+                                              PyObject *args);
+extern PyObject* py_ang2q_conversion_area_bounds(PyObject *self,
+                                                PyObject *args);
 extern PyObject* ang2q_conversion_area_pixel(PyObject *self, PyObject *args);
 extern PyObject* ang2q_conversion_area_pixel2(PyObject *self, PyObject *args);
 
@@ -56,6 +68,7 @@ extern PyObject* ang2q_detpos_area(PyObject *self, PyObject *args);
 
 /* functions from file_io.c */
 extern PyObject* cbfread(PyObject *self, PyObject *args);
+extern PyObject* specread(PyObject *self, PyObject *args);
 
 /* functions from hklcond.c */
 extern PyObject* testhklcond(PyObject *self, PyObject *args);
@@ -81,6 +94,9 @@ static PyMethodDef XRU_Methods[] = {
      "          Nch1 is the fast varying index\n"
      " Nav1, 2:  number of channels to average in each dimension\n"
      "          in total a block of Nav1 x Nav2 is averaged\n"
+     " nthreads: number of threads to use (0 uses all available)\n"
+     " mask:    optional boolean mask of excluded pixels (size of ccd)\n"
+     " out:     optional output array (float64 or float32)\n"
      "\n"
      "Returns\n"
      "-------\n"
@@ -95,6 +111,9 @@ static PyMethodDef XRU_Methods[] = {
      " psd:         input array of PSD values\n"
      "              size = (Nspec, Nch) (in)\n"
      " Nav:         number of channels to average\n"
+     " nthreads:    number of threads to use (0 uses all available)\n"
+     " mask:        optional boolean mask of excluded channels (size Nch)\n"
+     " out:         optional output array (float64 or float32)\n"
      "\n"
      "Returns\n"
      "-------\n"
@@ -110,6 +129,9 @@ static PyMethodDef XRU_Methods[] = {
      "          Nch1 is the fast varying index\n"
      " Nav1, 2:  number of channels to average in each dimension\n"
      "          in total a block of Nav1 x Nav2 is averaged\n"
+     " nthreads: number of threads to use (0 uses all available)\n"
+     " mask:    optional boolean mask of excluded pixels (size of a frame)\n"
+     " out:     optional output array (float64 or float32)\n"
      "\n"
      "Returns\n"
      "-------\n"
@@ -160,6 +182,32 @@ static PyMethodDef XRU_Methods[] = {
      "  norm ... normalization array\n"
      "  flags .. flags to specify behavior\n"
     },
+    {"slab_gridder2d", pyslab_gridder2d, METH_VARARGS,
+     "Function performs 2D gridding of the 3D input data inside a slab.\n"
+     "Points outside of the slab are discarded and the remaining ones are\n"
+     "binned using their coordinates in the plane of the slab. \n\n"
+     "Parameters\n"
+     "----------\n"
+     "  x ...... input x-values (1D numpy array - float64/float32)\n"
+     "  y ...... input y-values (1D numpy array - float64/float32)\n"
+     "  z ...... input z-values (1D numpy array - float64/float32)\n"
+     "  data ... input data (1D numpy array - float64/float32/uint16/\n"
+     "           int32/uint32)\n"
+     "  nx ..... number of grid points in x-direction\n"
+     "  ny ..... number of grid points in y-direction\n"
+     "  xmin ... minimum x-value of the grid\n"
+     "  xmax ... maximum x-value of the grid\n"
+     "  ymin ... minimum y-value of the grid\n"
+     "  ymax ... minimum y-value of the grid\n"
+     "  axes ... unit vectors of the in-plane x- and y-direction and the\n"
+     "           plane normal as rows (2D numpy array (3, 3) - float64)\n"
+     "  offset . distance of the slab center from the origin\n"
+     "  thick .. thickness of the slab\n"
+     "  out .... output data\n"
+     "  norm ... normalization array\n"
+     "  flags .. flags to specify behavior\n"
+     "  nthreads number of threads to use (0 uses all available)\n"
+    },
     {"fuzzygridder2d", pyfuzzygridder2d, METH_VARARGS,
      "Function performs 2D fuzzy gridding on 1D input data. \n\n"
      "Parameters\n"
@@ -224,6 +272,125 @@ static PyMethodDef XRU_Methods[] = {
      "  wz ..... fuzzy width of data points in z-direction\n"
      "  flags .. flags to specify behavior\n"
     },
+    {"sparse_gridder3d_blocks", pysparse_gridder3d_blocks, METH_VARARGS,
+     "Register the blocks of a sparse 3D grid touched by the data. \n\n"
+     "Parameters\n"
+     "----------\n"
+     "  x ...... input x-values (1D numpy array - float64/float32)\n"
+     "  y ...... input y-values (1D numpy array - float64/float32)\n"
+     "  z ...... input z-values (1D numpy array - float64/float32)\n"
+     "  data ... input data (1D numpy array - float64/float32/uint16/\n"
+     "           int32/uint32)\n"
+     "  nx ..... number of grid points in x-direction\n"
+     "  ny ..... number of grid points in y-direction\n"
+     "  nz ..... number of grid points in z-direction\n"
+     "  xmin ... minimum x-value of the grid\n"
+     "  xmax ... maximum x-value of the grid\n"
+     "  ymin ... minimum y-value of the grid\n"
+     "  ymax ... maximum y-value of the grid\n"
+     "  zmin ... minimum z-value of the grid\n"
+     "  zmax ... maximum z-value of the grid\n"
+     "  bs ..... edge length of the blocks\n"
+     "  table .. block table (3D numpy array - int64, modified in place)\n"
+     "  nblocks  number of blocks registered so far\n\n"
+     "Returns\n"
+     "-------\n"
+     "  number of registered blocks including the new ones\n"
+    },
+    {"sparse_gridder3d", pysparse_gridder3d, METH_VARARGS,
+     "Function performs 3D gridding on 1D input data into a block pool. \n\n"
+     "Parameters\n"
+     "----------\n"
+     "  x ...... input x-values (1D numpy array - float64/float32)\n"
+     "  y ...... input y-values (1D numpy array - float64/float32)\n"
+     "  z ...... input z-values (1D numpy array - float64/float32)\n"
+     "  data ... input data (1D numpy array - float64/float32/uint16/\n"
+     "           int32/uint32)\n"
+     "  nx ..... number of grid points in x-direction\n"
+     "  ny ..... number of grid points in y-direction\n"
+     "  nz ..... number of grid points in z-direction\n"
+     "  xmin ... minimum x-value of the grid\n"
+     "  xmax ... maximum x-value of the grid\n"
+     "  ymin ... minimum y-value of the grid\n"
+     "  ymax ... maximum y-value of the grid\n"
+     "  zmin ... minimum z-value of the grid\n"
+     "  zmax ... maximum z-value of the grid\n"
+     "  bs ..... edge length of the blocks\n"
+     "  table .. block table (3D numpy array - int64)\n"
+     "  bdata .. block pool of the data (2D numpy array - float64)\n"
+     "  bnorm .. block pool of the normalization (2D numpy array - float64)\n"
+     "  nthreads number of threads to use (0 uses all available)\n"
+    },
+    {"pixelsplit_gridder3d", pypixelsplit_gridder3d, METH_VARARGS,
+     "Function performs 3D gridding of detector pixels which are split\n"
+     "among the grid cells proportional to their area of overlap. \n\n"
+     "Parameters\n"
+     "----------\n"
+     "  x ...... x-values of the pixel corners (3D numpy array - float64)\n"
+     "  y ...... y-values of the pixel corners (3D numpy array - float64)\n"
+     "  z ...... z-values of the pixel corners (3D numpy array - float64)\n"
+     "           or None for a 2D grid\n"
+     "  data ... input data (3D numpy array - float64/float32/uint16/\n"
+     "           int32/uint32)\n"
+     "  nx ..... number of grid points in x-direction\n"
+     "  ny ..... number of grid points in y-direction\n"
+     "  nz ..... number of grid points in z-direction\n"
+     "  xmin ... minimum x-value of the grid\n"
+     "  xmax ... maximum x-value of the grid\n"
+     "  ymin ... minimum y-value of the grid\n"
+     "  ymax ... maximum y-value of the grid\n"
+     "  zmin ... minimum z-value of the grid\n"
+     "  zmax ... maximum z-value of the grid\n"
+     "  out .... output data\n"
+     "  norm ... normalization data\n"
+     "  flags .. flags for the gridder\n"
+     "  nthreads number of threads to use (0 uses all available)\n"
+    },
+    {"ang2q_detector_linear", py_ang2q_detector_linear, METH_VARARGS,
+     "position of the channels of a linear detector relative to the center\n"
+     "of rotation for zero detector angles. The result is used as input of\n"
+     "ang2q_conversion_linear.\n"
+     "\n"
+     "Parameters\n"
+     "----------\n"
+     " rcch ............ direction + distance of center channel (angles\n"
+     "                   zero)\n"
+     " cch ............. center channel of the detector\n"
+     " dpixel .......... width of one pixel, same unit as distance rcch\n"
+     " roi ............. region of interest of the detector\n"
+     " dir ............. direction of the detector, e.g.: 'x+'\n"
+     " tilt ............ tilt of the detector direction from dir\n"
+     "\n"
+     "Returns\n"
+     "-------\n"
+     " rpix ............ position of the channels (Nch, 3)\n"
+    },
+    {"ang2q_detector_area", py_ang2q_detector_area, METH_VARARGS,
+     "position of the pixels of an area detector relative to the center of\n"
+     "rotation for zero detector angles. The result is used as input of\n"
+     "ang2q_conversion_area and ang2q_conversion_area_grid.\n"
+     "\n"
+     "Parameters\n"
+     "----------\n"
+     "  rcch ............ direction + distance of center pixel (angles zero)\n"
+     "  cch1 ............ center channel of the detector\n"
+     "  cch2 ............ center channel of the detector\n"
+     "  dpixel1 ......... width of one pixel in first direction, same unit\n"
+     "                    as distance rcch\n"
+     "  dpixel2 ......... width of one pixel in second direction, same unit\n"
+     "                    as distance rcch\n"
+     "  roi ............. region of interest for the area detector\n"
+     "                    [dir1min, dir1max, dir2min, dir2max]\n"
+     "  dir1 ............ first direction of the detector, e.g.: 'x+'\n"
+     "  dir2 ............ second direction of the detector, e.g.: 'z+'\n"
+     "  tiltazimuth ..... azimuth of the tilt\n"
+     "  tilt ............ tilt of the detector plane (rotation around axis\n"
+     "                    normal to the direction given by the tiltazimuth\n"
+     "\n"
+     "Returns\n"
+     "-------\n"
+     " rpix ............ position of the pixels (Npix1, Npix2, 3)\n"
+    },
     {"ang2q_conversion", py_ang2q_conversion, METH_VARARGS,
      "conversion of Npoints of goniometer positions to reciprocal space\n"
      "for a setup with point detector\n"
@@ -252,6 +419,20 @@ static PyMethodDef XRU_Methods[] = {
      "-------\n"
      " qpos .......... momentum transfer (Npoints, 3)\n"
     },
+    {"ang2q_conversion_jacobian", py_ang2q_conversion_jacobian, METH_VARARGS,
+     "analytic derivatives of the momentum transfer of a setup with point\n"
+     "detector with respect to the sample and detector angles\n"
+     "\n"
+     "Parameters\n"
+     "----------\n"
+     "  same as for ang2q_conversion\n"
+     "\n"
+     "Returns\n"
+     "-------\n"
+     " jac ........... derivatives of the momentum transfer with respect to\n"
+     "                 the angles (per radian) and translations\n"
+     "                 (Npoints, Ns + Nd, 3)\n"
+    },
     {"ang2q_conversion_linear", py_ang2q_conversion_linear, METH_VARARGS,
      "conversion of Npoints of goniometer positions to reciprocal space\n"
      "for a linear detector with a given pixel size mounted along one of\n"
@@ -267,11 +448,8 @@ static PyMethodDef XRU_Methods[] = {
      " sampleAxis ...... string with sample axis directions\n"
      " detectorAxis .... string with detector axis directions\n"
      " kappadir ........ rotation axis of a possible kappa circle\n"
-     " cch ............. center channel of the detector\n"
-     " dpixel .......... width of one pixel, same unit as distance rcch\n"
-     " roi ............. region of interest of the detector\n"
-     " dir ............. direction of the detector, e.g.: 'x+'\n"
-     " tilt ............ tilt of the detector direction from dir\n"
+     " rpix ............ position of the detector channels for zero\n"
+     "                   detector angles (Nch, 3), see ang2q_detector_linear\n"
      " UB .............. orientation matrix and reciprocal space conversion\n"
      "                   of investigated crystal (9)\n"
      " sampledis ....... sample displacement vector in same unit as the\n"
@@ -301,19 +479,9 @@ static PyMethodDef XRU_Methods[] = {
      "  sampleAxis ...... string with sample axis directions\n"
      "  detectorAxis .... string with detector axis directions\n"
      "  kappadir ...... rotation axis of a possible kappa circle\n"
-     "  cch1 ............ center channel of the detector\n"
-     "  cch2 ............ center channel of the detector\n"
-     "  dpixel1 ......... width of one pixel in first direction, same unit\n"
-     "                    as distance rcch\n"
-     "  dpixel2 ......... width of one pixel in second direction, same unit\n"
-     "                    as distance rcch\n"
-     "  roi ............. region of interest for the area detector\n"
-     "                    [dir1min, dir1max, dir2min, dir2max]\n"
-     "  dir1 ............ first direction of the detector, e.g.: 'x+'\n"
-     "  dir2 ............ second direction of the detector, e.g.: 'z+'\n"
-     "  tiltazimuth ..... azimuth of the tilt\n"
-     "  tilt ............ tilt of the detector plane (rotation around axis\n"
-     "                    normal to the direction given by the tiltazimuth\n"
+     "  rpix ............ position of the detector pixels for zero\n"
+     "                    detector angles (Npix1, Npix2, 3), see\n"
+     "                    ang2q_detector_area\n"
      "  UB .............. orientation matrix and reciprocal space conversion\n"
      "                    of investigated crystal (3, 3)\n"
      "  sampledis ....... sample displacement vector in same unit as the\n"
@@ -322,12 +490,92 @@ static PyMethodDef XRU_Methods[] = {
      "  nthreads ........ number of threads to use in parallel section of\n"
      "                    the code\n"
      "  flags ........... integer flags to select sub-function\n"
+     "  qpos ............ optional output buffer for the momentum transfer\n"
+     "                    (Npoints * Npix1 * Npix2, 3)\n"
      "\n"
      "Returns\n"
      "-------\n"
      " qpos ............ momentum transfer (Npoints * Npix1 * Npix2, 3)\n"
      "\n"
     },
+    {"ang2q_conversion_area_grid", py_ang2q_conversion_area_grid,
+     METH_VARARGS,
+     "conversion of Npoints of goniometer positions to reciprocal space\n"
+     "for an area detector with direct binning of the intensities onto a\n"
+     "regular three-dimensional grid. The momentum transfer of the\n"
+     "individual pixels is never stored. The data and norm arrays are only\n"
+     "incremented, i.e. no initialization or normalization is performed.\n"
+     "\n"
+     "Parameters\n"
+     "----------\n"
+     "  sampleAngles .... angular positions of the sample goniometer\n"
+     "                    (Npoints, Ns)\n"
+     "  detectorAngles .. angular positions of the detector goniometer\n"
+     "                    (Npoints, Nd)\n"
+     "  rcch ............ direction + distance of center pixel (angles zero)\n"
+     "  sampleAxis ...... string with sample axis directions\n"
+     "  detectorAxis .... string with detector axis directions\n"
+     "  kappadir ...... rotation axis of a possible kappa circle\n"
+     "  rpix ............ position of the detector pixels for zero\n"
+     "                    detector angles (Npix1, Npix2, 3), see\n"
+     "                    ang2q_detector_area\n"
+     "  UB .............. orientation matrix and reciprocal space conversion\n"
+     "                    of investigated crystal (3, 3)\n"
+     "  sampledis ....... sample displacement vector in same unit as the\n"
+     "                    detector distance\n"
+     "  lambda .......... wavelength of the used x-rays \n"
+     "  data ............ detector intensities (Npoints * Npix1 * Npix2)\n"
+     "  nx, ny, nz ...... number of grid points in x, y, z-direction\n"
+     "  xmin, xmax ...... minimum and maximum x-value of the grid\n"
+     "  ymin, ymax ...... minimum and maximum y-value of the grid\n"
+     "  zmin, zmax ...... minimum and maximum z-value of the grid\n"
+     "  out ............. output data array (nx, ny, nz)\n"
+     "  norm ............ normalization array of the grid (nx, ny, nz)\n"
+     "  nthreads ........ number of threads to use in parallel section of\n"
+     "                    the code\n"
+     "  flags ........... integer flags to select sub-function\n"
+     "\n"
+     "Returns\n"
+     "-------\n"
+     " noutofbounds .... number of data points outside of the grid\n"
+     "\n"
+    },
+    {"ang2q_conversion_area_bounds", py_ang2q_conversion_area_bounds,
+     METH_VARARGS,
+     "minimum and maximum momentum transfer of all pixels of an area or\n"
+     "linear detector for Npoints goniometer positions. Only the pixels on\n"
+     "the detector boundary and around the interior extrema of the momentum\n"
+     "transfer components are converted.\n"
+     "\n"
+     "Parameters\n"
+     "----------\n"
+     "  sampleAngles .... angular positions of the sample goniometer\n"
+     "                    (Npoints, Ns)\n"
+     "  detectorAngles .. angular positions of the detector goniometer\n"
+     "                    (Npoints, Nd)\n"
+     "  rcch ............ direction + distance of center pixel (angles zero)\n"
+     "  sampleAxis ...... string with sample axis directions\n"
+     "  detectorAxis .... string with detector axis directions\n"
+     "  kappadir ...... rotation axis of a possible kappa circle\n"
+     "  rpix ............ position of the detector pixels for zero\n"
+     "                    detector angles (Npix1, Npix2, 3), see\n"
+     "                    ang2q_detector_area; use Npix2 = 1 for a linear\n"
+     "                    detector\n"
+     "  UB .............. orientation matrix and reciprocal space conversion\n"
+     "                    of investigated crystal (3, 3)\n"
+     "  sampledis ....... sample displacement vector in same unit as the\n"
+     "                    detector distance\n"
+     "  lambda .......... wavelength of the used x-rays \n"
+     "  nthreads ........ number of threads to use in parallel section of\n"
+     "                    the code\n"
+     "  flags ........... integer flags to select sub-function\n"
+     "\n"
+     "Returns\n"
+     "-------\n"
+     " bounds .......... minimum and maximum of the momentum transfer\n"
+     "                   components (3, 2)\n"
+     "\n"
+    },
     {"ang2q_conversion_area_pixel", ang2q_conversion_area_pixel, METH_VARARGS,
      "conversion of Npoints of detector positions to Q\n"
      "for an area detector with a given pixel size mounted along one of\n"
@@ -489,6 +737,22 @@ static PyMethodDef XRU_Methods[] = {
      " -------\n"
      "  the parsed data values as float ndarray\n"
     },
+    {"specread", specread, METH_VARARGS,
+     "parser for the data block of a SPEC scan\n\n"
+     " Parameters\n"
+     " ----------\n"
+     "  data:      data lines of the scan (bytes-like object)\n"
+     "  ncol:      number of scalar columns of each data point\n"
+     "  nchannels: number of MCA channels of each data point\n"
+     "  nmcalines: number of lines holding the MCA spectrum of one data\n"
+     "             point, 0 if no MCA data are stored\n\n"
+     " Returns\n"
+     " -------\n"
+     "  scalars:   parsed scalar data as float ndarray (npoints, ncol)\n"
+     "  mca:       parsed MCA spectra as uint32 ndarray\n"
+     "             (npoints, nchannels) or None\n\n"
+     " Raises ValueError if the data block is irregular\n"
+    },
     {"testhklcond", testhklcond, METH_VARARGS,
      "test if a Bragg peak is allowed according to reflection conditions\n\n"
      " Parameters\n"
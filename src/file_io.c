@@ -20,6 +20,7 @@
 #include "xrayutilities.h"
 
 #include <stdio.h>
+#include <string.h>
 
 PyObject* cbfread(PyObject *self, PyObject *args) {
     /* parser for cbf data arrays from Pilatus detector images
@@ -88,6 +89,7 @@ PyObject* cbfread(PyObject *self, PyObject *args) {
      *  and D. Kriegner */
     parser.uint8 = (const unsigned char*) cin + start;
 
+    Py_BEGIN_ALLOW_THREADS
     while (parsed < ((long) len - start)) {
         if (*parser.uint8 != 0x80) {
 	        diff = (int) *parser.int8;
@@ -119,7 +121,198 @@ PyObject* cbfread(PyObject *self, PyObject *args) {
             break;
         }
     }
+    Py_END_ALLOW_THREADS
 
     /* return output array */
     return PyArray_Return(outarr);
 }
+
+/* helper functions for the SPEC data block parser */
+#define SPEC_MAXTOKEN 64
+
+static int spec_isblank(char c) {
+    return c == ' ' || c == '\t' || c == '\r' || c == '\v' || c == '\f';
+}
+
+static const char* spec_skipblank(const char *p, const char *eol) {
+    while (p < eol && spec_isblank(*p)) {
+        p++;
+    }
+    return p;
+}
+
+static const char* spec_nextline(const char *p, const char *end) {
+    /* return the start of the next non-blank line or end */
+    const char *eol;
+    while (p < end) {
+        eol = memchr(p, '\n', end - p);
+        if (eol == NULL) {
+            eol = end;
+        }
+        if (spec_skipblank(p, eol) < eol) {
+            return p;
+        }
+        p = eol + 1;
+    }
+    return end;
+}
+
+static const char* spec_eol(const char *p, const char *end) {
+    const char *eol = memchr(p, '\n', end - p);
+    return eol == NULL ? end : eol;
+}
+
+PyObject* specread(PyObject *self, PyObject *args) {
+    /* parser for the data block of a SPEC scan
+     *
+     * Parameters
+     * ----------
+     *  data:       data lines of the scan (bytes-like object)
+     *  ncol:       number of scalar columns of each data point
+     *  nchannels:  number of MCA channels of each data point
+     *  nmcalines:  number of lines holding the MCA spectrum of one data
+     *              point, 0 if no MCA data are stored
+     *
+     * Returns
+     * -------
+     *  scalars:    parsed scalar data as float ndarray (npoints, ncol)
+     *  mca:        parsed MCA spectra as uint32 ndarray (npoints, nchannels)
+     *              or None if nmcalines is 0
+     */
+
+    int ncol, nchannels, nmcalines;
+    int i, k, l;
+    Py_buffer buf;
+    const char *cin, *p, *end, *eol, *next;
+    char token[SPEC_MAXTOKEN], *tend;
+    npy_intp nlines = 0, npoints, n, nout[2];
+    double *scalars;
+    npy_uint32 *mca = NULL;
+    unsigned long value;
+    PyArrayObject *sarr = NULL, *marr = NULL;
+
+    /* Python argument conversion code */
+    if (!PyArg_ParseTuple(args, "y*iii", &buf, &ncol, &nchannels,
+                          &nmcalines)) {
+        return NULL;
+    }
+    cin = (const char *) buf.buf;
+    end = cin + buf.len;
+
+    /* count the data lines to determine the number of data points;
+     * incomplete data points at the end are ignored */
+    p = spec_nextline(cin, end);
+    while (p < end) {
+        nlines++;
+        p = spec_nextline(spec_eol(p, end), end);
+    }
+    npoints = nlines / (1 + nmcalines);
+    if (npoints == 0 || ncol <= 0) {
+        PyBuffer_Release(&buf);
+        PyErr_SetString(PyExc_ValueError, "SPEC data block contains no data");
+        return NULL;
+    }
+
+    /* create output ndarrays */
+    nout[0] = npoints;
+    nout[1] = ncol;
+    sarr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_DOUBLE);
+    if (sarr == NULL) {
+        PyBuffer_Release(&buf);
+        return NULL;
+    }
+    scalars = (double *) PyArray_DATA(sarr);
+    if (nmcalines > 0) {
+        nout[1] = nchannels;
+        marr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_UINT32);
+        if (marr == NULL) {
+            Py_DECREF(sarr);
+            PyBuffer_Release(&buf);
+            return NULL;
+        }
+        mca = (npy_uint32 *) PyArray_DATA(marr);
+    }
+
+    p = spec_nextline(cin, end);
+    for (n = 0; n < npoints; ++n) {
+        /* scalar data line */
+        eol = spec_eol(p, end);
+        p = spec_skipblank(p, eol);
+        for (i = 0; i < ncol; ++i) {
+            if (p == eol) {
+                goto irregular;
+            }
+            /* the buffer is not necessarily null-terminated: copy the
+             * token before the conversion */
+            next = p;
+            while (next < eol && !spec_isblank(*next)) {
+                next++;
+            }
+            if (next - p >= SPEC_MAXTOKEN) {
+                goto irregular;
+            }
+            memcpy(token, p, next - p);
+            token[next - p] = '\0';
+            scalars[n * ncol + i] = PyOS_string_to_double(token, &tend, NULL);
+            if (tend != token + (next - p)) {
+                goto irregular;
+            }
+            p = spec_skipblank(next, eol);
+        }
+        if (p != eol) {
+            goto irregular;
+        }
+        p = spec_nextline(eol, end);
+
+        /* MCA spectrum */
+        k = 0;
+        for (l = 0; l < nmcalines; ++l) {
+            eol = spec_eol(p, end);
+            p = spec_skipblank(p, eol);
+            if (l == 0 && eol - p >= 2 && p[0] == '@' && p[1] == 'A') {
+                p = spec_skipblank(p + 2, eol);
+            }
+            while (p < eol && *p != '\\') {
+                if (k == nchannels || *p < '0' || *p > '9') {
+                    goto irregular;
+                }
+                value = 0;
+                while (p < eol && *p >= '0' && *p <= '9') {
+                    value = 10 * value + (*p++ - '0');
+                    if (value > 0xffffffffUL) {
+                        goto irregular;
+                    }
+                }
+                if (p < eol && !spec_isblank(*p) && *p != '\\') {
+                    goto irregular;
+                }
+                mca[n * nchannels + k++] = (npy_uint32) value;
+                p = spec_skipblank(p, eol);
+            }
+            /* line continuation mark has to be the last character */
+            if (p < eol && spec_skipblank(p + 1, eol) != eol) {
+                goto irregular;
+            }
+            p = spec_nextline(eol, end);
+        }
+        if (k != nchannels && nmcalines > 0) {
+            goto irregular;
+        }
+    }
+
+    PyBuffer_Release(&buf);
+    if (marr == NULL) {
+        Py_INCREF(Py_None);
+        return Py_BuildValue("(NN)", PyArray_Return(sarr), Py_None);
+    }
+    return Py_BuildValue("(NN)", PyArray_Return(sarr), PyArray_Return(marr));
+
+irregular:
+    PyErr_Clear();
+    PyErr_Format(PyExc_ValueError, "irregular SPEC data block in data "
+                 "point %ld", (long) n);
+    Py_DECREF(sarr);
+    Py_XDECREF(marr);
+    PyBuffer_Release(&buf);
+    return NULL;
+}
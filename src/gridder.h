@@ -33,10 +33,20 @@
 #include <stdio.h>
 #include <Python.h>
 
+#include "xrayutilities.h"
+
 /* define flags for the gridder functions */
 #define NO_DATA_INIT 1
 #define NO_NORMALIZATION 4
 #define VERBOSE 16
+/* output arrays in shared memory, updated by several processes */
+#define SHARED_OUTPUT 32
+
+/* determine the type in which an input array is passed to the gridder
+ * kernels: single precision arrays are used without conversion, all other
+ * types are converted to double */
+#define GRIDDER_INPUT_TYPE(array) \
+    (PyArray_TYPE(array) == NPY_FLOAT32 ? NPY_FLOAT32 : NPY_DOUBLE)
 
 /*!
 \brief python interface function
@@ -63,10 +73,12 @@ PyObject* pyfuzzygridder1d(PyObject *self, PyObject *args);
 \param norm normalization data
 \param fuzzywidth width of the data for the fuzzy assignment to bins
 \param flags control falgs
+\param nthreads number of threads to use (0 uses all available threads)
 */
 int fuzzygridder1d(double *x, double *data, unsigned int n,
               unsigned int nx, double xmin, double xmax,
-              double *odata, double *norm, double fuzzywidth, int flags);
+              double *odata, double *norm, double fuzzywidth, int flags,
+              unsigned int nthreads);
 
 /*!
 \brief python interface function
@@ -85,6 +97,9 @@ PyObject* pygridder1d(PyObject *self, PyObject *args);
 
 \param x input x-values
 \param data input data
+\param ctype numpy type of the x-values (NPY_DOUBLE or NPY_FLOAT32)
+\param dtype numpy type of the input data (NPY_DOUBLE, NPY_FLOAT32,
+       NPY_UINT16, NPY_INT32 or NPY_UINT32)
 \param n number of input points
 \param nx number of steps in x-direction
 \param xmin minimm along x-direction
@@ -92,10 +107,12 @@ PyObject* pygridder1d(PyObject *self, PyObject *args);
 \param odata output data
 \param norm normalization data
 \param flags control falgs
+\param nthreads number of threads to use (0 uses all available threads)
 */
-int gridder1d(double *x, double *data, unsigned int n,
+int gridder1d(void *x, void *data, int ctype, int dtype, unsigned int n,
               unsigned int nx, double xmin, double xmax,
-              double *odata, double *norm, int flags);
+              double *odata, double *norm, int flags,
+              unsigned int nthreads);
 
 /*!
 \brief python interface function
@@ -115,6 +132,9 @@ PyObject* pygridder2d(PyObject *self, PyObject *args);
 \param x input x-values
 \param y input y-values
 \param data input data
+\param ctype numpy type of the x/y-values (NPY_DOUBLE or NPY_FLOAT32)
+\param dtype numpy type of the input data (NPY_DOUBLE, NPY_FLOAT32,
+       NPY_UINT16, NPY_INT32 or NPY_UINT32)
 \param n number of input points
 \param nx number of steps in x-direction
 \param ny number of steps in y-direction
@@ -125,12 +145,64 @@ PyObject* pygridder2d(PyObject *self, PyObject *args);
 \param odata output data
 \param norm normalization data
 \param flags control falgs
+\param nthreads number of threads to use (0 uses all available threads)
 */
-int gridder2d(double *x, double *y, double *data, unsigned int n,
+int gridder2d(void *x, void *y, void *data, int ctype, int dtype,
+              unsigned int n,
               unsigned int nx, unsigned int ny,
               double xmin, double xmax,
               double ymin, double ymax,
-              double *odata, double *norm, int flags);
+              double *odata, double *norm, int flags,
+              unsigned int nthreads);
+
+/*!
+\brief python interface function
+
+Python interface function for slab_gridder2d. This function is virtually
+doing all the Python related stuff to run slab_gridder2d function.
+\param self reference to the module
+\param args function arguments
+\return return value of the function
+*/
+PyObject* pyslab_gridder2d(PyObject *self, PyObject *args);
+
+/*!
+\brief 2D gridder for a slab of 3D data
+
+Data points whose distance from the plane exceeds half the thickness of the
+slab are discarded. The remaining points are binned using their coordinates
+along the in-plane directions.
+
+\param x input x-values
+\param y input y-values
+\param z input z-values
+\param data input data
+\param ctype numpy type of the x/y/z-values (NPY_DOUBLE or NPY_FLOAT32)
+\param dtype numpy type of the input data (NPY_DOUBLE, NPY_FLOAT32,
+       NPY_UINT16, NPY_INT32 or NPY_UINT32)
+\param n number of input points
+\param nx number of steps in x-direction
+\param ny number of steps in y-direction
+\param xmin minimm along x-direction
+\param xmax maximum along x-direction
+\param ymin minimum along y-direction
+\param ymax maximum along y-direction
+\param axes unit vectors of the in-plane x- and y-direction and the plane
+       normal (3x3 matrix stored row by row)
+\param offset distance of the center of the slab from the origin along the
+       plane normal
+\param thickness thickness of the slab
+\param odata output data
+\param norm normalization data
+\param flags control falgs
+\param nthreads number of threads to use (0 uses all available threads)
+*/
+int slab_gridder2d(void *x, void *y, void *z, void *data, int ctype,
+                   int dtype, unsigned int n, unsigned int nx,
+                   unsigned int ny, double xmin, double xmax, double ymin,
+                   double ymax, double *axes, double offset, double thickness,
+                   double *odata, double *norm, int flags,
+                   unsigned int nthreads);
 
 /*!
 \brief python interface function
@@ -162,13 +234,15 @@ PyObject* pyfuzzygridder2d(PyObject *self, PyObject *args);
 \param wx fuzzy size of data along x-direction
 \param wy fuzzy size of data along y-direction
 \param flags control falgs
+\param nthreads number of threads to use (0 uses all available threads)
 */
 int fuzzygridder2d(double *x, double *y, double *data, unsigned int n,
                    unsigned int nx, unsigned int ny,
                    double xmin, double xmax,
                    double ymin, double ymax,
                    double *odata, double *norm,
-                   double wx, double wy, int flags);
+                   double wx, double wy, int flags,
+                   unsigned int nthreads);
 
 /*---------------------------------------------------------------------------*/
 /*!
@@ -208,12 +282,14 @@ Gridder code rebinning scatterd data onto a regular grid in 3 dimensions.
 \param wy fuzzy width parameter in y-direction
 \param wz fuzzy width parameter in z-direction
 \param flags gridder flags
+\param nthreads number of threads to use (0 uses all available threads)
 */
 int fuzzygridder3d(double *x, double *y, double *z, double *data,
                    unsigned int n, unsigned int nx, unsigned int ny,
                    unsigned int nz, double xmin, double xmax, double ymin,
                    double ymax, double zmin, double zmax, double *odata,
-                   double *norm, double wx, double wy, double wz, int flags);
+                   double *norm, double wx, double wy, double wz, int flags,
+                   unsigned int nthreads);
 
 /*---------------------------------------------------------------------------*/
 /*!
@@ -237,6 +313,9 @@ Gridder code rebinning scatterd data onto a regular grid in 3 dimensions.
 \param y pointer to y-coordinates of input data
 \param z pointer to z-coordinates of input data
 \param data pointer to input data
+\param ctype numpy type of the coordinates (NPY_DOUBLE or NPY_FLOAT32)
+\param dtype numpy type of the input data (NPY_DOUBLE, NPY_FLOAT32,
+       NPY_UINT16, NPY_INT32 or NPY_UINT32)
 \param n number of input points
 \param nx number of grid points along the x-direction
 \param ny number of grid points along the y-direction
@@ -250,9 +329,157 @@ Gridder code rebinning scatterd data onto a regular grid in 3 dimensions.
 \param odata pointer to grid data (output data)
 \param norm pointer to optional normalization from previous run
 \param flags gridder flags
+\param nthreads number of threads to use (0 uses all available threads)
 */
-int gridder3d(double *x, double *y, double *z, double *data, unsigned int n,
+int gridder3d(void *x, void *y, void *z, void *data, int ctype, int dtype,
+              unsigned int n,
               unsigned int nx, unsigned int ny, unsigned int nz,
               double xmin, double xmax, double ymin, double ymax,
               double zmin, double zmax,
-              double *odata, double *norm, int flags);
+              double *odata, double *norm, int flags,
+              unsigned int nthreads);
+
+/*---------------------------------------------------------------------------*/
+/*!
+\brief sparse 3D gridder python interface functions
+
+Python interface functions for sparse_gridder3d_blocks and sparse_gridder3d.
+\param self reference to the module
+\param args function arguments
+\return number of allocated blocks or return value of the gridder function
+*/
+PyObject* pysparse_gridder3d_blocks(PyObject *self, PyObject *args);
+PyObject* pysparse_gridder3d(PyObject *self, PyObject *args);
+
+/*---------------------------------------------------------------------------*/
+/*!
+\brief register the blocks of a sparse 3D grid touched by the data
+
+The grid is divided into cubic blocks of bs^3 bins which are stored in a
+block pool. The block table holds the index of every block in the pool or -1
+for blocks which were not touched yet. Blocks touched for the first time get
+the next free index of the pool.
+
+\param x pointer to x-coordinates of input data
+\param y pointer to y-coordinates of input data
+\param z pointer to z-coordinates of input data
+\param data pointer to input data
+\param ctype numpy type of the coordinates (NPY_DOUBLE or NPY_FLOAT32)
+\param dtype numpy type of the input data (NPY_DOUBLE, NPY_FLOAT32,
+       NPY_UINT16, NPY_INT32 or NPY_UINT32)
+\param n number of input points
+\param nx number of grid points along the x-direction
+\param ny number of grid points along the y-direction
+\param nz number of grid points along the z-direction
+\param xmin minimum value of x-axis on the grid
+\param xmax maximum value of x-axis on the grid
+\param ymin minimum value of y-axis on the grid
+\param ymax maximum value of y-axis on the grid
+\param zmin minimum value of z-axis on the grid
+\param zmax maximum value of z-axis on the grid
+\param bs edge length of the blocks
+\param btable block table (modified in place)
+\param nblocks number of blocks registered so far
+\return number of registered blocks including the new ones
+*/
+npy_int64 sparse_gridder3d_blocks(void *x, void *y, void *z, void *data,
+                                  int ctype, int dtype, unsigned int n,
+                                  unsigned int nx, unsigned int ny,
+                                  unsigned int nz, double xmin, double xmax,
+                                  double ymin, double ymax, double zmin,
+                                  double zmax, unsigned int bs,
+                                  npy_int64 *btable, npy_int64 nblocks);
+
+/*---------------------------------------------------------------------------*/
+/*!
+\brief sparse 3d gridder
+
+Gridder code rebinning scattered data onto a regular grid in 3 dimensions
+which is stored in blocks. The blocks touched by the data are registered by
+sparse_gridder3d_blocks before. Data points in blocks which are not registered
+in the block table are skipped. No normalization is performed.
+
+\param x pointer to x-coordinates of input data
+\param y pointer to y-coordinates of input data
+\param z pointer to z-coordinates of input data
+\param data pointer to input data
+\param ctype numpy type of the coordinates (NPY_DOUBLE or NPY_FLOAT32)
+\param dtype numpy type of the input data (NPY_DOUBLE, NPY_FLOAT32,
+       NPY_UINT16, NPY_INT32 or NPY_UINT32)
+\param n number of input points
+\param nx number of grid points along the x-direction
+\param ny number of grid points along the y-direction
+\param nz number of grid points along the z-direction
+\param xmin minimum value of x-axis on the grid
+\param xmax maximum value of x-axis on the grid
+\param ymin minimum value of y-axis on the grid
+\param ymax maximum value of y-axis on the grid
+\param zmin minimum value of z-axis on the grid
+\param zmax maximum value of z-axis on the grid
+\param bs edge length of the blocks
+\param btable block table
+\param bdata block pool of the grid data
+\param bnorm block pool of the normalization data
+\param nthreads number of threads to use (0 uses all available threads)
+*/
+int sparse_gridder3d(void *x, void *y, void *z, void *data,
+                     int ctype, int dtype, unsigned int n,
+                     unsigned int nx, unsigned int ny, unsigned int nz,
+                     double xmin, double xmax, double ymin, double ymax,
+                     double zmin, double zmax, unsigned int bs,
+                     npy_int64 *btable, double *bdata, double *bnorm,
+                     unsigned int nthreads);
+
+/*---------------------------------------------------------------------------*/
+/*!
+\brief python interface function
+
+Python interface function for pixelsplit_gridder3d. This function is virtually
+doing all the Python related stuff to run pixelsplit_gridder3d function.
+\param self reference to the module
+\param args function arguments
+\return return value of the function
+*/
+PyObject* pypixelsplit_gridder3d(PyObject *self, PyObject *args);
+
+/*!
+\brief pixel splitting 3d gridder
+
+Gridder code rebinning the pixels of area detector frames onto a regular grid
+in 3 dimensions. Each pixel is described by its four corners. The
+quadrilateral footprint of the pixel is split into two triangles which are
+clipped at the faces of the grid cells. The intensity of the pixel is
+distributed among the cells proportional to the area of overlap. Pixels with
+a degenerated footprint are assigned to the cell of their center.
+
+\param x pointer to x-coordinates of the pixel corners (nf, n1+1, n2+1)
+\param y pointer to y-coordinates of the pixel corners (nf, n1+1, n2+1)
+\param z pointer to z-coordinates of the pixel corners (nf, n1+1, n2+1) or
+       NULL for a grid with nz = 1
+\param data pointer to input data (nf, n1, n2)
+\param dtype numpy type of the input data (NPY_DOUBLE, NPY_FLOAT32,
+       NPY_UINT16, NPY_INT32 or NPY_UINT32)
+\param nf number of frames
+\param n1 number of pixels along the first detector direction
+\param n2 number of pixels along the second detector direction
+\param nx number of grid points along the x-direction
+\param ny number of grid points along the y-direction
+\param nz number of grid points along the z-direction
+\param xmin minimum value of x-axis on the grid
+\param xmax maximum value of x-axis on the grid
+\param ymin minimum value of y-axis on the grid
+\param ymax maximum value of y-axis on the grid
+\param zmin minimum value of z-axis on the grid
+\param zmax maximum value of z-axis on the grid
+\param odata pointer to grid data (output data)
+\param norm pointer to normalization data
+\param flags control flags
+\param nthreads number of threads to use (0 uses all available threads)
+*/
+int pixelsplit_gridder3d(double *x, double *y, double *z, void *data,
+                         int dtype, unsigned int nf, unsigned int n1,
+                         unsigned int n2, unsigned int nx, unsigned int ny,
+                         unsigned int nz, double xmin, double xmax,
+                         double ymin, double ymax, double zmin, double zmax,
+                         double *odata, double *norm, int flags,
+                         unsigned int nthreads);
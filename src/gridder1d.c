@@ -33,16 +33,17 @@ PyObject* pyfuzzygridder1d(PyObject *self, PyObject *args)
     double *x = NULL, *data = NULL, *odata = NULL, *norm = NULL;
     double xmin, xmax, fuzzywidth;
     unsigned int nx;
-    int flags;
+    int flags = 0;
+    unsigned int nthreads = 1;  /* number of threads to use */
     int n, result;
 
-    if (!PyArg_ParseTuple(args, "O!O!IddO!|O!di",
+    if (!PyArg_ParseTuple(args, "O!O!IddO!|O!diI",
                          &PyArray_Type, &py_x,
                          &PyArray_Type, &py_data,
                          &nx, &xmin, &xmax,
                          &PyArray_Type, &py_output,
                          &PyArray_Type, &py_norm,
-                         &fuzzywidth, &flags))
+                         &fuzzywidth, &flags, &nthreads))
         return NULL;
 
     /* have to check input variables */
@@ -67,8 +68,10 @@ PyObject* pyfuzzygridder1d(PyObject *self, PyObject *args)
     n = (int) PyArray_SIZE(py_x);
 
     /* call the actual gridder routine */
+    Py_BEGIN_ALLOW_THREADS
     result = fuzzygridder1d(x, data, n, nx, xmin, xmax, odata,
-                            norm, fuzzywidth, flags);
+                            norm, fuzzywidth, flags, nthreads);
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(py_x);
@@ -85,7 +88,8 @@ PyObject* pyfuzzygridder1d(PyObject *self, PyObject *args)
 int fuzzygridder1d(double *x, double *data, unsigned int n,
                    unsigned int nx,
                    double xmin, double xmax,
-                   double *odata, double *norm, double fuzzywidth, int flags)
+                   double *odata, double *norm, double fuzzywidth, int flags,
+                   unsigned int nthreads)
 {
     double *gnorm;
     unsigned int offset1, offset2;
@@ -94,7 +98,12 @@ int fuzzygridder1d(double *x, double *data, unsigned int n,
     double dx = delta(xmin, xmax, nx);
     double fraction, dwidth; /* fuzzy fraction and data width */
 
-    unsigned int i, j; /* loop indices */
+    long i; /* loop index */
+    unsigned int j; /* bin index */
+    unsigned int ntot = nx;  /* total number of points on the grid */
+    double *buffers;  /* per-thread accumulation buffers */
+    double *todata, *tnorm;  /* accumulation arrays of the current thread */
+    int nth, atomic;  /* number of threads and update strategy */
 
     /* initialize data if requested */
     if (!(flags & NO_DATA_INIT)) set_array(odata, nx, 0.);
@@ -118,48 +127,67 @@ int fuzzygridder1d(double *x, double *data, unsigned int n,
         gnorm = norm;
     }
 
+    /* select the parallelization strategy: per-thread buffers or atomic
+     * updates of the shared grid. A grid in shared memory might be updated
+     * by other processes at the same time and is always updated atomically */
+    nth = gridder_nthreads(nthreads, n);
+    if (flags & SHARED_OUTPUT) {
+        buffers = NULL;
+    }
+    else {
+        buffers = gridder_alloc_buffers(nth, n, ntot);
+    }
+    atomic = (nth > 1 && buffers == NULL) || (flags & SHARED_OUTPUT);
+
     /* the master loop over all data points */
     dwidth = fuzzywidth / dx;
     if (flags & VERBOSE) {
         fprintf(stdout, "XU.FuzzyGridder1D(c): fuzzyness: %f %f\n",
                 fuzzywidth, dwidth);
     }
-    for (i = 0; i < n; i++) {
-        /* if data point is nan ignore it */
-        if (!isnan(data[i])) {
-            /* if the x value is outside the grid boundaries continue with
-             * the next point */
-            if ((x[i] < (xmin - fuzzywidth/2.)) || (x[i] > xmax + fuzzywidth/2.)) {
-                noutofbounds++;
-                continue;
-            }
-            /* compute the linear offset and distribute the data to the bins */
-            if ((x[i] - fuzzywidth / 2.) <= xmin) {
-                offset1 = 0;
-            }
-            else {
-                offset1 = gindex(x[i] - fuzzywidth / 2., xmin, dx);
-            }
-            offset2 = gindex(x[i] + fuzzywidth / 2., xmin, dx);
-            offset2 = offset2 < nx ? offset2 : nx - 1;
-            for(j = offset1; j <= offset2; j++) {
-                if (offset1 == offset2) {
-                    fraction = 1.;
+    #pragma omp parallel num_threads(nth) default(shared) \
+                         private(j, offset1, offset2, fraction, todata, tnorm)
+    {
+        gridder_thread_buffers(buffers, ntot, odata, gnorm, &todata, &tnorm);
+        #pragma omp for schedule(static) reduction(+:noutofbounds)
+        for (i = 0; i < (long) n; i++) {
+            /* if data point is nan ignore it */
+            if (!isnan(data[i])) {
+                /* if the x value is outside the grid boundaries continue with
+                 * the next point */
+                if ((x[i] < (xmin - fuzzywidth/2.)) || (x[i] > xmax + fuzzywidth/2.)) {
+                    noutofbounds++;
+                    continue;
                 }
-                else if (j == offset1) {
-                    fraction = (j + 1 - (x[i] - fuzzywidth / 2. - xmin + dx / 2.) / dx) / dwidth;
-                }
-                else if (j == offset2) {
-                    fraction = ((x[i] + fuzzywidth / 2. - xmin + dx / 2.) / dx - j) / dwidth;
+                /* compute the linear offset and distribute the data to the bins */
+                if ((x[i] - fuzzywidth / 2.) <= xmin) {
+                    offset1 = 0;
                 }
                 else {
-                    fraction = 1 / dwidth;
+                    offset1 = gindex(x[i] - fuzzywidth / 2., xmin, dx);
+                }
+                offset2 = gindex(x[i] + fuzzywidth / 2., xmin, dx);
+                offset2 = offset2 < nx ? offset2 : nx - 1;
+                for(j = offset1; j <= offset2; j++) {
+                    if (offset1 == offset2) {
+                        fraction = 1.;
+                    }
+                    else if (j == offset1) {
+                        fraction = (j + 1 - (x[i] - fuzzywidth / 2. - xmin + dx / 2.) / dx) / dwidth;
+                    }
+                    else if (j == offset2) {
+                        fraction = ((x[i] + fuzzywidth / 2. - xmin + dx / 2.) / dx - j) / dwidth;
+                    }
+                    else {
+                        fraction = 1 / dwidth;
+                    }
+                    GRIDDER_ADD(todata[j], data[i]*fraction);
+                    GRIDDER_ADD(tnorm[j], fraction);
                 }
-                odata[j] += data[i]*fraction;
-                gnorm[j] += fraction;
             }
         }
     }
+    gridder_merge_buffers(buffers, nth, ntot, odata, gnorm);
 
     /* perform normalization */
     if (!(flags & NO_NORMALIZATION)) {
@@ -167,7 +195,7 @@ int fuzzygridder1d(double *x, double *data, unsigned int n,
             fprintf(stdout, "XU.FuzzyGridder1D(c): perform normalization\n");
         }
 
-        for (i = 0; i < nx; i++) {
+        for (i = 0; i < (long) nx; i++) {
             if (gnorm[i] > 1.e-16) {
                 odata[i] = odata[i] / gnorm[i];
             }
@@ -198,25 +226,32 @@ PyObject* pygridder1d(PyObject *self, PyObject *args)
     PyArrayObject *py_x = NULL, *py_data = NULL,
                   *py_output = NULL, *py_norm = NULL;
 
-    double *x = NULL, *data = NULL, *odata = NULL, *norm = NULL;
+    void *x = NULL, *data = NULL;
+    double *odata = NULL, *norm = NULL;
     double xmin, xmax;
     unsigned int nx;
-    int flags;
+    int ctype, dtype;  /* numpy types of coordinates and data */
+    int flags = 0;
+    unsigned int nthreads = 1;  /* number of threads to use */
     int n, result;
 
-    if (!PyArg_ParseTuple(args, "O!O!IddO!|O!i",
+    if (!PyArg_ParseTuple(args, "O!O!IddO!|O!iI",
                          &PyArray_Type, &py_x,
                          &PyArray_Type, &py_data,
                          &nx, &xmin, &xmax,
                          &PyArray_Type, &py_output,
                          &PyArray_Type, &py_norm,
-                         &flags))
+                         &flags, &nthreads))
         return NULL;
 
+    ctype = GRIDDER_INPUT_TYPE(py_x);
+    dtype = GRIDDER_DATA_TYPE(py_data);
+
     /* have to check input variables */
-    PYARRAY_CHECK(py_x, 1, NPY_DOUBLE, "x-axis must be a 1D double array!");
-    PYARRAY_CHECK(py_data, 1, NPY_DOUBLE,
-                  "input data must be a 1D double array!");
+    PYARRAY_CHECK(py_x, 1, ctype,
+                  "x-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_data, 1, dtype,
+                  "input data must be a 1D array!");
     PYARRAY_CHECK(py_output, 1, NPY_DOUBLE,
                   "ouput data must be a 1D double array!");
     if (py_norm != NULL)
@@ -224,8 +259,8 @@ PyObject* pygridder1d(PyObject *self, PyObject *args)
                       "norm data must be a 1D double array!");
 
     /* get data */
-    x = (double *) PyArray_DATA(py_x);
-    data = (double *) PyArray_DATA(py_data);
+    x = PyArray_DATA(py_x);
+    data = PyArray_DATA(py_data);
     odata = (double *) PyArray_DATA(py_output);
     if (py_norm != NULL) {
         norm = (double *) PyArray_DATA(py_norm);
@@ -235,7 +270,10 @@ PyObject* pygridder1d(PyObject *self, PyObject *args)
     n = (int) PyArray_SIZE(py_x);
 
     /* call the actual gridder routine */
-    result = gridder1d(x, data, n, nx, xmin, xmax, odata, norm, flags);
+    Py_BEGIN_ALLOW_THREADS
+    result = gridder1d(x, data, ctype, dtype, n, nx, xmin, xmax, odata, norm,
+                       flags, nthreads);
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(py_x);
@@ -249,18 +287,48 @@ PyObject* pygridder1d(PyObject *self, PyObject *args)
 }
 
 /*---------------------------------------------------------------------------*/
-int gridder1d(double *x, double *data, unsigned int n,
+/* master loop of the 1D gridder over all data points. The loop is defined as
+ * macro to expand it for all supported types of the input arrays. It needs
+ * to be used inside a parallel region and accumulates into the arrays
+ * todata and tnorm of the current thread. */
+#define GRIDDER1D_LOOP(CTYPE, DTYPE) \
+    { \
+        CTYPE *cx = (CTYPE *) x; \
+        DTYPE *cdata = (DTYPE *) data; \
+        OMP_PRAGMA(omp for schedule(static) reduction(+:noutofbounds)) \
+        for (i = 0; i < (long) n; i++) { \
+            /* if data point is nan ignore it */ \
+            if (isnan((double) cdata[i])) { \
+                continue; \
+            } \
+            /* if the x value is outside the grid boundaries continue with \
+             * the next point */ \
+            if ((cx[i] < xmin) || (cx[i] > xmax)) { \
+                noutofbounds++; \
+                continue; \
+            } \
+            /* compute the linear offset and set the data */ \
+            offset = gindex(cx[i], xmin, dx); \
+            GRIDDER_ADD(todata[offset], cdata[i]); \
+            GRIDDER_ADD(tnorm[offset], 1.); \
+        } \
+    }
+
+int gridder1d(void *x, void *data, int ctype, int dtype, unsigned int n,
               unsigned int nx,
               double xmin, double xmax,
-              double *odata, double *norm, int flags)
+              double *odata, double *norm, int flags,
+              unsigned int nthreads)
 {
     double *gnorm;
-    unsigned int offset;
     unsigned int noutofbounds = 0;  /* counter for out of bounds points */
 
     double dx = delta(xmin, xmax, nx);
 
-    unsigned int i; /* loop index */
+    long i;  /* loop index */
+    unsigned int ntot = nx;  /* total number of points on the grid */
+    double *buffers;  /* per-thread accumulation buffers */
+    int nth, atomic;  /* number of threads and update strategy */
 
     /* initialize data if requested */
     if (!(flags & NO_DATA_INIT)) set_array(odata, nx, 0.);
@@ -284,23 +352,33 @@ int gridder1d(double *x, double *data, unsigned int n,
         gnorm = norm;
     }
 
-    /* the master loop over all data points */
-    for (i = 0; i < n; i++) {
-        /* if data point is nan ignore it */
-        if (!isnan(data[i])) {
-            /* if the x value is outside the grid boundaries continue with
-             * the next point */
-            if ((x[i] < xmin) || (x[i] > xmax)) {
-                noutofbounds++;
-                continue;
-            }
-            /* compute the linear offset and set the data */
-            offset = gindex(x[i], xmin, dx);
+    /* select the parallelization strategy: per-thread buffers or atomic
+     * updates of the shared grid. A grid in shared memory might be updated
+     * by other processes at the same time and is always updated atomically */
+    nth = gridder_nthreads(nthreads, n);
+    if (flags & SHARED_OUTPUT) {
+        buffers = NULL;
+    }
+    else {
+        buffers = gridder_alloc_buffers(nth, n, ntot);
+    }
+    atomic = (nth > 1 && buffers == NULL) || (flags & SHARED_OUTPUT);
 
-            odata[offset] += data[i];
-            gnorm[offset] += 1.;
+    /* the master loop over all data points */
+    #pragma omp parallel num_threads(nth) default(shared)
+    {
+        unsigned int offset;  /* linear offset for the grid data */
+        double *todata, *tnorm;  /* accumulation arrays of this thread */
+
+        gridder_thread_buffers(buffers, ntot, odata, gnorm, &todata, &tnorm);
+        if (ctype == NPY_FLOAT32) {
+            GRIDDER_DATA_DISPATCH(GRIDDER1D_LOOP, float, dtype)
+        }
+        else {
+            GRIDDER_DATA_DISPATCH(GRIDDER1D_LOOP, double, dtype)
         }
     }
+    gridder_merge_buffers(buffers, nth, ntot, odata, gnorm);
 
     /* perform normalization */
     if (!(flags & NO_NORMALIZATION)) {
@@ -308,7 +386,7 @@ int gridder1d(double *x, double *data, unsigned int n,
             fprintf(stdout, "XU.Gridder1D(c): perform normalization ...\n");
         }
 
-        for (i = 0; i < nx; i++) {
+        for (i = 0; i < (long) nx; i++) {
             if (gnorm[i] > 1.e-16) {
                 odata[i] = odata[i] / gnorm[i];
             }
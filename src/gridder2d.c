@@ -35,17 +35,18 @@ PyObject* pyfuzzygridder2d(PyObject *self, PyObject *args)
     double *x = NULL, *y = NULL, *data = NULL, *odata = NULL, *norm = NULL;
     double xmin, xmax, ymin, ymax, wx, wy;
     unsigned int nx, ny;
-    int flags;
+    int flags = 0;
+    unsigned int nthreads = 1;  /* number of threads to use */
     int n, result;
 
-    if (!PyArg_ParseTuple(args, "O!O!O!IIddddO!|O!ddi",
+    if (!PyArg_ParseTuple(args, "O!O!O!IIddddO!|O!ddiI",
                           &PyArray_Type, &py_x,
                           &PyArray_Type, &py_y,
                           &PyArray_Type, &py_data,
                           &nx, &ny, &xmin, &xmax, &ymin, &ymax,
                           &PyArray_Type, &py_output,
                           &PyArray_Type, &py_norm,
-                          &wx, &wy, &flags)) {
+                          &wx, &wy, &flags, &nthreads)) {
         return NULL;
     }
 
@@ -74,8 +75,10 @@ PyObject* pyfuzzygridder2d(PyObject *self, PyObject *args)
     n = (int) PyArray_SIZE(py_x);
 
     /* call the actual gridder routine */
+    Py_BEGIN_ALLOW_THREADS
     result = fuzzygridder2d(x, y, data, n, nx, ny, xmin, xmax, ymin, ymax, odata,
-                            norm, wx, wy, flags);
+                            norm, wx, wy, flags, nthreads);
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(py_x);
@@ -94,7 +97,8 @@ int fuzzygridder2d(double *x, double *y, double *data, unsigned int n,
                    unsigned int nx, unsigned int ny,
                    double xmin, double xmax, double ymin, double ymax,
                    double *odata, double *norm, double wx, double wy,
-                   int flags)
+                   int flags,
+                   unsigned int nthreads)
 {
     double *gnorm;
     unsigned int offset, offsetx1, offsetx2, offsety1, offsety2;
@@ -105,7 +109,11 @@ int fuzzygridder2d(double *x, double *y, double *data, unsigned int n,
     double dx = delta(xmin, xmax, nx);
     double dy = delta(ymin, ymax, ny);
 
-    unsigned int i, j, k;  /* loop indices */
+    long i;  /* loop index */
+    unsigned int j, k;  /* bin indices */
+    double *buffers;  /* per-thread accumulation buffers */
+    double *todata, *tnorm;  /* accumulation arrays of the current thread */
+    int nth, atomic;  /* number of threads and update strategy */
 
     /* initialize data if requested */
     if (!(flags & NO_DATA_INIT)) {
@@ -138,73 +146,93 @@ int fuzzygridder2d(double *x, double *y, double *data, unsigned int n,
         fprintf(stdout, "XU.FuzzyGridder2D(c): fuzzyness: %f %f %f %f\n",
                 wx, wy, dwx, dwy);
     }
-    /* the master loop over all data points */
-    for (i = 0; i < n; i++) {
-        /* if data point is nan ignore it */
-        if (!isnan(data[i])) {
-            /* if the x and y values are outside the grids boundaries
-             * continue with the next point */
-            if ((x[i] < xmin) || (x[i] > xmax)) {
-                noutofbounds++;
-                continue;
-            }
-            if ((y[i] < ymin) || (y[i] > ymax)) {
-                noutofbounds++;
-                continue;
-            }
-            /* compute the linear offset and distribute the data to the bins */
-            if ((x[i] - wx / 2.) <= xmin) {
-                offsetx1 = 0;
-            }
-            else {
-                offsetx1 = gindex(x[i] - wx / 2., xmin, dx);
-            }
-            offsetx2 = gindex(x[i] + wx / 2., xmin, dx);
-            offsetx2 = offsetx2 < nx ? offsetx2 : nx - 1;
-            if ((y[i] - wy / 2.) <= ymin) {
-                offsety1 = 0;
-            }
-            else {
-                offsety1 = gindex(y[i] - wy / 2., ymin, dy);
-            }
-            offsety2 = gindex(y[i] + wy / 2., ymin, dy);
-            offsety2 = offsety2 < ny ? offsety2 : ny - 1;
+    /* select the parallelization strategy: per-thread buffers or atomic
+     * updates of the shared grid. A grid in shared memory might be updated
+     * by other processes at the same time and is always updated atomically */
+    nth = gridder_nthreads(nthreads, n);
+    if (flags & SHARED_OUTPUT) {
+        buffers = NULL;
+    }
+    else {
+        buffers = gridder_alloc_buffers(nth, n, ntot);
+    }
+    atomic = (nth > 1 && buffers == NULL) || (flags & SHARED_OUTPUT);
 
-            for(j = offsetx1; j <= offsetx2; j++) {
-                if (offsetx1 == offsetx2) {
-                    fractionx = 1.;
+    /* the master loop over all data points */
+    #pragma omp parallel num_threads(nth) default(shared) \
+                         private(j, k, offset, offsetx1, offsetx2, offsety1, offsety2, fractionx, \
+                                 fractiony, todata, tnorm)
+    {
+        gridder_thread_buffers(buffers, ntot, odata, gnorm, &todata, &tnorm);
+        #pragma omp for schedule(static) reduction(+:noutofbounds)
+        for (i = 0; i < (long) n; i++) {
+            /* if data point is nan ignore it */
+            if (!isnan(data[i])) {
+                /* if the x and y values are outside the grids boundaries
+                 * continue with the next point */
+                if ((x[i] < xmin) || (x[i] > xmax)) {
+                    noutofbounds++;
+                    continue;
                 }
-                else if (j == offsetx1) {
-                    fractionx = (j + 1 - (x[i] - wx / 2. - xmin + dx / 2.) / dx) / dwx;
+                if ((y[i] < ymin) || (y[i] > ymax)) {
+                    noutofbounds++;
+                    continue;
                 }
-                else if (j == offsetx2) {
-                    fractionx = ((x[i] + wx / 2. - xmin + dx / 2.) / dx - j) / dwx;
+                /* compute the linear offset and distribute the data to the bins */
+                if ((x[i] - wx / 2.) <= xmin) {
+                    offsetx1 = 0;
                 }
                 else {
-                    fractionx = 1 / dwx;
+                    offsetx1 = gindex(x[i] - wx / 2., xmin, dx);
+                }
+                offsetx2 = gindex(x[i] + wx / 2., xmin, dx);
+                offsetx2 = offsetx2 < nx ? offsetx2 : nx - 1;
+                if ((y[i] - wy / 2.) <= ymin) {
+                    offsety1 = 0;
                 }
+                else {
+                    offsety1 = gindex(y[i] - wy / 2., ymin, dy);
+                }
+                offsety2 = gindex(y[i] + wy / 2., ymin, dy);
+                offsety2 = offsety2 < ny ? offsety2 : ny - 1;
 
-                for(k = offsety1; k <= offsety2; k++) {
-                    if (offsety1 == offsety2) {
-                        fractiony = 1.;
+                for(j = offsetx1; j <= offsetx2; j++) {
+                    if (offsetx1 == offsetx2) {
+                        fractionx = 1.;
                     }
-                    else if (k == offsety1) {
-                        fractiony = (k + 1 - (y[i] - wy / 2. - ymin + dy / 2.) / dy) / dwy;
+                    else if (j == offsetx1) {
+                        fractionx = (j + 1 - (x[i] - wx / 2. - xmin + dx / 2.) / dx) / dwx;
                     }
-                    else if (k == offsety2) {
-                        fractiony = ((y[i] + wy / 2. - ymin + dy / 2.) / dy - k) / dwy;
+                    else if (j == offsetx2) {
+                        fractionx = ((x[i] + wx / 2. - xmin + dx / 2.) / dx - j) / dwx;
                     }
                     else {
-                        fractiony = 1 / dwy;
+                        fractionx = 1 / dwx;
                     }
 
-                    offset = j * ny + k;
-                    odata[offset] += data[i]*fractionx*fractiony;
-                    gnorm[offset] += fractionx*fractiony;
+                    for(k = offsety1; k <= offsety2; k++) {
+                        if (offsety1 == offsety2) {
+                            fractiony = 1.;
+                        }
+                        else if (k == offsety1) {
+                            fractiony = (k + 1 - (y[i] - wy / 2. - ymin + dy / 2.) / dy) / dwy;
+                        }
+                        else if (k == offsety2) {
+                            fractiony = ((y[i] + wy / 2. - ymin + dy / 2.) / dy - k) / dwy;
+                        }
+                        else {
+                            fractiony = 1 / dwy;
+                        }
+
+                        offset = j * ny + k;
+                        GRIDDER_ADD(todata[offset], data[i]*fractionx*fractiony);
+                        GRIDDER_ADD(tnorm[offset], fractionx*fractiony);
+                    }
                 }
             }
         }
     }
+    gridder_merge_buffers(buffers, nth, ntot, odata, gnorm);
 
     /* perform normalization */
     if (!(flags & NO_NORMALIZATION)) {
@@ -241,28 +269,44 @@ PyObject* pygridder2d(PyObject *self, PyObject *args)
     PyArrayObject *py_x = NULL, *py_y = NULL, *py_data = NULL,
                   *py_output = NULL, *py_norm = NULL;
 
-    double *x = NULL, *y = NULL, *data = NULL, *odata = NULL, *norm = NULL;
+    void *x = NULL, *y = NULL, *data = NULL;
+    double *odata = NULL, *norm = NULL;
     double xmin, xmax, ymin, ymax;
     unsigned int nx, ny;
-    int flags;
+    int ctype, dtype;  /* numpy types of coordinates and data */
+    int flags = 0;
+    unsigned int nthreads = 1;  /* number of threads to use */
     int n, result;
 
-    if (!PyArg_ParseTuple(args, "O!O!O!IIddddO!|O!i",
+    if (!PyArg_ParseTuple(args, "O!O!O!IIddddO!|O!iI",
                           &PyArray_Type, &py_x,
                           &PyArray_Type, &py_y,
                           &PyArray_Type, &py_data,
                           &nx, &ny, &xmin, &xmax, &ymin, &ymax,
                           &PyArray_Type, &py_output,
                           &PyArray_Type, &py_norm,
-                          &flags)) {
+                          &flags, &nthreads)) {
         return NULL;
     }
 
+    /* single precision coordinates are only used if all of them are
+     * given as float arrays */
+    if (GRIDDER_INPUT_TYPE(py_x) == NPY_FLOAT32 &&
+        GRIDDER_INPUT_TYPE(py_y) == NPY_FLOAT32) {
+        ctype = NPY_FLOAT32;
+    }
+    else {
+        ctype = NPY_DOUBLE;
+    }
+    dtype = GRIDDER_DATA_TYPE(py_data);
+
     /* have to check input variables */
-    PYARRAY_CHECK(py_x, 1, NPY_DOUBLE, "x-axis must be a 1D double array!");
-    PYARRAY_CHECK(py_y, 1, NPY_DOUBLE, "y-axis must be a 1D double array!");
-    PYARRAY_CHECK(py_data, 1, NPY_DOUBLE,
-                  "input data must be a 1D double array!");
+    PYARRAY_CHECK(py_x, 1, ctype,
+                  "x-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_y, 1, ctype,
+                  "y-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_data, 1, dtype,
+                  "input data must be a 1D array!");
     PYARRAY_CHECK(py_output, 2, NPY_DOUBLE,
                   "ouput data must be a 2D double array!");
     if (py_norm != NULL) {
@@ -271,9 +315,9 @@ PyObject* pygridder2d(PyObject *self, PyObject *args)
     }
 
     /* get data */
-    x = (double *) PyArray_DATA(py_x);
-    y = (double *) PyArray_DATA(py_y);
-    data = (double *) PyArray_DATA(py_data);
+    x = PyArray_DATA(py_x);
+    y = PyArray_DATA(py_y);
+    data = PyArray_DATA(py_data);
     odata = (double *) PyArray_DATA(py_output);
     if (py_norm != NULL) {
         norm = (double *) PyArray_DATA(py_norm);
@@ -283,8 +327,10 @@ PyObject* pygridder2d(PyObject *self, PyObject *args)
     n = (int) PyArray_SIZE(py_x);
 
     /* call the actual gridder routine */
-    result = gridder2d(x, y, data, n, nx, ny, xmin, xmax, ymin, ymax, odata,
-                       norm, flags);
+    Py_BEGIN_ALLOW_THREADS
+    result = gridder2d(x, y, data, ctype, dtype, n, nx, ny, xmin, xmax, ymin,
+                       ymax, odata, norm, flags, nthreads);
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(py_x);
@@ -299,20 +345,51 @@ PyObject* pygridder2d(PyObject *self, PyObject *args)
 }
 
 /*--------------------------------------------------------------------------*/
-int gridder2d(double *x, double *y, double *data, unsigned int n,
+/* master loop of the 2D gridder over all data points. The loop is defined as
+ * macro to expand it for all supported types of the input arrays. It needs
+ * to be used inside a parallel region and accumulates into the arrays
+ * todata and tnorm of the current thread. */
+#define GRIDDER2D_LOOP(CTYPE, DTYPE) \
+    { \
+        CTYPE *cx = (CTYPE *) x, *cy = (CTYPE *) y; \
+        DTYPE *cdata = (DTYPE *) data; \
+        OMP_PRAGMA(omp for schedule(static) reduction(+:noutofbounds)) \
+        for (i = 0; i < (long) n; i++) { \
+            /* if data point is nan ignore it */ \
+            if (isnan((double) cdata[i])) { \
+                continue; \
+            } \
+            /* if the x and y values are outside the grids boundaries \
+             * continue with the next point */ \
+            if ((cx[i] < xmin) || (cx[i] > xmax) || \
+                (cy[i] < ymin) || (cy[i] > ymax)) { \
+                noutofbounds++; \
+                continue; \
+            } \
+            /* compute the linear offset and set the data */ \
+            offset = gindex(cx[i], xmin, dx) * ny + gindex(cy[i], ymin, dy); \
+            GRIDDER_ADD(todata[offset], cdata[i]); \
+            GRIDDER_ADD(tnorm[offset], 1.); \
+        } \
+    }
+
+int gridder2d(void *x, void *y, void *data, int ctype, int dtype,
+              unsigned int n,
               unsigned int nx, unsigned int ny,
               double xmin, double xmax, double ymin, double ymax,
-              double *odata, double *norm, int flags)
+              double *odata, double *norm, int flags,
+              unsigned int nthreads)
 {
     double *gnorm;
-    unsigned int offset;
     unsigned int ntot = nx * ny;  /* total number of points on the grid */
     unsigned int noutofbounds = 0;  /* number of points out of bounds */
 
     double dx = delta(xmin, xmax, nx);
     double dy = delta(ymin, ymax, ny);
 
-    unsigned int i;  /* loop index */
+    long i;  /* loop index */
+    double *buffers;  /* per-thread accumulation buffers */
+    int nth, atomic;  /* number of threads and update strategy */
 
     /* initialize data if requested */
     if (!(flags & NO_DATA_INIT)) {
@@ -338,34 +415,40 @@ int gridder2d(double *x, double *y, double *data, unsigned int n,
         gnorm = norm;
     }
 
-    /* the master loop over all data points */
-    for (i = 0; i < n; i++) {
-        /* if data point is nan ignore it */
-        if (!isnan(data[i])) {
-            /* if the x and y values are outside the grids boundaries
-             * continue with the next point */
-            if ((x[i] < xmin) || (x[i] > xmax)) {
-                noutofbounds++;
-                continue;
-            }
-            if ((y[i] < ymin) || (y[i] > ymax)) {
-                noutofbounds++;
-                continue;
-            }
-            /* compute the linear offset and set the data */
-            offset = gindex(x[i], xmin, dx) * ny + gindex(y[i], ymin, dy);
+    /* select the parallelization strategy: per-thread buffers or atomic
+     * updates of the shared grid. A grid in shared memory might be updated
+     * by other processes at the same time and is always updated atomically */
+    nth = gridder_nthreads(nthreads, n);
+    if (flags & SHARED_OUTPUT) {
+        buffers = NULL;
+    }
+    else {
+        buffers = gridder_alloc_buffers(nth, n, ntot);
+    }
+    atomic = (nth > 1 && buffers == NULL) || (flags & SHARED_OUTPUT);
 
-            odata[offset] += data[i];
-            gnorm[offset] += 1.;
+    /* the master loop over all data points */
+    #pragma omp parallel num_threads(nth) default(shared)
+    {
+        unsigned int offset;  /* linear offset for the grid data */
+        double *todata, *tnorm;  /* accumulation arrays of this thread */
+
+        gridder_thread_buffers(buffers, ntot, odata, gnorm, &todata, &tnorm);
+        if (ctype == NPY_FLOAT32) {
+            GRIDDER_DATA_DISPATCH(GRIDDER2D_LOOP, float, dtype)
+        }
+        else {
+            GRIDDER_DATA_DISPATCH(GRIDDER2D_LOOP, double, dtype)
         }
     }
+    gridder_merge_buffers(buffers, nth, ntot, odata, gnorm);
 
     /* perform normalization */
     if (!(flags & NO_NORMALIZATION)) {
         if (flags & VERBOSE)
             fprintf(stdout, "XU.Gridder2D(c): perform normalization ...\n");
 
-        for (i = 0; i < nx * ny; i++) {
+        for (i = 0; i < (long) ntot; i++) {
             if (gnorm[i] > 1.e-16) {
                 odata[i] = odata[i] / gnorm[i];
             }
@@ -388,3 +471,200 @@ int gridder2d(double *x, double *y, double *data, unsigned int n,
     return 0;
 }
 
+
+/*---------------------------------------------------------------------------*/
+PyObject* pyslab_gridder2d(PyObject *self, PyObject *args)
+{
+    PyArrayObject *py_x = NULL, *py_y = NULL, *py_z = NULL, *py_data = NULL,
+                  *py_axes = NULL, *py_output = NULL, *py_norm = NULL;
+
+    double xmin, xmax, ymin, ymax, offset, thickness;
+    unsigned int nx, ny;
+    int ctype, dtype;  /* numpy types of coordinates and data */
+    int flags = 0;
+    unsigned int nthreads = 1;  /* number of threads to use */
+    int result;
+
+    if (!PyArg_ParseTuple(args, "O!O!O!O!IIddddO!ddO!O!iI",
+                          &PyArray_Type, &py_x,
+                          &PyArray_Type, &py_y,
+                          &PyArray_Type, &py_z,
+                          &PyArray_Type, &py_data,
+                          &nx, &ny, &xmin, &xmax, &ymin, &ymax,
+                          &PyArray_Type, &py_axes, &offset, &thickness,
+                          &PyArray_Type, &py_output,
+                          &PyArray_Type, &py_norm,
+                          &flags, &nthreads)) {
+        return NULL;
+    }
+
+    /* single precision coordinates are only used if all of them are
+     * given as float arrays */
+    if (GRIDDER_INPUT_TYPE(py_x) == NPY_FLOAT32 &&
+        GRIDDER_INPUT_TYPE(py_y) == NPY_FLOAT32 &&
+        GRIDDER_INPUT_TYPE(py_z) == NPY_FLOAT32) {
+        ctype = NPY_FLOAT32;
+    }
+    else {
+        ctype = NPY_DOUBLE;
+    }
+    dtype = GRIDDER_DATA_TYPE(py_data);
+
+    /* have to check input variables */
+    PYARRAY_CHECK(py_x, 1, ctype,
+                  "x-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_y, 1, ctype,
+                  "y-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_z, 1, ctype,
+                  "z-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_data, 1, dtype,
+                  "input data must be a 1D array!");
+    PYARRAY_CHECK(py_axes, 2, NPY_DOUBLE,
+                  "axes must be a 2D double array!");
+    PYARRAY_CHECK(py_output, 2, NPY_DOUBLE,
+                  "ouput data must be a 2D double array!");
+    PYARRAY_CHECK(py_norm, 2, NPY_DOUBLE,
+                  "norm data must be a 2D double array!");
+    if (PyArray_SIZE(py_axes) != 9) {
+        PyErr_SetString(PyExc_ValueError, "axes must be of shape (3, 3)!");
+        return NULL;
+    }
+
+    /* call the actual gridder routine */
+    Py_BEGIN_ALLOW_THREADS
+    result = slab_gridder2d(PyArray_DATA(py_x), PyArray_DATA(py_y),
+                            PyArray_DATA(py_z), PyArray_DATA(py_data),
+                            ctype, dtype, (unsigned int) PyArray_SIZE(py_x),
+                            nx, ny, xmin, xmax, ymin, ymax,
+                            (double *) PyArray_DATA(py_axes), offset,
+                            thickness, (double *) PyArray_DATA(py_output),
+                            (double *) PyArray_DATA(py_norm), flags,
+                            nthreads);
+    Py_END_ALLOW_THREADS
+
+    /* clean up */
+    Py_DECREF(py_x);
+    Py_DECREF(py_y);
+    Py_DECREF(py_z);
+    Py_DECREF(py_data);
+    Py_DECREF(py_axes);
+    Py_DECREF(py_output);
+    Py_DECREF(py_norm);
+
+    return Py_BuildValue("i", result);
+}
+
+/*--------------------------------------------------------------------------*/
+/* master loop of the slab gridder over all data points. Points outside of
+ * the slab are discarded before the in-plane coordinates are binned. */
+#define SLAB_GRIDDER2D_LOOP(CTYPE, DTYPE) \
+    { \
+        CTYPE *cx = (CTYPE *) x, *cy = (CTYPE *) y, *cz = (CTYPE *) z; \
+        DTYPE *cdata = (DTYPE *) data; \
+        OMP_PRAGMA(omp for schedule(static) \
+                   reduction(+:noutofbounds, ninslab)) \
+        for (i = 0; i < (long) n; i++) { \
+            double u, v; \
+            /* if data point is nan ignore it */ \
+            if (isnan((double) cdata[i])) { \
+                continue; \
+            } \
+            /* distance from the plane */ \
+            u = cx[i] * axes[6] + cy[i] * axes[7] + cz[i] * axes[8] - \
+                offset; \
+            if (!(fabs(u) <= hthick)) { \
+                continue; \
+            } \
+            ninslab++; \
+            /* coordinates in the plane */ \
+            u = cx[i] * axes[0] + cy[i] * axes[1] + cz[i] * axes[2]; \
+            v = cx[i] * axes[3] + cy[i] * axes[4] + cz[i] * axes[5]; \
+            if ((u < xmin) || (u > xmax) || (v < ymin) || (v > ymax)) { \
+                noutofbounds++; \
+                continue; \
+            } \
+            /* compute the linear offset and set the data */ \
+            goffset = gindex(u, xmin, dx) * ny + gindex(v, ymin, dy); \
+            GRIDDER_ADD(todata[goffset], cdata[i]); \
+            GRIDDER_ADD(tnorm[goffset], 1.); \
+        } \
+    }
+
+int slab_gridder2d(void *x, void *y, void *z, void *data, int ctype,
+                   int dtype, unsigned int n, unsigned int nx,
+                   unsigned int ny, double xmin, double xmax, double ymin,
+                   double ymax, double *axes, double offset, double thickness,
+                   double *odata, double *norm, int flags,
+                   unsigned int nthreads)
+{
+    unsigned int ntot = nx * ny;  /* total number of points on the grid */
+    unsigned int noutofbounds = 0;  /* number of points out of bounds */
+    unsigned int ninslab = 0;  /* number of points inside the slab */
+    double hthick = thickness / 2.;  /* half thickness of the slab */
+
+    double dx = delta(xmin, xmax, nx);
+    double dy = delta(ymin, ymax, ny);
+
+    long i;  /* loop index */
+    double *buffers;  /* per-thread accumulation buffers */
+    int nth, atomic;  /* number of threads and update strategy */
+
+    /* initialize data if requested */
+    if (!(flags & NO_DATA_INIT)) {
+        set_array(odata, ntot, 0.);
+        set_array(norm, ntot, 0.);
+    }
+
+    nth = gridder_nthreads(nthreads, n);
+    if (flags & SHARED_OUTPUT) {
+        buffers = NULL;
+    }
+    else {
+        buffers = gridder_alloc_buffers(nth, n, ntot);
+    }
+    atomic = (nth > 1 && buffers == NULL) || (flags & SHARED_OUTPUT);
+
+    /* the master loop over all data points */
+    #pragma omp parallel num_threads(nth) default(shared)
+    {
+        unsigned int goffset;  /* linear offset for the grid data */
+        double *todata, *tnorm;  /* accumulation arrays of this thread */
+
+        gridder_thread_buffers(buffers, ntot, odata, norm, &todata, &tnorm);
+        if (ctype == NPY_FLOAT32) {
+            GRIDDER_DATA_DISPATCH(SLAB_GRIDDER2D_LOOP, float, dtype)
+        }
+        else {
+            GRIDDER_DATA_DISPATCH(SLAB_GRIDDER2D_LOOP, double, dtype)
+        }
+    }
+    gridder_merge_buffers(buffers, nth, ntot, odata, norm);
+
+    /* perform normalization */
+    if (!(flags & NO_NORMALIZATION)) {
+        if (flags & VERBOSE)
+            fprintf(stdout, "XU.SlabGridder2D(c): perform normalization "
+                            "...\n");
+
+        for (i = 0; i < (long) ntot; i++) {
+            if (norm[i] > 1.e-16) {
+                odata[i] = odata[i] / norm[i];
+            }
+        }
+    }
+
+    if (flags & VERBOSE) {
+        fprintf(stdout, "XU.SlabGridder2D(c): %u of %u points inside the "
+                        "slab\n", ninslab, n);
+    }
+
+    /* warn the user in case more than half the data points in the slab were
+     * out of the gridding area */
+    if (noutofbounds > ninslab / 2) {
+        fprintf(stdout, "XU.SlabGridder2D(c): more than half of the "
+                        "datapoints in the slab out of the data range, "
+                        "consider regridding with extended range!\n");
+    }
+
+    return 0;
+}
@@ -35,10 +35,11 @@ PyObject* pyfuzzygridder3d(PyObject *self, PyObject *args)
            *norm = NULL;
     double xmin, xmax, ymin, ymax, zmin, zmax, wx, wy, wz;
     unsigned int nx, ny, nz;
-    int flags;
+    int flags = 0;
+    unsigned int nthreads = 1;  /* number of threads to use */
     int n, result;
 
-    if (!PyArg_ParseTuple(args, "O!O!O!O!IIIddddddO!|O!dddi",
+    if (!PyArg_ParseTuple(args, "O!O!O!O!IIIddddddO!|O!dddiI",
                          &PyArray_Type, &py_x,
                          &PyArray_Type, &py_y,
                          &PyArray_Type, &py_z,
@@ -47,7 +48,7 @@ PyObject* pyfuzzygridder3d(PyObject *self, PyObject *args)
                          &xmin, &xmax, &ymin, &ymax, &zmin, &zmax,
                          &PyArray_Type, &py_output,
                          &PyArray_Type, &py_norm,
-                         &wx, &wy, &wz, &flags)) {
+                         &wx, &wy, &wz, &flags, &nthreads)) {
         return NULL;
     }
 
@@ -78,9 +79,11 @@ PyObject* pyfuzzygridder3d(PyObject *self, PyObject *args)
     n = (int) PyArray_SIZE(py_x);
 
     /* call the actual gridder routine */
+    Py_BEGIN_ALLOW_THREADS
     result = fuzzygridder3d(x, y, z, data, n, nx, ny, nz,
                             xmin, xmax, ymin, ymax, zmin, zmax, odata, norm,
-                            wx, wy, wz, flags);
+                            wx, wy, wz, flags, nthreads);
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(py_x);
@@ -101,12 +104,17 @@ int fuzzygridder3d(double *x, double *y, double *z, double *data,
                    unsigned int nz, double xmin, double xmax, double ymin,
                    double ymax, double zmin, double zmax,
                    double *odata, double *norm,
-                   double wx, double wy, double wz, int flags)
+                   double wx, double wy, double wz, int flags,
+                   unsigned int nthreads)
 {
     double *gnorm;                     /* pointer to normalization data */
     unsigned int offset, offsetx1, offsetx2, offsety1, offsety2, offsetz1, offsetz2;
     unsigned int ntot = nx * ny * nz;  /* total number of points on the grid */
-    unsigned int i, j, k, l;          /* loop indeces variables */
+    long i;                            /* loop index */
+    unsigned int j, k, l;              /* bin indices */
+    double *buffers;  /* per-thread accumulation buffers */
+    double *todata, *tnorm;  /* accumulation arrays of the current thread */
+    int nth, atomic;  /* number of threads and update strategy */
     unsigned int noutofbounds = 0;     /* number of points out of bounds */
 
     double fractionx, fractiony, fractionz, dwx, dwy, dwz;  /* variables for
@@ -144,104 +152,125 @@ int fuzzygridder3d(double *x, double *y, double *z, double *data,
         fprintf(stdout, "XU.FuzzyGridder3D(c): fuzzyness: %f %f %f %f %f %f\n",
                 wx, wy, wz, dwx, dwy, dwz);
     }
-    /* the master loop over all data points */
-    for (i = 0; i < n; i++) {
-        if (!isnan(data[i])) {
-            /* check if the current point is within the bounds of the grid */
-            if ((x[i] < xmin) || (x[i] > xmax)) {
-                noutofbounds++;
-                continue;
-            }
-            if ((y[i] < ymin) || (y[i] > ymax)) {
-                noutofbounds++;
-                continue;
-            }
-            if ((z[i] < zmin) || (z[i] > zmax)) {
-                noutofbounds++;
-                continue;
-            }
+    /* select the parallelization strategy: per-thread buffers or atomic
+     * updates of the shared grid. A grid in shared memory might be updated
+     * by other processes at the same time and is always updated atomically */
+    nth = gridder_nthreads(nthreads, n);
+    if (flags & SHARED_OUTPUT) {
+        buffers = NULL;
+    }
+    else {
+        buffers = gridder_alloc_buffers(nth, n, ntot);
+    }
+    atomic = (nth > 1 && buffers == NULL) || (flags & SHARED_OUTPUT);
 
-            /* compute the offset value of the current input point on the
-             * grid array */
-            /* compute the linear offset and distribute the data to the bins */
-            if ((x[i] - wx / 2.) <= xmin) {
-                offsetx1 = 0;
-            }
-            else {
-                offsetx1 = gindex(x[i] - wx / 2., xmin, dx);
-            }
-            offsetx2 = gindex(x[i] + wx / 2., xmin, dx);
-            offsetx2 = offsetx2 < nx ? offsetx2 : nx - 1;
-            if ((y[i] - wy / 2.) <= ymin) {
-                offsety1 = 0;
-            }
-            else {
-                offsety1 = gindex(y[i] - wy / 2., ymin, dy);
-            }
-            offsety2 = gindex(y[i] + wy / 2., ymin, dy);
-            offsety2 = offsety2 < ny ? offsety2 : ny - 1;
-            if ((z[i] - wz / 2.) <= zmin) {
-                offsetz1 = 0;
-            }
-            else {
-                offsetz1 = gindex(z[i] - wz / 2., zmin, dz);
-            }
-            offsetz2 = gindex(z[i] + wz / 2., zmin, dz);
-            offsetz2 = offsetz2 < nz ? offsetz2 : nz - 1;
+    /* the master loop over all data points */
+    #pragma omp parallel num_threads(nth) default(shared) \
+                         private(j, k, l, offset, offsetx1, offsetx2, offsety1, offsety2, \
+                                 offsetz1, offsetz2, fractionx, fractiony, \
+                                 fractionz, todata, tnorm)
+    {
+        gridder_thread_buffers(buffers, ntot, odata, gnorm, &todata, &tnorm);
+        #pragma omp for schedule(static) reduction(+:noutofbounds)
+        for (i = 0; i < (long) n; i++) {
+            if (!isnan(data[i])) {
+                /* check if the current point is within the bounds of the grid */
+                if ((x[i] < xmin) || (x[i] > xmax)) {
+                    noutofbounds++;
+                    continue;
+                }
+                if ((y[i] < ymin) || (y[i] > ymax)) {
+                    noutofbounds++;
+                    continue;
+                }
+                if ((z[i] < zmin) || (z[i] > zmax)) {
+                    noutofbounds++;
+                    continue;
+                }
 
-            for(j = offsetx1; j <= offsetx2; j++) {
-                if (offsetx1 == offsetx2) {
-                    fractionx = 1.;
+                /* compute the offset value of the current input point on the
+                 * grid array */
+                /* compute the linear offset and distribute the data to the bins */
+                if ((x[i] - wx / 2.) <= xmin) {
+                    offsetx1 = 0;
+                }
+                else {
+                    offsetx1 = gindex(x[i] - wx / 2., xmin, dx);
+                }
+                offsetx2 = gindex(x[i] + wx / 2., xmin, dx);
+                offsetx2 = offsetx2 < nx ? offsetx2 : nx - 1;
+                if ((y[i] - wy / 2.) <= ymin) {
+                    offsety1 = 0;
                 }
-                else if (j == offsetx1) {
-                    fractionx = (j + 1 - (x[i] - wx / 2. - xmin + dx / 2.) / dx) / dwx;
+                else {
+                    offsety1 = gindex(y[i] - wy / 2., ymin, dy);
                 }
-                else if (j == offsetx2) {
-                    fractionx = ((x[i] + wx / 2. - xmin + dx / 2.) / dx - j) / dwx;
+                offsety2 = gindex(y[i] + wy / 2., ymin, dy);
+                offsety2 = offsety2 < ny ? offsety2 : ny - 1;
+                if ((z[i] - wz / 2.) <= zmin) {
+                    offsetz1 = 0;
                 }
                 else {
-                    fractionx = 1 / dwx;
+                    offsetz1 = gindex(z[i] - wz / 2., zmin, dz);
                 }
+                offsetz2 = gindex(z[i] + wz / 2., zmin, dz);
+                offsetz2 = offsetz2 < nz ? offsetz2 : nz - 1;
 
-                for(k = offsety1; k <= offsety2; k++) {
-                    if (offsety1 == offsety2) {
-                        fractiony = 1.;
+                for(j = offsetx1; j <= offsetx2; j++) {
+                    if (offsetx1 == offsetx2) {
+                        fractionx = 1.;
                     }
-                    else if (k == offsety1) {
-                        fractiony = (k + 1 - (y[i] - wy / 2. - ymin + dy / 2.) / dy) / dwy;
+                    else if (j == offsetx1) {
+                        fractionx = (j + 1 - (x[i] - wx / 2. - xmin + dx / 2.) / dx) / dwx;
                     }
-                    else if (k == offsety2) {
-                        fractiony = ((y[i] + wy / 2. - ymin + dy / 2.) / dy - k) / dwy;
+                    else if (j == offsetx2) {
+                        fractionx = ((x[i] + wx / 2. - xmin + dx / 2.) / dx - j) / dwx;
                     }
                     else {
-                        fractiony = 1 / dwy;
+                        fractionx = 1 / dwx;
                     }
-                    for(l = offsetz1; l <= offsetz2; l++) {
-                        if (offsetz1 == offsetz2) {
-                            fractionz = 1.;
+
+                    for(k = offsety1; k <= offsety2; k++) {
+                        if (offsety1 == offsety2) {
+                            fractiony = 1.;
                         }
-                        else if (l == offsetz1) {
-                            fractionz = (l + 1 - (z[i] - wz / 2. - zmin + dz / 2.) / dz) / dwz;
+                        else if (k == offsety1) {
+                            fractiony = (k + 1 - (y[i] - wy / 2. - ymin + dy / 2.) / dy) / dwy;
                         }
-                        else if (l == offsetz2) {
-                            fractionz = ((z[i] + wz / 2. - zmin + dz / 2.) / dz - l) / dwz;
+                        else if (k == offsety2) {
+                            fractiony = ((y[i] + wy / 2. - ymin + dy / 2.) / dy - k) / dwy;
                         }
                         else {
-                            fractionz = 1 / dwz;
+                            fractiony = 1 / dwy;
                         }
+                        for(l = offsetz1; l <= offsetz2; l++) {
+                            if (offsetz1 == offsetz2) {
+                                fractionz = 1.;
+                            }
+                            else if (l == offsetz1) {
+                                fractionz = (l + 1 - (z[i] - wz / 2. - zmin + dz / 2.) / dz) / dwz;
+                            }
+                            else if (l == offsetz2) {
+                                fractionz = ((z[i] + wz / 2. - zmin + dz / 2.) / dz - l) / dwz;
+                            }
+                            else {
+                                fractionz = 1 / dwz;
+                            }
 
-                        offset = j * ny * nz + k * nz + l;
-                        odata[offset] += data[i]*fractionx*fractiony*fractionz;
-                        gnorm[offset] += fractionx*fractiony*fractionz;
+                            offset = j * ny * nz + k * nz + l;
+                            GRIDDER_ADD(todata[offset], data[i]*fractionx*fractiony*fractionz);
+                            GRIDDER_ADD(tnorm[offset], fractionx*fractiony*fractionz);
+                        }
                     }
                 }
             }
         }
     }
+    gridder_merge_buffers(buffers, nth, ntot, odata, gnorm);
 
     /* perform normalization */
     if (!(flags & NO_NORMALIZATION)) {
-        for (i = 0; i < ntot; i++) {
+        for (i = 0; i < (long) ntot; i++) {
             if (gnorm[i] > 1.e-16) {
                 odata[i] = odata[i] / gnorm[i];
             }
@@ -271,14 +300,16 @@ PyObject* pygridder3d(PyObject *self, PyObject *args)
     PyArrayObject *py_x = NULL, *py_y = NULL, *py_z = NULL, *py_data = NULL,
                   *py_output = NULL, *py_norm = NULL;
 
-    double *x = NULL, *y = NULL, *z = NULL, *data = NULL, *odata = NULL,
-           *norm = NULL;
+    void *x = NULL, *y = NULL, *z = NULL, *data = NULL;
+    double *odata = NULL, *norm = NULL;
     double xmin, xmax, ymin, ymax, zmin, zmax;
     unsigned int nx, ny, nz;
-    int flags;
+    int ctype, dtype;  /* numpy types of coordinates and data */
+    int flags = 0;
+    unsigned int nthreads = 1;  /* number of threads to use */
     int n, result;
 
-    if (!PyArg_ParseTuple(args, "O!O!O!O!IIIddddddO!|O!i",
+    if (!PyArg_ParseTuple(args, "O!O!O!O!IIIddddddO!|O!iI",
                          &PyArray_Type, &py_x,
                          &PyArray_Type, &py_y,
                          &PyArray_Type, &py_z,
@@ -287,16 +318,31 @@ PyObject* pygridder3d(PyObject *self, PyObject *args)
                          &xmin, &xmax, &ymin, &ymax, &zmin, &zmax,
                          &PyArray_Type, &py_output,
                          &PyArray_Type, &py_norm,
-                         &flags)) {
+                         &flags, &nthreads)) {
         return NULL;
     }
 
+    /* single precision coordinates are only used if all of them are
+     * given as float arrays */
+    if (GRIDDER_INPUT_TYPE(py_x) == NPY_FLOAT32 &&
+        GRIDDER_INPUT_TYPE(py_y) == NPY_FLOAT32 &&
+        GRIDDER_INPUT_TYPE(py_z) == NPY_FLOAT32) {
+        ctype = NPY_FLOAT32;
+    }
+    else {
+        ctype = NPY_DOUBLE;
+    }
+    dtype = GRIDDER_DATA_TYPE(py_data);
+
     /* check input variables */
-    PYARRAY_CHECK(py_x, 1, NPY_DOUBLE, "x-axis must be a 1D double array!");
-    PYARRAY_CHECK(py_y, 1, NPY_DOUBLE, "y-axis must be a 1D double array!");
-    PYARRAY_CHECK(py_z, 1, NPY_DOUBLE, "z-axis must be a 1D double array!");
-    PYARRAY_CHECK(py_data, 1, NPY_DOUBLE,
-                  "input data must be a 1D double array!");
+    PYARRAY_CHECK(py_x, 1, ctype,
+                  "x-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_y, 1, ctype,
+                  "y-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_z, 1, ctype,
+                  "z-axis must be a 1D double or float array!");
+    PYARRAY_CHECK(py_data, 1, dtype,
+                  "input data must be a 1D array!");
     PYARRAY_CHECK(py_output, 3, NPY_DOUBLE,
                   "ouput data must be a 2D double array!");
     if (py_norm != NULL) {
@@ -305,10 +351,10 @@ PyObject* pygridder3d(PyObject *self, PyObject *args)
     }
 
     /* get data */
-    x = (double *) PyArray_DATA(py_x);
-    y = (double *) PyArray_DATA(py_y);
-    z = (double *) PyArray_DATA(py_z);
-    data = (double *) PyArray_DATA(py_data);
+    x = PyArray_DATA(py_x);
+    y = PyArray_DATA(py_y);
+    z = PyArray_DATA(py_z);
+    data = PyArray_DATA(py_data);
     odata = (double *) PyArray_DATA(py_output);
     if (py_norm != NULL) {
         norm = (double *) PyArray_DATA(py_norm);
@@ -318,8 +364,11 @@ PyObject* pygridder3d(PyObject *self, PyObject *args)
     n = (int) PyArray_SIZE(py_x);
 
     /* call the actual gridder routine */
-    result = gridder3d(x, y, z, data, n, nx, ny, nz,
-                       xmin, xmax, ymin, ymax, zmin, zmax, odata, norm, flags);
+    Py_BEGIN_ALLOW_THREADS
+    result = gridder3d(x, y, z, data, ctype, dtype, n, nx, ny, nz,
+                       xmin, xmax, ymin, ymax, zmin, zmax, odata, norm, flags,
+                       nthreads);
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(py_x);
@@ -335,17 +384,50 @@ PyObject* pygridder3d(PyObject *self, PyObject *args)
 }
 
 /*---------------------------------------------------------------------------*/
-int gridder3d(double *x, double *y, double *z, double *data, unsigned int n,
+/* master loop of the 3D gridder over all data points. The loop is defined as
+ * macro to expand it for all supported types of the input arrays. It needs
+ * to be used inside a parallel region and accumulates into the arrays
+ * todata and tnorm of the current thread. */
+#define GRIDDER3D_LOOP(CTYPE, DTYPE) \
+    { \
+        CTYPE *cx = (CTYPE *) x, *cy = (CTYPE *) y, *cz = (CTYPE *) z; \
+        DTYPE *cdata = (DTYPE *) data; \
+        OMP_PRAGMA(omp for schedule(static) reduction(+:noutofbounds)) \
+        for (i = 0; i < (long) n; i++) { \
+            if (isnan((double) cdata[i])) { \
+                continue; \
+            } \
+            /* check if the current point is within the bounds of the \
+             * grid */ \
+            if ((cx[i] < xmin) || (cx[i] > xmax) || \
+                (cy[i] < ymin) || (cy[i] > ymax) || \
+                (cz[i] < zmin) || (cz[i] > zmax)) { \
+                noutofbounds++; \
+                continue; \
+            } \
+            /* compute the offset value of the current input point on the \
+             * grid array */ \
+            offset = gindex(cx[i], xmin, dx) * ny * nz + \
+                     gindex(cy[i], ymin, dy) * nz + \
+                     gindex(cz[i], zmin, dz); \
+            GRIDDER_ADD(todata[offset], cdata[i]); \
+            GRIDDER_ADD(tnorm[offset], 1.); \
+        } \
+    }
+
+int gridder3d(void *x, void *y, void *z, void *data, int ctype, int dtype,
+              unsigned int n,
               unsigned int nx, unsigned int ny, unsigned int nz,
               double xmin, double xmax, double ymin, double ymax,
               double zmin, double zmax,
-              double *odata, double *norm, int flags)
+              double *odata, double *norm, int flags, unsigned int nthreads)
 {
     double *gnorm;                     /* pointer to normalization data */
-    unsigned int offset;               /* linear offset for the grid data */
     unsigned int ntot = nx * ny * nz;  /* total number of points on the grid */
-    unsigned int i;                    /* loop index variable */
+    long i;                            /* loop index variable */
     unsigned int noutofbounds = 0;     /* number of points out of bounds */
+    double *buffers;                   /* per-thread accumulation buffers */
+    int nth, atomic;                   /* threads and update strategy */
 
     /* compute step width for the grid */
     double dx = delta(xmin, xmax, nx);
@@ -372,37 +454,37 @@ int gridder3d(double *x, double *y, double *z, double *data, unsigned int n,
         gnorm = norm;
     }
 
-    /* the master loop over all data points */
-    for (i = 0; i < n; i++) {
-        if (!isnan(data[i])) {
-            /* check if the current point is within the bounds of the grid */
-            if ((x[i] < xmin) || (x[i] > xmax)) {
-                noutofbounds++;
-                continue;
-            }
-            if ((y[i] < ymin) || (y[i] > ymax)) {
-                noutofbounds++;
-                continue;
-            }
-            if ((z[i] < zmin) || (z[i] > zmax)) {
-                noutofbounds++;
-                continue;
-            }
+    /* select the parallelization strategy: per-thread buffers or atomic
+     * updates of the shared grid. A grid in shared memory might be updated
+     * by other processes at the same time and is always updated atomically */
+    nth = gridder_nthreads(nthreads, n);
+    if (flags & SHARED_OUTPUT) {
+        buffers = NULL;
+    }
+    else {
+        buffers = gridder_alloc_buffers(nth, n, ntot);
+    }
+    atomic = (nth > 1 && buffers == NULL) || (flags & SHARED_OUTPUT);
 
-            /* compute the offset value of the current input point on the
-             * grid array */
-            offset = gindex(x[i], xmin, dx) * ny * nz +
-                     gindex(y[i], ymin, dy) * nz +
-                     gindex(z[i], zmin, dz);
+    /* the master loop over all data points */
+    #pragma omp parallel num_threads(nth) default(shared)
+    {
+        unsigned int offset;  /* linear offset for the grid data */
+        double *todata, *tnorm;  /* accumulation arrays of this thread */
 
-            odata[offset] += data[i];
-            gnorm[offset] += 1.;
+        gridder_thread_buffers(buffers, ntot, odata, gnorm, &todata, &tnorm);
+        if (ctype == NPY_FLOAT32) {
+            GRIDDER_DATA_DISPATCH(GRIDDER3D_LOOP, float, dtype)
+        }
+        else {
+            GRIDDER_DATA_DISPATCH(GRIDDER3D_LOOP, double, dtype)
         }
     }
+    gridder_merge_buffers(buffers, nth, ntot, odata, gnorm);
 
     /* perform normalization */
     if (!(flags & NO_NORMALIZATION)) {
-        for (i = 0; i < ntot; i++) {
+        for (i = 0; i < (long) ntot; i++) {
             if (gnorm[i] > 1.e-16) {
                 odata[i] = odata[i] / gnorm[i];
             }
@@ -425,3 +507,627 @@ int gridder3d(double *x, double *y, double *z, double *data, unsigned int n,
     return 0;
 }
 
+
+/*---------------------------------------------------------------------------*/
+/* helper macros of the sparse 3D gridder. The grid is divided into cubic
+ * blocks with an edge length of bs bins. The block table holds the index of
+ * every block in the block pool or -1 if the block was never touched. */
+#define SPARSE_BLOCK_INDEX(ix, iy, iz) \
+    ((((ix) / bs) * nby + (iy) / bs) * nbz + (iz) / bs)
+#define SPARSE_BLOCK_OFFSET(ix, iy, iz) \
+    ((((ix) % bs) * bs + (iy) % bs) * bs + (iz) % bs)
+
+/* check if data point i is invalid or outside the grid */
+#define SPARSE_SKIP_POINT(i) \
+    (isnan((double) cdata[i]) || \
+     (cx[i] < xmin) || (cx[i] > xmax) || \
+     (cy[i] < ymin) || (cy[i] > ymax) || \
+     (cz[i] < zmin) || (cz[i] > zmax))
+
+/* loop over all data points registering the blocks touched by them */
+#define SPARSE_BLOCKS_LOOP(CTYPE, DTYPE) \
+    { \
+        CTYPE *cx = (CTYPE *) x, *cy = (CTYPE *) y, *cz = (CTYPE *) z; \
+        DTYPE *cdata = (DTYPE *) data; \
+        for (i = 0; i < (long) n; i++) { \
+            if (SPARSE_SKIP_POINT(i)) { \
+                continue; \
+            } \
+            block = SPARSE_BLOCK_INDEX(gindex(cx[i], xmin, dx), \
+                                       gindex(cy[i], ymin, dy), \
+                                       gindex(cz[i], zmin, dz)); \
+            if (btable[block] < 0) { \
+                btable[block] = nblocks++; \
+            } \
+        } \
+    }
+
+npy_int64 sparse_gridder3d_blocks(void *x, void *y, void *z, void *data,
+                                  int ctype, int dtype, unsigned int n,
+                                  unsigned int nx, unsigned int ny,
+                                  unsigned int nz, double xmin, double xmax,
+                                  double ymin, double ymax, double zmin,
+                                  double zmax, unsigned int bs,
+                                  npy_int64 *btable, npy_int64 nblocks)
+{
+    long i;                   /* loop index variable */
+    size_t block;             /* linear index of the block */
+    size_t nby = (ny + bs - 1) / bs;  /* number of blocks along y */
+    size_t nbz = (nz + bs - 1) / bs;  /* number of blocks along z */
+
+    /* compute step width for the grid */
+    double dx = delta(xmin, xmax, nx);
+    double dy = delta(ymin, ymax, ny);
+    double dz = delta(zmin, zmax, nz);
+
+    if (ctype == NPY_FLOAT32) {
+        GRIDDER_DATA_DISPATCH(SPARSE_BLOCKS_LOOP, float, dtype)
+    }
+    else {
+        GRIDDER_DATA_DISPATCH(SPARSE_BLOCKS_LOOP, double, dtype)
+    }
+
+    return nblocks;
+}
+
+/*---------------------------------------------------------------------------*/
+/* master loop of the sparse 3D gridder. Data points in blocks which are not
+ * registered in the block table are skipped. Since the block pool can be
+ * large the threads always update it atomically. */
+#define SPARSE_GRIDDER3D_LOOP(CTYPE, DTYPE) \
+    { \
+        CTYPE *cx = (CTYPE *) x, *cy = (CTYPE *) y, *cz = (CTYPE *) z; \
+        DTYPE *cdata = (DTYPE *) data; \
+        OMP_PRAGMA(omp for schedule(static) reduction(+:noutofbounds)) \
+        for (i = 0; i < (long) n; i++) { \
+            if (SPARSE_SKIP_POINT(i)) { \
+                if (!isnan((double) cdata[i])) { \
+                    noutofbounds++; \
+                } \
+                continue; \
+            } \
+            ix = gindex(cx[i], xmin, dx); \
+            iy = gindex(cy[i], ymin, dy); \
+            iz = gindex(cz[i], zmin, dz); \
+            slot = btable[SPARSE_BLOCK_INDEX(ix, iy, iz)]; \
+            if (slot < 0) { \
+                continue; \
+            } \
+            offset = slot * bvol + SPARSE_BLOCK_OFFSET(ix, iy, iz); \
+            GRIDDER_ADD(bdata[offset], cdata[i]); \
+            GRIDDER_ADD(bnorm[offset], 1.); \
+        } \
+    }
+
+int sparse_gridder3d(void *x, void *y, void *z, void *data,
+                     int ctype, int dtype, unsigned int n,
+                     unsigned int nx, unsigned int ny, unsigned int nz,
+                     double xmin, double xmax, double ymin, double ymax,
+                     double zmin, double zmax, unsigned int bs,
+                     npy_int64 *btable, double *bdata, double *bnorm,
+                     unsigned int nthreads)
+{
+    long i;                           /* loop index variable */
+    unsigned int noutofbounds = 0;    /* number of points out of bounds */
+    size_t nby = (ny + bs - 1) / bs;  /* number of blocks along y */
+    size_t nbz = (nz + bs - 1) / bs;  /* number of blocks along z */
+    size_t bvol = (size_t) bs * bs * bs;  /* number of bins per block */
+    int nth, atomic;                  /* threads and update strategy */
+
+    /* compute step width for the grid */
+    double dx = delta(xmin, xmax, nx);
+    double dy = delta(ymin, ymax, ny);
+    double dz = delta(zmin, zmax, nz);
+
+    nth = gridder_nthreads(nthreads, n);
+    atomic = (nth > 1);
+
+    #pragma omp parallel num_threads(nth) default(shared)
+    {
+        size_t ix, iy, iz;  /* grid indices of the current point */
+        npy_int64 slot;     /* index of the block in the block pool */
+        size_t offset;      /* linear offset in the block pool */
+
+        if (ctype == NPY_FLOAT32) {
+            GRIDDER_DATA_DISPATCH(SPARSE_GRIDDER3D_LOOP, float, dtype)
+        }
+        else {
+            GRIDDER_DATA_DISPATCH(SPARSE_GRIDDER3D_LOOP, double, dtype)
+        }
+    }
+
+    /* warn the user in case more than half the data points where out
+     * of the gridding area */
+    if (noutofbounds > n / 2) {
+        fprintf(stdout, "XU.SparseGridder3D(c): more than half of the "
+                "datapoints out of the data range, consider regridding with "
+                "extended range!\n");
+    }
+
+    return 0;
+}
+
+/*---------------------------------------------------------------------------*/
+/* convert the input arrays of the sparse gridder functions */
+#define SPARSE_GRIDDER3D_INPUT() \
+    if (GRIDDER_INPUT_TYPE(py_x) == NPY_FLOAT32 && \
+        GRIDDER_INPUT_TYPE(py_y) == NPY_FLOAT32 && \
+        GRIDDER_INPUT_TYPE(py_z) == NPY_FLOAT32) { \
+        ctype = NPY_FLOAT32; \
+    } \
+    else { \
+        ctype = NPY_DOUBLE; \
+    } \
+    dtype = GRIDDER_DATA_TYPE(py_data); \
+    PYARRAY_CHECK(py_x, 1, ctype, \
+                  "x-axis must be a 1D double or float array!"); \
+    PYARRAY_CHECK(py_y, 1, ctype, \
+                  "y-axis must be a 1D double or float array!"); \
+    PYARRAY_CHECK(py_z, 1, ctype, \
+                  "z-axis must be a 1D double or float array!"); \
+    PYARRAY_CHECK(py_data, 1, dtype, \
+                  "input data must be a 1D array!"); \
+    PYARRAY_CHECK(py_table, 3, NPY_INT64, \
+                  "block table must be a 3D int64 array!"); \
+    if (bs == 0 || \
+        PyArray_DIM(py_table, 0) != (npy_intp) ((nx + bs - 1) / bs) || \
+        PyArray_DIM(py_table, 1) != (npy_intp) ((ny + bs - 1) / bs) || \
+        PyArray_DIM(py_table, 2) != (npy_intp) ((nz + bs - 1) / bs)) { \
+        PyErr_SetString(PyExc_ValueError, \
+                        "shape of block table does not fit to the grid!"); \
+        return NULL; \
+    } \
+    n = (unsigned int) PyArray_SIZE(py_x);
+
+PyObject* pysparse_gridder3d_blocks(PyObject *self, PyObject *args)
+{
+    PyArrayObject *py_x = NULL, *py_y = NULL, *py_z = NULL, *py_data = NULL,
+                  *py_table = NULL;
+    double xmin, xmax, ymin, ymax, zmin, zmax;
+    unsigned int nx, ny, nz, bs;
+    int ctype, dtype;  /* numpy types of coordinates and data */
+    unsigned int n;
+    long long nblocks;
+
+    if (!PyArg_ParseTuple(args, "O!O!O!O!IIIddddddIO!L",
+                         &PyArray_Type, &py_x,
+                         &PyArray_Type, &py_y,
+                         &PyArray_Type, &py_z,
+                         &PyArray_Type, &py_data,
+                         &nx, &ny, &nz,
+                         &xmin, &xmax, &ymin, &ymax, &zmin, &zmax,
+                         &bs, &PyArray_Type, &py_table, &nblocks)) {
+        return NULL;
+    }
+
+    SPARSE_GRIDDER3D_INPUT()
+
+    Py_BEGIN_ALLOW_THREADS
+    nblocks = sparse_gridder3d_blocks(
+        PyArray_DATA(py_x), PyArray_DATA(py_y), PyArray_DATA(py_z),
+        PyArray_DATA(py_data), ctype, dtype, n, nx, ny, nz,
+        xmin, xmax, ymin, ymax, zmin, zmax, bs,
+        (npy_int64 *) PyArray_DATA(py_table), (npy_int64) nblocks);
+    Py_END_ALLOW_THREADS
+
+    /* clean up */
+    Py_DECREF(py_x);
+    Py_DECREF(py_y);
+    Py_DECREF(py_z);
+    Py_DECREF(py_data);
+    Py_DECREF(py_table);
+
+    return Py_BuildValue("L", nblocks);
+}
+
+PyObject* pysparse_gridder3d(PyObject *self, PyObject *args)
+{
+    PyArrayObject *py_x = NULL, *py_y = NULL, *py_z = NULL, *py_data = NULL,
+                  *py_table = NULL, *py_bdata = NULL, *py_bnorm = NULL;
+    double xmin, xmax, ymin, ymax, zmin, zmax;
+    unsigned int nx, ny, nz, bs;
+    int ctype, dtype;  /* numpy types of coordinates and data */
+    unsigned int nthreads = 1;  /* number of threads to use */
+    unsigned int n;
+    int result;
+
+    if (!PyArg_ParseTuple(args, "O!O!O!O!IIIddddddIO!O!O!|I",
+                         &PyArray_Type, &py_x,
+                         &PyArray_Type, &py_y,
+                         &PyArray_Type, &py_z,
+                         &PyArray_Type, &py_data,
+                         &nx, &ny, &nz,
+                         &xmin, &xmax, &ymin, &ymax, &zmin, &zmax,
+                         &bs, &PyArray_Type, &py_table,
+                         &PyArray_Type, &py_bdata,
+                         &PyArray_Type, &py_bnorm, &nthreads)) {
+        return NULL;
+    }
+
+    SPARSE_GRIDDER3D_INPUT()
+    PYARRAY_CHECK(py_bdata, 2, NPY_DOUBLE,
+                  "block data must be a 2D double array!");
+    PYARRAY_CHECK(py_bnorm, 2, NPY_DOUBLE,
+                  "block norm must be a 2D double array!");
+    if (PyArray_DIM(py_bdata, 1) != (npy_intp) bs * bs * bs ||
+        PyArray_DIM(py_bnorm, 1) != (npy_intp) bs * bs * bs ||
+        PyArray_DIM(py_bnorm, 0) != PyArray_DIM(py_bdata, 0)) {
+        PyErr_SetString(PyExc_ValueError,
+                        "shape of block pool does not fit to the block size!");
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    result = sparse_gridder3d(
+        PyArray_DATA(py_x), PyArray_DATA(py_y), PyArray_DATA(py_z),
+        PyArray_DATA(py_data), ctype, dtype, n, nx, ny, nz,
+        xmin, xmax, ymin, ymax, zmin, zmax, bs,
+        (npy_int64 *) PyArray_DATA(py_table),
+        (double *) PyArray_DATA(py_bdata),
+        (double *) PyArray_DATA(py_bnorm), nthreads);
+    Py_END_ALLOW_THREADS
+
+    /* clean up */
+    Py_DECREF(py_x);
+    Py_DECREF(py_y);
+    Py_DECREF(py_z);
+    Py_DECREF(py_data);
+    Py_DECREF(py_table);
+    Py_DECREF(py_bdata);
+    Py_DECREF(py_bnorm);
+
+    return Py_BuildValue("i", result);
+}
+
+
+/*---------------------------------------------------------------------------*/
+PyObject* pypixelsplit_gridder3d(PyObject *self, PyObject *args)
+{
+    PyArrayObject *py_x = NULL, *py_y = NULL, *py_data = NULL,
+                  *py_output = NULL, *py_norm = NULL;
+    PyObject *py_zobj = NULL;
+    PyArrayObject *py_z = NULL;
+
+    double *z = NULL;
+    double xmin, xmax, ymin, ymax, zmin, zmax;
+    unsigned int nx, ny, nz;
+    unsigned int nf, n1, n2;  /* number of frames and pixels */
+    int dtype;  /* numpy type of the data */
+    int flags = 0;
+    unsigned int nthreads = 1;  /* number of threads to use */
+    int result;
+
+    if (!PyArg_ParseTuple(args, "O!O!OO!IIIddddddO!O!iI",
+                          &PyArray_Type, &py_x,
+                          &PyArray_Type, &py_y,
+                          &py_zobj,
+                          &PyArray_Type, &py_data,
+                          &nx, &ny, &nz,
+                          &xmin, &xmax, &ymin, &ymax, &zmin, &zmax,
+                          &PyArray_Type, &py_output,
+                          &PyArray_Type, &py_norm,
+                          &flags, &nthreads)) {
+        return NULL;
+    }
+
+    dtype = GRIDDER_DATA_TYPE(py_data);
+
+    /* have to check input variables */
+    PYARRAY_CHECK(py_x, 3, NPY_DOUBLE,
+                  "x-corners must be a 3D double array!");
+    PYARRAY_CHECK(py_y, 3, NPY_DOUBLE,
+                  "y-corners must be a 3D double array!");
+    PYARRAY_CHECK(py_data, 3, dtype, "input data must be a 3D array!");
+    PYARRAY_CHECK(py_output, 3, NPY_DOUBLE,
+                  "ouput data must be a 3D double array!");
+    PYARRAY_CHECK(py_norm, 3, NPY_DOUBLE,
+                  "norm data must be a 3D double array!");
+    if (py_zobj != Py_None) {
+        py_z = (PyArrayObject *) py_zobj;
+        PYARRAY_CHECK(py_z, 3, NPY_DOUBLE,
+                      "z-corners must be a 3D double array!");
+        z = (double *) PyArray_DATA(py_z);
+    }
+    else if (nz != 1) {
+        PyErr_SetString(PyExc_ValueError,
+                        "z-corners are needed for nz > 1!");
+        return NULL;
+    }
+
+    nf = (unsigned int) PyArray_DIM(py_data, 0);
+    n1 = (unsigned int) PyArray_DIM(py_data, 1);
+    n2 = (unsigned int) PyArray_DIM(py_data, 2);
+    if (PyArray_DIM(py_x, 0) != nf || PyArray_DIM(py_x, 1) != n1 + 1 ||
+        PyArray_DIM(py_x, 2) != n2 + 1 ||
+        !PyArray_SAMESHAPE(py_x, py_y) ||
+        (py_z != NULL && !PyArray_SAMESHAPE(py_x, py_z))) {
+        PyErr_SetString(PyExc_ValueError,
+                        "corner arrays must be of shape (nf, n1 + 1, n2 + 1) "
+                        "for data of shape (nf, n1, n2)!");
+        return NULL;
+    }
+    if (PyArray_SIZE(py_output) != (npy_intp) nx * ny * nz ||
+        PyArray_SIZE(py_norm) != (npy_intp) nx * ny * nz) {
+        PyErr_SetString(PyExc_ValueError,
+                        "output and norm array must be of size nx*ny*nz!");
+        return NULL;
+    }
+
+    /* call the actual gridder routine */
+    Py_BEGIN_ALLOW_THREADS
+    result = pixelsplit_gridder3d(
+        (double *) PyArray_DATA(py_x), (double *) PyArray_DATA(py_y), z,
+        PyArray_DATA(py_data), dtype, nf, n1, n2, nx, ny, nz,
+        xmin, xmax, ymin, ymax, zmin, zmax,
+        (double *) PyArray_DATA(py_output), (double *) PyArray_DATA(py_norm),
+        flags, nthreads);
+    Py_END_ALLOW_THREADS
+
+    /* clean up */
+    Py_DECREF(py_x);
+    Py_DECREF(py_y);
+    if (py_z != NULL) {
+        Py_DECREF(py_z);
+    }
+    Py_DECREF(py_data);
+    Py_DECREF(py_output);
+    Py_DECREF(py_norm);
+
+    return Py_BuildValue("i", result);
+}
+
+/*---------------------------------------------------------------------------*/
+/* maximal number of vertices of a triangle clipped by the six faces of a
+ * voxel */
+#define PIXELSPLIT_MAXVERT 12
+
+/* clip the polygon p with n vertices at the plane v[axis] = value keeping the
+ * part with sign * (v[axis] - value) >= 0 (Sutherland-Hodgman algorithm).
+ * The clipped polygon is stored in q and its number of vertices returned. */
+static int clip_plane(double (*p)[3], int n, int axis, double value,
+                      double sign, double (*q)[3])
+{
+    int k, j, m = 0;
+    double da, db, t;
+    double *a, *b;
+
+    for (k = 0; k < n; ++k) {
+        a = p[k];
+        b = p[(k + 1) % n];
+        da = sign * (a[axis] - value);
+        db = sign * (b[axis] - value);
+        if (da >= 0) {
+            for (j = 0; j < 3; ++j) {
+                q[m][j] = a[j];
+            }
+            m++;
+        }
+        if ((da >= 0) != (db >= 0)) {
+            t = da / (da - db);
+            for (j = 0; j < 3; ++j) {
+                q[m][j] = a[j] + t * (b[j] - a[j]);
+            }
+            m++;
+        }
+    }
+    return m;
+}
+
+/* clip the polygon p with n vertices to the bin k of an axis and store the
+ * result in q. For axes with a single bin no clipping is performed. */
+static int clip_bin(double (*p)[3], int n, int axis, long k,
+                    double min, double d, unsigned int nbins, double (*q)[3])
+{
+    double tmp[PIXELSPLIT_MAXVERT][3];
+    int j, m;
+
+    if (nbins == 1) {
+        for (m = 0; m < n; ++m) {
+            for (j = 0; j < 3; ++j) {
+                q[m][j] = p[m][j];
+            }
+        }
+        return n;
+    }
+    m = clip_plane(p, n, axis, min + (k - 0.5) * d, 1., tmp);
+    if (m < 3) {
+        return 0;
+    }
+    return clip_plane(tmp, m, axis, min + (k + 0.5) * d, -1., q);
+}
+
+/* area of a planar polygon */
+static double polygon_area(double (*p)[3], int n)
+{
+    double c[3] = {0., 0., 0.};
+    double a[3], b[3];
+    int k, j;
+
+    for (k = 1; k < n - 1; ++k) {
+        for (j = 0; j < 3; ++j) {
+            a[j] = p[k][j] - p[0][j];
+            b[j] = p[k + 1][j] - p[0][j];
+        }
+        c[0] += a[1] * b[2] - a[2] * b[1];
+        c[1] += a[2] * b[0] - a[0] * b[2];
+        c[2] += a[0] * b[1] - a[1] * b[0];
+    }
+    return 0.5 * sqrt(c[0] * c[0] + c[1] * c[1] + c[2] * c[2]);
+}
+
+/* range of bins touched by the interval [vmin, vmax]; returns 0 if the
+ * interval is outside of the grid */
+static int bin_range(double vmin, double vmax, double min, double d,
+                     unsigned int nbins, long *k0, long *k1)
+{
+    if (nbins == 1) {
+        *k0 = *k1 = 0;
+        return 1;
+    }
+    *k0 = (long) floor((vmin - min) / d + 0.5);
+    *k1 = (long) floor((vmax - min) / d + 0.5);
+    if (*k1 < 0 || *k0 > (long) nbins - 1) {
+        return 0;
+    }
+    *k0 = *k0 < 0 ? 0 : *k0;
+    *k1 = *k1 > (long) nbins - 1 ? (long) nbins - 1 : *k1;
+    return 1;
+}
+
+int pixelsplit_gridder3d(double *x, double *y, double *z, void *data,
+                         int dtype, unsigned int nf, unsigned int n1,
+                         unsigned int n2, unsigned int nx, unsigned int ny,
+                         unsigned int nz, double xmin, double xmax,
+                         double ymin, double ymax, double zmin, double zmax,
+                         double *odata, double *norm, int flags,
+                         unsigned int nthreads)
+{
+    unsigned int ntot = nx * ny * nz;  /* total number of points on the grid */
+    long npix = (long) nf * n1 * n2;   /* total number of pixels */
+    long i;                            /* loop index variable */
+    double *buffers;                   /* per-thread accumulation buffers */
+    int nth, atomic;                   /* threads and update strategy */
+
+    /* compute step width for the grid */
+    double dx = delta(xmin, xmax, nx);
+    double dy = delta(ymin, ymax, ny);
+    double dz = delta(zmin, zmax, nz);
+
+    /* initialize data if requested */
+    if (!(flags & NO_DATA_INIT)) {
+        set_array(odata, ntot, 0.);
+        set_array(norm, ntot, 0.);
+    }
+
+    nth = gridder_nthreads(nthreads, (unsigned int) npix);
+    if (flags & SHARED_OUTPUT) {
+        buffers = NULL;
+    }
+    else {
+        buffers = gridder_alloc_buffers(nth, (unsigned int) npix, ntot);
+    }
+    atomic = (nth > 1 && buffers == NULL) || (flags & SHARED_OUTPUT);
+
+    /* the master loop over all pixels */
+    #pragma omp parallel num_threads(nth) default(shared)
+    {
+        double tri[2][3][3];  /* triangles of the pixel footprint */
+        double px[PIXELSPLIT_MAXVERT][3], pxy[PIXELSPLIT_MAXVERT][3];
+        double pxyz[PIXELSPLIT_MAXVERT][3];
+        double d, area, atot, w;
+        double vmin[3], vmax[3];
+        long c[4];  /* indices of the pixel corners */
+        long kx, ky, kz, k0[3], k1[3];
+        long f, p1, p2;
+        int t, v, j, nv1, nv2, nv3;
+        unsigned int offset;
+        double *todata, *tnorm;  /* accumulation arrays of this thread */
+
+        gridder_thread_buffers(buffers, ntot, odata, norm, &todata, &tnorm);
+
+        #pragma omp for schedule(static)
+        for (i = 0; i < npix; ++i) {
+            d = gridder_data_value(data, dtype, i);
+            if (isnan(d)) {
+                continue;
+            }
+            f = i / ((long) n1 * n2);
+            p1 = (i / n2) % n1;
+            p2 = i % n2;
+            /* corners in counter-clockwise order */
+            c[0] = (f * (n1 + 1) + p1) * (n2 + 1) + p2;
+            c[1] = c[0] + n2 + 1;
+            c[2] = c[1] + 1;
+            c[3] = c[0] + 1;
+            for (v = 0; v < 3; ++v) {
+                tri[0][v][0] = x[c[v]];
+                tri[0][v][1] = y[c[v]];
+                tri[0][v][2] = z != NULL ? z[c[v]] : 0.;
+                tri[1][v][0] = x[c[(v + 2) % 4]];
+                tri[1][v][1] = y[c[(v + 2) % 4]];
+                tri[1][v][2] = z != NULL ? z[c[(v + 2) % 4]] : 0.;
+            }
+            atot = polygon_area(tri[0], 3) + polygon_area(tri[1], 3);
+
+            if (!(atot > 0.)) {
+                /* degenerated footprint: deposit the pixel in the bin of
+                 * its center */
+                for (j = 0; j < 3; ++j) {
+                    vmin[j] = 0.25 * (tri[0][0][j] + tri[0][1][j] +
+                                      tri[0][2][j] + tri[1][2][j]);
+                }
+                if (vmin[0] < xmin || vmin[0] > xmax ||
+                    vmin[1] < ymin || vmin[1] > ymax ||
+                    (nz > 1 && (vmin[2] < zmin || vmin[2] > zmax))) {
+                    continue;
+                }
+                offset = gindex(vmin[0], xmin, dx) * ny * nz +
+                         gindex(vmin[1], ymin, dy) * nz;
+                if (nz > 1) {
+                    offset += gindex(vmin[2], zmin, dz);
+                }
+                GRIDDER_ADD(todata[offset], d);
+                GRIDDER_ADD(tnorm[offset], 1.);
+                continue;
+            }
+
+            for (t = 0; t < 2; ++t) {
+                for (j = 0; j < 3; ++j) {
+                    vmin[j] = fmin(fmin(tri[t][0][j], tri[t][1][j]),
+                                   tri[t][2][j]);
+                    vmax[j] = fmax(fmax(tri[t][0][j], tri[t][1][j]),
+                                   tri[t][2][j]);
+                }
+                if (!bin_range(vmin[0], vmax[0], xmin, dx, nx, &k0[0],
+                               &k1[0]) ||
+                    !bin_range(vmin[1], vmax[1], ymin, dy, ny, &k0[1],
+                               &k1[1]) ||
+                    !bin_range(vmin[2], vmax[2], zmin, dz, nz, &k0[2],
+                               &k1[2])) {
+                    continue;
+                }
+                /* distribute the triangle over the bins proportional to the
+                 * area of the overlap */
+                for (kx = k0[0]; kx <= k1[0]; ++kx) {
+                    nv1 = clip_bin(tri[t], 3, 0, kx, xmin, dx, nx, px);
+                    if (nv1 < 3) {
+                        continue;
+                    }
+                    for (ky = k0[1]; ky <= k1[1]; ++ky) {
+                        nv2 = clip_bin(px, nv1, 1, ky, ymin, dy, ny, pxy);
+                        if (nv2 < 3) {
+                            continue;
+                        }
+                        for (kz = k0[2]; kz <= k1[2]; ++kz) {
+                            nv3 = clip_bin(pxy, nv2, 2, kz, zmin, dz, nz,
+                                           pxyz);
+                            if (nv3 < 3) {
+                                continue;
+                            }
+                            area = polygon_area(pxyz, nv3);
+                            if (area <= 0.) {
+                                continue;
+                            }
+                            w = area / atot;
+                            offset = (kx * ny + ky) * nz + kz;
+                            GRIDDER_ADD(todata[offset], d * w);
+                            GRIDDER_ADD(tnorm[offset], w);
+                        }
+                    }
+                }
+            }
+        }
+    }
+    gridder_merge_buffers(buffers, nth, ntot, odata, norm);
+
+    /* perform normalization */
+    if (!(flags & NO_NORMALIZATION)) {
+        for (i = 0; i < (long) ntot; i++) {
+            if (norm[i] > 1.e-16) {
+                odata[i] = odata[i] / norm[i];
+            }
+        }
+    }
+
+    return 0;
+}
@@ -76,3 +76,91 @@ unsigned int gindex(double x, double min, double d)
 {
     return (unsigned int) rint((x - min) / d);
 }
+
+/*---------------------------------------------------------------------------*/
+int gridder_nthreads(unsigned int nthreads, unsigned int n)
+{
+#ifdef __OPENMP__
+    int nth = (nthreads == 0) ? omp_get_max_threads() : (int) nthreads;
+    int nmax = (int) (n / GRIDDER_MIN_POINTS_PER_THREAD);
+
+    if (nth > nmax) {
+        nth = nmax;
+    }
+    return nth > 1 ? nth : 1;
+#else
+    return 1;
+#endif
+}
+
+/*---------------------------------------------------------------------------*/
+double *gridder_alloc_buffers(int nthreads, unsigned int n, unsigned int ntot)
+{
+    size_t nbuf = 2 * (size_t) ntot * (size_t) (nthreads - 1);
+
+    if (nthreads < 2) {
+        return NULL;
+    }
+    /* the merging of the buffers should not exceed the effort of the
+     * gridding itself */
+    if (nbuf * sizeof(double) > GRIDDER_MAX_BUFFER_MEMORY ||
+        (size_t) ntot * (size_t) (nthreads - 1) > n) {
+        return NULL;
+    }
+    /* in case of an allocation failure atomic updates are used */
+    return (double *) calloc(nbuf, sizeof(double));
+}
+
+/*---------------------------------------------------------------------------*/
+void gridder_thread_buffers(double *buffers, unsigned int ntot,
+                            double *odata, double *norm,
+                            double **todata, double **tnorm)
+{
+    int tid = 0;
+#ifdef __OPENMP__
+    tid = omp_get_thread_num();
+#endif
+    if (buffers == NULL || tid == 0) {
+        *todata = odata;
+        *tnorm = norm;
+    }
+    else {
+        *todata = buffers + 2 * (size_t) ntot * (size_t) (tid - 1);
+        *tnorm = *todata + ntot;
+    }
+}
+
+/*---------------------------------------------------------------------------*/
+void gridder_merge_buffers(double *buffers, int nthreads, unsigned int ntot,
+                           double *odata, double *norm)
+{
+    long i;
+    int t;
+
+    if (buffers == NULL) {
+        return;
+    }
+
+    #pragma omp parallel for num_threads(nthreads) default(shared) \
+            private(t) schedule(static)
+    for (i = 0; i < (long) ntot; ++i) {
+        for (t = 0; t < nthreads - 1; ++t) {
+            odata[i] += buffers[2 * (size_t) ntot * t + i];
+            norm[i] += buffers[2 * (size_t) ntot * t + ntot + i];
+        }
+    }
+
+    free(buffers);
+}
+
+/*---------------------------------------------------------------------------*/
+double gridder_data_value(void *data, int dtype, size_t i)
+{
+    switch (dtype) {
+        case NPY_FLOAT32: return (double) ((float *) data)[i];
+        case NPY_UINT16: return (double) ((npy_uint16 *) data)[i];
+        case NPY_INT32: return (double) ((npy_int32 *) data)[i];
+        case NPY_UINT32: return (double) ((npy_uint32 *) data)[i];
+        default: return ((double *) data)[i];
+    }
+}
@@ -80,3 +80,121 @@ double delta(double min, double max, unsigned int n);
 */
 unsigned int gindex(double x, double min, double d);
 
+/*---------------------------------------------------------------------------*/
+/*
+ * parameters of the heuristic selecting the parallelization strategy of the
+ * gridders
+ */
+/* minimum number of data points per thread for parallel gridding */
+#define GRIDDER_MIN_POINTS_PER_THREAD 20000
+/* maximum memory (bytes) used for the per-thread accumulation buffers */
+#define GRIDDER_MAX_BUFFER_MEMORY (512 * 1024 * 1024)
+
+/*!
+\brief number of threads used by the gridders
+
+Determines the number of threads used for gridding n data points. The
+requested number of threads is reduced if the number of data points per
+thread would be too small. Without OpenMP support 1 is returned.
+\param nthreads requested number of threads (0 to use all available)
+\param n number of data points
+\return number of threads
+*/
+int gridder_nthreads(unsigned int nthreads, unsigned int n);
+
+/*---------------------------------------------------------------------------*/
+/*!
+\brief allocate per-thread accumulation buffers
+
+All but the first thread accumulate into private copies of the data and
+normalization grid which are merged at the end. This is preferred over atomic
+updates of the shared grid as long as the grid is small compared to the
+number of data points and the buffers fit into the memory limit
+GRIDDER_MAX_BUFFER_MEMORY. Otherwise NULL is returned and the shared grid
+needs to be updated atomically.
+\param nthreads number of threads
+\param n number of data points
+\param ntot number of grid points
+\return zero initialized buffer of size 2 * ntot * (nthreads - 1) or NULL
+*/
+double *gridder_alloc_buffers(int nthreads, unsigned int n, unsigned int ntot);
+
+/*---------------------------------------------------------------------------*/
+/*!
+\brief select the accumulation arrays of the current thread
+
+\param buffers per-thread buffers (or NULL)
+\param ntot number of grid points
+\param odata shared output data
+\param norm shared normalization data
+\param todata accumulation array for the data of the current thread (output)
+\param tnorm accumulation array for the normalization of the current thread
+       (output)
+*/
+void gridder_thread_buffers(double *buffers, unsigned int ntot,
+                            double *odata, double *norm,
+                            double **todata, double **tnorm);
+
+/*---------------------------------------------------------------------------*/
+/*!
+\brief merge per-thread buffers
+
+Adds the per-thread buffers to the output arrays and frees the buffers.
+\param buffers per-thread buffers (or NULL in which case nothing is done)
+\param nthreads number of threads
+\param ntot number of grid points
+\param odata output data
+\param norm normalization data
+*/
+void gridder_merge_buffers(double *buffers, int nthreads, unsigned int ntot,
+                           double *odata, double *norm);
+
+/*---------------------------------------------------------------------------*/
+/*
+ * add a value to an element of the accumulation arrays. If several threads
+ * share the same grid (atomic != 0) the update needs to be atomic.
+ */
+#define GRIDDER_ADD(target, value) \
+    do { \
+        if (atomic) { \
+            OMP_PRAGMA(omp atomic) \
+            target += value; \
+        } \
+        else { \
+            target += value; \
+        } \
+    } while (0)
+
+/*---------------------------------------------------------------------------*/
+/* determine the type in which the data array is passed to the gridder
+ * kernels: in addition to single precision, integer detector counts are
+ * used without conversion */
+#define GRIDDER_DATA_TYPE(array) \
+    ((PyArray_TYPE(array) == NPY_FLOAT32 || \
+      PyArray_TYPE(array) == NPY_UINT16 || \
+      PyArray_TYPE(array) == NPY_INT32 || \
+      PyArray_TYPE(array) == NPY_UINT32) ? PyArray_TYPE(array) : NPY_DOUBLE)
+
+/* expand a gridder loop macro LOOP(CTYPE, DTYPE) for the coordinate type
+ * CTYPE and all supported types of the data array. The accumulation is
+ * always performed in double precision. */
+#define GRIDDER_DATA_DISPATCH(LOOP, CTYPE, dtype) \
+    switch (dtype) { \
+        case NPY_FLOAT32: LOOP(CTYPE, float) break; \
+        case NPY_UINT16: LOOP(CTYPE, npy_uint16) break; \
+        case NPY_INT32: LOOP(CTYPE, npy_int32) break; \
+        case NPY_UINT32: LOOP(CTYPE, npy_uint32) break; \
+        default: LOOP(CTYPE, double) \
+    }
+
+/*!
+\brief read a data value
+
+Returns an element of a data array of one of the types supported by
+GRIDDER_DATA_TYPE as double.
+\param data data array
+\param dtype numpy type of the data array
+\param i index of the element
+\return value of the element
+*/
+double gridder_data_value(void *data, int dtype, size_t i);
@@ -119,6 +119,22 @@ INLINE void matvec(double *RESTRICT m, double *RESTRICT v,
     r[2] = m[6] * v[0] + m[7] * v[1] + m[8] * v[2];
 }
 
+INLINE void matvec_out(double *RESTRICT m, double *RESTRICT v,
+                       void *RESTRICT out, size_t idx, int flags) {
+    /* matrix vector product stored to out[idx:idx+3] either in double or
+     * single precision as determined by the flags */
+    double r[3];
+    matvec(m, v, r);
+    if (flags & OUTPUT_FLOAT32) {
+        ((float *) out)[idx] = (float) r[0];
+        ((float *) out)[idx + 1] = (float) r[1];
+        ((float *) out)[idx + 2] = (float) r[2];
+    }
+    else {
+        veccopy((double *) out + idx, r);
+    }
+}
+
 INLINE void matmul(double *RESTRICT m1, double *RESTRICT m2) {
     double a, b, c;
     unsigned int i;
@@ -357,6 +373,17 @@ int print_vector(double *m) {
  *  conversion helper functions
  * #######################################*/
 
+void set_value_error(const char *msg) {
+    /* raise a Python ValueError from the helper functions of the conversion
+     * routines. Since those might be called while the GIL is released it
+     * needs to be acquired before the exception is set. */
+    PyGILState_STATE gstate;
+
+    gstate = PyGILState_Ensure();
+    PyErr_SetString(PyExc_ValueError, msg);
+    PyGILState_Release(gstate);
+}
+
 int determine_detector_pixel(double *rpixel, char *dir, double dpixel,
                              double *r_i, double tilt) {
     /* determine the direction of a linear detector or one of the directions of
@@ -384,7 +411,7 @@ int determine_detector_pixel(double *rpixel, char *dir, double dpixel,
                     rpixel[0] = -dpixel;
                 break;
                 default:
-                    PyErr_SetString(PyExc_ValueError,
+                    set_value_error(
                         "XU.Qconversion(c): detector determination: no valid "
                         "direction sign given");
                     return 1;
@@ -399,7 +426,7 @@ int determine_detector_pixel(double *rpixel, char *dir, double dpixel,
                     rpixel[1] = -dpixel;
                 break;
                 default:
-                    PyErr_SetString(PyExc_ValueError,
+                    set_value_error(
                         "XU.Qconversion(c): detector determination: no valid "
                         "direction sign given");
                     return 1;
@@ -414,14 +441,14 @@ int determine_detector_pixel(double *rpixel, char *dir, double dpixel,
                     rpixel[2] = -dpixel;
                 break;
                 default:
-                    PyErr_SetString(PyExc_ValueError,
+                    set_value_error(
                         "XU.Qconversion(c): detector determination: no valid "
                         "direction sign given");
                     return 1;
             }
         break;
         default:
-            PyErr_SetString(PyExc_ValueError,
+            set_value_error(
                 "XU.Qconversion(c): detector determination: no valid "
                 "direction direction given");
             return 2;
@@ -462,7 +489,7 @@ int determine_axes_directions(fp_rot *fp_circles, char *stringAxis,
                         fp_circles[i] = &rotation_xm;
                     break;
                     default:
-                        PyErr_SetString(PyExc_ValueError,
+                        set_value_error(
                             "XU.Qconversion(c): axis determination: no valid "
                             "rotation sense given");
                         return 1;
@@ -477,7 +504,7 @@ int determine_axes_directions(fp_rot *fp_circles, char *stringAxis,
                         fp_circles[i] = &rotation_ym;
                     break;
                     default:
-                        PyErr_SetString(PyExc_ValueError,
+                        set_value_error(
                             "XU.Qconversion(c): axis determination: no valid "
                             "rotation sense given");
                         return 1;
@@ -492,7 +519,7 @@ int determine_axes_directions(fp_rot *fp_circles, char *stringAxis,
                         fp_circles[i] = &rotation_zm;
                     break;
                     default:
-                        PyErr_SetString(PyExc_ValueError,
+                        set_value_error(
                             "XU.Qconversion(c): axis determination: no valid "
                             "rotation sense given");
                         return 1;
@@ -502,7 +529,7 @@ int determine_axes_directions(fp_rot *fp_circles, char *stringAxis,
                 fp_circles[i] = &rotation_kappa;
             break;
             default:
-                PyErr_SetString(PyExc_ValueError,
+                set_value_error(
                     "XU.Qconversion(c): axis determination: no valid axis "
                     "direction given");
                 return 2;
@@ -530,7 +557,7 @@ int determine_axes_directions_apply(fp_rot *fp_circles, char *stringAxis,
                         fp_circles[i] = &apply_xm;
                     break;
                     default:
-                        PyErr_SetString(PyExc_ValueError,
+                        set_value_error(
                             "XU.Qconversion(c): axis determination: no valid "
                             "rotation sense given");
                         return 1;
@@ -545,7 +572,7 @@ int determine_axes_directions_apply(fp_rot *fp_circles, char *stringAxis,
                         fp_circles[i] = &apply_ym;
                     break;
                     default:
-                        PyErr_SetString(PyExc_ValueError,
+                        set_value_error(
                             "XU.Qconversion(c): axis determination: no valid "
                             "rotation sense given");
                         return 1;
@@ -560,7 +587,7 @@ int determine_axes_directions_apply(fp_rot *fp_circles, char *stringAxis,
                         fp_circles[i] = &apply_zm;
                     break;
                     default:
-                        PyErr_SetString(PyExc_ValueError,
+                        set_value_error(
                             "XU.Qconversion(c): axis determination: no valid "
                             "rotation sense given");
                         return 1;
@@ -578,14 +605,14 @@ int determine_axes_directions_apply(fp_rot *fp_circles, char *stringAxis,
                         fp_circles[i] = &apply_tz;
                     break;
                     default:
-                        PyErr_SetString(PyExc_ValueError,
+                        set_value_error(
                             "XU.Qconversion(c): axis determination: no valid "
                             "translation given");
                         return 1;
                 }
             break;
             default:
-                PyErr_SetString(PyExc_ValueError,
+                set_value_error(
                     "XU.Qconversion(c): axis determination: no valid axis "
                     "direction given");
                 return 2;
@@ -622,6 +649,265 @@ int tilt_detector_axis(double tiltazimuth, double tilt,
     return 0;
 }
 
+/***********************************************
+ *  detector geometry for linear and area      *
+ *  detectors                                  *
+ ***********************************************/
+
+int detector_pixels_linear(double *rcch, double cch, double dpixel, int *roi,
+                           char *dir, double tilt, double *rpix)
+   /* calculate the position of the channels of a linear detector relative
+    * to the center of rotation for zero detector angles
+    *
+    *   Parameters
+    *   ----------
+    *   rcch ............ direction + distance of center channel (angles zero)
+    *   cch ............. center channel of the detector
+    *   dpixel .......... width of one pixel, same unit as distance rcch
+    *   roi ............. region of interest of the detector
+    *   dir ............. direction of the detector, e.g.: "x+"
+    *   tilt ............ tilt of the detector direction from dir
+    *   rpix ............ position of the channels (Nch, 3) (OUTPUT array)
+    *   */
+{
+    double rpixel[3], rcchp[3];  /* pixel vector and center position */
+    double r_i[3];  /* center channel direction */
+    int j, k;  /* loop indices */
+
+    veccopy(r_i, rcch);
+    normalize(r_i);
+    /* determine detector pixel vector */
+    if (determine_detector_pixel(rpixel, dir, dpixel, r_i, tilt) != 0) {
+        return -1;
+    }
+    for (k = 0; k < 3; ++k) {
+        rcchp[k] = rpixel[k] * cch;
+    }
+
+    for (j = roi[0]; j < roi[1]; ++j) {
+        for (k = 0; k < 3; ++k) {
+            rpix[3 * (j - roi[0]) + k] = j * rpixel[k] - rcchp[k];
+        }
+        sumvec(&rpix[3 * (j - roi[0])], rcch);
+    }
+    return 0;
+}
+
+int detector_pixels_area(double *rcch, double cch1, double cch2,
+                         double dpixel1, double dpixel2, int *roi,
+                         char *dir1, char *dir2, double tiltazimuth,
+                         double tilt, double *rpix)
+   /* calculate the position of the pixels of an area detector relative to
+    * the center of rotation for zero detector angles
+    *
+    *   Parameters
+    *   ----------
+    *   rcch ............ direction + distance of center pixel (angles zero)
+    *   cch1 ............ center channel of the detector
+    *   cch2 ............ center channel of the detector
+    *   dpixel1 ......... width of one pixel in first direction, same unit as
+    *                     distance rcch
+    *   dpixel2 ......... width of one pixel in second direction, same unit as
+    *                     distance rcch
+    *   roi ............. region of interest for the area detector
+    *                     [dir1min, dir1max, dir2min, dir2max]
+    *   dir1 ............ first direction of the detector, e.g.: "x+"
+    *   dir2 ............ second direction of the detector, e.g.: "z+"
+    *   tiltazimuth ..... azimuth of the tilt
+    *   tilt ............ tilt of the detector plane (rotation around axis
+    *                     normal to the direction given by the tiltazimuth
+    *   rpix ............ position of the pixels (Npix1 * Npix2, 3) (OUTPUT
+    *                     array)
+    *   */
+{
+    double rpixel1[3], rpixel2[3], rcchp[3];  /* pixel vectors and center */
+    double r_i[3];  /* center channel direction */
+    int j1, j2, k;  /* loop indices */
+    double *rd;  /* position of the current pixel */
+
+    veccopy(r_i, rcch);
+    normalize(r_i);
+
+    /* determine detector pixel vector */
+    if (determine_detector_pixel(rpixel1, dir1, dpixel1, r_i, 0.) != 0) {
+        return -1;
+    }
+    if (determine_detector_pixel(rpixel2, dir2, dpixel2, r_i, 0.) != 0) {
+        return -1;
+    }
+
+    /* rotate detector pixel vectors according to tilt */
+    tilt_detector_axis(tiltazimuth, tilt, rpixel1, rpixel2);
+
+    /* calculate center channel position in detector plane */
+    for (k = 0; k < 3; ++k) {
+        rcchp[k] = rpixel1[k] * cch1 + rpixel2[k] * cch2;
+    }
+
+    rd = rpix;
+    for (j1 = roi[0]; j1 < roi[1]; ++j1) {
+        for (j2 = roi[2]; j2 < roi[3]; ++j2) {
+            for (k = 0; k < 3; ++k) {
+                rd[k] = j1 * rpixel1[k] + j2 * rpixel2[k] - rcchp[k];
+            }
+            sumvec(rd, rcch);
+            rd += 3;
+        }
+    }
+    return 0;
+}
+
+PyObject* py_ang2q_detector_linear(PyObject *self, PyObject *args)
+   /* calculate the position of the channels of a linear detector for zero
+    * detector angles. The result can be reused in all conversions with the
+    * same detector parameters.
+    *
+    *   Parameters
+    *   ----------
+    *   rcch ............ direction + distance of center channel (angles zero)
+    *   cch ............. center channel of the detector
+    *   dpixel .......... width of one pixel, same unit as distance rcch
+    *   roi ............. region of interest of the detector
+    *   dir ............. direction of the detector, e.g.: "x+"
+    *   tilt ............ tilt of the detector direction from dir
+    *
+    *   Returns
+    *   -------
+    *   rpix ............ position of the channels relative to the center of
+    *                     rotation (Nch, 3)
+    *   */
+{
+    int r;  /* return value checking */
+    double cch, dpixel, tilt;  /* detector parameters */
+    char *dir;  /* detector direction */
+    double *rcch, *rpix;  /* c-arrays for further usage */
+    int *roi;  /* region of interest integer array */
+    npy_intp nout[2];
+    PyArrayObject *rcchArr = NULL, *roiArr = NULL, *rpixArr = NULL;
+
+    /* Python argument conversion code */
+    if (!PyArg_ParseTuple(args, "O!ddO!sd",
+                          &PyArray_Type, &rcchArr,
+                          &cch, &dpixel, &PyArray_Type, &roiArr,
+                          &dir, &tilt)) {
+        return NULL;
+    }
+
+    /* check Python array dimensions and types */
+    PYARRAY_CHECK(rcchArr, 1, NPY_DOUBLE, "rcch must be a 1D double array");
+    if (PyArray_SIZE(rcchArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "rcch needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(roiArr, 1, NPY_INT32, "roi must be a 1D int array");
+    if (PyArray_SIZE(roiArr) != 2) {
+        PyErr_SetString(PyExc_ValueError, "roi must be of length 2");
+        return NULL;
+    }
+
+    rcch = (double *) PyArray_DATA(rcchArr);
+    roi = (int *) PyArray_DATA(roiArr);
+
+    /* create output ndarray */
+    nout[0] = roi[1] - roi[0];
+    nout[1] = 3;
+    rpixArr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_DOUBLE);
+    rpix = (double *) PyArray_DATA(rpixArr);
+
+    r = detector_pixels_linear(rcch, cch, dpixel, roi, dir, tilt, rpix);
+
+    /* clean up */
+    Py_DECREF(rcchArr);
+    Py_DECREF(roiArr);
+    if (r != 0) {
+        Py_DECREF(rpixArr);
+        return NULL;
+    }
+
+    return PyArray_Return(rpixArr);
+}
+
+PyObject* py_ang2q_detector_area(PyObject *self, PyObject *args)
+   /* calculate the position of the pixels of an area detector for zero
+    * detector angles. The result can be reused in all conversions with the
+    * same detector parameters.
+    *
+    *   Parameters
+    *   ----------
+    *   rcch ............ direction + distance of center pixel (angles zero)
+    *   cch1 ............ center channel of the detector
+    *   cch2 ............ center channel of the detector
+    *   dpixel1 ......... width of one pixel in first direction, same unit as
+    *                     distance rcch
+    *   dpixel2 ......... width of one pixel in second direction, same unit as
+    *                     distance rcch
+    *   roi ............. region of interest for the area detector
+    *                     [dir1min, dir1max, dir2min, dir2max]
+    *   dir1 ............ first direction of the detector, e.g.: "x+"
+    *   dir2 ............ second direction of the detector, e.g.: "z+"
+    *   tiltazimuth ..... azimuth of the tilt
+    *   tilt ............ tilt of the detector plane (rotation around axis
+    *                     normal to the direction given by the tiltazimuth
+    *
+    *   Returns
+    *   -------
+    *   rpix ............ position of the pixels relative to the center of
+    *                     rotation (Npix1, Npix2, 3)
+    *   */
+{
+    int r;  /* return value checking */
+    double cch1, cch2, dpixel1, dpixel2, tilt, tiltazimuth;
+    char *dir1, *dir2;  /* detector directions */
+    double *rcch, *rpix;  /* c-arrays for further usage */
+    int *roi;  /* region of interest integer array */
+    npy_intp nout[3];
+    PyArrayObject *rcchArr = NULL, *roiArr = NULL, *rpixArr = NULL;
+
+    /* Python argument conversion code */
+    if (!PyArg_ParseTuple(args, "O!ddddO!ssdd",
+                          &PyArray_Type, &rcchArr,
+                          &cch1, &cch2, &dpixel1, &dpixel2,
+                          &PyArray_Type, &roiArr,
+                          &dir1, &dir2, &tiltazimuth, &tilt)) {
+        return NULL;
+    }
+
+    /* check Python array dimensions and types */
+    PYARRAY_CHECK(rcchArr, 1, NPY_DOUBLE, "rcch must be a 1D double array");
+    if (PyArray_SIZE(rcchArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "rcch needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(roiArr, 1, NPY_INT32, "roi must be a 1D int array");
+    if (PyArray_SIZE(roiArr) != 4) {
+        PyErr_SetString(PyExc_ValueError, "roi must be of length 4");
+        return NULL;
+    }
+
+    rcch = (double *) PyArray_DATA(rcchArr);
+    roi = (int *) PyArray_DATA(roiArr);
+
+    /* create output ndarray */
+    nout[0] = roi[1] - roi[0];
+    nout[1] = roi[3] - roi[2];
+    nout[2] = 3;
+    rpixArr = (PyArrayObject *) PyArray_SimpleNew(3, nout, NPY_DOUBLE);
+    rpix = (double *) PyArray_DATA(rpixArr);
+
+    r = detector_pixels_area(rcch, cch1, cch2, dpixel1, dpixel2, roi, dir1,
+                             dir2, tiltazimuth, tilt, rpix);
+
+    /* clean up */
+    Py_DECREF(rcchArr);
+    Py_DECREF(roiArr);
+    if (r != 0) {
+        Py_DECREF(rpixArr);
+        return NULL;
+    }
+
+    return PyArray_Return(rpixArr);
+}
+
 /***********************************************
  *  QConversion functions for point detector   *
  ***********************************************/
@@ -654,6 +940,7 @@ PyObject* py_ang2q_conversion(PyObject *self, PyObject *args)
     *                    the code
     *    flags ......... integer with flags: (1: has_translations;
     *                                         4: has_sampledis;
+    *                                         8: float32 output;
     *                                         16: verbose)
     *
     *   Returns
@@ -668,7 +955,8 @@ PyObject* py_ang2q_conversion(PyObject *self, PyObject *args)
     unsigned int nthreads;  /* number of threads to use */
     char *sampleAxis, *detectorAxis;  /* str with sample and detector axis */
     double *sampleAngles,*detectorAngles, *ri, *kappadir, *sampledis,
-           *UB, *qpos, *lambda;  /* c-arrays for further usage */
+           *UB, *lambda;  /* c-arrays for further usage */
+    void *qpos;  /* output array (double or float) */
     int flags;
     npy_intp nout[2];
 
@@ -746,8 +1034,9 @@ PyObject* py_ang2q_conversion(PyObject *self, PyObject *args)
     /* create output ndarray */
     nout[0] = Npoints;
     nout[1] = 3;
-    qposArr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_DOUBLE);
-    qpos = (double *) PyArray_DATA(qposArr);
+    qposArr = (PyArrayObject *) PyArray_SimpleNew(
+        2, nout, (flags & OUTPUT_FLOAT32) ? NPY_FLOAT32 : NPY_DOUBLE);
+    qpos = PyArray_DATA(qposArr);
 
     #ifdef __OPENMP__
     /* set openmp thread numbers dynamically */
@@ -755,6 +1044,7 @@ PyObject* py_ang2q_conversion(PyObject *self, PyObject *args)
     #endif
 
     /* call worker function */
+    Py_BEGIN_ALLOW_THREADS
     if (flags & HAS_SAMPLEDIS) {
         if (flags & HAS_TRANSLATIONS) {
             r = ang2q_conversion_sdtrans(
@@ -783,6 +1073,7 @@ PyObject* py_ang2q_conversion(PyObject *self, PyObject *args)
                     Npoints, Ns, Nd, flags, qpos);
         }
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(sampleAnglesArr);
@@ -805,7 +1096,7 @@ int ang2q_conversion(double *sampleAngles, double *detectorAngles,
                      double *ri, char *sampleAxis, char *detectorAxis,
                      double *kappadir, double *UB, double *lambda,
                      int Npoints, int Ns, int Nd, int flags,
-                     double *qpos)
+                     void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for a setup with point detector
     *
@@ -827,8 +1118,9 @@ int ang2q_conversion(double *sampleAngles, double *detectorAngles,
     *    Npoints ....... number of points to calculate
     *    Ns ............ number of sample axes
     *    Nd ............ number of detector axes
-    *    flags ......... general flags integer (verbosity)
-    *    qpos .......... momentum transfer (Npoints, 3) (OUTPUT array)
+    *    flags ......... general flags integer (verbosity, float32 output)
+    *    qpos .......... momentum transfer (Npoints, 3) (OUTPUT array, double
+    *                   or float depending on the flags)
     *
     *   */
 {
@@ -887,7 +1179,7 @@ int ang2q_conversion(double *sampleAngles, double *detectorAngles,
          * calculate the momentum transfer */
         veccopy(ki, local_ri);  /* ki is now normalized ri */
         vecmul(ki, M_2PI / lambda[i]); /* scales k_i */
-        matvec(ms, ki, &qpos[3 * i]);
+        matvec_out(ms, ki, qpos, 3 * i, flags);
     }
     return 0;
 }
@@ -897,7 +1189,7 @@ int ang2q_conversion_sd(
         double *sampleAngles, double *detectorAngles, double *ri,
         char *sampleAxis, char *detectorAxis, double *kappadir, double *UB,
         double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int flags, double *qpos)
+        int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for a setup with point detector including the effect of a sample
     * displacement error.
@@ -922,8 +1214,9 @@ int ang2q_conversion_sd(
     *    Npoints ....... number of points to calculate
     *    Ns ............ number of sample axes
     *    Nd ............ number of detector axes
-    *    flags ......... general flags integer (verbosity)
-    *    qpos .......... momentum transfer (Npoints, 3) (OUTPUT array)
+    *    flags ......... general flags integer (verbosity, float32 output)
+    *    qpos .......... momentum transfer (Npoints, 3) (OUTPUT array, double
+    *                   or float depending on the flags)
     *
     *   */
 {
@@ -984,7 +1277,7 @@ int ang2q_conversion_sd(
         /* mtemp now contains the momentum transfer which will be
          * transformed to the sample q-coordinate system.
          * calculate the momentum transfer */
-        matvec(ms, mtemp, &qpos[3 * i]);
+        matvec_out(ms, mtemp, qpos, 3 * i, flags);
     }
     return 0;
 }
@@ -993,7 +1286,7 @@ int ang2q_conversion_sd(
 int ang2q_conversion_trans(
         double *sampleAngles, double *detectorAngles, double *ri,
         char *sampleAxis, char *detectorAxis, double *kappadir, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int flags, double *qpos)
+        double *lambda, int Npoints, int Ns, int Nd, int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for a setup with point detector and detector translations
     *
@@ -1015,8 +1308,9 @@ int ang2q_conversion_trans(
     *    Npoints ....... number of points to calculate
     *    Ns ............ number of sample axes
     *    Nd ............ number of detector axes
-    *    flags ......... general flags integer (verbosity)
-    *    qpos .......... momentum transfer (Npoints, 3) (OUTPUT array)
+    *    flags ......... general flags integer (verbosity, float32 output)
+    *    qpos .......... momentum transfer (Npoints, 3) (OUTPUT array, double
+    *                   or float depending on the flags)
     *
     *   */
 {
@@ -1073,7 +1367,7 @@ int ang2q_conversion_trans(
          * the momentum transfer.
          * calculate the momentum transfer */
         vecmul(rd, M_2PI / lambda[i]); /* scales by k */
-        matvec(ms, rd, &qpos[3 * i]);
+        matvec_out(ms, rd, qpos, 3 * i, flags);
     }
     return 0;
 }
@@ -1083,7 +1377,7 @@ int ang2q_conversion_sdtrans(
         double *sampleAngles, double *detectorAngles, double *ri,
         char *sampleAxis, char *detectorAxis, double *kappadir, double *UB,
         double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int flags, double *qpos)
+        int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for a setup with point detector including the effect of a sample
     * displacement error and detector translations
@@ -1108,8 +1402,9 @@ int ang2q_conversion_sdtrans(
     *    Npoints ....... number of points to calculate
     *    Ns ............ number of sample axes
     *    Nd ............ number of detector axes
-    *    flags ......... general flags integer (verbosity)
-    *    qpos .......... momentum transfer (Npoints, 3) (OUTPUT array)
+    *    flags ......... general flags integer (verbosity, float32 output)
+    *    qpos .......... momentum transfer (Npoints, 3) (OUTPUT array, double
+    *                   or float depending on the flags)
     *
     *   */
 {
@@ -1155,6 +1450,7 @@ int ang2q_conversion_sdtrans(
         inversemat(mtemp, ms);
 
         /* determine detector rotations */
+        veccopy(rd, ri);
         for (j = Nd - 1; j >= 0; --j) {
             detectorRotation[j](detectorAngles[Nd * i + j], rd);
         }
@@ -1167,50 +1463,391 @@ int ang2q_conversion_sdtrans(
         /* rd now contains the momentum transfer which will be
          * transformed to the sample q-coordinate system.
          * calculate the momentum transfer */
-        matvec(ms, rd, &qpos[3 * i]);
+        matvec_out(ms, rd, qpos, 3 * i, flags);
     }
     return 0;
 }
 
 
-/***********************************************
- *  QConversion functions for linear detector  *
- ***********************************************/
+/*****************************************************
+ *  derivatives of the point detector conversion     *
+ *****************************************************/
+
+INLINE void rotation_derivative(fp_rot rot, double a, double *RESTRICT kappadir,
+                                double *RESTRICT mat) {
+    /* derivative of the rotation matrix generated by rot with respect to
+     * the rotation angle a. For any rotation R(a) around an axis e
+     * dR/da = R(a + pi/2) - (1 + R(pi)) / 2, since 1 + R(pi) = 2 e o e */
+    double mtemp[9], mid[9];
+
+    veccopy(mat, kappadir);
+    rot(a + M_PI / 2., mat);
+    veccopy(mtemp, kappadir);
+    rot(M_PI, mtemp);
+    ident(mid);
+    summat(mtemp, mid);
+    matmulc(mtemp, 0.5);
+    diffmat(mat, mtemp);
+}
 
-PyObject* py_ang2q_conversion_linear(PyObject *self, PyObject *args)
-   /* conversion of Npoints of goniometer positions to reciprocal space
-    * for a linear detector with a given pixel size mounted along one of the
-    * coordinate axis. This is the python wrapper function which should be
-    * called by the user. It offers one common interface to the outside
-    * although internally several performance optimized variants are called.
+INLINE void apply_derivative(fp_rot apply, int translation, double a,
+                             double *vec) {
+    /* derivative of the rotation/translation apply with respect to its
+     * parameter a applied to the vector vec (overwritten by the result) */
+    double v1[3], v2[3];
+
+    if (translation) {
+        vec[0] = 0.; vec[1] = 0.; vec[2] = 0.;
+        apply(1., vec);
+    }
+    else {
+        veccopy(v1, vec);
+        apply(a + M_PI / 2., v1);
+        veccopy(v2, vec);
+        apply(M_PI, v2);
+        sumvec(v2, vec);
+        vecmul(v2, 0.5);
+        diffvec(v1, v2);
+        veccopy(vec, v1);
+    }
+}
+
+int ang2q_conversion_jacobian(
+        double *sampleAngles, double *detectorAngles, double *ri,
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *UB,
+        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
+        int flags, double *jac)
+   /* derivatives of the momentum transfer calculated for a setup with point
+    * detector with respect to all goniometer angles/translations.  The
+    * derivatives are calculated analytically from the rotation matrices and
+    * include the effect of detector translations and a sample displacement
     *
     *   Parameters
     *   ----------
-    *   sampleAngles .... angular positions of the goniometer (Npoints, Ns)
-    *   detectorAngles .. angular positions of the detector goniometer
-    *                     (Npoints, Nd)
-    *   rcch ............ direction + distance of center channel (angles zero)
-    *   sampleAxis ...... string with sample axis directions
-    *   detectorAxis .... string with detector axis directions
-    *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch ............. center channel of the detector
-    *   dpixel .......... width of one pixel, same unit as distance rcch
-    *   roi ............. region of interest of the detector
-    *   dir ............. direction of the detector, e.g.: "x+"
-    *   tilt ............ tilt of the detector direction from dir
-    *   UB .............. orientation matrix and reciprocal space conversion
-    *                     of investigated crystal (3, 3)
-    *   sampledis ....... sample displacement vector, same units as the
-    *                     detector distance
-    *   lambda .......... wavelength of the used x-rays in Angstroem (Npoints,)
-    *   nthreads ........ number of threads to use in parallel section of
-    *                     the code
-    *   flags ........... integer with flags: (1: has_translations;
-    *                                          4: has_sampledis;
-    *                                          16: verbose)
-    *
-    *   Returns
-    *   -------
+    *    sampleAngles .. angular positions of the sample goniometer
+    *                    (Npoints, Ns)
+    *    detectorAngles. angular positions of the detector goniometer
+    *                    (Npoints, Nd)
+    *    ri ............ direction of primary beam (length of detector distance)
+    *                    (angles zero)
+    *    sampleAxis .... string with sample axis directions
+    *    detectorAxis .. string with detector axis directions
+    *    kappadir ...... rotation axis of a possible kappa circle
+    *    UB ............ orientation matrix and reciprocal space
+    *                    conversion of the investigated crystal (3, 3)
+    *    sampledis ..... sample displacement vector in relative units of
+    *                    the detector distance
+    *    lambda ........ wavelength of the used x-rays as array (Npoints,)
+    *                    in units of Angstreom
+    *    Npoints ....... number of points to calculate
+    *    Ns ............ number of sample axes
+    *    Nd ............ number of detector axes
+    *    flags ......... general flags integer (verbosity)
+    *    jac ........... derivatives of the momentum transfer with respect to
+    *                    the sample and detector angles (in radians) or
+    *                    translations (Npoints, Ns + Nd, 3) (OUTPUT array)
+    *
+    *   */
+{
+    double mtemp[9], mtemp2[9], ms[9], dm[9];  /* matrices */
+    double local_ri[3], rd[3], q[3], v[3], w[3];  /* vectors */
+    double nrd, k;
+    int i, j, l;  /* needed indices */
+    int ret = 0;
+    /* arrays with function pointers to rotation matrix functions */
+    fp_rot *sampleRotation = malloc(Ns * sizeof(fp_rot));
+    fp_rot *detectorRotation = malloc(Nd * sizeof(fp_rot));
+    int *translation = malloc(Nd * sizeof(int));
+
+    /* determine axes directions */
+    if (determine_axes_directions(sampleRotation, sampleAxis, Ns) != 0 ||
+        determine_axes_directions_apply(detectorRotation,
+                                        detectorAxis, Nd) != 0) {
+        ret = -1;
+        goto cleanup;
+    }
+    for (j = 0; j < Nd; ++j) {
+        translation[j] = (tolower(detectorAxis[2 * j]) == 't');
+    }
+
+    /* give ri correct length */
+    veccopy(local_ri, ri);
+    normalize(local_ri);
+
+    #pragma omp parallel for default(shared) \
+            private(i, j, l, mtemp, mtemp2, ms, dm, rd, q, v, w, nrd, k) \
+            schedule(static)
+    for (i = 0; i < Npoints; ++i) {
+        k = M_2PI / lambda[i];
+        /* determine sample rotations */
+        ident(mtemp);
+        for (j = 0; j < Ns; ++j) {
+            veccopy(mtemp2, kappadir);
+            sampleRotation[j](sampleAngles[Ns * i + j], mtemp2);
+            matmul(mtemp, mtemp2);
+        }
+        matmul(mtemp, UB);
+        inversemat(mtemp, ms);
+
+        /* detector position including the sample displacement */
+        veccopy(rd, ri);
+        for (j = Nd - 1; j >= 0; --j) {
+            detectorRotation[j](detectorAngles[Nd * i + j], rd);
+        }
+        diffvec(rd, sampledis);
+        nrd = norm(rd);
+        vecmul(rd, 1. / nrd);
+
+        /* lab frame momentum transfer and its sample frame representation
+         * before the application of the sample rotations */
+        veccopy(w, rd);
+        diffvec(w, local_ri);
+        vecmul(w, k);
+        matvec(ms, w, q);
+        matvec(UB, q, v);
+
+        /* sample circles: dq = - (S UB)^-1 . dS . (UB q) */
+        for (j = 0; j < Ns; ++j) {
+            veccopy(w, v);
+            for (l = Ns - 1; l >= 0; --l) {
+                if (l == j) {
+                    rotation_derivative(sampleRotation[l],
+                                        sampleAngles[Ns * i + l],
+                                        kappadir, dm);
+                }
+                else {
+                    veccopy(dm, kappadir);
+                    sampleRotation[l](sampleAngles[Ns * i + l], dm);
+                }
+                veccopy(q, w);
+                matvec(dm, q, w);
+            }
+            matvec(ms, w, q);
+            vecmul(q, -1.);
+            veccopy(&jac[3 * ((Ns + Nd) * i + j)], q);
+        }
+
+        /* detector circles: derivative of the normalized detector direction
+         * transformed to the sample frame */
+        for (j = 0; j < Nd; ++j) {
+            veccopy(w, ri);
+            for (l = Nd - 1; l > j; --l) {
+                detectorRotation[l](detectorAngles[Nd * i + l], w);
+            }
+            apply_derivative(detectorRotation[j], translation[j],
+                             detectorAngles[Nd * i + j], w);
+            for (l = j - 1; l >= 0; --l) {
+                if (!translation[l]) {
+                    detectorRotation[l](detectorAngles[Nd * i + l], w);
+                }
+            }
+            /* derivative of the normalization */
+            veccopy(v, rd);
+            vecmul(v, rd[0] * w[0] + rd[1] * w[1] + rd[2] * w[2]);
+            diffvec(w, v);
+            vecmul(w, k / nrd);
+            matvec(ms, w, &jac[3 * ((Ns + Nd) * i + Ns + j)]);
+        }
+    }
+
+cleanup:
+    free(sampleRotation);
+    free(detectorRotation);
+    free(translation);
+    return ret;
+}
+
+PyObject* py_ang2q_conversion_jacobian(PyObject *self, PyObject *args)
+   /* derivatives of the momentum transfer calculated for a setup with point
+    * detector with respect to the goniometer angles. This is the python
+    * wrapper function with the same arguments as py_ang2q_conversion.
+    *
+    *   Parameters
+    *   ----------
+    *    sampleAngles .. angular positions of the sample goniometer
+    *                    (Npoints, Ns)
+    *    detectorAngles. angular positions of the detector goniometer
+    *                    (Npoints, Nd)
+    *    ri ............ direction of primary beam (length of detector distance)
+    *                    (angles zero)
+    *    sampleAxis .... string with sample axis directions
+    *    detectorAxis .. string with detector axis directions
+    *    kappadir ...... rotation axis of a possible kappa circle
+    *    UB ............ orientation matrix and reciprocal space
+    *                    conversion of the investigated crystal (3, 3)
+    *    sampledis ..... sample displacement vector in relative units of
+    *                    the detector distance
+    *    lambda ........ wavelength of the used x-rays as array (Npoints,)
+    *                    in units of Angstreom
+    *    nthreads ...... number of threads to use in parallel section of
+    *                    the code
+    *    flags ......... integer with flags: (4: has_sampledis;
+    *                                         16: verbose)
+    *
+    *   Returns
+    *   -------
+    *    jac ........... derivatives of the momentum transfer with respect to
+    *                    the angles (in radians) and translations
+    *                    (Npoints, Ns + Nd, 3)
+    *
+    *   */
+{
+    int Ns, Nd;  /* number of sample and detector circles */
+    int Npoints;  /* number of angular positions */
+    int r;  /* for return value checking */
+    unsigned int nthreads;  /* number of threads to use */
+    char *sampleAxis, *detectorAxis;  /* str with sample and detector axis */
+    double *sampleAngles, *detectorAngles, *ri, *kappadir, *sampledis,
+           *UB, *lambda, *jac;  /* c-arrays for further usage */
+    double nosampledis[3] = {0., 0., 0.};
+    int flags;
+    npy_intp nout[3];
+
+    /* numpy arrays */
+    PyArrayObject *sampleAnglesArr = NULL, *detectorAnglesArr = NULL,
+                  *riArr = NULL, *kappadirArr = NULL, *sampledisArr = NULL,
+                  *UBArr = NULL, *jacArr = NULL, *lambdaArr = NULL;
+
+    /* Python argument conversion code */
+    if (!PyArg_ParseTuple(args, "O!O!O!ssO!O!O!O!Ii",
+                          &PyArray_Type, &sampleAnglesArr,
+                          &PyArray_Type, &detectorAnglesArr,
+                          &PyArray_Type, &riArr,
+                          &sampleAxis, &detectorAxis,
+                          &PyArray_Type, &kappadirArr,
+                          &PyArray_Type, &UBArr,
+                          &PyArray_Type, &sampledisArr,
+                          &PyArray_Type, &lambdaArr, &nthreads, &flags)) {
+        return NULL;
+    }
+
+    /* check Python array dimensions and types */
+    PYARRAY_CHECK(sampleAnglesArr, 2, NPY_DOUBLE,
+                  "sampleAngles must be a 2D double array");
+    PYARRAY_CHECK(detectorAnglesArr, 2, NPY_DOUBLE,
+                  "detectorAngles must be a 2D double array");
+    PYARRAY_CHECK(lambdaArr, 1, NPY_DOUBLE,
+                  "wavelength must be a 1D double array");
+    PYARRAY_CHECK(riArr, 1, NPY_DOUBLE,
+                  "r_i must be a 1D double array");
+    if (PyArray_SIZE(riArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "r_i needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(sampledisArr, 1, NPY_DOUBLE,
+                  "sampledis must be a 1D double array");
+    if (PyArray_SIZE(sampledisArr) != 3) {
+        PyErr_SetString(PyExc_ValueError,"sampledis needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(kappadirArr, 1, NPY_DOUBLE,
+                  "kappa_dir must be a 1D double array");
+    if (PyArray_SIZE(kappadirArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "kappa_dir needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(UBArr, 2, NPY_DOUBLE, "UB must be a 2D double array");
+    if (PyArray_DIMS(UBArr)[0] != 3 || PyArray_DIMS(UBArr)[1] != 3) {
+        PyErr_SetString(PyExc_ValueError, "UB must be of shape (3, 3)");
+        return NULL;
+    }
+
+    Npoints = (int) PyArray_DIMS(sampleAnglesArr)[0];
+    Ns = (int) PyArray_DIMS(sampleAnglesArr)[1];
+    Nd = (int) PyArray_DIMS(detectorAnglesArr)[1];
+    if (PyArray_DIMS(detectorAnglesArr)[0] != Npoints) {
+        PyErr_SetString(PyExc_ValueError,
+            "detectorAngles and sampleAngles must have same first dimension");
+        return NULL;
+    }
+    if (PyArray_SIZE(lambdaArr) != Npoints) {
+        PyErr_SetString(PyExc_ValueError,
+            "size of wavelength array need to fit with angle arrays");
+        return NULL;
+    }
+
+    sampleAngles = (double *) PyArray_DATA(sampleAnglesArr);
+    detectorAngles = (double *) PyArray_DATA(detectorAnglesArr);
+    lambda = (double *) PyArray_DATA(lambdaArr);
+    ri = (double *) PyArray_DATA(riArr);
+    sampledis = (flags & HAS_SAMPLEDIS) ?
+                (double *) PyArray_DATA(sampledisArr) : nosampledis;
+    kappadir = (double *) PyArray_DATA(kappadirArr);
+    UB = (double *) PyArray_DATA(UBArr);
+
+    /* create output ndarray */
+    nout[0] = Npoints;
+    nout[1] = Ns + Nd;
+    nout[2] = 3;
+    jacArr = (PyArrayObject *) PyArray_SimpleNew(3, nout, NPY_DOUBLE);
+    jac = (double *) PyArray_DATA(jacArr);
+
+    #ifdef __OPENMP__
+    /* set openmp thread numbers dynamically */
+    OMPSETNUMTHREADS(nthreads);
+    #endif
+
+    /* call worker function */
+    Py_BEGIN_ALLOW_THREADS
+    r = ang2q_conversion_jacobian(
+            sampleAngles, detectorAngles, ri, sampleAxis, detectorAxis,
+            kappadir, UB, sampledis, lambda, Npoints, Ns, Nd, flags, jac);
+    Py_END_ALLOW_THREADS
+
+    /* clean up */
+    Py_DECREF(sampleAnglesArr);
+    Py_DECREF(detectorAnglesArr);
+    Py_DECREF(riArr);
+    Py_DECREF(kappadirArr);
+    Py_DECREF(UBArr);
+    Py_DECREF(sampledisArr);
+    Py_DECREF(lambdaArr);
+    if (r != 0) {
+        Py_DECREF(jacArr);
+        return NULL;
+    }
+
+    return PyArray_Return(jacArr);
+}
+
+
+/***********************************************
+ *  QConversion functions for linear detector  *
+ ***********************************************/
+
+PyObject* py_ang2q_conversion_linear(PyObject *self, PyObject *args)
+   /* conversion of Npoints of goniometer positions to reciprocal space
+    * for a linear detector with a given pixel size mounted along one of the
+    * coordinate axis. This is the python wrapper function which should be
+    * called by the user. It offers one common interface to the outside
+    * although internally several performance optimized variants are called.
+    *
+    *   Parameters
+    *   ----------
+    *   sampleAngles .... angular positions of the goniometer (Npoints, Ns)
+    *   detectorAngles .. angular positions of the detector goniometer
+    *                     (Npoints, Nd)
+    *   rcch ............ direction + distance of center channel (angles zero)
+    *   sampleAxis ...... string with sample axis directions
+    *   detectorAxis .... string with detector axis directions
+    *   kappadir ........ rotation axis of a possible kappa circle
+    *   rpix ............ position of the detector channels relative to the
+    *                     center of rotation at zero detector angles (Nch, 3),
+    *                     see py_ang2q_detector_linear
+    *   UB .............. orientation matrix and reciprocal space conversion
+    *                     of investigated crystal (3, 3)
+    *   sampledis ....... sample displacement vector, same units as the
+    *                     detector distance
+    *   lambda .......... wavelength of the used x-rays in Angstroem (Npoints,)
+    *   nthreads ........ number of threads to use in parallel section of
+    *                     the code
+    *   flags ........... integer with flags: (1: has_translations;
+    *                                          4: has_sampledis;
+    *                                          8: float32 output;
+    *                                          16: verbose)
+    *
+    *   Returns
+    *   -------
     *   qpos ............ momentum transfer (Npoints * Nch, 3)
     *   */
 {
@@ -1220,29 +1857,25 @@ PyObject* py_ang2q_conversion_linear(PyObject *self, PyObject *args)
     int r;  /* return value checking */
     int flags;  /* flags to select behavior of the function */
     unsigned int nthreads;  /* number of threads to use */
-    double cch, dpixel, tilt;  /* wavelength and detector parameters */
-    char *sampleAxis, *detectorAxis, *dir;  /* string with sample and
-                                             * detector axis, and
-                                             * detector direction */
-    double *sampleAngles, *detectorAngles, *rcch, *kappadir, *sampledis,
-           *UB, *qpos, *lambda;  /* c-arrays for further usage */
-    int *roi;  /* region of interest integer array */
+    char *sampleAxis, *detectorAxis;  /* sample and detector axis */
+    double *sampleAngles, *detectorAngles, *rcch, *kappadir, *rpix,
+           *sampledis, *UB, *lambda;  /* c-arrays for further usage */
+    void *qpos;  /* output array (double or float) */
     npy_intp nout[2];
 
     PyArrayObject *sampleAnglesArr = NULL, *detectorAnglesArr = NULL,
-                  *rcchArr = NULL, *kappadirArr = NULL, *roiArr = NULL,
+                  *rcchArr = NULL, *kappadirArr = NULL, *rpixArr = NULL,
                   *sampledisArr = NULL, *UBArr = NULL, *qposArr = NULL,
                   *lambdaArr = NULL;
 
     /* Python argument conversion code */
-    if (!PyArg_ParseTuple(args, "O!O!O!ssO!ddO!sdO!O!O!Ii",
+    if (!PyArg_ParseTuple(args, "O!O!O!ssO!O!O!O!O!Ii",
                           &PyArray_Type, &sampleAnglesArr,
                           &PyArray_Type, &detectorAnglesArr,
                           &PyArray_Type, &rcchArr,
                           &sampleAxis, &detectorAxis,
                           &PyArray_Type, &kappadirArr,
-                          &cch, &dpixel, &PyArray_Type, &roiArr,
-                          &dir, &tilt,
+                          &PyArray_Type, &rpixArr,
                           &PyArray_Type, &UBArr,
                           &PyArray_Type, &sampledisArr,
                           &PyArray_Type, &lambdaArr, &nthreads, &flags)) {
@@ -1281,9 +1914,9 @@ PyObject* py_ang2q_conversion_linear(PyObject *self, PyObject *args)
         PyErr_SetString(PyExc_ValueError, "UB must be of shape (3, 3)");
         return NULL;
     }
-    PYARRAY_CHECK(roiArr, 1, NPY_INT32, "roi must be a 1D int array");
-    if (PyArray_SIZE(roiArr) != 2) {
-        PyErr_SetString(PyExc_ValueError, "roi must be of length 2");
+    PYARRAY_CHECK(rpixArr, 2, NPY_DOUBLE, "rpix must be a 2D double array");
+    if (PyArray_DIMS(rpixArr)[1] != 3) {
+        PyErr_SetString(PyExc_ValueError, "rpix must be of shape (Nch, 3)");
         return NULL;
     }
 
@@ -1308,16 +1941,17 @@ PyObject* py_ang2q_conversion_linear(PyObject *self, PyObject *args)
     kappadir = (double *) PyArray_DATA(kappadirArr);
     UB = (double *) PyArray_DATA(UBArr);
     sampledis = (double *) PyArray_DATA(sampledisArr);
-    roi = (int *) PyArray_DATA(roiArr);
+    rpix = (double *) PyArray_DATA(rpixArr);
 
-    /* derived values from input parameters */
-    Nch = roi[1] - roi[0];  /* number of channels */
+    /* number of channels in the region of interest */
+    Nch = (int) PyArray_DIMS(rpixArr)[0];
 
     /* create output ndarray */
     nout[0] = Npoints * Nch;
     nout[1] = 3;
-    qposArr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_DOUBLE);
-    qpos = (double *) PyArray_DATA(qposArr);
+    qposArr = (PyArrayObject *) PyArray_SimpleNew(
+        2, nout, (flags & OUTPUT_FLOAT32) ? NPY_FLOAT32 : NPY_DOUBLE);
+    qpos = PyArray_DATA(qposArr);
 
     #ifdef __OPENMP__
     /* set openmp thread numbers dynamically */
@@ -1325,41 +1959,39 @@ PyObject* py_ang2q_conversion_linear(PyObject *self, PyObject *args)
     #endif
 
     /* call worker function */
+    Py_BEGIN_ALLOW_THREADS
     if (flags & HAS_SAMPLEDIS) {
         if (flags & HAS_TRANSLATIONS) {
             r = ang2q_conversion_linear_sdtrans(
                     sampleAngles, detectorAngles, rcch, sampleAxis,
-                    detectorAxis, kappadir, cch, dpixel, roi, dir, tilt,
-                    UB, sampledis, lambda, Npoints, Ns, Nd, Nch, flags, qpos);
+                    detectorAxis, kappadir, rpix, UB, sampledis, lambda, Npoints, Ns, Nd, Nch, flags, qpos);
         }
         else {
             r = ang2q_conversion_linear_sd(
                     sampleAngles, detectorAngles, rcch, sampleAxis,
-                    detectorAxis, kappadir, cch, dpixel, roi, dir, tilt,
-                    UB, sampledis, lambda, Npoints, Ns, Nd, Nch, flags, qpos);
+                    detectorAxis, kappadir, rpix, UB, sampledis, lambda, Npoints, Ns, Nd, Nch, flags, qpos);
         }
     }
     else {
         if (flags & HAS_TRANSLATIONS) {
             r = ang2q_conversion_linear_trans(
                     sampleAngles, detectorAngles, rcch, sampleAxis,
-                    detectorAxis, kappadir, cch, dpixel, roi, dir, tilt,
-                    UB, lambda, Npoints, Ns, Nd, Nch, flags, qpos);
+                    detectorAxis, kappadir, rpix, UB, lambda, Npoints, Ns, Nd, Nch, flags, qpos);
         }
         else {
             r = ang2q_conversion_linear(
                     sampleAngles, detectorAngles, rcch, sampleAxis,
-                    detectorAxis, kappadir, cch, dpixel, roi, dir, tilt,
-                    UB, lambda, Npoints, Ns, Nd, Nch, flags, qpos);
+                    detectorAxis, kappadir, rpix, UB, lambda, Npoints, Ns, Nd, Nch, flags, qpos);
         }
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(sampleAnglesArr);
     Py_DECREF(detectorAnglesArr);
     Py_DECREF(rcchArr);
     Py_DECREF(kappadirArr);
-    Py_DECREF(roiArr);
+    Py_DECREF(rpixArr);
     Py_DECREF(UBArr);
     Py_DECREF(sampledisArr);
     Py_DECREF(lambdaArr);
@@ -1374,10 +2006,9 @@ PyObject* py_ang2q_conversion_linear(PyObject *self, PyObject *args)
 
 int ang2q_conversion_linear(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch,
-        double dpixel, int *roi, char *dir, double tilt, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int Nch,
-        int flags, double *qpos)
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *lambda, int Npoints, int Ns, int Nd, int Nch,
+        int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for a linear detector with a given pixel size mounted along one of the
     * coordinate axis. This is the python wrapper function which should be
@@ -1393,11 +2024,8 @@ int ang2q_conversion_linear(
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch ............. center channel of the detector
-    *   dpixel .......... width of one pixel, same unit as distance rcch
-    *   roi ............. region of interest of the detector
-    *   dir ............. direction of the detector, e.g.: "x+"
-    *   tilt ............ tilt of the detector direction from dir
+    *   rpix ............ position of the detector channels relative to the
+    *                     center of rotation at zero detector angles (Nch, 3)
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of investigated crystal (3, 3)
     *   lambda .......... wavelength of the used x-rays in Angstroem (Npoints,)
@@ -1406,14 +2034,15 @@ int ang2q_conversion_linear(
     *   Nd .............. number of detector axes
     *   Nch ............. number of channels
     *   flags ........... general flags integer (verbosity)
-    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array)
+    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array,
+    *                     double or float depending on the flags)
     *
     *   */
 {
     double mtemp[9], mtemp2[9], ms[9], md[9];  /* matrices */
-    double rd[3], rpixel[3], rcchp[3];  /* detector position */
+    double rd[3];  /* detector position */
     double r_i[3], rtemp[3];  /* center channel direction */
-    int i, j, k;  /* needed indices */
+    int i, j;  /* needed indices */
     double f;  /* f = M_2PI / lambda */
     fp_rot *sampleRotation = malloc(Ns * sizeof(fp_rot));
     fp_rot *detectorRotation = malloc(Nd * sizeof(fp_rot));
@@ -1428,17 +2057,10 @@ int ang2q_conversion_linear(
 
     veccopy(r_i, rcch);
     normalize(r_i);
-    /* determine detector pixel vector */
-    if (determine_detector_pixel(rpixel, dir, dpixel, r_i, tilt) != 0) {
-        return -1;
-    }
-    for (k = 0; k < 3; ++k) {
-        rcchp[k] = rpixel[k] * cch;
-    }
 
     /* calculate rotation matices and perform rotations */
     #pragma omp parallel for default(shared) \
-            private(i, j, k, f, mtemp, mtemp2, ms, md, rd, rtemp) \
+            private(i, j, f, mtemp, mtemp2, ms, md, rd, rtemp) \
             schedule(static)
     for (i = 0; i < Npoints; ++i) {
         /* length of k */
@@ -1469,11 +2091,8 @@ int ang2q_conversion_linear(
         /* ms contains now the inverse rotation matrix for the sample circles
          * md contains the detector rotation matrix
          * calculate the momentum transfer for each detector pixel */
-        for (j = roi[0]; j < roi[1]; ++j) {
-            for (k = 0; k < 3; ++k) {
-                rd[k] = j * rpixel[k] - rcchp[k];
-            }
-            sumvec(rd, rcch);
+        for (j = 0; j < Nch; ++j) {
+            veccopy(rd, &rpix[3 * j]);
             normalize(rd);
             /* rd contains detector pixel direction,
              * r_i contains primary beam direction */
@@ -1481,7 +2100,7 @@ int ang2q_conversion_linear(
             diffvec(rtemp, r_i);
             vecmul(rtemp, f);
             /* determine momentum transfer */
-            matvec(ms, rtemp, &qpos[3 * (i * Nch + j - roi[0])]);
+            matvec_out(ms, rtemp, qpos, 3 * (i * Nch + j), flags);
         }
     }
     return 0;
@@ -1490,10 +2109,9 @@ int ang2q_conversion_linear(
 
 int ang2q_conversion_linear_sd(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch,
-        double dpixel, int *roi, char *dir, double tilt, double *UB,
-        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int Nch, int flags, double *qpos)
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Nch, int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for a linear detector with a given pixel size mounted along one of
     * the coordinate axis. this variant also considers the effect of a sample
@@ -1508,11 +2126,8 @@ int ang2q_conversion_linear_sd(
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch ............. center channel of the detector
-    *   dpixel .......... width of one pixel, same unit as distance rcch
-    *   roi ............. region of interest of the detector
-    *   dir ............. direction of the detector, e.g.: "x+"
-    *   tilt ............ tilt of the detector direction from dir
+    *   rpix ............ position of the detector channels relative to the
+    *                     center of rotation at zero detector angles (Nch, 3)
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of investigated crystal (3, 3)
     *   sampledis ....... sample displacement vector, same units as the
@@ -1523,14 +2138,15 @@ int ang2q_conversion_linear_sd(
     *   Nd .............. number of detector axes
     *   Nch ............. number of channels
     *   flags ........... general flags integer (verbosity)
-    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array)
+    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array,
+    *                     double or float depending on the flags)
     *
     *   */
 {
     double mtemp[9], mtemp2[9], ms[9], md[9];  /* matrices */
-    double rd[3], rpixel[3], rcchp[3];  /* detector position */
+    double rd[3];  /* detector position */
     double r_i[3], rtemp[3];  /* center channel direction */
-    int i, j, k;  /* needed indices */
+    int i, j;  /* needed indices */
     double f;  /* wavelength parameters */
     fp_rot *sampleRotation = malloc(Ns * sizeof(fp_rot));
     fp_rot *detectorRotation = malloc(Nd * sizeof(fp_rot));
@@ -1545,17 +2161,10 @@ int ang2q_conversion_linear_sd(
 
     veccopy(r_i, rcch);
     normalize(r_i);
-    /* determine detector pixel vector */
-    if (determine_detector_pixel(rpixel, dir, dpixel, r_i, tilt) != 0) {
-        return -1;
-    }
-    for (k = 0; k < 3; ++k) {
-        rcchp[k] = rpixel[k] * cch;
-    }
 
     /* calculate rotation matices and perform rotations */
     #pragma omp parallel for default(shared) \
-            private(i, j, k, f, mtemp, mtemp2, ms, md, rd, rtemp) \
+            private(i, j, f, mtemp, mtemp2, ms, md, rd, rtemp) \
             schedule(static)
     for (i = 0; i < Npoints; ++i) {
         /* length of k */
@@ -1586,11 +2195,8 @@ int ang2q_conversion_linear_sd(
         /* ms contains now the inverse rotation matrix for the sample circles
          * md contains the detector rotation matrix
          * calculate the momentum transfer for each detector pixel */
-        for (j = roi[0]; j < roi[1]; ++j) {
-            for (k = 0; k < 3; ++k) {
-                rd[k] = j * rpixel[k] - rcchp[k];
-            }
-            sumvec(rd, rcch);
+        for (j = 0; j < Nch; ++j) {
+            veccopy(rd, &rpix[3 * j]);
             matvec(md, rd, rtemp);
             /* consider sample displacement vector */
             diffvec(rtemp, sampledis);
@@ -1601,7 +2207,7 @@ int ang2q_conversion_linear_sd(
             diffvec(rtemp, r_i);
             vecmul(rtemp, f);
             /* determine momentum transfer */
-            matvec(ms, rtemp, &qpos[3 * (i * Nch + j - roi[0])]);
+            matvec_out(ms, rtemp, qpos, 3 * (i * Nch + j), flags);
         }
     }
     return 0;
@@ -1610,10 +2216,9 @@ int ang2q_conversion_linear_sd(
 
 int ang2q_conversion_linear_trans(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch,
-        double dpixel, int *roi, char *dir, double tilt, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int Nch,
-        int flags, double *qpos)
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *lambda, int Npoints, int Ns, int Nd, int Nch,
+        int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for a linear detector with a given pixel size mounted along one of
     * the coordinate axis, and translation motors on the detector arm
@@ -1627,11 +2232,8 @@ int ang2q_conversion_linear_trans(
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch ............. center channel of the detector
-    *   dpixel .......... width of one pixel, same unit as distance rcch
-    *   roi ............. region of interest of the detector
-    *   dir ............. direction of the detector, e.g.: "x+"
-    *   tilt ............ tilt of the detector direction from dir
+    *   rpix ............ position of the detector channels relative to the
+    *                     center of rotation at zero detector angles (Nch, 3)
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of investigated crystal (3, 3)
     *   lambda .......... wavelength of the used x-rays in Angstroem (Npoints,)
@@ -1640,12 +2242,13 @@ int ang2q_conversion_linear_trans(
     *   Nd .............. number of detector axes
     *   Nch ............. number of channels
     *   flags ........... general flags integer (verbosity)
-    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array))
+    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array,
+    *                     double or float depending on the flags)
     *
     *   */
 {
     double mtemp[9], mtemp2[9], ms[9];  /* matrices */
-    double rd[3], rpixel[3], rcchp[3];  /* detector position */
+    double rd[3];  /* detector position */
     double r_i[3];  /* center channel direction */
     int i, j, k;  /* needed indices */
     double f;  /* f = M_2PI / lambda */
@@ -1663,13 +2266,6 @@ int ang2q_conversion_linear_trans(
 
     veccopy(r_i, rcch);
     normalize(r_i);
-    /* determine detector pixel vector */
-    if (determine_detector_pixel(rpixel, dir, dpixel, r_i, tilt) != 0) {
-        return -1;
-    }
-    for (k = 0; k < 3; ++k) {
-        rcchp[k] = rpixel[k] * cch;
-    }
 
     /* calculate rotation matices and perform rotations */
     #pragma omp parallel for default(shared) \
@@ -1696,11 +2292,8 @@ int ang2q_conversion_linear_trans(
 
         /* ms contains now the inverse rotation matrix for the sample circles
          * calculate the momentum transfer for each detector pixel */
-        for (j = roi[0]; j < roi[1]; ++j) {
-            for (k = 0; k < 3; ++k) {
-                rd[k] = j * rpixel[k] - rcchp[k];
-            }
-            sumvec(rd, rcch);
+        for (j = 0; j < Nch; ++j) {
+            veccopy(rd, &rpix[3 * j]);
             /* determine detector rotations */
             for (k = Nd - 1; k >= 0; --k) {
                 detectorRotation[k](detectorAngles[Nd * i + k], rd);
@@ -1712,7 +2305,7 @@ int ang2q_conversion_linear_trans(
             diffvec(rd, r_i);
             vecmul(rd, f);
             /* determine momentum transfer */
-            matvec(ms, rd, &qpos[3 * (i * Nch + j - roi[0])]);
+            matvec_out(ms, rd, qpos, 3 * (i * Nch + j), flags);
         }
     }
     return 0;
@@ -1720,10 +2313,9 @@ int ang2q_conversion_linear_trans(
 
 int ang2q_conversion_linear_sdtrans(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch,
-        double dpixel, int *roi, char *dir, double tilt, double *UB,
-        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int Nch, int flags, double *qpos)
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Nch, int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for a linear detector with a given pixel size mounted along one of
     * the coordinate axis. this variant also considers the effect of a sample
@@ -1738,11 +2330,8 @@ int ang2q_conversion_linear_sdtrans(
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch ............. center channel of the detector
-    *   dpixel .......... width of one pixel, same unit as distance rcch
-    *   roi ............. region of interest of the detector
-    *   dir ............. direction of the detector, e.g.: "x+"
-    *   tilt ............ tilt of the detector direction from dir
+    *   rpix ............ position of the detector channels relative to the
+    *                     center of rotation at zero detector angles (Nch, 3)
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of investigated crystal (3, 3)
     *   sampledis ....... sample displacement vector, same units as the
@@ -1753,12 +2342,13 @@ int ang2q_conversion_linear_sdtrans(
     *   Nd .............. number of detector axes
     *   Nch ............. number of channels
     *   flags ........... general flags integer (verbosity)
-    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array))
+    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array,
+    *                     double or float depending on the flags)
     *
     *   */
 {
     double mtemp[9], mtemp2[9], ms[9];  /* matrices */
-    double rd[3], rpixel[3], rcchp[3];  /* detector position */
+    double rd[3];  /* detector position */
     double r_i[3];  /* center channel direction */
     int i, j, k;  /* needed indices */
     double f;  /* wavelength parameter */
@@ -1776,13 +2366,6 @@ int ang2q_conversion_linear_sdtrans(
 
     veccopy(r_i, rcch);
     normalize(r_i);
-    /* determine detector pixel vector */
-    if (determine_detector_pixel(rpixel, dir, dpixel, r_i, tilt) != 0) {
-        return -1;
-    }
-    for (k = 0; k < 3; ++k) {
-        rcchp[k] = rpixel[k] * cch;
-    }
 
     /* calculate rotation matices and perform rotations */
     #pragma omp parallel for default(shared) \
@@ -1809,11 +2392,8 @@ int ang2q_conversion_linear_sdtrans(
 
         /* ms contains now the inverse rotation matrix for the sample circles
          * calculate the momentum transfer for each detector pixel */
-        for (j = roi[0]; j < roi[1]; ++j) {
-            for (k = 0; k < 3; ++k) {
-                rd[k] = j * rpixel[k] - rcchp[k];
-            }
-            sumvec(rd, rcch);
+        for (j = 0; j < Nch; ++j) {
+            veccopy(rd, &rpix[3 * j]);
             /* apply detector rotations/translations, starting with the
              * inner most */
             for (k = Nd - 1; k >= 0; --k) {
@@ -1828,7 +2408,7 @@ int ang2q_conversion_linear_sdtrans(
             diffvec(rd, r_i);
             vecmul(rd, f);
             /* determine momentum transfer */
-            matvec(ms, rd, &qpos[3 * (i * Nch + j - roi[0])]);
+            matvec_out(ms, rd, qpos, 3 * (i * Nch + j), flags);
         }
     }
     return 0;
@@ -1855,19 +2435,9 @@ PyObject* py_ang2q_conversion_area(PyObject *self, PyObject *args)
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch1 ............ center channel of the detector
-    *   cch2 ............ center channel of the detector
-    *   dpixel1 ......... width of one pixel in first direction, same unit as
-    *                     distance rcch
-    *   dpixel2 ......... width of one pixel in second direction, same unit as
-    *                     distance rcch
-    *   roi ............. region of interest for the area detector
-    *                     [dir1min, dir1max, dir2min, dir2max]
-    *   dir1 ............ first direction of the detector, e.g.: "x+"
-    *   dir2 ............ second direction of the detector, e.g.: "z+"
-    *   tiltazimuth ..... azimuth of the tilt
-    *   tilt ............ tilt of the detector plane (rotation around axis
-    *                     normal to the direction given by the tiltazimuth
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix1, Npix2, 3), see py_ang2q_detector_area
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of investigated crystal (3, 3)
     *   sampledis ....... sample displacement vector, same units as the
@@ -1876,7 +2446,11 @@ PyObject* py_ang2q_conversion_area(PyObject *self, PyObject *args)
     *   nthreads ........ number of threads to use in parallelization
     *   flags ........... integer with flags: (1: has_translations;
     *                                          4: has_sampledis;
+    *                                          8: float32 output;
     *                                          16: verbose)
+    *   qpos ............ optional output array of shape
+    *                     (Npoints * Npix1 * Npix2, 3); if given the result is
+    *                     written into this buffer instead of a new array
     *
     *   Returns
     *   -------
@@ -1888,32 +2462,32 @@ PyObject* py_ang2q_conversion_area(PyObject *self, PyObject *args)
     int r;  /* return value checking */
     int flags;  /* flags to select behavior of the function */
     unsigned int nthreads;  /* number threads for OpenMP */
-    double cch1, cch2, dpixel1, dpixel2, tilt, tiltazimuth;
-    /* string with sample and detector axis, and detector direction */
-    char *sampleAxis, *detectorAxis, *dir1, *dir2;
-    double *sampleAngles,*detectorAngles, *rcch, *kappadir, *UB, *sampledis,
-           *qpos, *lambda;  /* c-arrays for further usage */
-    int *roi;  /* region of interest integer array */
+    /* string with sample and detector axis */
+    char *sampleAxis, *detectorAxis;
+    double *sampleAngles,*detectorAngles, *rcch, *kappadir, *rpix, *UB,
+           *sampledis, *lambda;  /* c-arrays for further usage */
+    void *qpos;  /* output array (double or float) */
+    int Npix;  /* number of detector pixels */
+    int otype;  /* numpy type of the output array */
     npy_intp nout[2];
     /* numpy arrays */
     PyArrayObject *sampleAnglesArr = NULL, *detectorAnglesArr = NULL,
-                  *rcchArr = NULL, *kappadirArr = NULL, *roiArr = NULL,
+                  *rcchArr = NULL, *kappadirArr = NULL, *rpixArr = NULL,
                   *sampledisArr = NULL, *UBArr = NULL, *qposArr = NULL,
                   *lambdaArr = NULL;
 
     /* Python argument conversion code */
-    if (!PyArg_ParseTuple(args, "O!O!O!ssO!ddddO!ssddO!O!O!Ii",
+    if (!PyArg_ParseTuple(args, "O!O!O!ssO!O!O!O!O!Ii|O!",
                           &PyArray_Type, &sampleAnglesArr,
                           &PyArray_Type, &detectorAnglesArr,
                           &PyArray_Type, &rcchArr,
                           &sampleAxis, &detectorAxis,
                           &PyArray_Type, &kappadirArr,
-                          &cch1, &cch2, &dpixel1, &dpixel2,
-                          &PyArray_Type, &roiArr,
-                          &dir1, &dir2, &tiltazimuth, &tilt,
+                          &PyArray_Type, &rpixArr,
                           &PyArray_Type, &UBArr,
                           &PyArray_Type, &sampledisArr,
-                          &PyArray_Type, &lambdaArr, &nthreads, &flags)) {
+                          &PyArray_Type, &lambdaArr, &nthreads, &flags,
+                          &PyArray_Type, &qposArr)) {
         return NULL;
     }
 
@@ -1940,9 +2514,10 @@ PyObject* py_ang2q_conversion_area(PyObject *self, PyObject *args)
         PyErr_SetString(PyExc_ValueError, "UB must be of shape (3, 3)");
         return NULL;
     }
-    PYARRAY_CHECK(roiArr, 1, NPY_INT32, "roi must be a 1D int array");
-    if (PyArray_SIZE(roiArr) != 4) {
-        PyErr_SetString(PyExc_ValueError, "roi must be of length 4");
+    PYARRAY_CHECK(rpixArr, 3, NPY_DOUBLE, "rpix must be a 3D double array");
+    if (PyArray_DIMS(rpixArr)[2] != 3) {
+        PyErr_SetString(PyExc_ValueError,
+                        "rpix must be of shape (Npix1, Npix2, 3)");
         return NULL;
     }
     PYARRAY_CHECK(sampledisArr, 1, NPY_DOUBLE,
@@ -1972,14 +2547,31 @@ PyObject* py_ang2q_conversion_area(PyObject *self, PyObject *args)
     rcch = (double *) PyArray_DATA(rcchArr);
     kappadir = (double *) PyArray_DATA(kappadirArr);
     UB = (double *) PyArray_DATA(UBArr);
-    roi = (int *) PyArray_DATA(roiArr);
+    rpix = (double *) PyArray_DATA(rpixArr);
     sampledis = (double *) PyArray_DATA(sampledisArr);
+    Npix = (int) (PyArray_DIMS(rpixArr)[0] * PyArray_DIMS(rpixArr)[1]);
 
-    /* create output ndarray */
-    nout[0] = Npoints * (roi[1] - roi[0]) * (roi[3] - roi[2]);
+    /* create output ndarray or use the buffer provided by the caller */
+    nout[0] = Npoints * Npix;
     nout[1] = 3;
-    qposArr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_DOUBLE);
-    qpos = (double *) PyArray_DATA(qposArr);
+    otype = (flags & OUTPUT_FLOAT32) ? NPY_FLOAT32 : NPY_DOUBLE;
+    if (qposArr == NULL) {
+        qposArr = (PyArrayObject *) PyArray_SimpleNew(2, nout, otype);
+    }
+    else {
+        if (!PyArray_ISCARRAY(qposArr) ||
+            PyArray_TYPE(qposArr) != otype ||
+            PyArray_NDIM(qposArr) != 2 ||
+            PyArray_DIMS(qposArr)[0] != nout[0] ||
+            PyArray_DIMS(qposArr)[1] != nout[1]) {
+            PyErr_SetString(PyExc_ValueError,
+                "qpos must be a writeable C-contiguous array of shape "
+                "(Npoints * Npix1 * Npix2, 3) and type according to flags");
+            return NULL;
+        }
+        Py_INCREF(qposArr);
+    }
+    qpos = PyArray_DATA(qposArr);
 
     #ifdef __OPENMP__
     /* set openmp thread numbers dynamically */
@@ -1987,45 +2579,43 @@ PyObject* py_ang2q_conversion_area(PyObject *self, PyObject *args)
     #endif
 
     /* call worker function */
+    Py_BEGIN_ALLOW_THREADS
     if (flags & HAS_SAMPLEDIS) {
         if (flags & HAS_TRANSLATIONS) {
             r = ang2q_conversion_area_sdtrans(
                     sampleAngles, detectorAngles, rcch, sampleAxis,
-                    detectorAxis, kappadir, cch1, cch2, dpixel1, dpixel2, roi,
-                    dir1, dir2, tiltazimuth, tilt, UB, sampledis, lambda,
-                    Npoints, Ns, Nd, flags, qpos);
+                    detectorAxis, kappadir, rpix, UB, sampledis, lambda,
+                    Npoints, Ns, Nd, Npix, flags, qpos);
         }
         else {
             r = ang2q_conversion_area_sd(
                     sampleAngles, detectorAngles, rcch, sampleAxis,
-                    detectorAxis, kappadir, cch1, cch2, dpixel1, dpixel2, roi,
-                    dir1, dir2, tiltazimuth, tilt, UB, sampledis, lambda,
-                    Npoints, Ns, Nd, flags, qpos);
+                    detectorAxis, kappadir, rpix, UB, sampledis, lambda,
+                    Npoints, Ns, Nd, Npix, flags, qpos);
         }
     }
     else {
         if (flags & HAS_TRANSLATIONS) {
             r = ang2q_conversion_area_trans(
                     sampleAngles, detectorAngles, rcch, sampleAxis,
-                    detectorAxis, kappadir, cch1, cch2, dpixel1, dpixel2, roi,
-                    dir1, dir2, tiltazimuth, tilt, UB, lambda, Npoints, Ns, Nd,
-                    flags, qpos);
+                    detectorAxis, kappadir, rpix, UB, lambda, Npoints, Ns, Nd,
+                    Npix, flags, qpos);
         }
         else {
             r = ang2q_conversion_area(
                     sampleAngles, detectorAngles, rcch, sampleAxis,
-                    detectorAxis, kappadir, cch1, cch2, dpixel1, dpixel2, roi,
-                    dir1, dir2, tiltazimuth, tilt, UB, lambda, Npoints, Ns, Nd,
-                    flags, qpos);
+                    detectorAxis, kappadir, rpix, UB, lambda, Npoints, Ns, Nd,
+                    Npix, flags, qpos);
         }
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(sampleAnglesArr);
     Py_DECREF(detectorAnglesArr);
     Py_DECREF(rcchArr);
     Py_DECREF(kappadirArr);
-    Py_DECREF(roiArr);
+    Py_DECREF(rpixArr);
     Py_DECREF(UBArr);
     Py_DECREF(sampledisArr);
     Py_DECREF(lambdaArr);
@@ -2040,10 +2630,9 @@ PyObject* py_ang2q_conversion_area(PyObject *self, PyObject *args)
 
 int ang2q_conversion_area(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch1,
-        double cch2, double dpixel1, double dpixel2, int *roi, char *dir1,
-        char *dir2, double tiltazimuth, double tilt, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int flags, double *qpos)
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *lambda, int Npoints, int Ns, int Nd, int Npix,
+        int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for an area detector with a given pixel size mounted along one of
     * the coordinate axis
@@ -2058,45 +2647,31 @@ int ang2q_conversion_area(
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch1 ............ center channel of the detector
-    *   cch2 ............ center channel of the detector
-    *   dpixel1 ......... width of one pixel in first direction, same unit as
-    *                     distance rcch
-    *   dpixel2 ......... width of one pixel in second direction, same unit as
-    *                     distance rcch
-    *   roi ............. region of interest for the area detector
-    *                     [dir1min, dir1max, dir2min, dir2max]
-    *   dir1 ............ first direction of the detector, e.g.: "x+"
-    *   dir2 ............ second direction of the detector, e.g.: "z+"
-    *   tiltazimuth ..... azimuth of the tilt
-    *   tilt ............ tilt of the detector plane (rotation around axis
-    *                     normal to the direction
-    *                     given by the tiltazimuth
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix, 3)
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of the investigated crystal (3, 3)
     *   lambda .......... wavelength of the used x-rays (Npoints,)
     *   Npoints ......... number of points to calculate
     *   Ns .............. number of sample axes
     *   Nd .............. number of detector axes
+    *   Npix ............ number of detector pixels
     *   flags ........... general flags integer (verbosity)
-    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array)
+    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array,
+    *                     double or float depending on the flags)
     *
     *   */
 {
     double mtemp[9], mtemp2[9], ms[9], md[9];  /* matrices */
-    double rd[3], rpixel1[3], rpixel2[3], rcchp[3];  /* detector position */
+    double rd[3];  /* detector position */
     double r_i[3], rtemp[3];  /* r_i: center channel direction */
-    int i, j, j1, j2, k;  /* loop indices */
-    int idxh1, idxh2;  /* temporary index helper */
+    int i, j, j1;  /* loop indices */
     double f;  /* f = M_2PI / lambda and detector parameters */
     /* string with sample and detector axis, and detector direction */
     fp_rot *sampleRotation = malloc(Ns * sizeof(fp_rot));
     fp_rot *detectorRotation = malloc(Nd * sizeof(fp_rot));
 
-    /* calculate some index shortcuts */
-    idxh1 = (roi[1] - roi[0]) * (roi[3] - roi[2]);
-    idxh2 = roi[3] - roi[2];
-
     /* determine axes directions */
     if (determine_axes_directions(sampleRotation, sampleAxis, Ns) != 0) {
         return -1;
@@ -2108,25 +2683,9 @@ int ang2q_conversion_area(
     veccopy(r_i, rcch);
     normalize(r_i);
 
-    /* determine detector pixel vector */
-    if (determine_detector_pixel(rpixel1, dir1, dpixel1, r_i, 0.) != 0) {
-        return -1;
-    }
-    if (determine_detector_pixel(rpixel2, dir2, dpixel2, r_i, 0.) != 0) {
-        return -1;
-    }
-
-    /* rotate detector pixel vectors according to tilt */
-    tilt_detector_axis(tiltazimuth, tilt, rpixel1, rpixel2);
-
-    /* calculate center channel position in detector plane */
-    for (k = 0; k < 3; ++k) {
-        rcchp[k] = rpixel1[k] * cch1 + rpixel2[k] * cch2;
-    }
-
     /* calculate rotation matices and perform rotations */
     #pragma omp parallel for default(shared) \
-            private(i, j, j1, j2, k, f, mtemp, mtemp2, ms, md, rd, rtemp) \
+            private(i, j, j1, f, mtemp, mtemp2, ms, md, rd, rtemp) \
             schedule(static)
     for (i = 0; i < Npoints; ++i) {
         f = M_2PI / lambda[i];
@@ -2156,23 +2715,17 @@ int ang2q_conversion_area(
         /* ms contains now the inverse rotation matrix for the sample circles
          * md contains the detector rotation matrix
          * calculate the momentum transfer for each detector pixel */
-        for (j1 = roi[0]; j1 < roi[1]; ++j1) {
-            for (j2 = roi[2]; j2 < roi[3]; ++j2) {
-                for (k = 0; k < 3; ++k) {
-                    rd[k] = j1 * rpixel1[k] + j2 * rpixel2[k] - rcchp[k];
-                }
-                sumvec(rd, rcch);
-                normalize(rd);
-                /* rd contains detector pixel direction,
-                 * r_i contains primary beam direction */
-                matvec(md, rd, rtemp);
-                diffvec(rtemp, r_i);
-                vecmul(rtemp, f);
-                /* determine momentum transfer */
-                matvec(ms, rtemp,
-                       &qpos[3 * (i * idxh1 + idxh2 * (j1 - roi[0]) +
-                             (j2 - roi[2]))]);
-            }
+        for (j1 = 0; j1 < Npix; ++j1) {
+            veccopy(rd, &rpix[3 * j1]);
+            normalize(rd);
+            /* rd contains detector pixel direction,
+             * r_i contains primary beam direction */
+            matvec(md, rd, rtemp);
+            diffvec(rtemp, r_i);
+            vecmul(rtemp, f);
+            /* determine momentum transfer */
+            matvec_out(ms, rtemp, qpos,
+                       3 * (i * Npix + j1), flags);
         }
     }
     return 0;
@@ -2181,11 +2734,9 @@ int ang2q_conversion_area(
 
 int ang2q_conversion_area_sd(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch1,
-        double cch2, double dpixel1, double dpixel2, int *roi, char *dir1,
-        char *dir2, double tiltazimuth, double tilt, double *UB,
-        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int flags, double *qpos)
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Npix, int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for an area detector with a given pixel size mounted along one of
     * the coordinate axis. this variant also considers the effect of a
@@ -2201,19 +2752,9 @@ int ang2q_conversion_area_sd(
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch1 ............ center channel of the detector
-    *   cch2 ............ center channel of the detector
-    *   dpixel1 ......... width of one pixel in first direction, same unit as
-    *                     distance rcch
-    *   dpixel2 ......... width of one pixel in second direction, same unit as
-    *                     distance rcch
-    *   roi ............. region of interest for the area detector
-    *                     [dir1min, dir1max, dir2min, dir2max]
-    *   dir1 ............ first direction of the detector, e.g.: "x+"
-    *   dir2 ............ second direction of the detector, e.g.: "z+"
-    *   tiltazimuth ..... azimuth of the tilt
-    *   tilt ............ tilt of the detector plane (rotation around axis
-    *                     normal to the direction given by the tiltazimuth
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix, 3)
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of investigated crystal (3, 3)
     *   sampledis ....... sample displacement vector, same units as the
@@ -2222,24 +2763,21 @@ int ang2q_conversion_area_sd(
     *   Npoints ......... number of points to calculate
     *   Ns .............. number of sample axes
     *   Nd .............. number of detector axes
+    *   Npix ............ number of detector pixels
     *   flags ........... general flags integer (verbosity)
-    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array)
+    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array,
+    *                     double or float depending on the flags)
     *
     *   */
 {
     double mtemp[9], mtemp2[9], ms[9], md[9];  /* matrices */
-    double rd[3], rpixel1[3], rpixel2[3], rcchp[3];  /* detector position */
+    double rd[3];  /* detector position */
     double r_i[3], rtemp[3];  /* r_i: center channel direction */
-    int i, j, j1, j2, k; /* loop indices */
-    int idxh1, idxh2;  /* temporary index helper */
+    int i, j, j1; /* loop indices */
     double f;  /* f = M_2PI / lambda and detector parameters */
     fp_rot *sampleRotation = malloc(Ns * sizeof(fp_rot));
     fp_rot *detectorRotation = malloc(Nd * sizeof(fp_rot));
 
-    /* calculate some index shortcuts */
-    idxh1 = (roi[1] - roi[0]) * (roi[3] - roi[2]);
-    idxh2 = roi[3] - roi[2];
-
     /* determine axes directions */
     if (determine_axes_directions(sampleRotation, sampleAxis, Ns) != 0) {
         return -1;
@@ -2251,25 +2789,9 @@ int ang2q_conversion_area_sd(
     veccopy(r_i, rcch);
     normalize(r_i);
 
-    /* determine detector pixel vector */
-    if (determine_detector_pixel(rpixel1, dir1, dpixel1, r_i, 0.) != 0) {
-        return -1;
-    }
-    if (determine_detector_pixel(rpixel2, dir2, dpixel2, r_i, 0.) != 0) {
-        return -1;
-    }
-
-    /* rotate detector pixel vectors according to tilt */
-    tilt_detector_axis(tiltazimuth, tilt, rpixel1, rpixel2);
-
-    /* calculate center channel position in detector plane */
-    for (k = 0; k < 3; ++k) {
-        rcchp[k] = rpixel1[k] * cch1 + rpixel2[k] * cch2;
-    }
-
     /* calculate rotation matices and perform rotations */
     #pragma omp parallel for default(shared) \
-            private(i, j, j1, j2, k, f, mtemp, mtemp2, ms, md, rd, rtemp) \
+            private(i, j, j1, f, mtemp, mtemp2, ms, md, rd, rtemp) \
             schedule(static)
     for (i = 0; i < Npoints; ++i) {
         /* length of k */
@@ -2300,25 +2822,19 @@ int ang2q_conversion_area_sd(
         /* ms contains now the inverse rotation matrix for the sample circles
          * md contains the detector rotation matrix
          * calculate the momentum transfer for each detector pixel */
-        for (j1 = roi[0]; j1 < roi[1]; ++j1) {
-            for (j2 = roi[2]; j2 < roi[3]; ++j2) {
-                for (k = 0; k < 3; ++k) {
-                    rd[k] = j1 * rpixel1[k] + j2 * rpixel2[k] - rcchp[k];
-                }
-                sumvec(rd, rcch);
-                matvec(md, rd, rtemp);
-                /* consider the effect of the sample displacement */
-                diffvec(rtemp, sampledis);
-                normalize(rtemp);
-                /* rd contains detector pixel direction,
-                 * r_i contains primary beam direction */
-                diffvec(rtemp, r_i);
-                vecmul(rtemp, f);
-                /* determine momentum transfer */
-                matvec(ms, rtemp,
-                       &qpos[3 * (i * idxh1 + idxh2 * (j1 - roi[0]) +
-                             (j2 - roi[2]))]);
-            }
+        for (j1 = 0; j1 < Npix; ++j1) {
+            veccopy(rd, &rpix[3 * j1]);
+            matvec(md, rd, rtemp);
+            /* consider the effect of the sample displacement */
+            diffvec(rtemp, sampledis);
+            normalize(rtemp);
+            /* rd contains detector pixel direction,
+             * r_i contains primary beam direction */
+            diffvec(rtemp, r_i);
+            vecmul(rtemp, f);
+            /* determine momentum transfer */
+            matvec_out(ms, rtemp, qpos,
+                       3 * (i * Npix + j1), flags);
         }
     }
     return 0;
@@ -2327,10 +2843,9 @@ int ang2q_conversion_area_sd(
 
 int ang2q_conversion_area_trans(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch1,
-        double cch2, double dpixel1, double dpixel2, int *roi, char *dir1,
-        char *dir2, double tiltazimuth, double tilt, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int flags, double *qpos)
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *lambda, int Npoints, int Ns, int Nd, int Npix,
+        int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for an area detector with a given pixel size mounted along one of
     * the coordinate axis including translation axis on the detector arm
@@ -2345,44 +2860,30 @@ int ang2q_conversion_area_trans(
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch1 ............ center channel of the detector
-    *   cch2 ............ center channel of the detector
-    *   dpixel1 ......... width of one pixel in first direction, same unit as
-    *                     distance rcch
-    *   dpixel2 ......... width of one pixel in second direction, same unit as
-    *                     distance rcch
-    *   roi ............. region of interest for the area detector
-    *                     [dir1min, dir1max, dir2min, dir2max]
-    *   dir1 ............ first direction of the detector, e.g.: "x+"
-    *   dir2 ............ second direction of the detector, e.g.: "z+"
-    *   tiltazimuth ..... azimuth of the tilt
-    *   tilt ............ tilt of the detector plane (rotation around axis
-    *                     normal to the direction
-    *                     given by the tiltazimuth
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix, 3)
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of the investigated crystal (3, 3)
     *   lambda .......... wavelength of the used x-rays (Npoints,)
     *   Npoints ......... number of points to calculate
     *   Ns .............. number of sample axes
     *   Nd .............. number of detector axes
+    *   Npix ............ number of detector pixels
     *   flags ........... general flags integer (verbosity)
-    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array)
+    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array,
+    *                     double or float depending on the flags)
     *
     *   */
 {
     double mtemp[9], mtemp2[9], ms[9];  /* matrices */
-    double rd[3], rpixel1[3], rpixel2[3], rcchp[3];  /* detector position */
+    double rd[3];  /* detector position */
     double r_i[3];  /* r_i: center channel direction */
-    int i, j, j1, j2, k;  /* loop indices */
-    int idxh1, idxh2;  /* temporary index helper */
+    int i, j, j1;  /* loop indices */
     double f;  /* f = M_2PI / lambda and detector parameters */
     fp_rot *sampleRotation = malloc(Ns * sizeof(fp_rot));
     fp_rot *detectorRotation = malloc(Nd * sizeof(fp_rot));
 
-    /* calculate some index shortcuts */
-    idxh1 = (roi[1] - roi[0]) * (roi[3] - roi[2]);
-    idxh2 = roi[3] - roi[2];
-
     /* determine axes directions */
     if (determine_axes_directions(sampleRotation, sampleAxis, Ns) != 0) {
         return -1;
@@ -2395,25 +2896,9 @@ int ang2q_conversion_area_trans(
     veccopy(r_i, rcch);
     normalize(r_i);
 
-    /* determine detector pixel vector */
-    if (determine_detector_pixel(rpixel1, dir1, dpixel1, r_i, 0.) != 0) {
-        return -1;
-    }
-    if (determine_detector_pixel(rpixel2, dir2, dpixel2, r_i, 0.) != 0) {
-        return -1;
-    }
-
-    /* rotate detector pixel vectors according to tilt */
-    tilt_detector_axis(tiltazimuth, tilt, rpixel1, rpixel2);
-
-    /* calculate center channel position in detector plane */
-    for (k = 0; k < 3; ++k) {
-        rcchp[k] = rpixel1[k] * cch1 + rpixel2[k] * cch2;
-    }
-
     /* calculate rotation matices and perform rotations */
     #pragma omp parallel for default(shared) \
-            private(i, j, j1, j2, k, f, mtemp, mtemp2, ms, rd) \
+            private(i, j, j1, f, mtemp, mtemp2, ms, rd) \
             schedule(static)
     for (i = 0; i < Npoints; ++i) {
         f = M_2PI / lambda[i];
@@ -2436,28 +2921,22 @@ int ang2q_conversion_area_trans(
         /* ms contains now the inverse rotation matrix for the sample circles
          * detector rotations/translations need to be applied separately for
          * every pixel */
-        for (j1 = roi[0]; j1 < roi[1]; ++j1) {
-            for (j2 = roi[2]; j2 < roi[3]; ++j2) {
-                for (k = 0; k < 3; ++k) {
-                    rd[k] = j1 * rpixel1[k] + j2 * rpixel2[k] - rcchp[k];
-                }
-                sumvec(rd, rcch);
-                /* apply detector rotations/translations, starting with the
-                 * inner most */
-                for (j = Nd - 1; j >= 0; --j) {
-                    detectorRotation[j](detectorAngles[Nd * i + j], rd);
-                }
-
-                normalize(rd);
-                /* rd contains detector pixel direction,
-                 * r_i contains primary beam direction */
-                diffvec(rd, r_i);
-                vecmul(rd, f);
-                /* determine momentum transfer */
-                matvec(ms, rd,
-                       &qpos[3 * (i * idxh1 + idxh2 * (j1 - roi[0]) +
-                             (j2 - roi[2]))]);
+        for (j1 = 0; j1 < Npix; ++j1) {
+            veccopy(rd, &rpix[3 * j1]);
+            /* apply detector rotations/translations, starting with the
+             * inner most */
+            for (j = Nd - 1; j >= 0; --j) {
+                detectorRotation[j](detectorAngles[Nd * i + j], rd);
             }
+
+            normalize(rd);
+            /* rd contains detector pixel direction,
+             * r_i contains primary beam direction */
+            diffvec(rd, r_i);
+            vecmul(rd, f);
+            /* determine momentum transfer */
+            matvec_out(ms, rd, qpos,
+                       3 * (i * Npix + j1), flags);
         }
     }
     return 0;
@@ -2466,11 +2945,9 @@ int ang2q_conversion_area_trans(
 
 int ang2q_conversion_area_sdtrans(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch1,
-        double cch2, double dpixel1, double dpixel2, int *roi, char *dir1,
-        char *dir2, double tiltazimuth, double tilt, double *UB,
-        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int flags, double *qpos)
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Npix, int flags, void *qpos)
    /* conversion of Npoints of goniometer positions to reciprocal space
     * for an area detector with a given pixel size mounted along one of
     * the coordinate axis including translation axis on the detector arm
@@ -2486,20 +2963,9 @@ int ang2q_conversion_area_sdtrans(
     *   sampleAxis ...... string with sample axis directions
     *   detectorAxis .... string with detector axis directions
     *   kappadir ........ rotation axis of a possible kappa circle
-    *   cch1 ............ center channel of the detector
-    *   cch2 ............ center channel of the detector
-    *   dpixel1 ......... width of one pixel in first direction, same unit as
-    *                     distance rcch
-    *   dpixel2 ......... width of one pixel in second direction, same unit as
-    *                     distance rcch
-    *   roi ............. region of interest for the area detector
-    *                     [dir1min, dir1max, dir2min, dir2max]
-    *   dir1 ............ first direction of the detector, e.g.: "x+"
-    *   dir2 ............ second direction of the detector, e.g.: "z+"
-    *   tiltazimuth ..... azimuth of the tilt
-    *   tilt ............ tilt of the detector plane (rotation around axis
-    *                     normal to the direction
-    *                     given by the tiltazimuth
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix, 3)
     *   UB .............. orientation matrix and reciprocal space conversion
     *                     of the investigated crystal (3, 3)
     *   sampledis ....... sample displacement vector, same units as the
@@ -2508,24 +2974,21 @@ int ang2q_conversion_area_sdtrans(
     *   Npoints ......... number of points to calculate
     *   Ns .............. number of sample axes
     *   Nd .............. number of detector axes
+    *   Npix ............ number of detector pixels
     *   flags ........... general flags integer (verbosity)
-    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array)
+    *   qpos ............ momentum transfer (Npoints * Nch, 3) (OUTPUT array,
+    *                     double or float depending on the flags)
     *
     *   */
 {
     double mtemp[9], mtemp2[9], ms[9];  /* matrices */
-    double rd[3], rpixel1[3], rpixel2[3], rcchp[3];  /* detector position */
+    double rd[3];  /* detector position */
     double r_i[3];  /* r_i: center channel direction */
-    int i, j, j1, j2, k;  /* loop indices */
-    int idxh1, idxh2;  /* temporary index helper */
+    int i, j, j1;  /* loop indices */
     double f;  /* f = M_2PI / lambda and detector parameters */
     fp_rot *sampleRotation = malloc(Ns * sizeof(fp_rot));
     fp_rot *detectorRotation = malloc(Nd * sizeof(fp_rot));
 
-    /* calculate some index shortcuts */
-    idxh1 = (roi[1] - roi[0]) * (roi[3] - roi[2]);
-    idxh2 = roi[3] - roi[2];
-
     /* determine axes directions */
     if (determine_axes_directions(sampleRotation, sampleAxis, Ns) != 0) {
         return -1;
@@ -2538,25 +3001,9 @@ int ang2q_conversion_area_sdtrans(
     veccopy(r_i, rcch);
     normalize(r_i);
 
-    /* determine detector pixel vector */
-    if (determine_detector_pixel(rpixel1, dir1, dpixel1, r_i, 0.) != 0) {
-        return -1;
-    }
-    if (determine_detector_pixel(rpixel2, dir2, dpixel2, r_i, 0.) != 0) {
-        return -1;
-    }
-
-    /* rotate detector pixel vectors according to tilt */
-    tilt_detector_axis(tiltazimuth, tilt, rpixel1, rpixel2);
-
-    /* calculate center channel position in detector plane */
-    for (k = 0; k < 3; ++k) {
-        rcchp[k] = rpixel1[k] * cch1 + rpixel2[k] * cch2;
-    }
-
     /* calculate rotation matices and perform rotations */
     #pragma omp parallel for default(shared) \
-            private(i, j, j1, j2, k, f, mtemp, mtemp2, ms, rd) \
+            private(i, j, j1, f, mtemp, mtemp2, ms, rd) \
             schedule(static)
     for (i = 0; i < Npoints; ++i) {
         f = M_2PI / lambda[i];
@@ -2579,29 +3026,23 @@ int ang2q_conversion_area_sdtrans(
         /* ms contains now the inverse rotation matrix for the sample circles
          * detector rotations/translations need to be applied separately for
          * every pixel */
-        for (j1 = roi[0]; j1 < roi[1]; ++j1) {
-            for (j2 = roi[2]; j2 < roi[3]; ++j2) {
-                for (k = 0; k < 3; ++k) {
-                    rd[k] = j1 * rpixel1[k] + j2 * rpixel2[k] - rcchp[k];
-                }
-                sumvec(rd, rcch);
-                /* apply detector rotations/translations, starting with the
-                 * inner most */
-                for (j = Nd - 1; j >= 0; --j) {
-                    detectorRotation[j](detectorAngles[Nd * i + j], rd);
-                }
-                /* consider the effect of the sample displacement */
-                diffvec(rd, sampledis);
-                normalize(rd);
-                /* rd contains detector pixel direction,
-                 * r_i contains primary beam direction */
-                diffvec(rd, r_i);
-                vecmul(rd, f);
-                /* determine momentum transfer */
-                matvec(ms, rd,
-                       &qpos[3 * (i * idxh1 + idxh2 * (j1 - roi[0]) +
-                             (j2 - roi[2]))]);
+        for (j1 = 0; j1 < Npix; ++j1) {
+            veccopy(rd, &rpix[3 * j1]);
+            /* apply detector rotations/translations, starting with the
+             * inner most */
+            for (j = Nd - 1; j >= 0; --j) {
+                detectorRotation[j](detectorAngles[Nd * i + j], rd);
             }
+            /* consider the effect of the sample displacement */
+            diffvec(rd, sampledis);
+            normalize(rd);
+            /* rd contains detector pixel direction,
+             * r_i contains primary beam direction */
+            diffvec(rd, r_i);
+            vecmul(rd, f);
+            /* determine momentum transfer */
+            matvec_out(ms, rd, qpos,
+                       3 * (i * Npix + j1), flags);
         }
     }
     return 0;
@@ -2739,6 +3180,7 @@ PyObject* ang2q_conversion_area_pixel(PyObject *self, PyObject *args)
     }
 
     /* calculate rotation matices and perform rotations */
+    Py_BEGIN_ALLOW_THREADS
     #pragma omp parallel for default(shared) \
             private(i, j, k, rd) \
             schedule(static)
@@ -2760,6 +3202,7 @@ PyObject* ang2q_conversion_area_pixel(PyObject *self, PyObject *args)
         /* save momentum transfer to output */
         veccopy(&qpos[3 * i], rd);
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(detectorAnglesArr);
@@ -2936,6 +3379,7 @@ PyObject* ang2q_conversion_area_pixel2(PyObject *self, PyObject *args)
     }
 
     /* calculate rotation matices and perform rotations */
+    Py_BEGIN_ALLOW_THREADS
     #pragma omp parallel for default(shared) \
             private(i, j, k, mtemp, mtemp2, ms, rd) \
             schedule(static)
@@ -2969,6 +3413,7 @@ PyObject* ang2q_conversion_area_pixel2(PyObject *self, PyObject *args)
         /* determine momentum transfer */
         matvec(ms, rd, &qpos[3 * i]);
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(detectorAnglesArr);
@@ -3069,6 +3514,7 @@ PyObject* ang2q_detpos(PyObject *self, PyObject *args)
     }
 
     /* calculate rotation matices and perform rotations */
+    Py_BEGIN_ALLOW_THREADS
     #pragma omp parallel for default(shared) \
             private(i, j, rd) schedule(static)
     for (i = 0; i < Npoints; ++i) {
@@ -3079,6 +3525,7 @@ PyObject* ang2q_detpos(PyObject *self, PyObject *args)
         }
         veccopy(&qpos[3 * i], rd);
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(detectorAnglesArr);
@@ -3196,6 +3643,7 @@ PyObject* ang2q_detpos_linear(PyObject *self, PyObject *args)
     }
 
     /* calculate rotation matices and perform rotations */
+    Py_BEGIN_ALLOW_THREADS
     #pragma omp parallel for default(shared) \
             private(i, j, k, rd) schedule(static)
     for (i = 0; i < Npoints; ++i) {
@@ -3212,6 +3660,7 @@ PyObject* ang2q_detpos_linear(PyObject *self, PyObject *args)
             veccopy(&qpos[3 * (i * Nch + j - roi[0])], rd);
         }
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(detectorAnglesArr);
@@ -3350,6 +3799,7 @@ PyObject* ang2q_detpos_area(PyObject *self, PyObject *args)
     }
 
     /* calculate rotation matices and perform rotations */
+    Py_BEGIN_ALLOW_THREADS
     #pragma omp parallel for default(shared) \
             private(i, j, j1, j2, k, rd) schedule(static)
     for (i = 0; i < Npoints; ++i) {
@@ -3370,6 +3820,7 @@ PyObject* ang2q_detpos_area(PyObject *self, PyObject *args)
             }
         }
     }
+    Py_END_ALLOW_THREADS
 
     /* clean up */
     Py_DECREF(detectorAnglesArr);
@@ -3379,3 +3830,920 @@ PyObject* ang2q_detpos_area(PyObject *self, PyObject *args)
     /* return output array */
     return PyArray_Return(qposArr);
 }
+
+
+/* ##################################################
+ *  fused conversion and gridding for area detectors
+ * ##################################################*/
+
+PyObject* py_ang2q_conversion_area_grid(PyObject *self, PyObject *args)
+   /* conversion of Npoints of goniometer positions to reciprocal space for an
+    * area detector with direct binning of the detector intensities onto a
+    * regular three-dimensional grid. In contrast to a call of
+    * py_ang2q_conversion_area followed by the 3D gridder the momentum
+    * transfer of the pixels is never stored. The data and normalization
+    * arrays of the grid are only incremented, i.e. neither initialization
+    * nor normalization is performed.
+    *
+    *   Parameters
+    *   ----------
+    *   sampleAngles .... angular positions of the sample goniometer
+    *                     (Npoints, Ns)
+    *   detectorAngles .. angular positions of the detector goniometer
+    *                     (Npoints, Nd)
+    *   rcch ............ direction + distance of center pixel (angles zero)
+    *   sampleAxis ...... string with sample axis directions
+    *   detectorAxis .... string with detector axis directions
+    *   kappadir ........ rotation axis of a possible kappa circle
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix1, Npix2, 3), see py_ang2q_detector_area
+    *   UB .............. orientation matrix and reciprocal space conversion
+    *                     of investigated crystal (3, 3)
+    *   sampledis ....... sample displacement vector, same units as the
+    *                     detector distance
+    *   lambda .......... wavelength of the used x-rays (Npoints,)
+    *   data ............ detector intensities (Npoints * Npix1 * Npix2)
+    *   nx, ny, nz ...... number of grid points in x, y, z-direction
+    *   xmin, xmax ...... minimum and maximum x-value of the grid
+    *   ymin, ymax ...... minimum and maximum y-value of the grid
+    *   zmin, zmax ...... minimum and maximum z-value of the grid
+    *   odata ........... gridded data (nx, ny, nz)
+    *   norm ............ normalization array of the grid (nx, ny, nz)
+    *   nthreads ........ number of threads to use in parallelization
+    *   flags ........... integer with flags: (1: has_translations;
+    *                                          4: has_sampledis;
+    *                                          16: verbose)
+    *
+    *   Returns
+    *   -------
+    *   noutofbounds .... number of data points outside the grid
+    *   */
+{
+    int Ns, Nd;  /* number of sample and detector circles */
+    int Npoints;  /* number of angular positions */
+    npy_intp r;  /* return value: number of points out of bounds */
+    int flags;  /* flags to select behavior of the function */
+    unsigned int nthreads;  /* number threads for OpenMP */
+    unsigned int nx, ny, nz;  /* number of grid points */
+    double xmin, xmax, ymin, ymax, zmin, zmax;
+    /* string with sample and detector axis */
+    char *sampleAxis, *detectorAxis;
+    double *sampleAngles,*detectorAngles, *rcch, *kappadir, *rpix, *UB,
+           *sampledis, *lambda, *odata, *norm;  /* c-arrays for further usage */
+    void *data;  /* detector intensities */
+    int dtype;  /* numpy type of the detector intensities */
+    int Npix;  /* number of detector pixels */
+    double grid[6];  /* grid boundaries */
+    unsigned int ngrid[3];  /* grid dimensions */
+    /* numpy arrays */
+    PyArrayObject *sampleAnglesArr = NULL, *detectorAnglesArr = NULL,
+                  *rcchArr = NULL, *kappadirArr = NULL, *rpixArr = NULL,
+                  *sampledisArr = NULL, *UBArr = NULL, *lambdaArr = NULL,
+                  *dataArr = NULL, *odataArr = NULL, *normArr = NULL;
+
+    /* Python argument conversion code */
+    if (!PyArg_ParseTuple(args, "O!O!O!ssO!O!O!O!O!O!IIIddddddO!O!Ii",
+                          &PyArray_Type, &sampleAnglesArr,
+                          &PyArray_Type, &detectorAnglesArr,
+                          &PyArray_Type, &rcchArr,
+                          &sampleAxis, &detectorAxis,
+                          &PyArray_Type, &kappadirArr,
+                          &PyArray_Type, &rpixArr,
+                          &PyArray_Type, &UBArr,
+                          &PyArray_Type, &sampledisArr,
+                          &PyArray_Type, &lambdaArr,
+                          &PyArray_Type, &dataArr,
+                          &nx, &ny, &nz,
+                          &xmin, &xmax, &ymin, &ymax, &zmin, &zmax,
+                          &PyArray_Type, &odataArr,
+                          &PyArray_Type, &normArr,
+                          &nthreads, &flags)) {
+        return NULL;
+    }
+
+    /* check Python array dimensions and types */
+    PYARRAY_CHECK(sampleAnglesArr, 2, NPY_DOUBLE,
+                  "sampleAngles must be a 2D double array");
+    PYARRAY_CHECK(detectorAnglesArr, 2, NPY_DOUBLE,
+                  "detectorAngles must be a 2D double array");
+    PYARRAY_CHECK(lambdaArr, 1, NPY_DOUBLE,
+                  "wavelength must be a 1D double array");
+    PYARRAY_CHECK(rcchArr, 1, NPY_DOUBLE, "rcch must be a 1D double array");
+    if (PyArray_SIZE(rcchArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "rcch needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(kappadirArr, 1, NPY_DOUBLE,
+                  "kappa_dir must be a 1D double array");
+    if (PyArray_SIZE(kappadirArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "kappa_dir needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(UBArr, 2, NPY_DOUBLE, "UB must be a 2D double array");
+    if (PyArray_DIMS(UBArr)[0] != 3 || PyArray_DIMS(UBArr)[1] != 3) {
+        PyErr_SetString(PyExc_ValueError, "UB must be of shape (3, 3)");
+        return NULL;
+    }
+    PYARRAY_CHECK(rpixArr, 3, NPY_DOUBLE, "rpix must be a 3D double array");
+    if (PyArray_DIMS(rpixArr)[2] != 3) {
+        PyErr_SetString(PyExc_ValueError,
+                        "rpix must be of shape (Npix1, Npix2, 3)");
+        return NULL;
+    }
+    PYARRAY_CHECK(sampledisArr, 1, NPY_DOUBLE,
+                  "sampledis must be a 1D double array");
+    if (PyArray_SIZE(sampledisArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "sampledis needs to be of length 3");
+        return NULL;
+    }
+    dtype = GRIDDER_DATA_TYPE(dataArr);
+    PYARRAY_CHECK(dataArr, 1, dtype, "input data must be a 1D array!");
+    PYARRAY_CHECK(odataArr, 3, NPY_DOUBLE,
+                  "ouput data must be a 3D double array!");
+    PYARRAY_CHECK(normArr, 3, NPY_DOUBLE,
+                  "norm data must be a 3D double array!");
+    if (PyArray_SIZE(odataArr) != (npy_intp) nx * ny * nz ||
+        PyArray_SIZE(normArr) != (npy_intp) nx * ny * nz) {
+        PyErr_SetString(PyExc_ValueError,
+            "output and norm array must be of size nx * ny * nz");
+        return NULL;
+    }
+
+    Npoints = (int) PyArray_DIMS(sampleAnglesArr)[0];
+    Ns = (int) PyArray_DIMS(sampleAnglesArr)[1];
+    Nd = (int) PyArray_DIMS(detectorAnglesArr)[1];
+    if (PyArray_DIMS(detectorAnglesArr)[0] != Npoints) {
+        PyErr_SetString(PyExc_ValueError,
+            "detectorAngles and sampleAngles must have same first dimension");
+        return NULL;
+    }
+    if (PyArray_SIZE(lambdaArr) != Npoints) {
+        PyErr_SetString(PyExc_ValueError,
+            "size of wavelength array need to fit with angle arrays");
+        return NULL;
+    }
+
+    Npix = (int) (PyArray_DIMS(rpixArr)[0] * PyArray_DIMS(rpixArr)[1]);
+    if (PyArray_SIZE(dataArr) != (npy_intp) Npoints * Npix) {
+        PyErr_SetString(PyExc_ValueError,
+            "size of data array must be Npoints * Npix1 * Npix2");
+        return NULL;
+    }
+
+    sampleAngles = (double *) PyArray_DATA(sampleAnglesArr);
+    detectorAngles = (double *) PyArray_DATA(detectorAnglesArr);
+    lambda = (double *) PyArray_DATA(lambdaArr);
+    rcch = (double *) PyArray_DATA(rcchArr);
+    kappadir = (double *) PyArray_DATA(kappadirArr);
+    UB = (double *) PyArray_DATA(UBArr);
+    rpix = (double *) PyArray_DATA(rpixArr);
+    sampledis = (double *) PyArray_DATA(sampledisArr);
+    data = PyArray_DATA(dataArr);
+    odata = (double *) PyArray_DATA(odataArr);
+    norm = (double *) PyArray_DATA(normArr);
+
+    grid[0] = xmin; grid[1] = xmax;
+    grid[2] = ymin; grid[3] = ymax;
+    grid[4] = zmin; grid[5] = zmax;
+    ngrid[0] = nx; ngrid[1] = ny; ngrid[2] = nz;
+
+    #ifdef __OPENMP__
+    /* set openmp thread numbers dynamically */
+    OMPSETNUMTHREADS(nthreads);
+    #endif
+
+    Py_BEGIN_ALLOW_THREADS
+    r = ang2q_conversion_area_grid(
+            sampleAngles, detectorAngles, rcch, sampleAxis, detectorAxis,
+            kappadir, rpix, UB, sampledis, lambda, Npoints, Ns, Nd, Npix,
+            data, dtype, ngrid, grid, odata, norm, flags);
+    Py_END_ALLOW_THREADS
+
+    /* clean up */
+    Py_DECREF(sampleAnglesArr);
+    Py_DECREF(detectorAnglesArr);
+    Py_DECREF(rcchArr);
+    Py_DECREF(kappadirArr);
+    Py_DECREF(rpixArr);
+    Py_DECREF(UBArr);
+    Py_DECREF(sampledisArr);
+    Py_DECREF(lambdaArr);
+    Py_DECREF(dataArr);
+    Py_DECREF(odataArr);
+    Py_DECREF(normArr);
+    if (r < 0) {
+        return NULL;
+    }
+
+    return Py_BuildValue("n", (Py_ssize_t) r);
+}
+
+
+npy_intp ang2q_conversion_area_grid(
+        double *sampleAngles, double *detectorAngles, double *rcch,
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Npix, void *data, int dtype, unsigned int *ngrid,
+        double *grid, double *odata, double *norm, int flags)
+   /* conversion of Npoints of goniometer positions to reciprocal space
+    * for an area detector and binning of the detector intensities on a
+    * regular grid. All variants of the area detector conversion (detector
+    * translations and/or sample displacement) are supported and selected by
+    * the flags.
+    *
+    *   Parameters
+    *   ----------
+    *   sampleAngles .... angular positions of the sample goniometer
+    *                     (Npoints, Ns)
+    *   detectorAngles .. angular positions of the detector goniometer
+    *                     (Npoints, Nd)
+    *   rcch ............ direction + distance of center pixel (angles zero)
+    *   sampleAxis ...... string with sample axis directions
+    *   detectorAxis .... string with detector axis directions
+    *   kappadir ........ rotation axis of a possible kappa circle
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix, 3)
+    *   UB .............. orientation matrix and reciprocal space conversion
+    *                     of investigated crystal (3, 3)
+    *   sampledis ....... sample displacement vector, same units as the
+    *                     detector distance
+    *   lambda .......... wavelength of the used x-rays (Npoints,)
+    *   Npoints ......... number of points to calculate
+    *   Ns .............. number of sample axes
+    *   Nd .............. number of detector axes
+    *   Npix ............ number of detector pixels
+    *   data ............ detector intensities (Npoints * Npix1 * Npix2)
+    *   dtype ........... numpy type of the detector intensities, see
+    *                     GRIDDER_DATA_TYPE
+    *   ngrid ........... number of grid points in the three directions
+    *   grid ............ grid boundaries (xmin, xmax, ymin, ymax, zmin, zmax)
+    *   odata ........... gridded data (nx * ny * nz) (OUTPUT array)
+    *   norm ............ normalization of the grid (nx * ny * nz)
+    *                     (OUTPUT array)
+    *   flags ........... integer with flags: (1: has_translations;
+    *                                          4: has_sampledis;
+    *                                          16: verbose)
+    *
+    *   Returns
+    *   -------
+    *   number of data points out of the grid boundaries or -1 in case of an
+    *   error
+    *   */
+{
+    double mtemp[9], mtemp2[9], ms[9], md[9];  /* matrices */
+    double rd[3];  /* detector position */
+    double r_i[3], rtemp[3], q[3];  /* r_i: center channel direction */
+    int i, j, j1;  /* loop indices */
+    double f;  /* f = M_2PI / lambda */
+    double d, dx, dy, dz;  /* data value and grid step width */
+    unsigned int offset;  /* linear offset for the grid data */
+    npy_intp noutofbounds = 0;  /* number of points out of bounds */
+    fp_rot *sampleRotation, *detectorRotation;
+
+    /* compute step width for the grid */
+    dx = delta(grid[0], grid[1], ngrid[0]);
+    dy = delta(grid[2], grid[3], ngrid[1]);
+    dz = delta(grid[4], grid[5], ngrid[2]);
+
+    /* arrays with function pointers to rotation matrix functions */
+    sampleRotation = (fp_rot*) malloc(Ns * sizeof(fp_rot));
+    detectorRotation = (fp_rot*) malloc(Nd * sizeof(fp_rot));
+
+    /* determine axes directions */
+    if (determine_axes_directions(sampleRotation, sampleAxis, Ns) != 0) {
+        return -1;
+    }
+    if (flags & HAS_TRANSLATIONS) {
+        if (determine_axes_directions_apply(detectorRotation,
+                                            detectorAxis, Nd) != 0) {
+            return -1;
+        }
+    }
+    else {
+        if (determine_axes_directions(detectorRotation,
+                                      detectorAxis, Nd) != 0) {
+            return -1;
+        }
+    }
+
+    veccopy(r_i, rcch);
+    normalize(r_i);
+
+    /* calculate rotation matices and perform rotations; several frames can
+     * contribute to the same grid point and therefore the grid update needs
+     * to be atomic */
+    #pragma omp parallel for default(shared) \
+            private(i, j, j1, f, d, offset, mtemp, mtemp2, ms, md, \
+                    rd, rtemp, q) \
+            reduction(+:noutofbounds) schedule(static)
+    for (i = 0; i < Npoints; ++i) {
+        f = M_2PI / lambda[i];
+        /* determine sample rotations */
+        ident(mtemp);
+        for (j = 0; j < Ns; ++j) {
+            /* load kappa direction into matrix
+             * (just needed for kappa goniometer) */
+            mtemp2[0] = kappadir[0];
+            mtemp2[1] = kappadir[1];
+            mtemp2[2] = kappadir[2];
+            sampleRotation[j](sampleAngles[Ns * i + j], mtemp2);
+            matmul(mtemp, mtemp2);
+        }
+        /* apply rotation of orientation matrix */
+        matmul(mtemp, UB);
+        /* determine inverse matrix */
+        inversemat(mtemp, ms);
+
+        /* determine detector rotations, in case of translations they are
+         * applied separately for every pixel */
+        if (!(flags & HAS_TRANSLATIONS)) {
+            ident(md);
+            for (j = 0; j < Nd; ++j) {
+                detectorRotation[j](detectorAngles[Nd * i + j], mtemp);
+                matmul(md, mtemp);
+            }
+        }
+
+        for (j1 = 0; j1 < Npix; ++j1) {
+            d = gridder_data_value(data, dtype, (size_t) i * Npix + j1);
+            if (isnan(d)) {
+                continue;
+            }
+            veccopy(rd, &rpix[3 * j1]);
+            if (flags & HAS_TRANSLATIONS) {
+                /* apply detector rotations/translations, starting with
+                 * the inner most */
+                for (j = Nd - 1; j >= 0; --j) {
+                    detectorRotation[j](detectorAngles[Nd * i + j], rd);
+                }
+                veccopy(rtemp, rd);
+            }
+            else if (flags & HAS_SAMPLEDIS) {
+                matvec(md, rd, rtemp);
+            }
+            else {
+                /* same order of operations as in ang2q_conversion_area to
+                 * obtain identical momentum transfer values */
+                normalize(rd);
+                matvec(md, rd, rtemp);
+            }
+            if (flags & HAS_SAMPLEDIS) {
+                /* consider the effect of the sample displacement */
+                diffvec(rtemp, sampledis);
+            }
+            if (flags & (HAS_TRANSLATIONS | HAS_SAMPLEDIS)) {
+                normalize(rtemp);
+            }
+            /* rtemp contains detector pixel direction,
+             * r_i contains primary beam direction */
+            diffvec(rtemp, r_i);
+            vecmul(rtemp, f);
+            /* determine momentum transfer */
+            matvec(ms, rtemp, q);
+
+            /* check if the current point is within the bounds of the
+             * grid */
+            if ((q[0] < grid[0]) || (q[0] > grid[1]) ||
+                (q[1] < grid[2]) || (q[1] > grid[3]) ||
+                (q[2] < grid[4]) || (q[2] > grid[5])) {
+                noutofbounds++;
+                continue;
+            }
+            offset = gindex(q[0], grid[0], dx) * ngrid[1] * ngrid[2] +
+                     gindex(q[1], grid[2], dy) * ngrid[2] +
+                     gindex(q[2], grid[4], dz);
+            #pragma omp atomic
+            odata[offset] += d;
+            #pragma omp atomic
+            norm[offset] += 1.;
+        }
+    }
+
+    free(sampleRotation);
+    free(detectorRotation);
+
+    /* warn the user in case more than half the data points where out
+     * of the gridding area */
+    if (noutofbounds > (npy_intp) Npoints * Npix / 2) {
+        fprintf(stdout, "XU.Gridder3D(c): more than half of the datapoints "
+                "out of the data range, consider regridding with extended "
+                "range!\n");
+    }
+
+    return noutofbounds;
+}
+
+
+/*################################################
+#   bounding box of the momentum transfer
+#   of area and linear detectors
+##################################################*/
+
+PyObject* py_ang2q_conversion_area_bounds(PyObject *self, PyObject *args)
+   /* determine the minimum and maximum momentum transfer of all pixels of
+    * an area or linear detector for Npoints goniometer positions without
+    * converting every pixel. Only the boundary pixels of the detector and the
+    * pixels next to the stationary point of every momentum transfer component
+    * along each detector row are converted using the same routines as
+    * ang2q_conversion_area.
+    *
+    *   Parameters
+    *   ----------
+    *   sampleAngles .... angular positions of the sample goniometer
+    *                     (Npoints, Ns)
+    *   detectorAngles .. angular positions of the detector goniometer
+    *                     (Npoints, Nd)
+    *   rcch ............ direction + distance of center pixel (angles zero)
+    *   sampleAxis ...... string with sample axis directions
+    *   detectorAxis .... string with detector axis directions
+    *   kappadir ........ rotation axis of a possible kappa circle
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix1, Npix2, 3); use Npix2 = 1 for a linear
+    *                     detector
+    *   UB .............. orientation matrix and reciprocal space conversion
+    *                     of investigated crystal (3, 3)
+    *   sampledis ....... sample displacement vector, same units as the
+    *                     detector distance
+    *   lambda .......... wavelength of the used x-rays (Npoints,)
+    *   nthreads ........ number of threads to use in parallelization
+    *   flags ........... integer with flags: (1: has_translations;
+    *                                          4: has_sampledis;
+    *                                          16: verbose)
+    *
+    *   Returns
+    *   -------
+    *   bounds .......... minimum and maximum of the momentum transfer
+    *                     components (3, 2)
+    *   */
+{
+    int Ns, Nd;  /* number of sample and detector circles */
+    int Npoints;  /* number of angular positions */
+    int Npix1, Npix2;  /* number of detector pixels */
+    int r;  /* return value checking */
+    int flags;  /* flags to select behavior of the function */
+    unsigned int nthreads;  /* number threads for OpenMP */
+    /* string with sample and detector axis */
+    char *sampleAxis, *detectorAxis;
+    double *sampleAngles,*detectorAngles, *rcch, *kappadir, *rpix, *UB,
+           *sampledis, *lambda, *bounds;  /* c-arrays for further usage */
+    npy_intp nout[2] = {3, 2};
+    /* numpy arrays */
+    PyArrayObject *sampleAnglesArr = NULL, *detectorAnglesArr = NULL,
+                  *rcchArr = NULL, *kappadirArr = NULL, *rpixArr = NULL,
+                  *sampledisArr = NULL, *UBArr = NULL, *lambdaArr = NULL,
+                  *boundsArr = NULL;
+
+    /* Python argument conversion code */
+    if (!PyArg_ParseTuple(args, "O!O!O!ssO!O!O!O!O!Ii",
+                          &PyArray_Type, &sampleAnglesArr,
+                          &PyArray_Type, &detectorAnglesArr,
+                          &PyArray_Type, &rcchArr,
+                          &sampleAxis, &detectorAxis,
+                          &PyArray_Type, &kappadirArr,
+                          &PyArray_Type, &rpixArr,
+                          &PyArray_Type, &UBArr,
+                          &PyArray_Type, &sampledisArr,
+                          &PyArray_Type, &lambdaArr,
+                          &nthreads, &flags)) {
+        return NULL;
+    }
+
+    /* check Python array dimensions and types */
+    PYARRAY_CHECK(sampleAnglesArr, 2, NPY_DOUBLE,
+                  "sampleAngles must be a 2D double array");
+    PYARRAY_CHECK(detectorAnglesArr, 2, NPY_DOUBLE,
+                  "detectorAngles must be a 2D double array");
+    PYARRAY_CHECK(lambdaArr, 1, NPY_DOUBLE,
+                  "wavelength must be a 1D double array");
+    PYARRAY_CHECK(rcchArr, 1, NPY_DOUBLE, "rcch must be a 1D double array");
+    if (PyArray_SIZE(rcchArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "rcch needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(kappadirArr, 1, NPY_DOUBLE,
+                  "kappa_dir must be a 1D double array");
+    if (PyArray_SIZE(kappadirArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "kappa_dir needs to be of length 3");
+        return NULL;
+    }
+    PYARRAY_CHECK(UBArr, 2, NPY_DOUBLE, "UB must be a 2D double array");
+    if (PyArray_DIMS(UBArr)[0] != 3 || PyArray_DIMS(UBArr)[1] != 3) {
+        PyErr_SetString(PyExc_ValueError, "UB must be of shape (3, 3)");
+        return NULL;
+    }
+    PYARRAY_CHECK(rpixArr, 3, NPY_DOUBLE, "rpix must be a 3D double array");
+    if (PyArray_DIMS(rpixArr)[2] != 3 || PyArray_SIZE(rpixArr) == 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "rpix must be of shape (Npix1, Npix2, 3)");
+        return NULL;
+    }
+    PYARRAY_CHECK(sampledisArr, 1, NPY_DOUBLE,
+                  "sampledis must be a 1D double array");
+    if (PyArray_SIZE(sampledisArr) != 3) {
+        PyErr_SetString(PyExc_ValueError, "sampledis needs to be of length 3");
+        return NULL;
+    }
+
+    Npoints = (int) PyArray_DIMS(sampleAnglesArr)[0];
+    Ns = (int) PyArray_DIMS(sampleAnglesArr)[1];
+    Nd = (int) PyArray_DIMS(detectorAnglesArr)[1];
+    if (PyArray_DIMS(detectorAnglesArr)[0] != Npoints) {
+        PyErr_SetString(PyExc_ValueError,
+            "detectorAngles and sampleAngles must have same first dimension");
+        return NULL;
+    }
+    if (PyArray_SIZE(lambdaArr) != Npoints) {
+        PyErr_SetString(PyExc_ValueError,
+            "size of wavelength array need to fit with angle arrays");
+        return NULL;
+    }
+    Npix1 = (int) PyArray_DIMS(rpixArr)[0];
+    Npix2 = (int) PyArray_DIMS(rpixArr)[1];
+
+    sampleAngles = (double *) PyArray_DATA(sampleAnglesArr);
+    detectorAngles = (double *) PyArray_DATA(detectorAnglesArr);
+    lambda = (double *) PyArray_DATA(lambdaArr);
+    rcch = (double *) PyArray_DATA(rcchArr);
+    kappadir = (double *) PyArray_DATA(kappadirArr);
+    UB = (double *) PyArray_DATA(UBArr);
+    rpix = (double *) PyArray_DATA(rpixArr);
+    sampledis = (double *) PyArray_DATA(sampledisArr);
+
+    boundsArr = (PyArrayObject *) PyArray_SimpleNew(2, nout, NPY_DOUBLE);
+    bounds = (double *) PyArray_DATA(boundsArr);
+
+    #ifdef __OPENMP__
+    /* set openmp thread numbers dynamically */
+    OMPSETNUMTHREADS(nthreads);
+    #endif
+
+    Py_BEGIN_ALLOW_THREADS
+    r = ang2q_conversion_area_bounds(
+            sampleAngles, detectorAngles, rcch, sampleAxis, detectorAxis,
+            kappadir, rpix, UB, sampledis, lambda, Npoints, Ns, Nd, Npix1,
+            Npix2, flags, bounds);
+    Py_END_ALLOW_THREADS
+
+    /* clean up */
+    Py_DECREF(sampleAnglesArr);
+    Py_DECREF(detectorAnglesArr);
+    Py_DECREF(rcchArr);
+    Py_DECREF(kappadirArr);
+    Py_DECREF(rpixArr);
+    Py_DECREF(UBArr);
+    Py_DECREF(sampledisArr);
+    Py_DECREF(lambdaArr);
+    if (r != 0) {
+        Py_DECREF(boundsArr);
+        if (!PyErr_Occurred()) {
+            PyErr_SetString(PyExc_MemoryError,
+                            "failed to allocate pixel buffers");
+        }
+        return NULL;
+    }
+
+    return PyArray_Return(boundsArr);
+}
+
+
+static int append_pixels(double *rpix, int Npix2, int i0, int i1, int j0,
+                         int j1, double **buf, int *n, int *nalloc)
+   /* append the positions of the pixels (i0..i1, j0..j1) to a buffer which
+    * is enlarged if necessary; returns -1 if the allocation fails */
+{
+    int i, j;
+    double *tmp;
+
+    if (*n + (i1 - i0 + 1) * (j1 - j0 + 1) > *nalloc) {
+        *nalloc = 2 * (*n + (i1 - i0 + 1) * (j1 - j0 + 1));
+        tmp = realloc(*buf, 3 * (size_t) *nalloc * sizeof(double));
+        if (tmp == NULL) {
+            return -1;
+        }
+        *buf = tmp;
+    }
+    for (i = i0; i <= i1; ++i) {
+        for (j = j0; j <= j1; ++j) {
+            veccopy(&(*buf)[3 * *n], &rpix[3 * (i * Npix2 + j)]);
+            (*n)++;
+        }
+    }
+    return 0;
+}
+
+
+int ang2q_conversion_area_bounds(
+        double *sampleAngles, double *detectorAngles, double *rcch,
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Npix1, int Npix2, int flags, double *bounds)
+   /* determine the bounding box of the momentum transfer of all pixels of an
+    * area detector (or a linear detector with Npix2 = 1) for Npoints
+    * goniometer positions.
+    *
+    * For every frame the pixel positions are an affine function of the
+    * pixel indices and a component q_c = f * (e_c . r / |r| - e_c . r_i)
+    * with e_c the c-th row of the inverse sample rotation matrix has at most
+    * one stationary point along every detector row. Therefore the extrema
+    * of q_c are either found on the detector boundary or next to the
+    * stationary point of one of the rows. The momentum transfer of these
+    * pixels is calculated with the regular conversion functions so that
+    * the result is identical to the extrema of a full conversion.
+    *
+    *   Parameters
+    *   ----------
+    *   sampleAngles .... angular positions of the sample goniometer
+    *                     (Npoints, Ns)
+    *   detectorAngles .. angular positions of the detector goniometer
+    *                     (Npoints, Nd)
+    *   rcch ............ direction + distance of center pixel (angles zero)
+    *   sampleAxis ...... string with sample axis directions
+    *   detectorAxis .... string with detector axis directions
+    *   kappadir ........ rotation axis of a possible kappa circle
+    *   rpix ............ position of the detector pixels relative to the
+    *                     center of rotation at zero detector angles
+    *                     (Npix1, Npix2, 3)
+    *   UB .............. orientation matrix and reciprocal space conversion
+    *                     of investigated crystal (3, 3)
+    *   sampledis ....... sample displacement vector, same units as the
+    *                     detector distance
+    *   lambda .......... wavelength of the used x-rays (Npoints,)
+    *   Npoints ......... number of points to calculate
+    *   Ns .............. number of sample axes
+    *   Nd .............. number of detector axes
+    *   Npix1, Npix2 .... number of detector pixels along the two directions
+    *   flags ........... integer with flags: (1: has_translations;
+    *                                          4: has_sampledis;
+    *                                          16: verbose)
+    *   bounds .......... minimum and maximum of the three momentum transfer
+    *                     components (3 * 2) (OUTPUT array)
+    *
+    *   Returns
+    *   -------
+    *   0 on success or -1 in case of an error
+    *   */
+{
+    double mtemp[9], mtemp2[9], ms[9], md[9];  /* matrices */
+    double p[3][3];  /* lab positions of three corner pixels */
+    double a[3], b[3], e[3], x[3], *dir;
+    double ed, dd, ex, xd, xx, den, tr;
+    double lbounds[6];  /* bounds determined by the individual threads */
+    double *buf = NULL, *qbuf = NULL;  /* pixel positions and momentum */
+    int nalloc, nqalloc = 0, n;  /* buffer sizes and number of pixels */
+    int i, j, k, c, j0, j1, nrows, nrow;
+    int Npix = Npix1 * Npix2;
+    int linear = (Npix1 == 1 || Npix2 == 1);
+    int corner[3];  /* indices of the corner pixels */
+    int cflags = flags & (HAS_TRANSLATIONS | HAS_SAMPLEDIS);
+    int r = 0, err;  /* return value and error of the individual threads */
+    fp_rot *sampleRotation, *detectorRotation;
+
+    for (c = 0; c < 3; ++c) {
+        bounds[2 * c] = INFINITY;
+        bounds[2 * c + 1] = -INFINITY;
+    }
+
+    /* arrays with function pointers to rotation matrix functions */
+    sampleRotation = (fp_rot*) malloc(Ns * sizeof(fp_rot));
+    detectorRotation = (fp_rot*) malloc(Nd * sizeof(fp_rot));
+
+    /* determine axes directions; this also validates the axes strings
+     * before they are used in the conversion functions below */
+    if (determine_axes_directions(sampleRotation, sampleAxis, Ns) != 0) {
+        return -1;
+    }
+    if (flags & HAS_TRANSLATIONS) {
+        if (determine_axes_directions_apply(detectorRotation,
+                                            detectorAxis, Nd) != 0) {
+            return -1;
+        }
+    }
+    else {
+        if (determine_axes_directions(detectorRotation,
+                                      detectorAxis, Nd) != 0) {
+            return -1;
+        }
+    }
+
+    /* corner pixels spanning the detector plane */
+    corner[0] = 0;
+    if (linear) {
+        corner[1] = Npix - 1;
+        corner[2] = Npix - 1;
+    }
+    else {
+        corner[1] = (Npix1 - 1) * Npix2;
+        corner[2] = Npix2 - 1;
+    }
+
+    #pragma omp parallel default(shared) \
+            private(i, j, k, c, j0, j1, nrows, nrow, n, nalloc, nqalloc, \
+                    buf, qbuf, mtemp, mtemp2, ms, md, p, a, b, e, x, dir, \
+                    ed, dd, ex, xd, xx, den, tr, lbounds, err)
+    {
+    err = 0;
+    buf = NULL;
+    qbuf = NULL;
+    nalloc = 0;
+    nqalloc = 0;
+    for (c = 0; c < 3; ++c) {
+        lbounds[2 * c] = INFINITY;
+        lbounds[2 * c + 1] = -INFINITY;
+    }
+
+    #pragma omp for schedule(static)
+    for (i = 0; i < Npoints; ++i) {
+        if (err != 0) {
+            continue;
+        }
+        /* determine sample rotations */
+        ident(mtemp);
+        for (j = 0; j < Ns; ++j) {
+            /* load kappa direction into matrix
+             * (just needed for kappa goniometer) */
+            mtemp2[0] = kappadir[0];
+            mtemp2[1] = kappadir[1];
+            mtemp2[2] = kappadir[2];
+            sampleRotation[j](sampleAngles[Ns * i + j], mtemp2);
+            matmul(mtemp, mtemp2);
+        }
+        matmul(mtemp, UB);
+        inversemat(mtemp, ms);
+
+        /* lab frame position of the corner pixels relative to the sample */
+        if (!(flags & HAS_TRANSLATIONS)) {
+            ident(md);
+            for (j = 0; j < Nd; ++j) {
+                detectorRotation[j](detectorAngles[Nd * i + j], mtemp);
+                matmul(md, mtemp);
+            }
+        }
+        for (k = 0; k < 3; ++k) {
+            if (flags & HAS_TRANSLATIONS) {
+                veccopy(p[k], &rpix[3 * corner[k]]);
+                for (j = Nd - 1; j >= 0; --j) {
+                    detectorRotation[j](detectorAngles[Nd * i + j], p[k]);
+                }
+            }
+            else {
+                matvec(md, &rpix[3 * corner[k]], p[k]);
+            }
+            if (flags & HAS_SAMPLEDIS) {
+                diffvec(p[k], sampledis);
+            }
+        }
+
+        /* detector boundary */
+        n = 0;
+        if (linear) {
+            err |= append_pixels(rpix, 1, 0, 0, 0, 0, &buf, &n, &nalloc);
+            err |= append_pixels(rpix, 1, Npix - 1, Npix - 1, 0, 0,
+                                 &buf, &n, &nalloc);
+        }
+        else {
+            err |= append_pixels(rpix, Npix2, 0, 0, 0, Npix2 - 1,
+                                 &buf, &n, &nalloc);
+            err |= append_pixels(rpix, Npix2, Npix1 - 1, Npix1 - 1, 0,
+                                 Npix2 - 1, &buf, &n, &nalloc);
+            if (Npix1 > 2) {
+                err |= append_pixels(rpix, Npix2, 1, Npix1 - 2, 0, 0,
+                                     &buf, &n, &nalloc);
+                err |= append_pixels(rpix, Npix2, 1, Npix1 - 2, Npix2 - 1,
+                                     Npix2 - 1, &buf, &n, &nalloc);
+            }
+        }
+
+        /* pixels around the stationary points of the three components:
+         * along a row of pixels r(t) = x + t * d the function e . r / |r|
+         * has at most one stationary point, since the numerator of its
+         * derivative, (e . d) |r|^2 - (e . r) (r . d), is linear in t.
+         * The extrema along every row are therefore found at the ends of
+         * the row (detector boundary) or at the pixels next to this point */
+        if (Npix > 2) {
+            veccopy(a, p[1]);
+            diffvec(a, p[0]);
+            vecmul(a, 1. / (linear ? Npix - 1 : Npix1 - 1));
+            if (!linear) {
+                veccopy(b, p[2]);
+                diffvec(b, p[0]);
+                vecmul(b, 1. / (Npix2 - 1));
+            }
+        }
+        nrows = linear ? 1 : Npix1;
+        nrow = linear ? Npix : Npix2;
+        dir = linear ? a : b;
+        for (c = 0; c < 3 && Npix > 2; ++c) {
+            veccopy(e, &ms[3 * c]);
+            ed = e[0] * dir[0] + e[1] * dir[1] + e[2] * dir[2];
+            dd = dir[0] * dir[0] + dir[1] * dir[1] + dir[2] * dir[2];
+            for (k = 0; k < nrows; ++k) {
+                /* start of the row */
+                veccopy(x, a);
+                vecmul(x, linear ? 0. : (double) k);
+                sumvec(x, p[0]);
+                ex = e[0] * x[0] + e[1] * x[1] + e[2] * x[2];
+                xd = x[0] * dir[0] + x[1] * dir[1] + x[2] * dir[2];
+                xx = x[0] * x[0] + x[1] * x[1] + x[2] * x[2];
+                den = ed * xd - ex * dd;
+                if (den == 0.) {
+                    continue;
+                }
+                tr = (ex * xd - ed * xx) / den;
+                if (!(tr > 0. && tr < nrow - 1)) {
+                    continue;
+                }
+                /* one additional pixel on each side guards against
+                 * rounding errors */
+                j0 = (int) floor(tr) - 1;
+                j1 = (int) ceil(tr) + 1;
+                j0 = j0 < 0 ? 0 : j0;
+                j1 = j1 > nrow - 1 ? nrow - 1 : j1;
+                if (linear) {
+                    err |= append_pixels(rpix, 1, j0, j1, 0, 0,
+                                         &buf, &n, &nalloc);
+                }
+                else {
+                    err |= append_pixels(rpix, Npix2, k, k, j0, j1,
+                                         &buf, &n, &nalloc);
+                }
+            }
+        }
+        if (err != 0) {
+            continue;
+        }
+
+        /* momentum transfer of the selected pixels */
+        if (nqalloc < nalloc) {
+            free(qbuf);
+            nqalloc = nalloc;
+            qbuf = malloc(3 * (size_t) nqalloc * sizeof(double));
+            if (qbuf == NULL) {
+                nqalloc = 0;
+                err = -1;
+                continue;
+            }
+        }
+        if (flags & HAS_SAMPLEDIS) {
+            if (flags & HAS_TRANSLATIONS) {
+                k = ang2q_conversion_area_sdtrans(
+                        &sampleAngles[Ns * i], &detectorAngles[Nd * i], rcch,
+                        sampleAxis, detectorAxis, kappadir, buf, UB,
+                        sampledis, &lambda[i], 1, Ns, Nd, n, cflags, qbuf);
+            }
+            else {
+                k = ang2q_conversion_area_sd(
+                        &sampleAngles[Ns * i], &detectorAngles[Nd * i], rcch,
+                        sampleAxis, detectorAxis, kappadir, buf, UB,
+                        sampledis, &lambda[i], 1, Ns, Nd, n, cflags, qbuf);
+            }
+        }
+        else {
+            if (flags & HAS_TRANSLATIONS) {
+                k = ang2q_conversion_area_trans(
+                        &sampleAngles[Ns * i], &detectorAngles[Nd * i], rcch,
+                        sampleAxis, detectorAxis, kappadir, buf, UB,
+                        &lambda[i], 1, Ns, Nd, n, cflags, qbuf);
+            }
+            else {
+                k = ang2q_conversion_area(
+                        &sampleAngles[Ns * i], &detectorAngles[Nd * i], rcch,
+                        sampleAxis, detectorAxis, kappadir, buf, UB,
+                        &lambda[i], 1, Ns, Nd, n, cflags, qbuf);
+            }
+        }
+        err |= k;
+        for (j = 0; j < n; ++j) {
+            for (c = 0; c < 3; ++c) {
+                lbounds[2 * c] = fmin(lbounds[2 * c], qbuf[3 * j + c]);
+                lbounds[2 * c + 1] = fmax(lbounds[2 * c + 1],
+                                          qbuf[3 * j + c]);
+            }
+        }
+    }
+
+    #pragma omp critical
+    {
+    r |= err;
+    for (c = 0; c < 3; ++c) {
+        bounds[2 * c] = fmin(bounds[2 * c], lbounds[2 * c]);
+        bounds[2 * c + 1] = fmax(bounds[2 * c + 1], lbounds[2 * c + 1]);
+    }
+    }
+    free(buf);
+    free(qbuf);
+    }
+
+    free(sampleRotation);
+    free(detectorRotation);
+
+    if (flags & VERBOSE) {
+        fprintf(stdout, "XU.QConversion(c): momentum transfer bounds "
+                "(%g, %g), (%g, %g), (%g, %g)\n", bounds[0], bounds[1],
+                bounds[2], bounds[3], bounds[4], bounds[5]);
+    }
+
+    return r;
+}
@@ -19,6 +19,7 @@
 #pragma once
 
 #include "xrayutilities.h"
+#include "gridder_utils.h"
 
 #define cdeg2rad (M_PI / 180.)
 #define crad2deg (180. / M_PI)
@@ -29,6 +30,7 @@
 /* define flags for the qconversion functions */
 #define HAS_TRANSLATIONS 1
 #define HAS_SAMPLEDIS 4
+#define OUTPUT_FLOAT32 8
 #define VERBOSE 16
 
 /* ###################################
@@ -57,6 +59,9 @@ INLINE void cross(double *RESTRICT v1, double *RESTRICT v2,
 INLINE void vecmatcross(double *RESTRICT v, double *RESTRICT m,
                         double *RESTRICT mr);
 
+INLINE void matvec_out(double *RESTRICT m, double *RESTRICT v,
+                       void *RESTRICT out, size_t idx, int flags);
+
 INLINE void matmul(double *RESTRICT m1, double *RESTRICT m2);
 
 INLINE void matmulc(double *RESTRICT m, double c);
@@ -116,6 +121,8 @@ INLINE void apply_tz(double z, double *vec);
 #   functions needed for reciprocal space converions
 ################################################*/
 
+void set_value_error(const char *msg);
+
 int determine_axes_directions(fp_rot *fp_circles, char *stringAxis,
                               unsigned int n);
 
@@ -128,6 +135,14 @@ int determine_detector_pixel(double *rpixel, char *dir, double dpixel,
 int tilt_detector_axis(double tiltazimuth, double tilt,
                         double *RESTRICT rpixel1, double *RESTRICT rpixel2);
 
+int detector_pixels_linear(double *rcch, double cch, double dpixel, int *roi,
+                           char *dir, double tilt, double *rpix);
+
+int detector_pixels_area(double *rcch, double cch1, double cch2,
+                         double dpixel1, double dpixel2, int *roi,
+                         char *dir1, char *dir2, double tiltazimuth,
+                         double tilt, double *rpix);
+
 int print_matrix(double *m);
 int print_vector(double *m);
 
@@ -140,24 +155,30 @@ int ang2q_conversion(
 	double *sampleAngles, double *detectorAngles,
         double *ri, char *sampleAxis, char *detectorAxis,
         double *kappadir, double *UB, double *lambda,
-        int Npoints, int Ns, int Nd, int flags, double *qpos);
+        int Npoints, int Ns, int Nd, int flags, void *qpos);
 
 int ang2q_conversion_sd(
         double *sampleAngles, double *detectorAngles, double *ri,
         char *sampleAxis, char *detectorAxis, double *kappadir, double *UB,
         double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int flags, double *qpos);
+        int flags, void *qpos);
 
 int ang2q_conversion_trans(
         double *sampleAngles, double *detectorAngles, double *ri,
         char *sampleAxis, char *detectorAxis, double *kappadir, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int flags, double *qpos);
+        double *lambda, int Npoints, int Ns, int Nd, int flags, void *qpos);
 
 int ang2q_conversion_sdtrans(
         double *sampleAngles, double *detectorAngles, double *ri,
         char *sampleAxis, char *detectorAxis, double *kappadir, double *UB,
         double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int flags, double *qpos);
+        int flags, void *qpos);
+
+int ang2q_conversion_jacobian(
+        double *sampleAngles, double *detectorAngles, double *ri,
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *UB,
+        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
+        int flags, double *jac);
 
 /*################################################
 #   reciprocal space converions worker functions
@@ -166,30 +187,27 @@ int ang2q_conversion_sdtrans(
 
 int ang2q_conversion_linear(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch,
-        double dpixel, int *roi, char *dir, double tilt, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int Nch,
-        int flags, double *qpos);
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *lambda, int Npoints, int Ns, int Nd, int Nch,
+        int flags, void *qpos);
 
 int ang2q_conversion_linear_sd(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch,
-        double dpixel, int *roi, char *dir, double tilt, double *UB,
-        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int Nch, int flags, double *qpos);
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Nch, int flags, void *qpos);
 
 int ang2q_conversion_linear_trans(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch,
-        double dpixel, int *roi, char *dir, double tilt, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int Nch,
-        int flags, double *qpos);
-
-int ang2q_conversion_linear_sdtrans(double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch,
-        double dpixel, int *roi, char *dir, double tilt, double *UB,
-        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int Nch, int flags, double *qpos);
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *lambda, int Npoints, int Ns, int Nd, int Nch,
+        int flags, void *qpos);
+
+int ang2q_conversion_linear_sdtrans(
+        double *sampleAngles, double *detectorAngles, double *rcch,
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Nch, int flags, void *qpos);
 
 /*################################################
 #   reciprocal space converions worker functions
@@ -198,30 +216,47 @@ int ang2q_conversion_linear_sdtrans(double *sampleAngles, double *detectorAngles
 
 int ang2q_conversion_area(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch1,
-        double cch2, double dpixel1, double dpixel2, int *roi, char *dir1,
-        char *dir2, double tiltazimuth, double tilt, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int flags, double *qpos);
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *lambda, int Npoints, int Ns, int Nd, int Npix,
+        int flags, void *qpos);
 
 int ang2q_conversion_area_sd(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch1,
-        double cch2, double dpixel1, double dpixel2, int *roi, char *dir1,
-        char *dir2, double tiltazimuth, double tilt, double *UB,
-        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int flags, double *qpos);
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Npix, int flags, void *qpos);
 
 int ang2q_conversion_area_trans(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch1,
-        double cch2, double dpixel1, double dpixel2, int *roi, char *dir1,
-        char *dir2, double tiltazimuth, double tilt, double *UB,
-        double *lambda, int Npoints, int Ns, int Nd, int flags, double *qpos);
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *lambda, int Npoints, int Ns, int Nd, int Npix,
+        int flags, void *qpos);
 
 int ang2q_conversion_area_sdtrans(
         double *sampleAngles, double *detectorAngles, double *rcch,
-        char *sampleAxis, char *detectorAxis, double *kappadir, double cch1,
-        double cch2, double dpixel1, double dpixel2, int *roi, char *dir1,
-        char *dir2, double tiltazimuth, double tilt, double *UB,
-        double *sampledis, double *lambda, int Npoints, int Ns, int Nd,
-        int flags, double *qpos);
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Npix, int flags, void *qpos);
+
+/*################################################
+#   fused reciprocal space conversion and gridding
+#                 area detector
+##################################################*/
+
+npy_intp ang2q_conversion_area_grid(
+        double *sampleAngles, double *detectorAngles, double *rcch,
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Npix, void *data, int dtype, unsigned int *ngrid,
+        double *grid, double *odata, double *norm, int flags);
+
+/*################################################
+#   bounding box of the momentum transfer
+#          area and linear detector
+##################################################*/
+
+int ang2q_conversion_area_bounds(
+        double *sampleAngles, double *detectorAngles, double *rcch,
+        char *sampleAxis, char *detectorAxis, double *kappadir, double *rpix,
+        double *UB, double *sampledis, double *lambda, int Npoints, int Ns,
+        int Nd, int Npix1, int Npix2, int flags, double *bounds);
@@ -102,3 +102,12 @@
 #define OMPSETNUMTHREADS(nth) \
     if (nth == 0) omp_set_num_threads(omp_get_max_threads());\
     else omp_set_num_threads(nth);
+
+/*
+ * OpenMP pragmas for the usage inside of macros
+ */
+#ifdef _MSC_VER
+#define OMP_PRAGMA(x) __pragma(x)
+#else
+#define OMP_PRAGMA(x) _Pragma(#x)
+#endif
@@ -0,0 +1,55 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestQ2Ang_GID(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mat = xu.materials.GaAs
+        cls.gid = xu.GID(cls.mat.Q(1, -1, 0), cls.mat.Q(0, 0, 1))
+        cls.hkl = numpy.array([(2, 2, 0), (4, 0, 0), (-2, 4, 0)])
+
+    def test_Q2Ang_gid_point(self):
+        ang = self.gid.Q2Ang(self.mat.Q(self.hkl[0]))
+        self.assertEqual(len(ang), 4)
+        qout = self.gid.Ang2HKL(*ang, mat=self.mat)
+        for i in range(3):
+            self.assertAlmostEqual(qout[i], self.hkl[0][i], places=10)
+
+    def test_Q2Ang_gid_array(self):
+        ang = self.gid.Q2Ang(self.mat.Q(self.hkl).T)
+        self.assertEqual(ang.shape, (4, len(self.hkl)))
+        for i, h in enumerate(self.hkl):
+            numpy.testing.assert_allclose(ang[:, i],
+                                          self.gid.Q2Ang(self.mat.Q(h)),
+                                          rtol=0, atol=1e-10)
+        qout = numpy.transpose(self.gid.Ang2HKL(*ang, mat=self.mat))
+        numpy.testing.assert_allclose(qout, self.hkl, rtol=0, atol=1e-8)
+
+    def test_Q2Ang_gid_unreachable(self):
+        q = self.mat.Q(numpy.array([(2, 2, 0), (1, 1, 1)])).T
+        with self.assertRaises(xu.exception.InputError):
+            self.gid.Q2Ang(q)
+
+
+if __name__ == '__main__':
+    unittest.main()
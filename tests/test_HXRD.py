@@ -59,6 +59,37 @@ class TestQ2Ang_HXRD(unittest.TestCase):
         for i in range(3):
             self.assertAlmostEqual(qout[i], self.hkltest[i], places=10)
 
+    def test_Q2Ang_hxrd_array(self):
+        hkl = numpy.array([(1, 3, 2), (1, 1, 1), (2, 2, 3), (0, 1, 2)])
+        for geom in ('hi_lo', 'lo_hi', 'real', 'realTilt'):
+            ang = self.hxrd.Q2Ang(self.mat.Q(hkl).T, geometry=geom)
+            self.assertEqual(ang.shape, (4, len(hkl)))
+            for i, h in enumerate(hkl):
+                numpy.testing.assert_allclose(
+                    ang[:, i], self.hxrd.Q2Ang(self.mat.Q(h), geometry=geom),
+                    rtol=0, atol=1e-10)
+            qout = numpy.transpose(self.hxrd.Ang2HKL(*ang, mat=self.mat))
+            valid = numpy.isfinite(ang[0])
+            numpy.testing.assert_allclose(qout[valid], hkl[valid], rtol=0,
+                                          atol=1e-8)
+
+    def test_Q2Ang_hxrd_array_refrac(self):
+        # (1, 1, -1) can not be reached in coplanar geometry -> NaN
+        hkl = numpy.array([(1, 3, 2), (1, 1, 1), (2, 2, 3), (1, 1, -1)])
+        for geom in ('hi_lo', 'lo_hi', 'real', 'realTilt'):
+            ang = self.hxrd.Q2Ang(self.mat.Q(hkl).T, geometry=geom,
+                                  refrac=True, mat=self.mat,
+                                  full_output=True)
+            self.assertEqual(ang.shape, (6, len(hkl)))
+            self.assertTrue(numpy.any(numpy.isfinite(ang[0])))
+            for i, h in enumerate(hkl):
+                numpy.testing.assert_allclose(
+                    ang[:, i],
+                    self.hxrd.Q2Ang(self.mat.Q(h), geometry=geom,
+                                    refrac=True, mat=self.mat,
+                                    full_output=True),
+                    rtol=0, atol=1e-10)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -53,6 +53,80 @@ class TestBlockAverageFunctions(unittest.TestCase):
             (self.seq2d.shape[0],
              numpy.ceil(self.seq2d.shape[1] / float(self.n))))
 
+    @staticmethod
+    def reference(data, nav1, nav2, mask=None):
+        """
+        block average of a single frame using numpy
+        """
+        n1 = int(numpy.ceil(data.shape[0] / float(nav1)))
+        n2 = int(numpy.ceil(data.shape[1] / float(nav2)))
+        ref = numpy.empty((n1, n2))
+        valid = numpy.ones(data.shape, dtype=bool)
+        if mask is not None:
+            valid = ~mask
+        for i in range(n1):
+            for j in range(n2):
+                sl = (slice(i * nav1, (i + 1) * nav1),
+                      slice(j * nav2, (j + 1) * nav2))
+                v = valid[sl]
+                ref[i, j] = data[sl][v].mean() if v.any() else numpy.nan
+        return ref
+
+    def test_blockav_ccd(self):
+        data = numpy.random.rand(3, 10, 15)
+        out = xu.blockAverageCCD(data, self.n2d[0], self.n2d[1])
+        self.assertEqual(out.shape, (3, 4, 4))
+        for i in range(data.shape[0]):
+            numpy.testing.assert_allclose(
+                out[i], self.reference(data[i], *self.n2d))
+        # number of blocks differs along the two dimensions
+        out = xu.blockAverageCCD(data, 2, 2, roi=(1, 9, 0, 15))
+        for i in range(data.shape[0]):
+            numpy.testing.assert_allclose(
+                out[i], self.reference(data[i, 1:9], 2, 2))
+
+    def test_blockav_integer(self):
+        data = numpy.random.randint(0, 2**16, (2, 10, 15))
+        for dtype in (numpy.uint16, numpy.int32, numpy.uint32,
+                      numpy.float32):
+            out = xu.blockAverageCCD(data.astype(dtype), *self.n2d)
+            numpy.testing.assert_allclose(
+                out, xu.blockAverageCCD(data.astype(numpy.double),
+                                        *self.n2d))
+            out = xu.blockAverage2D(data[0].astype(dtype), *self.n2d,
+                                    roi=(1, 9, 2, 13))
+            numpy.testing.assert_allclose(
+                out, self.reference(data[0, 1:9, 2:13], *self.n2d))
+
+    def test_blockav_mask(self):
+        mask = numpy.zeros(self.seq2d.shape, dtype=bool)
+        mask[0, 1] = mask[5, 7] = True
+        mask[3:6, 12:15] = True
+        out = xu.blockAverage2D(self.seq2d, 3, 3, mask=mask)
+        numpy.testing.assert_allclose(
+            out, self.reference(self.seq2d, 3, 3, mask))
+        self.assertTrue(numpy.isnan(out[1, 4]))
+        data = numpy.asarray((self.seq2d, 2 * self.seq2d))
+        out = xu.blockAverageCCD(data, 3, 3, mask=mask)
+        numpy.testing.assert_allclose(out[1], 2 * out[0])
+        out = xu.blockAveragePSD(self.seq2d, 4, mask=mask[0])
+        numpy.testing.assert_allclose(
+            out, self.reference(self.seq2d, 1, 4,
+                                numpy.broadcast_to(mask[0], mask.shape)))
+
+    def test_blockav_out(self):
+        out = numpy.empty((4, 4), dtype=numpy.float32)
+        ret = xu.blockAverage2D(self.seq2d, *self.n2d, out=out)
+        self.assertIs(ret, out)
+        numpy.testing.assert_allclose(
+            out, self.reference(self.seq2d, *self.n2d), rtol=1e-6)
+        with self.assertRaises(ValueError):
+            xu.blockAverage2D(self.seq2d, *self.n2d,
+                              out=numpy.empty((4, 5)))
+        with self.assertRaises(ValueError):
+            xu.blockAverage2D(self.seq2d, *self.n2d,
+                              out=numpy.empty((4, 4), dtype=int))
+
 
 if __name__ == '__main__':
     unittest.main()
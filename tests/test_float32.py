@@ -0,0 +1,94 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestFloat32(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.hxrd = xu.HXRD((1, 1, 0), (0, 0, 1))
+        cls.qconv = cls.hxrd.Ang2Q
+        cls.nch = (12, 17)
+        cls.qconv.init_linear('z+', 6, cls.nch[0], 0.5, 50e-6)
+        cls.qconv.init_area('z+', 'x+', 6, 8, cls.nch[0], cls.nch[1], 0.5,
+                            50e-6, 50e-6)
+        cls.npoints = 9
+        cls.om = numpy.linspace(10, 20, cls.npoints)
+        cls.tt = numpy.linspace(20, 40, cls.npoints)
+
+    def check(self, q, q32):
+        for a, b in zip(q, q32):
+            self.assertEqual(b.dtype, numpy.float32)
+            numpy.testing.assert_allclose(b, a, rtol=1e-6, atol=1e-6)
+
+    def test_ang2q(self):
+        for f in (self.qconv.point, self.qconv.linear, self.qconv.area):
+            self.check(f(self.om, self.tt),
+                       f(self.om, self.tt, dtype=numpy.float32))
+        self.check(self.qconv.area(self.om, self.tt, sampledis=(0, 1e-3, 0)),
+                   self.qconv.area(self.om, self.tt, sampledis=(0, 1e-3, 0),
+                                   dtype=numpy.float32))
+
+    def test_ang2hkl(self):
+        for dettype in ('point', 'linear', 'area'):
+            self.check(
+                self.hxrd.Ang2HKL(self.om, self.tt, mat=xu.materials.Si,
+                                  dettype=dettype),
+                self.hxrd.Ang2HKL(self.om, self.tt, mat=xu.materials.Si,
+                                  dettype=dettype, dtype=numpy.float32))
+
+    def test_invalid_dtype(self):
+        with self.assertRaises(xu.exception.InputError):
+            self.qconv.point(self.om, self.tt, dtype=numpy.int32)
+
+    def test_gridder(self):
+        qx, qy, qz = self.qconv.area(self.om, self.tt, dtype=numpy.float32)
+        data = numpy.random.rand(*qx.shape).astype(numpy.float32)
+        for g, g32, args in (
+                (xu.Gridder1D(21), xu.Gridder1D(21), (qz, )),
+                (xu.Gridder2D(21, 23), xu.Gridder2D(21, 23), (qy, qz)),
+                (xu.Gridder3D(21, 23, 25), xu.Gridder3D(21, 23, 25),
+                 (qx, qy, qz))):
+            ref = [a.astype(numpy.double) for a in args]
+            g(*ref, data.astype(numpy.double))
+            g32(*args, data)
+            numpy.testing.assert_allclose(g32._gnorm, g._gnorm)
+            numpy.testing.assert_allclose(g32.data, g.data)
+
+    def test_gridder_integer_data(self):
+        qx, qy, qz = self.qconv.area(self.om, self.tt, dtype=numpy.float32)
+        counts = numpy.random.randint(0, 2**16, size=qx.shape)
+        for dtype in (numpy.uint16, numpy.int32, numpy.uint32):
+            data = counts.astype(dtype)
+            for g, gref, args in (
+                    (xu.Gridder1D(21), xu.Gridder1D(21), (qz, )),
+                    (xu.Gridder2D(21, 23), xu.Gridder2D(21, 23), (qy, qz)),
+                    (xu.Gridder3D(21, 23, 25), xu.Gridder3D(21, 23, 25),
+                     (qx, qy, qz)),
+                    (xu.SparseGridder3D(21, 23, 25, blocksize=4),
+                     xu.Gridder3D(21, 23, 25), (qx, qy, qz))):
+                g(*args, data)
+                gref(*args, data.astype(numpy.double))
+                numpy.testing.assert_allclose(g.data, gref.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+import xrayutilities as xu
+
+
+class TestGILRelease(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.nthreads = xu.config.NTHREADS
+        # disable the OpenMP parallelization to measure the effect of
+        # concurrent Python threads only
+        xu.config.NTHREADS = 1
+        cls.qconv = xu.QConversion(['x+', 'y+'], ['z+', 'x-'], [0, 1, 0])
+        cls.qconv.init_area('z+', 'x+', 100, 100, 200, 200, 0.5,
+                            50e-6, 50e-6)
+        cls.npoints = 20
+        cls.om = numpy.linspace(10, 20, cls.npoints)
+        cls.tt = numpy.linspace(20, 40, cls.npoints)
+
+    @classmethod
+    def tearDownClass(cls):
+        xu.config.NTHREADS = cls.nthreads
+
+    def convert(self, i):
+        qx, qy, qz = self.qconv.area(self.om + i, 0, 5, self.tt)
+        g = xu.Gridder3D(30, 30, 30)
+        g(qx, qy, qz, numpy.ones_like(qx))
+        return g.data
+
+    def test_threaded_results(self):
+        ref = [self.convert(i) for i in range(4)]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            res = list(executor.map(self.convert, range(4)))
+        for r, d in zip(ref, res):
+            numpy.testing.assert_array_equal(r, d)
+
+    def test_concurrent_progress(self):
+        # with a very long switch interval the interpreter only switches
+        # threads when the running thread releases the GIL. The main thread
+        # can therefore only make progress while the worker thread is inside
+        # the C code if the extension releases the GIL. The input arrays are
+        # prepared before, so that no numpy operation is performed during the
+        # measurement.
+        n = 2000000
+        x, y, z = numpy.random.rand(3, n)
+        data = numpy.ones(n)
+        gdata = numpy.zeros((30, 30, 30))
+        gnorm = numpy.zeros((30, 30, 30))
+        state = {'incall': False, 'progress': 0}
+
+        def work():
+            for i in range(5):
+                state['incall'] = True
+                xu.cxrayutilities.gridder3d(x, y, z, data, 30, 30, 30,
+                                            0, 1, 0, 1, 0, 1, gdata, gnorm,
+                                            5, 1)
+                state['incall'] = False
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(100)
+        try:
+            worker = threading.Thread(target=work)
+            worker.start()
+            while worker.is_alive():
+                if state['incall']:
+                    state['progress'] += 1
+                time.sleep(0)
+            worker.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(gnorm.sum(), 5 * n)
+        self.assertGreater(state['progress'], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -52,6 +52,41 @@ class TestGridder2DList(unittest.TestCase):
             else:
                 self.assertEqual(self.gridder.data[j, k], [])
 
+    def test_bin_data(self):
+        for j in range(1, self.nx):
+            numpy.testing.assert_array_equal(
+                self.gridder.bin_data(j, 2 * j), [self.data[j]])
+            self.assertEqual(self.gridder.bin_data(j, 2 * j - 1).size, 0)
+
+    def test_order_and_range(self):
+        g = xu.Gridder2DList(3, 4)
+        g.dataRange(0, 2, 0, 3)
+        g.KeepData(True)
+        g([0, 1, 2, 0.1, 5], [0, 1, 3, 0.2, 0], ['a', 'b', 'c', 'd', 'e'])
+        g([0.2, 1, 1], [0.1, 1, -0.6], ['f', 'g', 'h'])
+        self.assertEqual(g.data[0, 0], ['a', 'd', 'f'])
+        self.assertEqual(g.data[1, 1], ['b', 'g'])
+        self.assertEqual(g.data[2, 3], ['c'])
+        self.assertEqual(sum(len(v) for v in g.data.flat), 6)
+        numpy.testing.assert_array_equal(
+            g._gnorm, [[len(v) for v in row] for row in g.data])
+
+    def test_merge(self):
+        g1 = xu.Gridder2DList(4, 5)
+        g1.dataRange(0, 1, 0, 1)
+        g2 = xu.Gridder2DList(4, 5)
+        g2.dataRange(0, 1, 0, 1)
+        x = numpy.random.rand(100)
+        y = numpy.random.rand(100)
+        g1(x[:60], y[:60], numpy.arange(60))
+        g2(x[60:], y[60:], numpy.arange(60, 100))
+        g1 += g2
+        gref = xu.Gridder2DList(4, 5)
+        gref.dataRange(0, 1, 0, 1)
+        gref(x, y, numpy.arange(100))
+        for a, b in zip(g1.data.flat, gref.data.flat):
+            self.assertEqual(a, b)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestGridder3DArea(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.qconv = xu.QConversion(['x+', 'y+'], ['z+', 'x-'], [0, 1, 0])
+        cls.nch = (20, 25)
+        cls.qconv.init_area('z+', 'x+', 8, 10, cls.nch[0], cls.nch[1], 0.5,
+                            50e-5, 50e-5)
+        cls.npoints = 15
+        cls.om = numpy.linspace(10, 20, cls.npoints)
+        cls.chi = numpy.linspace(-1, 1, cls.npoints)
+        cls.nu = 5.
+        cls.tt = numpy.linspace(20, 40, cls.npoints)
+        cls.data = numpy.random.rand(cls.npoints, *cls.nch)
+        cls.n = (11, 13, 17)
+
+    def reference(self, *args, **kwargs):
+        qx, qy, qz = self.qconv.area(*args[:-1], **kwargs)
+        g = xu.Gridder3D(*self.n)
+        g(qx, qy, qz, args[-1])
+        return g
+
+    def test_autorange(self):
+        gref = self.reference(self.om, self.chi, self.nu, self.tt, self.data)
+        g = xu.Gridder3D(*self.n)
+        g.grid_area(self.qconv, self.om, self.chi, self.nu, self.tt,
+                    self.data)
+        for a in ('xaxis', 'yaxis', 'zaxis'):
+            numpy.testing.assert_allclose(getattr(g, a), getattr(gref, a))
+        numpy.testing.assert_allclose(g._gnorm, gref._gnorm)
+        numpy.testing.assert_allclose(g.data, gref.data)
+
+    def test_fixedrange_keepdata(self):
+        kwargs = {'roi': (2, 18, 3, 22), 'sampledis': (0, 1e-3, 0)}
+        roi = kwargs['roi']
+        data = self.data[:, roi[0]:roi[1], roi[2]:roi[3]]
+        gref = self.reference(self.om, self.chi, self.nu, self.tt, data,
+                              **kwargs)
+        g = xu.Gridder3D(*self.n)
+        g.KeepData(True)
+        g.dataRange(gref.xmin, gref.xmax, gref.ymin, gref.ymax,
+                    gref.zmin, gref.zmax)
+        for s in (slice(0, 6), slice(6, None)):
+            g.grid_area(self.qconv, self.om[s], self.chi[s], self.nu,
+                        self.tt[s], data[s], **kwargs)
+        numpy.testing.assert_allclose(g._gnorm, gref._gnorm)
+        numpy.testing.assert_allclose(g.data, gref.data)
+
+    def test_integer_data(self):
+        data = (self.data * 1000).astype(numpy.uint16)
+        gref = self.reference(self.om, self.chi, self.nu, self.tt,
+                              data.astype(numpy.double))
+        g = xu.Gridder3D(*self.n)
+        g.grid_area(self.qconv, self.om, self.chi, self.nu, self.tt, data)
+        numpy.testing.assert_allclose(g._gnorm, gref._gnorm)
+        numpy.testing.assert_allclose(g.data, gref.data)
+
+    def test_fuzzy(self):
+        qx, qy, qz = self.qconv.area(self.om, self.chi, self.nu, self.tt)
+        for width in (None, (0.01, 0.02, 0.03)):
+            kwargs = {} if width is None else {'width': width}
+            gref = xu.FuzzyGridder3D(*self.n)
+            gref(qx, qy, qz, self.data, **kwargs)
+            g = xu.FuzzyGridder3D(*self.n)
+            g.grid_area(self.qconv, self.om, self.chi, self.nu, self.tt,
+                        self.data, **kwargs)
+            self.assertFalse(g.fixed_range)
+            for a in ('xaxis', 'yaxis', 'zaxis'):
+                numpy.testing.assert_allclose(getattr(g, a),
+                                              getattr(gref, a))
+            numpy.testing.assert_allclose(g._gnorm, gref._gnorm)
+            numpy.testing.assert_allclose(g.data, gref.data)
+
+    def test_datasize(self):
+        g = xu.Gridder3D(*self.n)
+        with self.assertRaises(xu.exception.InputError):
+            g.grid_area(self.qconv, self.om, self.chi, self.nu, self.tt,
+                        self.data[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
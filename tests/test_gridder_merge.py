@@ -0,0 +1,140 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import os.path
+import pickle
+import tempfile
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+numpy.random.seed(0)
+npoints = 20000
+x, y, z = numpy.random.normal(size=(3, npoints))
+data = numpy.random.rand(npoints)
+
+
+def points3d(idx):
+    return x[idx], y[idx], z[idx], data[idx]
+
+
+class TestGridderMerge(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.n = (23, 19, 17)
+        cls.parts = numpy.array_split(numpy.arange(npoints), 4)
+
+    def setrange(self, g):
+        g.dataRange(x.min(), x.max(), y.min(), y.max(), z.min(), z.max())
+
+    def reference(self):
+        g = xu.Gridder3D(*self.n)
+        self.setrange(g)
+        g(x, y, z, data)
+        return g
+
+    def partial(self, cls, idx, *args):
+        g = cls(*self.n, *args)
+        self.setrange(g)
+        g(*points3d(idx))
+        return g
+
+    def test_merge1d2d(self):
+        gref = xu.Gridder2D(13, 11)
+        gref(x, y, data)
+        g = [xu.Gridder2D(13, 11) for idx in self.parts]
+        for gp, idx in zip(g, self.parts):
+            gp.dataRange(x.min(), x.max(), y.min(), y.max())
+            gp(x[idx], y[idx], data[idx])
+        g[0].merge(*g[1:])
+        numpy.testing.assert_allclose(g[0].data, gref.data)
+
+        gref = xu.FuzzyGridder1D(31)
+        gref(x, data)
+        g = xu.FuzzyGridder1D(31)
+        g.dataRange(x.min(), x.max())
+        for idx in self.parts:
+            gp = xu.FuzzyGridder1D(31)
+            gp.dataRange(x.min(), x.max())
+            gp(x[idx], data[idx])
+            g += gp
+        numpy.testing.assert_allclose(g.data, gref.data)
+
+    def test_merge3d(self):
+        gref = self.reference()
+        g = [self.partial(xu.Gridder3D, idx) for idx in self.parts]
+        g[0] += g[1]
+        g[0].merge(*g[2:])
+        numpy.testing.assert_allclose(g[0].data, gref.data)
+
+    def test_incompatible(self):
+        g = self.partial(xu.Gridder3D, self.parts[0])
+        g2 = self.partial(xu.Gridder3D, self.parts[1])
+        g2.dataRange(0, 1, 0, 1, 0, 1)
+        with self.assertRaises(xu.exception.InputError):
+            g.merge(g2)
+        with self.assertRaises(xu.exception.InputError):
+            g += xu.Gridder2D(23, 19)
+        with self.assertRaises(xu.exception.InputError):
+            g += self.partial(xu.SparseGridder3D, self.parts[0])
+
+    def test_pickle(self):
+        g = xu.Gridder3D(100, 100, 100)
+        g(numpy.arange(10), numpy.arange(10), numpy.arange(10),
+          numpy.ones(10))
+        s = pickle.dumps(g)
+        self.assertTrue(len(s) < 10000)
+        g2 = pickle.loads(s)
+        numpy.testing.assert_array_equal(g2._gdata, g._gdata)
+        numpy.testing.assert_array_equal(g2._gnorm, g._gnorm)
+        numpy.testing.assert_array_equal(g2.data, g.data)
+
+        g = self.partial(xu.SparseGridder3D, self.parts[0], 4)
+        g2 = pickle.loads(pickle.dumps(g))
+        numpy.testing.assert_array_equal(g2.data, g.data)
+
+    def test_merge_sparse(self):
+        gref = self.reference()
+        g = [self.partial(xu.SparseGridder3D, idx, 4) for idx in self.parts]
+        g[0].merge(*g[1:])
+        numpy.testing.assert_allclose(g[0].data, gref.data)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with xu.OutOfCoreGridder3D(os.path.join(tmpdir, 'grid.h5'),
+                                       *self.n, blocksize=4,
+                                       cachesize=5) as go:
+                self.setrange(go)
+                for gp in g[1:]:
+                    go += gp
+                go += self.partial(xu.SparseGridder3D, self.parts[0], 4)
+                numpy.testing.assert_allclose(go.data, gref.data)
+                gs = go._empty_copy()
+                gs += go
+                numpy.testing.assert_allclose(gs.data, gref.data)
+
+    def test_grid_parallel(self):
+        gref = self.reference()
+        for g in (xu.Gridder3D(*self.n), xu.SparseGridder3D(*self.n)):
+            with self.assertRaises(xu.exception.InputError):
+                xu.grid_parallel(g, points3d, self.parts)
+            self.setrange(g)
+            xu.grid_parallel(g, points3d, self.parts, nproc=2, nchunks=3)
+            numpy.testing.assert_allclose(g.data, gref.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
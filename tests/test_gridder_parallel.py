@@ -0,0 +1,90 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestGridderParallel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.nthreads = xu.config.NTHREADS
+        cls.n = 200000
+        rng = numpy.random.RandomState(1234)
+        cls.x = rng.normal(size=cls.n)
+        cls.y = rng.normal(size=cls.n)
+        cls.z = rng.normal(size=cls.n)
+        cls.data = rng.uniform(size=cls.n)
+        cls.data[::97] = numpy.nan
+
+    @classmethod
+    def tearDownClass(cls):
+        xu.config.NTHREADS = cls.nthreads
+
+    def grid(self, gridder, nthreads, *args, **kwargs):
+        xu.config.NTHREADS = nthreads
+        gridder(*args, **kwargs)
+        return gridder.data.copy(), gridder._gnorm.copy()
+
+    def compare(self, factory, args, **kwargs):
+        ref, refnorm = self.grid(factory(), 1, *args, **kwargs)
+        for nthreads in (0, 2, 4):
+            d, norm = self.grid(factory(), nthreads, *args, **kwargs)
+            numpy.testing.assert_allclose(d, ref, rtol=1e-10, atol=1e-12)
+            numpy.testing.assert_allclose(norm, refnorm, rtol=1e-10)
+
+    def test_gridder1d(self):
+        self.compare(lambda: xu.Gridder1D(1000), (self.x, self.data))
+
+    def test_fuzzygridder1d(self):
+        self.compare(lambda: xu.FuzzyGridder1D(1000), (self.x, self.data),
+                     width=0.01)
+
+    def test_gridder2d(self):
+        # small grid uses per-thread buffers, large grid atomic updates
+        for shape in ((100, 100), (700, 700)):
+            self.compare(lambda: xu.Gridder2D(*shape),
+                         (self.x, self.y, self.data))
+
+    def test_fuzzygridder2d(self):
+        self.compare(lambda: xu.FuzzyGridder2D(150, 150),
+                     (self.x, self.y, self.data), width=(0.05, 0.05))
+
+    def test_gridder3d(self):
+        for shape in ((20, 20, 20), (100, 100, 100)):
+            self.compare(lambda: xu.Gridder3D(*shape),
+                         (self.x, self.y, self.z, self.data))
+
+    def test_fuzzygridder3d(self):
+        self.compare(lambda: xu.FuzzyGridder3D(30, 30, 30),
+                     (self.x, self.y, self.z, self.data),
+                     width=(0.2, 0.2, 0.2))
+
+    def test_counts_exact(self):
+        ones = numpy.ones(self.n)
+        ref, _ = self.grid(xu.Gridder2D(50, 50), 1, self.x, self.y, ones)
+        g = xu.Gridder2D(50, 50)
+        g.normalize = False
+        self.grid(g, 4, self.x, self.y, ones)
+        numpy.testing.assert_array_equal(g._gnorm, g.data)
+        self.assertEqual(g.data.sum(), self.n)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestPixelSplitGridder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.qconv = xu.QConversion(['x+', 'y+'], ['z+', 'x-'], [0, 1, 0])
+        cls.qconv.init_area('z+', 'x+', 10, 12, 21, 25, 0.5, 172e-6, 172e-6)
+        cls.om = numpy.linspace(10, 11, 5)
+        cls.chi = 0.3
+        cls.nu = 1.
+        cls.tt = 30.
+        numpy.random.seed(7)
+        cls.data = numpy.random.rand(5, 21, 25) * 100
+
+    def test_single_pixel(self):
+        # unit square split into the four cells of a 2x2 grid
+        x = numpy.array([[0., 0.], [1., 1.]])
+        y = numpy.array([[0., 1.], [0., 1.]])
+        g = xu.PixelSplitGridder2D(2, 2)
+        g.dataRange(0.25, 0.75, 0.25, 0.75)
+        g(x, y, numpy.array([[4.]]))
+        numpy.testing.assert_allclose(g._gnorm, 0.25)
+        numpy.testing.assert_allclose(g._gdata, 1.)
+        numpy.testing.assert_allclose(g.data, 4.)
+
+    def test_conservation(self):
+        g = xu.PixelSplitGridder3D(10, 12, 14)
+        g.grid_area(self.qconv, self.om, self.chi, self.nu, self.tt,
+                    self.data)
+        self.assertAlmostEqual(g._gnorm.sum(), self.data.size, places=6)
+        self.assertAlmostEqual(g._gdata.sum() / self.data.sum(), 1.,
+                               places=10)
+
+    def test_grid_area(self):
+        roi = (1, 20, 2, 25)
+        data = numpy.array([xu.blockAverage2D(d, 2, 2, roi=roi)
+                            for d in self.data])
+        g = xu.PixelSplitGridder3D(10, 12, 14)
+        g.grid_area(self.qconv, self.om, self.chi, self.nu, self.tt, data,
+                    roi=roi, Nav=(2, 2), chunk=2)
+        qx, qy, qz = self.qconv.area(self.om, self.chi, self.nu, self.tt,
+                                     roi=roi, Nav=(2, 2), corners=True)
+        self.assertEqual(qx.shape, (5, data.shape[1] + 1, data.shape[2] + 1))
+        gref = xu.PixelSplitGridder3D(10, 12, 14)
+        gref.dataRange(g.xmin, g.xmax, g.ymin, g.ymax, g.zmin, g.zmax)
+        gref(qx, qy, qz, data)
+        numpy.testing.assert_allclose(g._gdata, gref._gdata, rtol=1e-12)
+        numpy.testing.assert_allclose(g._gnorm, gref._gnorm, rtol=1e-12)
+        self.assertAlmostEqual(g._gnorm.sum(), data.size, places=8)
+
+    def test_compare_point_gridder(self):
+        # for a grid much coarser than the pixel footprint both gridders
+        # agree apart from the pixels at the cell borders
+        qx, qy, qz = self.qconv.area(self.om, self.chi, self.nu, self.tt,
+                                     corners=True)
+        g = xu.PixelSplitGridder3D(3, 3, 3)
+        g(qx, qy, qz, numpy.ones(self.data.shape, dtype=numpy.uint16))
+        gp = xu.Gridder3D(3, 3, 3)
+        gp.dataRange(g.xmin, g.xmax, g.ymin, g.ymax, g.zmin, g.zmax)
+        gp(*self.qconv.area(self.om, self.chi, self.nu, self.tt),
+           numpy.ones(self.data.shape))
+        numpy.testing.assert_allclose(g.data[g._gnorm > 0], 1.)
+        numpy.testing.assert_allclose(g._gnorm, gp._gnorm, rtol=0.05,
+                                      atol=self.data[0].size * 0.05)
+
+    def test_nan_data(self):
+        qx, qy, qz = self.qconv.area(self.om[0], self.chi, self.nu, self.tt,
+                                     corners=True)
+        data = self.data[0].copy()
+        data[3, 4] = numpy.nan
+        g = xu.PixelSplitGridder2D(20, 20)
+        g(qx, qz, data)
+        self.assertAlmostEqual(g._gnorm.sum(), data.size - 1, places=8)
+        self.assertFalse(numpy.any(numpy.isnan(g.data)))
+
+    def test_invalid_shape(self):
+        g = xu.PixelSplitGridder2D(20, 20)
+        with self.assertRaises(xu.exception.InputError):
+            g(numpy.zeros((3, 3)), numpy.zeros((3, 3)), numpy.ones((3, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import os
+import tempfile
+import unittest
+
+import h5py
+import numpy
+import xrayutilities as xu
+
+
+class TestGridderPyramid(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = numpy.random.RandomState(11)
+        cls.n = 5000
+        cls.x = rng.uniform(-1, 1, cls.n)
+        cls.y = rng.uniform(0, 2, cls.n)
+        cls.z = rng.uniform(1, 3, cls.n)
+        cls.data = rng.rand(cls.n)
+
+    def test_levels3d(self):
+        g = xu.Gridder3D(16, 12, 9)
+        g(self.x, self.y, self.z, self.data)
+        pyr = g.pyramid()
+        self.assertEqual(len(pyr), 4)
+        for level, (axes, data, norm) in enumerate(pyr):
+            self.assertEqual(data.shape, norm.shape)
+            self.assertEqual(data.shape, tuple(a.size for a in axes))
+            self.assertAlmostEqual(norm.sum(), self.n)
+            # the averaging uses the accumulated data
+            self.assertAlmostEqual((data * norm).sum(), self.data.sum())
+        self.assertEqual(pyr[1][1].shape, (8, 6, 5))
+        self.assertEqual(pyr[3][1].shape, (2, 2, 2))
+        numpy.testing.assert_allclose(pyr[0][1], g.data)
+        numpy.testing.assert_allclose(
+            pyr[1][0][0], (g.xaxis[::2] + g.xaxis[1::2]) / 2)
+        # the bins of the coarse levels contain all data points with
+        # positions inside them
+        axes, data, norm = pyr[2]
+        ix = numpy.argmin(numpy.abs(axes[0][:, numpy.newaxis] - self.x),
+                          axis=0)
+        iy = numpy.argmin(numpy.abs(axes[1][:, numpy.newaxis] - self.y),
+                          axis=0)
+        iz = numpy.argmin(numpy.abs(axes[2][:, numpy.newaxis] - self.z),
+                          axis=0)
+        mask = (ix == 1) & (iy == 2) & (iz == 1)
+        self.assertEqual(norm[1, 2, 1], mask.sum())
+        self.assertAlmostEqual(data[1, 2, 1], self.data[mask].mean())
+
+    def test_levels2d(self):
+        g = xu.Gridder2D(7, 1)
+        g.Normalize(False)
+        g(self.x, self.y, self.data)
+        axes, data, norm = g.pyramid(levels=2)[2]
+        self.assertEqual(data.shape, (2, 1))
+        self.assertAlmostEqual(data.sum(), self.data.sum())
+        # odd number of bins are padded by an empty bin
+        numpy.testing.assert_allclose(axes[0], (-0.5, 5 / 6.), atol=1e-3)
+
+    def test_sparse(self):
+        g = xu.Gridder3D(20, 20, 20)
+        g.dataRange(-1, 1, 0, 2, 1, 3)
+        gs = xu.SparseGridder3D(20, 20, 20, blocksize=8)
+        gs.dataRange(-1, 1, 0, 2, 1, 3)
+        g(self.x, self.y, self.z, self.data)
+        gs(self.x, self.y, self.z, self.data)
+        for ref, sparse in zip(g.pyramid(), gs.pyramid()):
+            numpy.testing.assert_allclose(ref[1], sparse[1])
+            numpy.testing.assert_allclose(ref[2], sparse[2])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'pyramid.h5')
+            gs.save_pyramid(fname, levels=2, chunks=8)
+            for level, (axes, data, norm) in enumerate(g.pyramid(2)):
+                laxes, ldata, lnorm = xu.load_pyramid(fname, level)
+                numpy.testing.assert_allclose(ldata, data)
+                numpy.testing.assert_allclose(lnorm, norm)
+                for a, la in zip(axes, laxes):
+                    numpy.testing.assert_allclose(a, la)
+
+    def test_save_load(self):
+        g = xu.Gridder3D(40, 30, 20)
+        g(self.x, self.y, self.z, self.data)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'pyramid.h5')
+            g.save_pyramid(fname, levels=4, chunks=16)
+            with h5py.File(fname, 'r') as h5:
+                self.assertEqual(h5.attrs['levels'], 4)
+                self.assertEqual(h5['level0/data'].chunks, (16, 16, 16))
+                self.assertEqual(h5['level3'].attrs['factor'], 8)
+            for level, (axes, data, norm) in enumerate(g.pyramid(4)):
+                laxes, ldata, lnorm = xu.load_pyramid(fname, level)
+                numpy.testing.assert_array_equal(ldata, data)
+                numpy.testing.assert_array_equal(lnorm, norm)
+                for a, la in zip(axes, laxes):
+                    numpy.testing.assert_array_equal(a, la)
+            # saving again replaces the old levels
+            g.save_pyramid(fname, levels=1)
+            with self.assertRaises(xu.exception.InputError):
+                xu.load_pyramid(fname, 2)
+
+    def test_outofcore(self):
+        # the grid extends beyond the data to contain tiles without data
+        n = (40, 33, 20)
+        g = xu.Gridder3D(*n)
+        g.dataRange(-1, 4, 0, 2, 1, 3)
+        g(self.x, self.y, self.z, self.data)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'pyramid.h5')
+            with xu.OutOfCoreGridder3D(os.path.join(tmpdir, 'grid.h5'), *n,
+                                       blocksize=8, cachesize=4) as go:
+                go.dataRange(-1, 4, 0, 2, 1, 3)
+                go(self.x, self.y, self.z, self.data)
+                go.save_pyramid(fname, levels=4, chunks=16)
+            for level, (axes, data, norm) in enumerate(g.pyramid(4)):
+                laxes, ldata, lnorm = xu.load_pyramid(fname, level)
+                numpy.testing.assert_allclose(ldata, data)
+                numpy.testing.assert_allclose(lnorm, norm)
+                for a, la in zip(axes, laxes):
+                    numpy.testing.assert_allclose(a, la)
+
+
+if __name__ == '__main__':
+    unittest.main()
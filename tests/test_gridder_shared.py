@@ -0,0 +1,129 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import concurrent.futures
+import pickle
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # multiprocessing.shared_memory needs Python 3.8
+    shared_memory = None
+
+numpy.random.seed(0)
+npoints = 20000
+x, y, z = numpy.random.normal(size=(3, npoints))
+data = numpy.random.rand(npoints)
+
+
+def grid_part(gridder, idx):
+    gridder(x[idx], y[idx], z[idx], data[idx])
+
+
+class CountingLock(object):
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        self.count += 1
+
+    def __exit__(self, *args):
+        pass
+
+
+class TestGridderShared(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.n = (23, 19, 17)
+        cls.gref = xu.Gridder3D(*cls.n)
+        cls.gref(x, y, z, data)
+        cls.parts = numpy.array_split(numpy.arange(npoints), 4)
+
+    def gridder(self, buffer, lock=None):
+        g = xu.Gridder3D(*self.n, buffer=buffer, lock=lock)
+        g.dataRange(self.gref.xmin, self.gref.xmax, self.gref.ymin,
+                    self.gref.ymax, self.gref.zmin, self.gref.zmax)
+        return g
+
+    def test_buffer(self):
+        buf = bytearray(16 * numpy.prod(self.n))
+        lock = CountingLock()
+        g = self.gridder(buf, lock)
+        self.assertTrue(g.keep_data)
+        for idx in self.parts:
+            g(x[idx], y[idx], z[idx], data[idx])
+        self.assertEqual(lock.count, len(self.parts))
+        grid = numpy.frombuffer(buf).reshape((2, ) + self.n)
+        numpy.testing.assert_allclose(grid[0], self.gref._gdata)
+        numpy.testing.assert_allclose(grid[1], self.gref._gnorm)
+        numpy.testing.assert_allclose(g.data, self.gref.data)
+
+        # second gridder on the same buffer sees the data
+        g2 = self.gridder(buf)
+        numpy.testing.assert_allclose(g2.data, self.gref.data)
+
+        # pickled copies of gridders on plain buffers are independent
+        g3 = pickle.loads(pickle.dumps(g))
+        g3.Clear()
+        numpy.testing.assert_allclose(g.data, self.gref.data)
+
+    def test_invalid_buffer(self):
+        with self.assertRaises(xu.exception.InputError):
+            xu.Gridder3D(*self.n, buffer=bytearray(100))
+        with self.assertRaises(xu.exception.InputError):
+            xu.Gridder2D(3, 4, buffer=bytes(200))
+        with self.assertRaises(xu.exception.InputError):
+            xu.Gridder2DList(3, 4, buffer=bytearray(200))
+
+    def test_buffer_range(self):
+        # gridders sharing a buffer can not deduce the range from their data
+        g = xu.Gridder3D(*self.n, buffer=bytearray(16 * numpy.prod(self.n)))
+        with self.assertRaises(xu.exception.InputError):
+            g(x, y, z, data)
+        g = xu.Gridder1D(10, buffer=bytearray(160))
+        with self.assertRaises(xu.exception.InputError):
+            g(x, data)
+        self.assertEqual(g._gnorm.sum(), 0)
+
+    @unittest.skipUnless(shared_memory, "multiprocessing.shared_memory "
+                         "(Python >= 3.8) is needed")
+    def test_shared_memory(self):
+        shm = shared_memory.SharedMemory(create=True,
+                                         size=16 * int(numpy.prod(self.n)))
+        try:
+            g = self.gridder(shm)
+            g.Clear()
+            with concurrent.futures.ProcessPoolExecutor(2) as executor:
+                list(executor.map(grid_part, [g] * len(self.parts),
+                                  self.parts))
+            numpy.testing.assert_allclose(g.data, self.gref.data)
+            # unpickled gridders attach to the same shared memory
+            g2 = pickle.loads(pickle.dumps(g))
+            g2(x[:10], y[:10], z[:10], data[:10])
+            self.assertEqual(g._gnorm.sum(), g2._gnorm.sum())
+            del g, g2
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
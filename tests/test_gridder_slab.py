@@ -0,0 +1,96 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import pickle
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestSlabGridder2D(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        numpy.random.seed(3)
+        cls.n = 20000
+        cls.x = numpy.random.uniform(-1, 1, cls.n)
+        cls.y = numpy.random.uniform(-1, 1, cls.n)
+        cls.z = numpy.random.uniform(0, 2, cls.n)
+        cls.data = numpy.random.rand(cls.n)
+
+    def test_axes(self):
+        g = xu.SlabGridder2D(10, 10, (0, 1, 0), 0, 0.1)
+        numpy.testing.assert_allclose(g.xdir, (1, 0, 0))
+        numpy.testing.assert_allclose(g.ydir, (0, 0, 1))
+        g = xu.SlabGridder2D(10, 10, (0, 0, 2), 0, 0.1)
+        numpy.testing.assert_allclose(g.normal, (0, 0, 1))
+        numpy.testing.assert_allclose(g.xdir, (1, 0, 0))
+        numpy.testing.assert_allclose(g.ydir, (0, 1, 0))
+        g = xu.SlabGridder2D(10, 10, (1, 1, 0), 0, 0.1, xdir=(1, 0, 0))
+        numpy.testing.assert_allclose(g.xdir, numpy.array((1, -1, 0)) /
+                                      numpy.sqrt(2))
+        numpy.testing.assert_allclose(g.ydir, (0, 0, 1), atol=1e-15)
+        with self.assertRaises(xu.exception.InputError):
+            xu.SlabGridder2D(10, 10, (1, 0, 0), 0, 0.1, xdir=(2, 0, 0))
+        with self.assertRaises(xu.exception.InputError):
+            xu.SlabGridder2D(10, 10, (1, 0, 0), 0, 0)
+
+    def test_reference(self):
+        # compare with masking in Python and a regular Gridder2D
+        g = xu.SlabGridder2D(15, 12, (0, 1, 0), 0.2, 0.3)
+        g(self.x, self.y, self.z, self.data)
+        mask = numpy.abs(self.y - 0.2) <= 0.15
+        gref = xu.Gridder2D(15, 12)
+        gref(self.x[mask], self.z[mask], self.data[mask])
+        for attr in ('xmin', 'xmax', 'ymin', 'ymax'):
+            self.assertEqual(getattr(g, attr), getattr(gref, attr))
+        numpy.testing.assert_allclose(g.data, gref.data)
+        self.assertEqual(g._gnorm.sum(), mask.sum())
+
+    def test_oblique(self):
+        normal = numpy.array((1., 1., 1.)) / numpy.sqrt(3)
+        g = xu.SlabGridder2D(8, 9, normal, 0.5, 0.2)
+        g.dataRange(-1, 1, -1, 1)
+        g(self.x.astype(numpy.float32), self.y.astype(numpy.float32),
+          self.z.astype(numpy.float32), self.data)
+        u, v, d = g.plane_coordinates(self.x, self.y, self.z)
+        mask = (numpy.abs(d) <= 0.1) & (numpy.abs(u) <= 1) & \
+            (numpy.abs(v) <= 1)
+        self.assertAlmostEqual(g._gnorm.sum(), mask.sum(), delta=2)
+        self.assertAlmostEqual(g._gdata.sum(), self.data[mask].sum(),
+                               delta=2)
+
+    def test_merge_pickle(self):
+        g1 = xu.SlabGridder2D(10, 10, (0, 1, 0), 0, 0.5)
+        g1.dataRange(-1, 1, 0, 2)
+        g2 = pickle.loads(pickle.dumps(g1))
+        h = self.n // 2
+        g1(self.x[:h], self.y[:h], self.z[:h], self.data[:h])
+        g2(self.x[h:], self.y[h:], self.z[h:], self.data[h:])
+        g1.merge(g2)
+        gref = xu.SlabGridder2D(10, 10, (0, 1, 0), 0, 0.5)
+        gref.dataRange(-1, 1, 0, 2)
+        gref(self.x, self.y, self.z, self.data)
+        numpy.testing.assert_allclose(g1.data, gref.data)
+        g3 = xu.SlabGridder2D(10, 10, (0, 1, 0), 0.1, 0.5)
+        g3.dataRange(-1, 1, 0, 2)
+        with self.assertRaises(xu.exception.InputError):
+            g1.merge(g3)
+
+
+if __name__ == '__main__':
+    unittest.main()
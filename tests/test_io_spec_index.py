@@ -0,0 +1,137 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import os.path
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy
+import xrayutilities as xu
+
+xu.config.VERBOSITY = 0  # make no output during test
+
+fileheader = """#F test.spec
+#E 1383596285
+#D Mon Nov 04 21:18:05 2013
+#O0 Theta  Two Theta  Chi
+
+"""
+
+
+def specscan(nr, npoints, mca=False):
+    lines = ["#S %d  ascan  th 0 1 %d 1" % (nr, npoints - 1),
+             "#D Mon Nov 04 21:18:%02d 2013" % nr,
+             "#T 1  (Seconds)",
+             "#P0 %.1f 2.0 3.0" % nr]
+    if mca:
+        lines += ["#@MCA 4C", "#@CHANN 8 0 7 1"]
+    lines += ["#N 3", "#L Theta  Two Theta  Detector"]
+    for i in range(npoints):
+        lines.append("%.2f %.2f %d" % (i * 0.5, i, 10 * nr + i))
+        if mca:
+            lines += ["@A %s \\" % " ".join("%d" % (i + j) for j in range(4)),
+                      " %s" % " ".join("%d" % (i + j) for j in range(4, 8))]
+    return "\n".join(lines) + "\n\n"
+
+
+class TestSPECFileIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmpdir.name, 'test.spec')
+        self.write(fileheader + specscan(1, 5) + specscan(2, 3, mca=True) +
+                   specscan(3, 4))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, content, mode='w'):
+        with open(self.fname, mode) as f:
+            f.write(content)
+
+    def assertSameScans(self, s1, s2):
+        self.assertEqual(len(s1), len(s2))
+        for a, b in zip(s1, s2):
+            for attr in ('nr', 'command', 'date', 'time', 'colnames',
+                         'hoffset', 'doffset', 'scan_status', 'has_mca',
+                         'mca_channels', 'mca_nof_lines', 'init_motor_pos'):
+                self.assertEqual(getattr(a, attr), getattr(b, attr))
+            a.ReadData()
+            b.ReadData()
+            for name in a.data.dtype.names:
+                numpy.testing.assert_array_equal(a.data[name], b.data[name])
+        self.assertEqual(s1.last_offset, s2.last_offset)
+
+    def test_reopen(self):
+        ref = xu.io.SPECFile(self.fname)
+        s = xu.io.SPECFile(self.fname, index=True)
+        self.assertTrue(os.path.isfile(self.fname + '.xuidx'))
+        self.assertSameScans(ref, s)
+        with mock.patch.object(xu.io.SPECFile, 'Parse',
+                               side_effect=AssertionError):
+            s = xu.io.SPECFile(self.fname, index=True)
+        self.assertSameScans(ref, s)
+        self.assertEqual(s.scan2.mca_channels, 8)
+        self.assertEqual(s.scan3.init_motor_pos['INIT_MOPO_Theta'], 3.0)
+
+    def test_grown(self):
+        xu.io.SPECFile(self.fname, index=True)
+        self.write(specscan(4, 2, mca=True) + specscan(5, 6), mode='a')
+        s = xu.io.SPECFile(self.fname, index=True)
+        ref = xu.io.SPECFile(self.fname)
+        self.assertEqual([scan.nr for scan in s], [1, 2, 3, 4, 5])
+        self.assertSameScans(ref, s)
+        # the updated index is used without parsing
+        with mock.patch.object(xu.io.SPECFile, 'Parse',
+                               side_effect=AssertionError):
+            s = xu.io.SPECFile(self.fname, index=True)
+        self.assertSameScans(ref, s)
+
+    def test_update(self):
+        indexname = os.path.join(self.tmpdir.name, 'other.idx')
+        s = xu.io.SPECFile(self.fname, index=indexname)
+        self.write(specscan(4, 2), mode='a')
+        s.Update()
+        with mock.patch.object(xu.io.SPECFile, 'Parse',
+                               side_effect=AssertionError):
+            s = xu.io.SPECFile(self.fname, index=indexname)
+        self.assertEqual([scan.nr for scan in s], [1, 2, 3, 4])
+
+    def test_invalid(self):
+        xu.io.SPECFile(self.fname, index=True)
+        mtime = os.stat(self.fname).st_mtime_ns
+        # rewrite the file with different content of the same size
+        self.write(fileheader + specscan(1, 5) + specscan(2, 3, mca=True) +
+                   specscan(7, 4))
+        os.utime(self.fname, ns=(mtime + 10**9, mtime + 10**9))
+        s = xu.io.SPECFile(self.fname, index=True)
+        self.assertEqual([scan.nr for scan in s], [1, 2, 7])
+        # modify the indexed part while growing the file
+        self.write(fileheader + specscan(1, 5) + specscan(2, 3, mca=True) +
+                   specscan(8, 5))
+        s = xu.io.SPECFile(self.fname, index=True)
+        self.assertEqual([scan.nr for scan in s], [1, 2, 8])
+        self.assertSameScans(xu.io.SPECFile(self.fname), s)
+        # corrupted index
+        with open(self.fname + '.xuidx', 'w') as f:
+            f.write('{')
+        s = xu.io.SPECFile(self.fname, index=True)
+        self.assertEqual([scan.nr for scan in s], [1, 2, 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import gzip
+import os.path
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+import xrayutilities as xu
+
+xu.config.VERBOSITY = 0  # make no output during test
+
+fileheader = """#F test.spec
+#E 1383596285
+#D Mon Nov 04 21:18:05 2013
+#O0 Theta  Two Theta
+
+"""
+
+
+def specheader(nr, mca=False):
+    lines = ["#S %d  ascan  th 0 1 4 1" % nr,
+             "#D Mon Nov 04 21:18:05 2013",
+             "#T 1  (Seconds)",
+             "#P0 1.0 2.0"]
+    if mca:
+        lines += ["#@MCA 4C", "#@CHANN 6 0 5 1"]
+    lines += ["#N 3", "#L Theta  Two Theta  Detector"]
+    return lines
+
+
+def datalines(i, mca=False):
+    lines = ["%.2f %.2f %d" % (i * 0.5, i, 10 + i)]
+    if mca:
+        lines += ["@A %s\\" % " ".join("%d" % (i + j) for j in range(4)),
+                  " %s" % " ".join("%d" % (i + j) for j in range(4, 6))]
+    return lines
+
+
+class TestSPECScanReadData(unittest.TestCase):
+    use_mmap = False
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmpdir.name, 'test.spec')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def readscans(self, *scans):
+        with open(self.fname, 'w') as f:
+            f.write(fileheader)
+            for s in scans:
+                f.write("\n".join(s) + "\n\n")
+        specfile = xu.io.SPECFile(self.fname, use_mmap=self.use_mmap)
+        for s in specfile:
+            s.ReadData()
+        return specfile
+
+    def checkdata(self, scan, points, mca=False):
+        self.assertIsInstance(scan.data, numpy.recarray)
+        self.assertEqual(scan.data.shape, (len(points), ))
+        p = numpy.asarray(points)
+        numpy.testing.assert_array_equal(scan.data['Theta'], p * 0.5)
+        numpy.testing.assert_array_equal(scan.data['Two Theta'], p)
+        numpy.testing.assert_array_equal(scan.data['Detector'], p + 10)
+        self.assertEqual(scan.data['Detector'].dtype, numpy.float32)
+        if mca:
+            self.assertEqual(scan.data['MCA'].dtype, numpy.uint32)
+            numpy.testing.assert_array_equal(
+                scan.data['MCA'], p[:, numpy.newaxis] + numpy.arange(6))
+
+    def test_scalar(self):
+        s1 = specheader(1)
+        for i in range(5):
+            s1 += datalines(i)
+        s2 = specheader(2) + datalines(0) + [" ", "#C comment"]
+        s2 += datalines(1) + ["  " + datalines(2)[0] + " \r"]
+        specfile = self.readscans(s1, s2)
+        self.checkdata(specfile[0], range(5))
+        self.checkdata(specfile[1], range(3))
+
+    def test_mca(self):
+        s1 = specheader(1, mca=True)
+        for i in range(4):
+            s1 += datalines(i, mca=True)
+        # last data point is incomplete and therefore ignored
+        s2 = specheader(2, mca=True) + datalines(0, mca=True)
+        s2 += datalines(1, mca=True)[:2]
+        specfile = self.readscans(s1, s2)
+        self.checkdata(specfile[0], range(4), mca=True)
+        self.checkdata(specfile[1], range(1), mca=True)
+
+    def test_aborted(self):
+        s1 = specheader(1) + datalines(0) + datalines(1)
+        s1 += ["#C Mon Nov 04 21:18:05 2013.  Scan aborted after 2 points."]
+        s2 = list(s1) + ["#C Scan resumed."] + datalines(2)
+        s3 = list(s1) + datalines(2)
+        specfile = self.readscans(s1, s2, s3)
+        self.assertEqual(specfile[0].scan_status, 'ABORTED')
+        self.checkdata(specfile[0], range(2))
+        self.assertEqual(specfile[1].scan_status, 'OK')
+        self.checkdata(specfile[1], range(3))
+        # data after an abort without resume notice are not read
+        self.assertEqual(specfile[2].scan_status, 'ABORTED')
+        self.checkdata(specfile[2], range(2))
+
+    def test_irregular(self):
+        # irregular data blocks are handled by the line by line parser
+        s1 = specheader(1) + datalines(0) + ["0.50 11"] + datalines(2)
+        s2 = specheader(2) + datalines(0) + ["0.50 1.00 11 abc"]
+        specfile = self.readscans(s1, s2)
+        self.assertEqual(specfile[0].scan_status, 'NODATA')
+        self.assertIsNone(specfile[0].data)
+        self.checkdata(specfile[1], range(2))
+
+
+class TestSPECScanReadDataMmap(TestSPECScanReadData):
+    use_mmap = True
+
+    def test_shared_mapping(self):
+        s1 = specheader(1) + datalines(0) + datalines(1)
+        specfile = self.readscans(s1, specheader(2, mca=True) +
+                                  datalines(0, mca=True))
+        self.assertIsNotNone(specfile._mmap)
+        for s in specfile:
+            self.assertIs(s._mmap, specfile._mmap)
+
+        # the mapping is renewed when the file grows
+        s3 = specheader(3) + datalines(0) + datalines(1) + datalines(2)
+        with open(self.fname, 'a') as f:
+            f.write("\n".join(s3) + "\n")
+        specfile.Update()
+        self.assertEqual(len(specfile._mmap), os.path.getsize(self.fname))
+        for s in specfile:
+            self.assertIs(s._mmap, specfile._mmap)
+        specfile.scan3.ReadData()
+        self.checkdata(specfile.scan3, range(3))
+        specfile.scan2.ReadData()
+        self.checkdata(specfile.scan2, range(1), mca=True)
+
+    def test_threaded(self):
+        scans = []
+        for nr in range(1, 9):
+            s = specheader(nr)
+            for i in range(nr * 50):
+                s += datalines(i)
+            scans.append(s)
+        specfile = self.readscans(*scans)
+        for s in specfile:
+            s.ClearData()
+        # the shared mapping is read by offsets: concurrent reading of
+        # different scans does not interfere
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda s: s.ReadData(), list(specfile) * 4))
+        self.assertEqual(specfile._mmap.tell(), 0)
+        for nr, s in enumerate(specfile, start=1):
+            self.assertEqual(s.header[0], "#S %d  ascan  th 0 1 4 1" % nr)
+            self.checkdata(s, range(nr * 50))
+
+    def test_compressed(self):
+        fname = os.path.join(self.tmpdir.name, 'test.spec.gz')
+        with gzip.open(fname, 'wt') as f:
+            f.write(fileheader)
+            f.write("\n".join(specheader(1) + datalines(0)) + "\n")
+        specfile = xu.io.SPECFile(fname, use_mmap=True)
+        self.assertIsNone(specfile._mmap)
+        specfile[0].ReadData()
+        self.checkdata(specfile[0], range(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
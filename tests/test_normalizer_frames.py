@@ -0,0 +1,100 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestNormalizerFrames(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = numpy.random.RandomState(5)
+        cls.nframes = 6
+        cls.shape = (7, 9)
+        cls.ccd = rng.randint(0, 1000, (cls.nframes, ) + cls.shape)
+        cls.ccd = cls.ccd.astype(numpy.uint16)
+        cls.data = numpy.zeros(cls.nframes, dtype=[('time', float),
+                                                   ('moni', float),
+                                                   ('att', float)])
+        cls.data['time'] = rng.uniform(0.5, 2, cls.nframes)
+        cls.data['moni'] = rng.uniform(1e4, 2e4, cls.nframes)
+        cls.data['att'] = rng.uniform(1, 10, cls.nframes)
+        cls.dark = rng.uniform(0, 20, cls.shape)
+        cls.flat = rng.uniform(0.8, 1.2, cls.shape)
+        cls.normalizer = xu.IntensityNormalizer(
+            mon='moni', time='time', absfun=lambda d: d['att'],
+            darkfield=cls.dark, flatfield=cls.flat)
+
+    def reference(self):
+        d = self.data
+        c = d['att'] * d['moni'].mean() / (d['moni'] * d['time'])
+        ref = self.ccd - self.dark * d['time'][:, numpy.newaxis, numpy.newaxis]
+        ref[ref < 0] = 0
+        ref *= c[:, numpy.newaxis, numpy.newaxis]
+        return ref / self.flat * self.flat.mean()
+
+    def test_call(self):
+        corr = self.normalizer(self.data, ccd=self.ccd)
+        self.assertEqual(corr.dtype, numpy.float64)
+        numpy.testing.assert_allclose(corr, self.reference(), rtol=1e-12)
+
+    def test_out(self):
+        out = numpy.empty(self.ccd.shape, dtype=numpy.float32)
+        corr = self.normalizer(self.data, ccd=self.ccd, out=out)
+        self.assertIs(corr, out)
+        numpy.testing.assert_allclose(out, self.reference(), rtol=1e-5)
+        # in place correction
+        ccd = self.ccd.astype(numpy.float32)
+        self.normalizer(self.data, ccd=ccd, out=ccd)
+        numpy.testing.assert_allclose(ccd, self.reference(), rtol=1e-5)
+        with self.assertRaises(xu.exception.InputError):
+            self.normalizer(self.data, ccd=self.ccd,
+                            out=numpy.empty(self.ccd.shape, dtype=int))
+
+    def test_iter_frames(self):
+        ref = self.reference()
+        frames = (f for f in self.ccd)
+        n = 0
+        for i, f in enumerate(self.normalizer.iter_frames(self.data,
+                                                          frames)):
+            self.assertEqual(f.dtype, numpy.float32)
+            numpy.testing.assert_allclose(f, ref[i], rtol=1e-5)
+            n += 1
+        self.assertEqual(n, self.nframes)
+        with self.assertRaises(xu.exception.InputError):
+            list(self.normalizer.iter_frames(self.data[:2], self.ccd))
+
+    def test_shape_mismatch(self):
+        # darkfield and flatfield of a different shape are ignored
+        ccd = self.ccd[:, :, :-1]
+        normalizer = xu.IntensityNormalizer(
+            mon='moni', time='time', absfun=lambda d: d['att'])
+        numpy.testing.assert_allclose(
+            self.normalizer(self.data, ccd=ccd),
+            normalizer(self.data, ccd=ccd), rtol=1e-12)
+
+    def test_constant_factor(self):
+        normalizer = xu.IntensityNormalizer(time=2.)
+        corr = list(normalizer.iter_frames(None, self.ccd,
+                                           dtype=numpy.float64))
+        numpy.testing.assert_allclose(corr[-1], self.ccd[-1] / 2.)
+
+
+if __name__ == '__main__':
+    unittest.main()
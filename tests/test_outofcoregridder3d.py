@@ -0,0 +1,100 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import os.path
+import tempfile
+import unittest
+
+import h5py
+import numpy
+import xrayutilities as xu
+
+
+class TestOutOfCoreGridder3D(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.n = (37, 41, 29)
+        cls.npoints = 50000
+        cls.x, cls.y, cls.z = numpy.random.normal(size=(3, cls.npoints))
+        cls.data = numpy.random.rand(cls.npoints)
+        cls.gref = xu.Gridder3D(*cls.n)
+        cls.gref(cls.x, cls.y, cls.z, cls.data)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, 'grid.h5')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_gridding(self):
+        # small cache to force eviction of chunks and several passes
+        with xu.OutOfCoreGridder3D(self.filename, *self.n, blocksize=8,
+                                   cachesize=3) as g:
+            g(self.x, self.y, self.z, self.data)
+            self.assertTrue(g.nbytes < 3 * 2 * 8 * 8**3 + 10000)
+            numpy.testing.assert_allclose(g.data, self.gref.data)
+            idx, values = g.tocoo()
+            dense = numpy.zeros(self.n)
+            dense[idx] = values
+            numpy.testing.assert_allclose(dense, self.gref.data)
+            for axis in range(3):
+                ref = numpy.take(self.gref.data, 7, axis=axis)
+                numpy.testing.assert_allclose(g.slice(axis, 7), ref)
+                numpy.testing.assert_allclose(
+                    g.slice(axis, 7, sparse=True).toarray(), ref)
+
+    def test_restart(self):
+        g = xu.OutOfCoreGridder3D(self.filename, *self.n, blocksize=8,
+                                  cachesize=10)
+        g.KeepData(True)
+        g.dataRange(self.gref.xmin, self.gref.xmax, self.gref.ymin,
+                    self.gref.ymax, self.gref.zmin, self.gref.zmax)
+        g(self.x[:1000], self.y[:1000], self.z[:1000], self.data[:1000])
+        g.close()
+
+        # continue the gridding in a new gridder
+        g = xu.OutOfCoreGridder3D(self.filename, cachesize=20)
+        self.assertTrue(g.keep_data)
+        self.assertEqual((g.nx, g.ny, g.nz), self.n)
+        for a in ('xaxis', 'yaxis', 'zaxis'):
+            numpy.testing.assert_allclose(getattr(g, a),
+                                          getattr(self.gref, a))
+        g(self.x[1000:], self.y[1000:], self.z[1000:], self.data[1000:])
+        numpy.testing.assert_allclose(g.data, self.gref.data)
+        g.close()
+
+        with self.assertRaises(xu.exception.InputError):
+            xu.OutOfCoreGridder3D(self.filename, 10, 10, 10)
+
+    def test_group(self):
+        with h5py.File(self.filename, 'a') as h5:
+            g = xu.OutOfCoreGridder3D(h5.create_group('grid'), *self.n)
+            g(self.x, self.y, self.z, self.data)
+            g.close()
+            self.assertTrue(h5.id.valid)
+            g = xu.OutOfCoreGridder3D(h5['grid'])
+            numpy.testing.assert_allclose(g.data, self.gref.data)
+            g.KeepData(False)
+            g(self.x[:10], self.y[:10], self.z[:10], self.data[:10])
+            self.assertEqual(numpy.count_nonzero(h5['grid/chunks']), 0)
+            g.flush()
+            self.assertTrue(numpy.count_nonzero(h5['grid/chunks']) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,6 +41,23 @@ class TestQ2AngFit(unittest.TestCase):
         for i in range(3):
             self.assertAlmostEqual(qout[i], self.qvec[i], places=5)
 
+    def test_q2angfit_batch(self):
+        qvecs = numpy.zeros((8, 3))
+        qvecs[:, 0] = numpy.linspace(-0.2, 0.2, 8)
+        qvecs[:, 2] = numpy.linspace(1, 1.5, 8)
+        for nproc in (1, 2):
+            ang, qerror, errcode = xu.Q2AngFitBatch(qvecs, self.hxrd,
+                                                    self.bounds, nproc=nproc)
+            self.assertEqual(ang.shape, (8, 5))
+            self.assertEqual(qerror.shape, (8, ))
+            self.assertEqual(errcode.shape, (8, ))
+            qout = numpy.transpose(self.hxrd.Ang2Q(*ang.T))
+            numpy.testing.assert_allclose(qout, qvecs, rtol=0, atol=1e-5)
+
+    def test_q2angfit_batch_invalid(self):
+        with self.assertRaises(xu.exception.InputError):
+            xu.Q2AngFitBatch(self.qvec, self.hxrd, self.bounds)
+
 
 if __name__ == '__main__':
     unittest.main()
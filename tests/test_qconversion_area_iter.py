@@ -0,0 +1,85 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestQConversionAreaIter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.qconv = xu.QConversion(['x+', 'y+'], ['z+', 'x-'], [0, 1, 0])
+        cls.nch = (9, 13)
+        cls.qconv.init_area('z+', 'x+', 4, 6, cls.nch[0], cls.nch[1], 0.5,
+                            50e-6, 50e-6)
+        cls.npoints = 7
+        cls.om = numpy.linspace(10, 20, cls.npoints)
+        cls.chi = numpy.linspace(-1, 1, cls.npoints)
+        cls.nu = 5.
+        cls.tt = numpy.linspace(20, 40, cls.npoints)
+        cls.qref = cls.qconv.area(cls.om, cls.chi, cls.nu, cls.tt)
+
+    def test_chunks(self):
+        for chunk in (1, 3, self.npoints, 2 * self.npoints):
+            start = 0
+            for q in self.qconv.area_iter(self.om, self.chi, self.nu, self.tt,
+                                          chunk=chunk):
+                n = q[0].shape[0]
+                self.assertTrue(n <= chunk)
+                self.assertEqual(q[0].shape[1:], self.nch)
+                for i in range(3):
+                    numpy.testing.assert_allclose(
+                        q[i], self.qref[i][start:start+n], rtol=0, atol=1e-12)
+                start += n
+            self.assertEqual(start, self.npoints)
+
+    def test_outbuffer(self):
+        chunk = 2
+        out = numpy.empty((chunk, ) + self.nch + (3, ))
+        start = 0
+        for q in self.qconv.area_iter(self.om, self.chi, self.nu, self.tt,
+                                      chunk=chunk, out=out):
+            n = q[0].shape[0]
+            self.assertTrue(numpy.shares_memory(q[0], out))
+            for i in range(3):
+                numpy.testing.assert_allclose(
+                    q[i], self.qref[i][start:start+n], rtol=0, atol=1e-12)
+            start += n
+
+    def test_roi_nav(self):
+        roi = (1, 8, 2, 11)
+        qref = self.qconv.area(self.om, self.chi, self.nu, self.tt, roi=roi,
+                               Nav=(2, 3))
+        q = numpy.concatenate(
+            [numpy.stack(q, axis=-1) for q in self.qconv.area_iter(
+                self.om, self.chi, self.nu, self.tt, roi=roi, Nav=(2, 3),
+                chunk=4)])
+        for i in range(3):
+            numpy.testing.assert_allclose(q[..., i], qref[i], rtol=0,
+                                          atol=1e-12)
+
+    def test_invalid_out(self):
+        out = numpy.empty((2, ) + self.nch + (3, ), dtype=numpy.float32)
+        with self.assertRaises(xu.exception.InputError):
+            self.qconv.area_iter(self.om, self.chi, self.nu, self.tt,
+                                 chunk=2, out=out)
+
+
+if __name__ == '__main__':
+    unittest.main()
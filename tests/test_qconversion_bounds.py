@@ -0,0 +1,98 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestQConversionBounds(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.qconv = xu.QConversion(['x+', 'y+', 'z-'], ['z+', 'x-'],
+                                   [0, 1, 0])
+        # large pixels to cover a wide angular range with the detector such
+        # that extrema of the momentum transfer inside the detector occur
+        cls.qconv.init_area('z+', 'x+', 10, 15, 31, 37, 0.2, 3e-3, 2e-3,
+                            tiltazimuth=30, tilt=5)
+        cls.qconv.init_linear('x+', 50, 120, 0.2, 2e-3)
+        rng = numpy.random.RandomState(12)
+        cls.npoints = 25
+        cls.angles = [rng.uniform(-90, 90, cls.npoints) for _ in range(5)]
+
+    @staticmethod
+    def reference(q):
+        return numpy.array([[qi.min(), qi.max()] for qi in q])
+
+    def test_area(self):
+        bounds = self.qconv.area_bounds(*self.angles)
+        self.assertEqual(bounds.shape, (3, 2))
+        numpy.testing.assert_array_equal(
+            bounds, self.reference(self.qconv.area(*self.angles)))
+
+    def test_area_options(self):
+        kwargs = dict(UB=numpy.array([[1, 0.2, 0], [0, 1, 0.3],
+                                      [0.1, 0, 1.]]),
+                      roi=(2, 29, 5, 30), Nav=(2, 3),
+                      sampledis=(0.01, -0.02, 0.005))
+        bounds = self.qconv.area_bounds(*self.angles, **kwargs)
+        numpy.testing.assert_array_equal(
+            bounds, self.reference(self.qconv.area(*self.angles, **kwargs)))
+
+    def test_area_strong_tilt(self):
+        # strongly tilted detector covering a wide angular range: the contour
+        # lines of the momentum transfer on the detector are elongated and
+        # the extrema lie far away from the stationary point of the plane
+        qconv = xu.QConversion(['x+', 'y+', 'z-'], ['z+', 'x+'], [0, 1, 0])
+        qconv.init_area('z-', 'x+', 70, 23, 140, 47, 0.11, 7e-3, 1.2e-3,
+                        detrot=85, tiltazimuth=0.4, tilt=88.9)
+        rng = numpy.random.RandomState(3)
+        args = [rng.uniform(-180, 180, 50) for _ in range(5)]
+        UB = rng.normal(size=(3, 3))
+        numpy.testing.assert_array_equal(
+            qconv.area_bounds(*args, UB=UB),
+            self.reference(qconv.area(*args, UB=UB)))
+
+    def test_area_translation(self):
+        qconv = xu.QConversion(['x+', 'y+'], ['z+', 'ty'], [0, 1, 0])
+        qconv.init_area('z+', 'x+', 10, 15, 31, 37, 0.2, 3e-3, 2e-3)
+        args = self.angles[:3] + [numpy.linspace(-0.05, 0.05, self.npoints)]
+        numpy.testing.assert_array_equal(
+            qconv.area_bounds(*args), self.reference(qconv.area(*args)))
+
+    def test_linear(self):
+        bounds = self.qconv.linear_bounds(*self.angles)
+        numpy.testing.assert_array_equal(
+            bounds, self.reference(self.qconv.linear(*self.angles)))
+        bounds = self.qconv.linear_bounds(*self.angles, roi=(10, 100), Nav=3)
+        numpy.testing.assert_array_equal(
+            bounds, self.reference(self.qconv.linear(*self.angles,
+                                                     roi=(10, 100), Nav=3)))
+
+    def test_gridder_range(self):
+        data = numpy.ones((self.npoints, 31, 37))
+        g = xu.Gridder3D(10, 11, 12)
+        g.grid_area(self.qconv, *self.angles, data)
+        q = self.qconv.area(*self.angles)
+        self.assertEqual((g.xmin, g.xmax), (q[0].min(), q[0].max()))
+        self.assertEqual((g.zmin, g.zmax), (q[2].min(), q[2].max()))
+        self.assertEqual(g._gnorm.sum(), data.size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestQConversionDetectorCache(unittest.TestCase):
+    def setUp(self):
+        self.qconv = xu.QConversion(['x+', 'y+'], ['z+', 'x-'], [0, 1, 0])
+        self.qconv.init_area('z+', 'x+', 20, 30, 40, 60, 0.5, 50e-6, 50e-6,
+                             tilt=0.5, tiltazimuth=20)
+        self.ang = (numpy.linspace(10, 20, 5), 1, 5, numpy.linspace(20, 40, 5))
+
+    def test_area_cached(self):
+        qref = self.qconv.area(*self.ang)
+        self.assertEqual(len(self.qconv._detector_cache), 1)
+        rpix = list(self.qconv._detector_cache.values())[0]
+        self.assertEqual(rpix.shape, (40, 60, 3))
+        self.assertFalse(rpix.flags.writeable)
+        q = self.qconv.area(*self.ang)
+        self.assertEqual(len(self.qconv._detector_cache), 1)
+        self.assertIs(list(self.qconv._detector_cache.values())[0], rpix)
+        for i in range(3):
+            numpy.testing.assert_array_equal(q[i], qref[i])
+
+    def test_area_roi(self):
+        qref = self.qconv.area(*self.ang)
+        q = self.qconv.area(*self.ang, roi=(5, 30, 10, 50))
+        self.assertEqual(len(self.qconv._detector_cache), 2)
+        for i in range(3):
+            numpy.testing.assert_allclose(q[i], qref[i][:, 5:30, 10:50],
+                                          rtol=0, atol=1e-12)
+
+    def test_linear_roi(self):
+        self.qconv.init_linear('z+', 100, 200, 0.7, 50e-6, tilt=0.3)
+        qref = self.qconv.linear(*self.ang)
+        self.assertEqual(len(self.qconv._detector_cache), 1)
+        q = self.qconv.linear(*self.ang, roi=(20, 150))
+        for i in range(3):
+            numpy.testing.assert_allclose(q[i], qref[i][:, 20:150],
+                                          rtol=0, atol=1e-12)
+
+    def test_invalidation(self):
+        qref = self.qconv.area(*self.ang)
+        self.qconv.init_area('z+', 'x+', 10, 30, 40, 60, 0.5, 50e-6, 50e-6,
+                             tilt=0.5, tiltazimuth=20)
+        self.assertEqual(len(self.qconv._detector_cache), 0)
+        q = self.qconv.area(*self.ang)
+        self.assertFalse(numpy.allclose(q[0], qref[0]))
+        # restoring the parameters restores the result
+        self.qconv.init_area('z+', 'x+', 20, 30, 40, 60, 0.5, 50e-6, 50e-6,
+                             tilt=0.5, tiltazimuth=20)
+        q = self.qconv.area(*self.ang)
+        for i in range(3):
+            numpy.testing.assert_array_equal(q[i], qref[i])
+
+
+if __name__ == '__main__':
+    unittest.main()
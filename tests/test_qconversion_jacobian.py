@@ -0,0 +1,72 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestQConversionJacobian(unittest.TestCase):
+    npoints = 5
+    step = 1e-6
+
+    def setUp(self):
+        self.rng = numpy.random.RandomState(2)
+
+    def numeric_jacobian(self, qconv, angles, **kwargs):
+        jac = numpy.empty((self.npoints, len(angles), 3))
+        for j in range(len(angles)):
+            ap = list(angles)
+            am = list(angles)
+            ap[j] = angles[j] + self.step
+            am[j] = angles[j] - self.step
+            jac[:, j, :] = (numpy.transpose(qconv.point(*ap, **kwargs)) -
+                            numpy.transpose(qconv.point(*am, **kwargs)))
+        return jac / (2 * self.step)
+
+    def check(self, qconv, **kwargs):
+        nang = len(qconv.sampleAxis) + len(qconv.detectorAxis)
+        angles = [self.rng.uniform(-40, 40, self.npoints)
+                  for i in range(nang)]
+        jac = qconv.point_jacobian(*angles, **kwargs)
+        self.assertEqual(jac.shape, (self.npoints, nang, 3))
+        numpy.testing.assert_allclose(
+            jac, self.numeric_jacobian(qconv, angles, **kwargs), rtol=0,
+            atol=1e-7)
+
+    def test_fourcircle(self):
+        self.check(xu.QConversion(['x+', 'y+', 'z-'], 'x+', [0, 1, 0]))
+
+    def test_sixcircle_UB(self):
+        self.check(xu.QConversion(['z+', 'y-', 'z-'], ['z+', 'y-'],
+                                  [1, 0, 0]),
+                   UB=self.rng.rand(3, 3))
+
+    def test_sampledis_translations(self):
+        self.check(xu.QConversion(['k+', 'y-', 'z-'],
+                                  ['z+', 'ty', 'y-', 'tz'], [1, 0, 0]),
+                   sampledis=(0.01, -0.02, 0.03))
+
+    def test_single_point(self):
+        qconv = xu.QConversion(['x+', 'y+'], ['z+', 'x-'], [0, 1, 0])
+        jac = qconv.point_jacobian(10, 20, 30, 40, deg=False)
+        self.assertEqual(jac.shape, (4, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# This file is part of xrayutilities.
+#
+# xrayutilities is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright (C) 2020 Dominik Kriegner <dominik.kriegner@gmail.com>
+
+import unittest
+
+import numpy
+import xrayutilities as xu
+
+
+class TestSparseGridder3D(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.n = (37, 41, 29)
+        cls.npoints = 50000
+        cls.x, cls.y, cls.z = numpy.random.normal(size=(3, cls.npoints))
+        cls.data = numpy.random.rand(cls.npoints)
+        cls.gref = xu.Gridder3D(*cls.n)
+        cls.gref(cls.x, cls.y, cls.z, cls.data)
+
+    def test_dense(self):
+        for bs in (1, 7, 16):
+            g = xu.SparseGridder3D(*self.n, blocksize=bs)
+            g(self.x, self.y, self.z, self.data)
+            for a in ('xaxis', 'yaxis', 'zaxis'):
+                numpy.testing.assert_allclose(getattr(g, a),
+                                              getattr(self.gref, a))
+            numpy.testing.assert_allclose(g.data, self.gref.data)
+
+    def test_coo(self):
+        g = xu.SparseGridder3D(*self.n, blocksize=8)
+        g(self.x, self.y, self.z, self.data)
+        idx, values = g.tocoo()
+        dense = numpy.zeros(self.n)
+        dense[idx] = values
+        numpy.testing.assert_allclose(dense, self.gref.data)
+        self.assertTrue(numpy.all(self.gref._gnorm[idx] > 0))
+        self.assertEqual(values.size, numpy.count_nonzero(self.gref._gnorm))
+
+    def test_slice(self):
+        g = xu.SparseGridder3D(*self.n, blocksize=8)
+        g(self.x, self.y, self.z, self.data)
+        for axis in range(3):
+            for index in (0, 9, self.n[axis] - 1):
+                ref = numpy.take(self.gref.data, index, axis=axis)
+                numpy.testing.assert_allclose(g.slice(axis, index), ref)
+                numpy.testing.assert_allclose(
+                    g.slice(axis, index, sparse=True).toarray(), ref)
+        with self.assertRaises(xu.exception.InputError):
+            g.slice(0, self.n[0])
+
+    def test_keepdata(self):
+        g = xu.SparseGridder3D(*self.n, blocksize=5)
+        g.KeepData(True)
+        g.dataRange(self.gref.xmin, self.gref.xmax, self.gref.ymin,
+                    self.gref.ymax, self.gref.zmin, self.gref.zmax)
+        for s in (slice(0, 1000), slice(1000, 20000), slice(20000, None)):
+            g(self.x[s], self.y[s], self.z[s], self.data[s])
+        numpy.testing.assert_allclose(g.data, self.gref.data)
+        g.Normalize(False)
+        numpy.testing.assert_allclose(g.data, self.gref._gdata)
+
+        # new gridding after clearing of the data
+        g.KeepData(False)
+        g(self.x[:100], self.y[:100], self.z[:100], self.data[:100])
+        gref = xu.Gridder3D(*self.n)
+        gref.KeepData(True)
+        gref.Normalize(False)
+        gref.dataRange(self.gref.xmin, self.gref.xmax, self.gref.ymin,
+                       self.gref.ymax, self.gref.zmin, self.gref.zmax)
+        gref(self.x[:100], self.y[:100], self.z[:100], self.data[:100])
+        numpy.testing.assert_allclose(g.data, gref.data)
+
+    def test_memory(self):
+        g = xu.SparseGridder3D(512, 512, 512)
+        g.dataRange(-1, 1, -1, 1, -1, 1)
+        phi = numpy.linspace(0, 2 * numpy.pi, 1000)
+        g(numpy.cos(phi), numpy.sin(phi), numpy.zeros_like(phi),
+          numpy.ones_like(phi))
+        self.assertTrue(g.nbytes < 512**3 * 16 / 100)
+        self.assertEqual(g.slice(2, 255).sum(), numpy.count_nonzero(
+            g.slice(2, 255, sparse=True).toarray()))
+
+    def test_grid_area(self):
+        qconv = xu.QConversion(['x+', 'y+'], ['z+', 'x-'], [0, 1, 0])
+        nch = (20, 25)
+        qconv.init_area('z+', 'x+', 8, 10, nch[0], nch[1], 0.5, 50e-5, 50e-5)
+        npoints = 15
+        om = numpy.linspace(10, 20, npoints)
+        tt = numpy.linspace(20, 40, npoints)
+        data = numpy.random.rand(npoints, *nch)
+        gref = xu.Gridder3D(*self.n)
+        gref(*qconv.area(om, 1, 5, tt), data)
+        g = xu.SparseGridder3D(*self.n, blocksize=4)
+        g.grid_area(qconv, om, 1, 5, tt, data)
+        numpy.testing.assert_allclose(g.data, gref.data)
+
+
+if __name__ == '__main__':
+    unittest.main()